@@ -19,8 +19,10 @@ SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 We undertake not to change the open source license (MIT license) applicable to the current version of
 the project delivered to anyone in the future.
 """
-import copy
+import bisect
+import json
 import re
+from functools import lru_cache
 from typing import List
 
 from django.db.models import Q
@@ -42,6 +44,47 @@ from apps.log_search.constants import CollectorScenarioEnum
 from apps.log_search.models import LogIndexSet, Scenario
 from apps.models import model_to_dict
 
+# 正则中包含反向引用或条件分组时，合并为一个表达式后语义会发生变化
+UNSAFE_COMBINE_REGEX = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+# 正则开头的全局标记 如 (?i)
+GLOBAL_FLAGS_REGEX = re.compile(r"^\(\?([aiLmsux]+)\)")
+
+
+@lru_cache(maxsize=1024)
+def compile_desensitize_rule(operator: str, params: str, match_pattern: str):
+    """
+    编译脱敏规则 生成算子实例和正则表达式 结果在进程内跨请求复用
+    params 为 json 序列化后的算子参数
+    """
+    operator_cls = OPERATOR_MAPPING[operator]
+    params = json.loads(params)
+    operator_obj = operator_cls() if not params else operator_cls(**params)
+    regex = None if not match_pattern else re.compile(match_pattern)
+    return operator_obj, regex
+
+
+@lru_cache(maxsize=1024)
+def compile_prefilter(match_patterns: tuple):
+    """
+    将一组规则的正则合并为一个表达式 用于一次扫描判断文本是否可能命中任意规则
+    无法安全合并时返回 None
+    """
+    if not match_patterns or not all(match_patterns):
+        return None
+    if any(UNSAFE_COMBINE_REGEX.search(pattern) for pattern in match_patterns):
+        return None
+    # 全局标记只能出现在表达式开头 合并前转换为仅作用于当前分支的标记
+    match_patterns = [
+        GLOBAL_FLAGS_REGEX.sub(r"(?\1:", pattern, count=1) + ")"
+        if GLOBAL_FLAGS_REGEX.match(pattern)
+        else f"(?:{pattern})"
+        for pattern in match_patterns
+    ]
+    try:
+        return re.compile("|".join(match_patterns))
+    except re.error:
+        return None
+
 
 class DesensitizeHandler(object):
     """
@@ -83,15 +126,10 @@ class DesensitizeHandler(object):
             if operator not in OPERATOR_MAPPING:
                 raise ValidationError(_("{} 算子能力尚未实现").format(operator))
 
-            operator_cls = OPERATOR_MAPPING[operator]
-
-            # 实例化算子
-            _config["operator_obj"] = operator_cls() if not _config["params"] else operator_cls(**_config["params"])
-
-            # 编译正则表达式
+            # 实例化算子 编译正则表达式
             try:
-                _config["__regex__"] = (
-                    None if not _config.get("match_pattern") else re.compile(_config["match_pattern"])
+                _config["operator_obj"], _config["__regex__"] = compile_desensitize_rule(
+                    operator, json.dumps(_config["params"] or {}, sort_keys=True), _config.get("match_pattern") or ""
                 )
             except re.error:
                 raise DesensitizeRuleRegexCompileException(
@@ -115,6 +153,12 @@ class DesensitizeHandler(object):
         if self.rules:
             self.rules = sorted(self.rules, key=lambda x: x["sort_index"])
 
+        # 每组规则的合并正则 id(rules) -> prefilter
+        self.prefilter_mapping = {
+            id(_rules): compile_prefilter(tuple(_rule.get("match_pattern") or "" for _rule in _rules))
+            for _rules in [self.rules, *self.field_rule_mapping.values()]
+        }
+
     def transform_text(self, text: str, is_highlight: bool = False):
         """
         处理文本类型
@@ -214,16 +258,49 @@ class DesensitizeHandler(object):
 
         return result
 
-    def transform(self, log: str, rules: list, is_highlight: bool = False):
+    @classmethod
+    def find_substrings(cls, log: str, rules: list):
+        """
+        按规则优先级找出所有不重叠的匹配子串，与逐条规则调用 merge_substrings 的结果一致
+        已选中的子串按起始位置有序存放，重叠判断通过二分查找完成
+        """
         substrings = []
+        # 已选中的非空子串 互不重叠 因此按起始位置排序后结束位置同样有序
+        starts, ends = [], []
+        # 已选中的空子串位置
+        empty_points = []
+
         for rule in rules:
-            rule_substrings = self.find_substrings_by_rule(log, rule)
-            substrings = self.merge_substrings(substrings, rule_substrings)
+            for item in cls.find_substrings_by_rule(log, rule):
+                start, end = item["start"], item["end"]
+                # 起始位置在 start 之前且覆盖 start 的非空子串
+                index = bisect.bisect_left(starts, end)
+                if index and ends[index - 1] > start:
+                    continue
+                if start != end:
+                    # 严格位于 (start, end) 之间的空子串
+                    index = bisect.bisect_right(empty_points, start)
+                    if index < len(empty_points) and empty_points[index] < end:
+                        continue
+                    index = bisect.bisect_left(starts, start)
+                    starts.insert(index, start)
+                    ends.insert(index, end)
+                else:
+                    bisect.insort(empty_points, start)
+                substrings.append(item)
+
         substrings.sort(key=lambda x: x["start"])
+        return substrings
+
+    def transform(self, log: str, rules: list, is_highlight: bool = False):
+        prefilter = self.prefilter_mapping.get(id(rules))
+        if prefilter and not prefilter.search(log):
+            # 所有规则均未命中
+            return log
 
         last_end = 0
         outputs = []
-        for substring in substrings:
+        for substring in self.find_substrings(log, rules):
             outputs.append(log[last_end : substring["start"]])
             # 文本处理
             _text = self._match_transform(
@@ -648,7 +725,8 @@ class DesensitizeRuleHandler(object):
         # 日志原文脱敏处理
         for _log in logs:
             _log = expand_nested_data(_log)
-            log_content_tmp = copy.deepcopy(_log)
+            # 脱敏只会替换字段值 保留待脱敏字段的原始值即可
+            log_content_tmp = {field_name: _log[field_name] for field_name in field_names if field_name in _log}
 
             result = desensitize_handler.transform_dict(_log)
 
@@ -661,6 +739,9 @@ class DesensitizeRuleHandler(object):
                 for field_name in field_names:
                     if field_name not in result or field_name == text_field:
                         continue
+                    if result[field_name] is log_content_tmp[field_name]:
+                        # 字段值未发生变化
+                        continue
                     result[text_field] = result[text_field].replace(
                         str(log_content_tmp[field_name]), str(result[field_name])
                     )
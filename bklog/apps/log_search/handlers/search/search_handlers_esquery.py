@@ -314,6 +314,7 @@ class SearchHandler:
 
         # 导出字段
         self.export_fields = export_fields
+        self._export_field_plan = None
 
         self.is_desensitize = self._init_desensitize()
 
@@ -1120,11 +1121,12 @@ class SearchHandler:
         )
         return result
 
-    def search_after_result(self, search_result, sorted_fields):
+    def search_after_result(self, search_result, sorted_fields, origin_log_only: bool = False):
         """
         search_after_result
         @param search_result:
         @param sorted_fields:
+        @param origin_log_only: 只返回 origin_log_list(生成器)，用于导出
         @return:
         """
         # 获取search对应的esquery方法
@@ -1170,12 +1172,16 @@ class SearchHandler:
 
             search_after_size = len(search_result["hits"]["hits"])
             result_size += search_after_size
-            yield self._deal_query_result(search_result)
+            if origin_log_only:
+                yield {"origin_log_list": self.iter_origin_log(search_result)}
+            else:
+                yield self._deal_query_result(search_result)
 
-    def scroll_result(self, scroll_result):
+    def scroll_result(self, scroll_result, origin_log_only: bool = False):
         """
         scroll_result
         @param scroll_result:
+        @param origin_log_only: 只返回 origin_log_list(生成器)，用于导出
         @return:
         """
         # 获取scroll对应的esquery方法
@@ -1199,7 +1205,10 @@ class SearchHandler:
             )
             scroll_size = len(scroll_result["hits"]["hits"])
             result_size += scroll_size
-            yield self._deal_query_result(scroll_result)
+            if origin_log_only:
+                yield {"origin_log_list": self.iter_origin_log(scroll_result)}
+            else:
+                yield self._deal_query_result(scroll_result)
 
     def multi_get_slice_data(self, pre_file_name, export_file_type):
         collector_config = CollectorConfig.objects.filter(index_set_id=self.index_set_id).first()
@@ -2189,73 +2198,101 @@ class SearchHandler:
         log["__ipv6__"] = host.get("bk_host_innerip_v6", "")
         return log
 
-    def _deal_query_result(self, result_dict: dict) -> dict:
-        if self.export_fields:
+    def _get_export_field_plan(self) -> list[tuple[str, list[str] | None]]:
+        """
+        导出字段投影计划 [(字段名, 按 . 切分后的路径)]，同一个请求内只生成一次
+        """
+        if self._export_field_plan is None:
             # 将导出字段和检索日志有的字段取交集
             support_fields_list = [i["field_name"] for i in self.fields()["fields"]]
             self.export_fields = list(set(self.export_fields).intersection(set(support_fields_list)))
-        result: dict = {
-            "aggregations": result_dict.get("aggregations", {}),
-        }
-        # 将_shards 字段返回以供saas判断错误
-        _shards = result_dict.get("_shards", {})
-        result.update({"_shards": _shards})
-        log_list: list = []
-        agg_result: dict = {}
-        origin_log_list: list = []
-        if not result_dict.get("hits", {}).get("total"):
-            result.update(
-                {"total": 0, "took": 0, "list": log_list, "aggs": agg_result, "origin_log_list": origin_log_list}
-            )
-            return result
-        # hit data
-        for hit in result_dict["hits"]["hits"]:
+            self._export_field_plan = [
+                (_export_field, _export_field.split(".") if "." in _export_field else None)
+                for _export_field in self.export_fields
+            ]
+        return self._export_field_plan
+
+    def _iter_hit_logs(self, hits: list, origin_log_only: bool = False):
+        """
+        逐条处理命中的日志，返回 (log, origin_log)
+        未被修改的子对象在 log、origin_log 及原始结果之间共享，不做复制
+        origin_log_only 为 True 时跳过仅影响 log 的高亮处理，此时返回的 log 为 None
+        """
+        export_field_plan = self._get_export_field_plan() if self.export_fields else []
+        is_desensitize = (self.field_configs or self.text_fields_field_configs) and self.is_desensitize
+        is_return_doc_id = self.search_dict.get("is_return_doc_id")
+
+        for hit in hits:
             log = hit["_source"]
             # 脱敏处理
-            if (self.field_configs or self.text_fields_field_configs) and self.is_desensitize:
+            if is_desensitize:
                 log = self._log_desensitize(log)
             else:
                 log = self.convert_keys(log)
             # 联合检索补充索引集信息
             log["__index_set_id__"] = self.index_set_id
             log = self._add_cmdb_fields(log)
-            if self.export_fields:
-                new_origin_log = {}
-                for _export_field in self.export_fields:
+            if export_field_plan:
+                origin_log = {}
+                for _export_field, _path in export_field_plan:
                     # 此处是为了虚拟字段[__set__, __module__, ipv6]可以导出
                     if _export_field in log:
-                        new_origin_log[_export_field] = log[_export_field]
+                        origin_log[_export_field] = log[_export_field]
                     # 处理a.b.c的情况
-                    elif "." in _export_field:
+                    elif _path:
                         # 在log中找不到时,去log的子级查找
-                        key, *field_list = _export_field.split(".")
-                        _result = log.get(key, {})
-                        for _field in field_list:
+                        _result = log.get(_path[0], {})
+                        for _field in _path[1:]:
                             if isinstance(_result, dict) and _field in _result:
                                 _result = _result[_field]
                             else:
                                 _result = ""
                                 break
-                        new_origin_log[_export_field] = _result
+                        origin_log[_export_field] = _result
                     else:
-                        new_origin_log[_export_field] = log.get(_export_field, "")
-                origin_log = new_origin_log
+                        origin_log[_export_field] = log.get(_export_field, "")
             else:
                 origin_log = log
-            _index = hit["_index"]
-            log.update({"index": _index})
-            if self.search_dict.get("is_return_doc_id"):
-                log.update({"__id__": hit["_id"]})
-
-            if "highlight" not in hit:
-                origin_log_list.append(origin_log)
-                log_list.append(log)
+            log["index"] = hit["_index"]
+            if is_return_doc_id:
+                log["__id__"] = hit["_id"]
+
+            if origin_log_only:
+                yield None, origin_log
                 continue
-            else:
-                origin_log_list.append(copy.deepcopy(origin_log))
 
-            if not (self.field_configs or self.text_fields_field_configs) or not self.is_desensitize:
+            if "highlight" in hit and not is_desensitize:
+                # 高亮结果写入新的 log 对象，origin_log 保持不变
                 log = self._deal_object_highlight(log=log, highlight=hit["highlight"])
+            yield log, origin_log
+
+    def iter_origin_log(self, result_dict: dict):
+        """
+        逐条返回处理后的 origin_log，用于导出场景，避免整页结果同时驻留在内存中
+        """
+        if not result_dict.get("hits", {}).get("total"):
+            return
+        for _log, origin_log in self._iter_hit_logs(result_dict["hits"]["hits"], origin_log_only=True):
+            yield origin_log
+
+    def _deal_query_result(self, result_dict: dict) -> dict:
+        result: dict = {
+            "aggregations": result_dict.get("aggregations", {}),
+        }
+        # 将_shards 字段返回以供saas判断错误
+        _shards = result_dict.get("_shards", {})
+        result.update({"_shards": _shards})
+        log_list: list = []
+        agg_result: dict = {}
+        origin_log_list: list = []
+        if not result_dict.get("hits", {}).get("total"):
+            result.update(
+                {"total": 0, "took": 0, "list": log_list, "aggs": agg_result, "origin_log_list": origin_log_list}
+            )
+            return result
+        # hit data
+        for log, origin_log in self._iter_hit_logs(result_dict["hits"]["hits"]):
+            origin_log_list.append(origin_log)
             log_list.append(log)
 
         result.update(
@@ -2272,16 +2309,38 @@ class SearchHandler:
         return result
 
     def convert_keys(self, data):
-        new_dict = {}
+        """
+        将带 . 的字段名转换为嵌套结构 {"a.b": 1} -> {"a": {"b": 1}}
+        返回新的顶层对象，无需转换的子对象直接引用原对象
+        """
+        return self._nest_dotted_items([(key, self._convert_value_keys(value)) for key, value in data.items()])
 
-        for key, value in data.items():
-            # 如果值是字典，递归调用
-            if isinstance(value, dict):
-                value = self.convert_keys(value)  # 递归处理嵌套字典
-            # 如果值是列表，处理列表中的每个字典
-            elif isinstance(value, list):
-                value = [self.convert_keys(item) if isinstance(item, dict) else item for item in value]
+    @classmethod
+    def _convert_value_keys(cls, value):
+        """
+        递归转换嵌套字典及列表中字典的字段名，无需转换时返回原对象
+        """
+        if isinstance(value, dict):
+            items = []
+            changed = False
+            for key, sub_value in value.items():
+                new_value = cls._convert_value_keys(sub_value)
+                changed = changed or new_value is not sub_value or "." in key
+                items.append((key, new_value))
+            return cls._nest_dotted_items(items) if changed else value
+        if isinstance(value, list):
+            new_list = [cls._convert_value_keys(item) if isinstance(item, dict) else item for item in value]
+            if any(new_item is not item for new_item, item in zip(new_list, value)):
+                return new_list
+        return value
+
+    @staticmethod
+    def _nest_dotted_items(items: list) -> dict:
+        new_dict = {}
+        # 本次新建的字典，只有这些字典可以直接写入，共享的子对象需要先复制
+        owned = {id(new_dict)}
 
+        for key, value in items:
             # 如果键中有点，进行转换
             if "." in key:
                 # 分割键
@@ -2291,6 +2350,10 @@ class SearchHandler:
                 for part in parts[:-1]:  # 所有部分，除了最后一部分
                     if part not in nested_dict:
                         nested_dict[part] = {}
+                        owned.add(id(nested_dict[part]))
+                    elif isinstance(nested_dict[part], dict) and id(nested_dict[part]) not in owned:
+                        nested_dict[part] = dict(nested_dict[part])
+                        owned.add(id(nested_dict[part]))
                     nested_dict = nested_dict[part]
 
                 # 设置最后一个部分的值
@@ -2301,6 +2364,26 @@ class SearchHandler:
 
         return new_dict
 
+    @classmethod
+    def merge_nested_dict(cls, base_dict: dict[str, Any], update_dict: dict[str, Any]) -> dict[str, Any]:
+        """
+        与 update_nested_dict 的结果一致，但不修改 base_dict
+        只复制被更新路径上的字典，其余子对象直接引用原对象
+        """
+        if not isinstance(base_dict, dict):
+            return base_dict
+        merged_dict = None
+        for key, value in update_dict.items():
+            if key not in base_dict:
+                continue
+            if merged_dict is None:
+                merged_dict = dict(base_dict)
+            if isinstance(value, dict):
+                merged_dict[key] = cls.merge_nested_dict(base_dict[key], value)
+            else:
+                merged_dict[key] = value
+        return base_dict if merged_dict is None else merged_dict
+
     @classmethod
     def update_nested_dict(cls, base_dict: dict[str, Any], update_dict: dict[str, Any]) -> dict[str, Any]:
         """
@@ -2336,7 +2419,7 @@ class SearchHandler:
         ES层会返回打平后的高亮字段, 该函数将其高亮的字段更新至对应Object字段
         """
         nested_dict = self.nested_dict_from_dotted_key(dotted_dict=highlight)
-        return self.update_nested_dict(log, nested_dict)
+        return self.merge_nested_dict(log, nested_dict)
 
     def _log_desensitize(self, log: dict = None):
         """
@@ -2348,7 +2431,12 @@ class SearchHandler:
         # 展开object对象
         log = expand_nested_data(log)
         # 保存一份未处理之前的log字段 用于脱敏之后的日志原文处理
-        log_content_tmp = copy.deepcopy(log)
+        # 脱敏只会替换字段值而不会修改原对象 因此只需保留待脱敏字段的原始值
+        log_content_tmp = {
+            _config["field_name"]: log[_config["field_name"]]
+            for _config in self.field_configs
+            if _config["field_name"] in log
+        }
 
         # 字段脱敏处理
         log = self.desensitize_handler.transform_dict(log)
@@ -2366,6 +2454,9 @@ class SearchHandler:
                 field_name = _config["field_name"]
                 if field_name not in log.keys() or field_name == text_field:
                     continue
+                if log[field_name] is log_content_tmp[field_name]:
+                    # 字段值未发生变化
+                    continue
                 log[text_field] = log[text_field].replace(str(log_content_tmp[field_name]), str(log[field_name]))
 
         # 处理原文字段自身绑定的脱敏逻辑
@@ -407,13 +407,14 @@ class AsyncExportUtils:
                 logger.error("can not create async_export task, reason: {}".format(result["_shards"]["failures"]))
                 raise PreCheckAsyncExportException()
             with open(file_path, "a+", encoding="utf-8") as f:
-                result_list = search_handler._deal_query_result(result_dict=result).get("origin_log_list")
-                for item in result_list:
+                for item in search_handler.iter_origin_log(result):
                     f.write("%s\n" % ujson.dumps(item, ensure_ascii=False))
                 if search_handler.scenario_id == Scenario.ES:
-                    generate_result = search_handler.scroll_result(result)
+                    generate_result = search_handler.scroll_result(result, origin_log_only=True)
                 else:
-                    generate_result = search_handler.search_after_result(result, self.sorted_fields)
+                    generate_result = search_handler.search_after_result(
+                        result, self.sorted_fields, origin_log_only=True
+                    )
                 self.write_file(f, generate_result)
         except Exception as e:  # pylint: disable=broad-except
             logger.exception("async export error: index_set_id: %s, reason: %s", search_handler.index_set_id, e)
@@ -680,13 +681,12 @@ class UnionAsyncExportUtils:
                 logger.error("can not create async_export task, reason: {}".format(result["_shards"]["failures"]))
                 raise PreCheckAsyncExportException()
             with open(file_path, "a+", encoding="utf-8") as f:
-                result_list = search_handler._deal_query_result(result_dict=result).get("origin_log_list")
-                for item in result_list:
+                for item in search_handler.iter_origin_log(result):
                     f.write("%s\n" % ujson.dumps(item, ensure_ascii=False))
                 if search_handler.scenario_id == Scenario.ES:
-                    generate_result = search_handler.scroll_result(result)
+                    generate_result = search_handler.scroll_result(result, origin_log_only=True)
                 else:
-                    generate_result = search_handler.search_after_result(result, sorted_fields)
+                    generate_result = search_handler.search_after_result(result, sorted_fields, origin_log_only=True)
                 self.write_file(f, generate_result)
         except Exception as e:  # pylint: disable=broad-except
             logger.exception("async export error: index_set_id: %s, reason: %s", search_handler.index_set_id, e)
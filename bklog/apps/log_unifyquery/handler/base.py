@@ -686,7 +686,12 @@ class UnifyQueryHandler:
         # 展开object对象
         log = expand_nested_data(log)
         # 保存一份未处理之前的log字段 用于脱敏之后的日志原文处理
-        log_content_tmp = copy.deepcopy(log)
+        # 脱敏只会替换字段值而不会修改原对象 因此只需保留待脱敏字段的原始值
+        log_content_tmp = {
+            _config["field_name"]: log[_config["field_name"]]
+            for _config in self.field_configs
+            if _config["field_name"] in log
+        }
 
         # 字段脱敏处理
         log = self.desensitize_handler.transform_dict(log)
@@ -704,6 +709,9 @@ class UnifyQueryHandler:
                 field_name = _config["field_name"]
                 if field_name not in log.keys() or field_name == text_field:
                     continue
+                if log[field_name] is log_content_tmp[field_name]:
+                    # 字段值未发生变化
+                    continue
                 log[text_field] = log[text_field].replace(str(log_content_tmp[field_name]), str(log[field_name]))
 
         # 处理原文字段自身绑定的脱敏逻辑
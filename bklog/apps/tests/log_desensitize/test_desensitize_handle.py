@@ -22,7 +22,10 @@ the project delivered to anyone in the future.
 from django.test import TestCase
 
 from apps.log_desensitize.constants import DesensitizeOperator
-from apps.log_desensitize.handlers.desensitize import DesensitizeHandler
+from apps.log_desensitize.handlers.desensitize import (
+    DesensitizeHandler,
+    compile_prefilter,
+)
 
 
 class TestDesensitizeOperator(TestCase):
@@ -59,3 +62,56 @@ class TestDesensitizeOperator(TestCase):
 
         self.assertEqual(result.get("test_field_1"), "132*****678")
         self.assertEqual(result.get("test_field_2"), "abc3434defg")
+
+    def test_transform_text_priority(self):
+        desensitize_config_info = [
+            {
+                "operator": DesensitizeOperator.MASK_SHIELD.value,
+                "params": {"preserve_head": 1, "preserve_tail": 1},
+                "match_pattern": r"\d{11}",
+                "sort_index": 0,
+            },
+            {
+                "operator": DesensitizeOperator.TEXT_REPLACE.value,
+                "params": {"template_string": "<num>"},
+                "match_pattern": r"\d+",
+                "sort_index": 1,
+            },
+        ]
+        handler = DesensitizeHandler(desensitize_config_info=desensitize_config_info)
+
+        # 优先级高的规则先命中 与其重叠的低优先级匹配被丢弃
+        self.assertEqual(handler.transform_text("phone 13234345678 code 42"), "phone 1*********8 code <num>")
+        self.assertEqual(handler.transform_text("no sensitive data"), "no sensitive data")
+        self.assertEqual(
+            handler.transform_text("code 42", is_highlight=True),
+            "code <mark><num></mark>",
+        )
+
+    def test_find_substrings(self):
+        """
+        一次性合并的匹配结果与逐条规则合并的结果一致
+        """
+        desensitize_config_info = [
+            {"operator": DesensitizeOperator.MASK_SHIELD.value, "params": {}, "match_pattern": pattern, "sort_index": i}
+            for i, pattern in enumerate([r"\d{5}", r"(?i)id=\w+", r"\d{3}", r"x*", r"\w+@\w+\.com", r"\d+"])
+        ]
+        handler = DesensitizeHandler(desensitize_config_info=desensitize_config_info)
+        log_lines = [
+            "2024-05-01 12:00:00 INFO user=admin@test.com ID=a1b2 req=1234567 cost=12ms",
+            "xx 1 22 333 4444 55555 666666 xx",
+            "",
+        ]
+        for log in log_lines:
+            substrings = []
+            for rule in handler.rules:
+                substrings = handler.merge_substrings(substrings, handler.find_substrings_by_rule(log, rule))
+            substrings.sort(key=lambda x: x["start"])
+            self.assertEqual(handler.find_substrings(log, handler.rules), substrings)
+
+    def test_compile_prefilter(self):
+        self.assertIsNotNone(compile_prefilter((r"\d+", r"(?i)secret")))
+        self.assertTrue(compile_prefilter((r"\d+", r"(?i)secret")).search("SeCrEt"))
+        # 包含反向引用或未指定正则的规则不进行合并
+        self.assertIsNone(compile_prefilter((r"\d+", r"(\w)\1")))
+        self.assertIsNone(compile_prefilter((r"\d+", "")))
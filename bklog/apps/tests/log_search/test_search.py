@@ -19,6 +19,7 @@ We undertake not to change the open source license (MIT license) applicable to t
 the project delivered to anyone in the future.
 """
 
+import copy
 from unittest.mock import Mock, patch
 
 import arrow
@@ -555,6 +556,48 @@ class TestSearchHandler(TestCase):
         dot_logs = dot_result["list"]
         self.assertEqual(dot_logs, DOT_RESULT)
 
+    def test_deal_query_result_highlight(self):
+        result_dict = {
+            "took": 1,
+            "_shards": {},
+            "hits": {
+                "total": 1,
+                "hits": [
+                    {
+                        "_index": "index_1",
+                        "_id": "1",
+                        "_source": {"log": "error", "attributes.level": "ERROR", "resource": {"name": "svc"}},
+                        "highlight": {"log": ["<mark>error</mark>"], "attributes.level": ["<mark>ERROR</mark>"]},
+                    }
+                ],
+            },
+        }
+        source = copy.deepcopy(result_dict["hits"]["hits"][0]["_source"])
+        result = self.search_handler._deal_query_result(result_dict=result_dict)
+
+        self.assertEqual(result["list"][0]["log"], "<mark>error</mark>")
+        self.assertEqual(result["list"][0]["attributes"], {"level": "<mark>ERROR</mark>"})
+        # 高亮不影响原始日志和原始查询结果
+        self.assertEqual(result["origin_log_list"][0]["log"], "error")
+        self.assertEqual(result["origin_log_list"][0]["attributes"], {"level": "ERROR"})
+        self.assertEqual(result_dict["hits"]["hits"][0]["_source"], source)
+        # 未修改的子对象直接共享
+        self.assertIs(result["list"][0]["resource"], result_dict["hits"]["hits"][0]["_source"]["resource"])
+
+    def test_iter_origin_log(self):
+        self.search_handler.export_fields = ["log", "attributes.level", "resource.name"]
+        fields = {"fields": [{"field_name": "log"}, {"field_name": "attributes.level"}]}
+        with patch.object(SearchHandler, "fields", return_value=fields) as mock_fields:
+            origin_logs = list(self.search_handler.iter_origin_log(DOT_DICT))
+            self.search_handler._deal_query_result(result_dict=DOT_DICT)
+
+        # 导出字段投影计划只生成一次
+        self.assertEqual(mock_fields.call_count, 1)
+        self.assertEqual(
+            origin_logs,
+            [{"log": "", "attributes.level": ""}] + [{"log": "", "attributes.level": "DEBUG"}] * 2,
+        )
+
     @patch(
         "apps.log_clustering.models.ClusteringConfig.get_by_index_set_id",
         lambda index_set_id, raise_exception: Mock(clustered_rt=CLUSTERED_RT),
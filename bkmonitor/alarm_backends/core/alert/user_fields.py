@@ -0,0 +1,194 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+
+告警用户修改字段缓存
+
+告警的分派、确认、处理阶段等字段由页面操作及处理套餐等其他进程修改，只有 ES 中的数据是最准的。
+为避免告警管理周期检测时每次都从 ES 批量拉取，修改这些字段时同步写入 Redis 缓存，检测时优先从缓存读取：
+
+1. 写入：AlertDocument 以 update 方式批量写入时，将其中的用户修改字段写入缓存，并记录修改时间
+2. 读取：缓存完整(已与 ES 对齐过)时直接使用缓存；缓存缺失、extra_info 刚被修改或被抽样对账时，从 ES 拉取并回写缓存
+3. 对账：缓存与 ES 不一致且超过对账窗口时，以 ES 为准，并上报不一致的字段
+"""
+
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from alarm_backends.core.alert.alert import Alert
+from alarm_backends.core.cache.key import ALERT_USER_FIELDS_KEY
+from bkmonitor.documents import AlertDocument
+from bkmonitor.utils.extended_json import ESJSONEncoder
+from core.prometheus import metrics
+
+logger = logging.getLogger("alert.manager")
+
+# 用户修改字段，修改时直接覆盖
+USER_FIELDS = [
+    "assignee",
+    "is_handled",
+    "handle_stage",
+    "is_ack",
+    "is_ack_noticed",
+    "ack_operator",
+    "appointee",
+    "supervisor",
+]
+# 从 ES 补充的字段，extra_info 以 ES 为主，同时合并 check 阶段新增内容
+ES_FIELDS = ["id"] + USER_FIELDS + ["extra_info"]
+
+# 缓存最近一次与 ES 对齐的时间，不存在时说明缓存不完整
+SYNC_TIME_FIELD = "_sync_time"
+# 缓存最近一次被修改的时间
+UPDATE_TIME_FIELD = "_update_time"
+# extra_info 最近一次被修改的时间，extra_info 为增量合并写入，对账窗口内需要从 ES 读取
+EXTRA_INFO_TIME_FIELD = "_extra_info_time"
+
+
+def dumps(value) -> str:
+    return json.dumps(value, cls=ESJSONEncoder)
+
+
+def save_user_fields(documents: list[AlertDocument]):
+    """
+    将告警文档中的用户修改字段写入缓存
+    """
+    now = int(time.time())
+    pipeline = ALERT_USER_FIELDS_KEY.client.pipeline(transaction=False)
+    count = 0
+    for doc in documents:
+        alert_id = getattr(doc, "id", None)
+        if not alert_id:
+            continue
+        # 与 ES 局部更新保持一致，仅写入文档中有值的字段
+        data = doc.to_dict()
+        mapping = {field: dumps(data[field]) for field in USER_FIELDS if field in data}
+        if "extra_info" in data:
+            mapping[EXTRA_INFO_TIME_FIELD] = now
+        if not mapping:
+            continue
+        mapping[UPDATE_TIME_FIELD] = now
+        key = ALERT_USER_FIELDS_KEY.get_key(alert_id=alert_id)
+        pipeline.hmset(key, mapping)
+        pipeline.expire(key, ALERT_USER_FIELDS_KEY.ttl)
+        count += 1
+
+    if count:
+        pipeline.execute()
+
+
+def get_alert_documents(alert_ids: list[str]) -> dict[str, AlertDocument]:
+    return {alert_doc.id: alert_doc for alert_doc in AlertDocument.mget(ids=alert_ids, fields=ES_FIELDS)}
+
+
+def apply_alert_document(alert: Alert, alert_doc: AlertDocument):
+    """
+    使用 ES 中的告警文档补充用户修改字段
+    """
+    for field in USER_FIELDS:
+        alert.data[field] = getattr(alert_doc, field, None)
+    # 以DB为主，同时合并check阶段新增内容
+    extra_info = getattr(alert_doc, "extra_info", None)
+    alert.data["extra_info"] = alert.data.get("extra_info") or {}
+    alert.data["extra_info"].update(extra_info.to_dict() if extra_info else {})
+
+
+def fill_user_fields_from_es(alerts: list[Alert]):
+    """
+    从 ES 补充用户修改字段
+    """
+    alert_docs = get_alert_documents([alert.id for alert in alerts])
+    for alert in alerts:
+        if alert.id in alert_docs:
+            apply_alert_document(alert, alert_docs[alert.id])
+
+
+def fill_user_fields(alerts: list[Alert]):
+    """
+    补充用户修改字段，优先从缓存读取，必要时从 ES 拉取并回写缓存
+    """
+    if not alerts:
+        return
+
+    now = int(time.time())
+    reconcile_window = settings.ALERT_USER_FIELDS_RECONCILE_WINDOW
+
+    pipeline = ALERT_USER_FIELDS_KEY.client.pipeline(transaction=False)
+    for alert in alerts:
+        pipeline.hgetall(ALERT_USER_FIELDS_KEY.get_key(alert_id=alert.id))
+    try:
+        cached_results = pipeline.execute()
+    except RedisError as error:
+        logger.exception("[alert.manager] load alert user fields from redis failed: %s", error)
+        fill_user_fields_from_es(alerts)
+        metrics.ALERT_USER_FIELDS_READ_COUNT.labels(source="es").inc(len(alerts))
+        return
+
+    alerts_to_reconcile = []
+    for alert, cached in zip(alerts, cached_results):
+        values = {}
+        for field in USER_FIELDS:
+            if field not in cached:
+                continue
+            try:
+                values[field] = json.loads(cached[field])
+            except ValueError:
+                continue
+
+        is_complete = SYNC_TIME_FIELD in cached and len(values) == len(USER_FIELDS)
+        extra_info_time = int(cached.get(EXTRA_INFO_TIME_FIELD) or 0)
+        if (
+            not is_complete
+            or now - extra_info_time < reconcile_window
+            or random.random() < settings.ALERT_USER_FIELDS_RECONCILE_RATIO
+        ):
+            alerts_to_reconcile.append((alert, cached, values))
+        else:
+            alert.data.update(values)
+
+    metrics.ALERT_USER_FIELDS_READ_COUNT.labels(source="cache").inc(len(alerts) - len(alerts_to_reconcile))
+    if not alerts_to_reconcile:
+        return
+
+    metrics.ALERT_USER_FIELDS_READ_COUNT.labels(source="es").inc(len(alerts_to_reconcile))
+    alert_docs = get_alert_documents([alert.id for alert, _, _ in alerts_to_reconcile])
+    pipeline = ALERT_USER_FIELDS_KEY.client.pipeline(transaction=False)
+    for alert, cached, values in alerts_to_reconcile:
+        alert_doc = alert_docs.get(alert.id)
+        if alert_doc is None:
+            # ES 中暂未查询到(如新告警尚未刷新)，仅使用缓存中已有的值
+            alert.data.update(values)
+            continue
+
+        apply_alert_document(alert, alert_doc)
+        # 对账窗口内 ES 可能尚未刷新，以缓存为准
+        is_recently_updated = now - int(cached.get(UPDATE_TIME_FIELD) or 0) < reconcile_window
+        mapping = {SYNC_TIME_FIELD: now}
+        for field in USER_FIELDS:
+            es_value = json.loads(dumps(alert.data[field]))
+            if field in values and (values[field] == es_value or is_recently_updated):
+                alert.data[field] = values[field]
+                continue
+            if field in values:
+                metrics.ALERT_USER_FIELDS_STALE_COUNT.labels(field=field).inc()
+            alert.data[field] = es_value
+            mapping[field] = dumps(es_value)
+
+        key = ALERT_USER_FIELDS_KEY.get_key(alert_id=alert.id)
+        pipeline.hmset(key, mapping)
+        pipeline.expire(key, ALERT_USER_FIELDS_KEY.ttl)
+
+    try:
+        pipeline.execute()
+    except RedisError as error:
+        logger.exception("[alert.manager] save alert user fields to redis failed: %s", error)
@@ -226,11 +226,42 @@ NO_DATA_LIST_KEY = register_key_with_config(
     }
 )
 
+NO_DATA_LIVENESS_KEY = register_key_with_config(
+    {
+        "label": "[access]无数据检测维度存活集合(按数据时间)",
+        "key_type": "set",
+        "key_tpl": "access.nodata.liveness.{strategy_id}.{item_id}.{timestamp}",
+        "ttl": 10 * CONST_MINUTES,
+        "backend": "queue",
+    }
+)
+
+NO_DATA_LIVENESS_INDEX_KEY = register_key_with_config(
+    {
+        "label": "[access]无数据检测维度存活集合的数据时间索引",
+        "key_type": "sorted_set",
+        "key_tpl": "access.nodata.liveness.{strategy_id}.{item_id}",
+        "ttl": 10 * CONST_MINUTES,
+        "backend": "queue",
+    }
+)
+
+NO_DATA_DIMENSIONS_KEY = register_key_with_config(
+    {
+        "label": "[access]无数据检测维度字典(按数据时间分桶，桶大小与过期时间一致)",
+        "key_type": "hash",
+        "key_tpl": "access.nodata.dimensions.{strategy_id}.{item_id}.{bucket}",
+        "field_tpl": "{dimensions_md5}",
+        "ttl": CONST_ONE_HOUR,
+        "backend": "queue",
+    }
+)
+
 HISTORY_DATA_KEY = register_key_with_config(
     {
-        "label": "[detect]待检测数据对应历史数据",
+        "label": "[detect]待检测数据对应历史数据(按查询配置共享)",
         "key_type": "hash",
-        "key_tpl": "detect.history.data.{strategy_id}.{item_id}.{timestamp}",
+        "key_tpl": "detect.history.data.{query_md5}.{timestamp}",
         "field_tpl": "{dimensions_md5}",
         "ttl": 30 * CONST_MINUTES,
         "backend": "service",
@@ -310,6 +341,28 @@ ACCESS_DUPLICATE_KEY = register_key_with_config(
     }
 )
 
+ACCESS_DUPLICATE_BLOOM_KEY = register_key_with_config(
+    {
+        "label": "[access]数据拉取去重(布隆过滤器)",
+        "key_type": "string",
+        "key_tpl": (
+            "access.data.duplicate_bloom.strategy_group_{strategy_group_key}.{dt_event_time}.{bit_size}_{hash_count}"
+        ),
+        "ttl": 10 * CONST_MINUTES,
+        "backend": "service",
+    }
+)
+
+ACCESS_DUPLICATE_BLOOM_CAPACITY_KEY = register_key_with_config(
+    {
+        "label": "[access]数据拉取去重(布隆过滤器)容量档位",
+        "key_type": "string",
+        "key_tpl": "access.data.duplicate_bloom_capacity.strategy_group_{strategy_group_key}",
+        "ttl": CONST_ONE_DAY,
+        "backend": "service",
+    }
+)
+
 ACCESS_PRIORITY_KEY = register_key_with_config(
     {
         "label": "[access]数据拉取优先级",
@@ -578,6 +631,17 @@ ALERT_SNAPSHOT_KEY = register_key_with_config(
     }
 )
 
+ALERT_USER_FIELDS_KEY = register_key_with_config(
+    {
+        "label": "[alert]告警用户修改字段缓存",
+        "key_type": "hash",
+        "key_tpl": "alert.user_fields.{alert_id}",
+        "field_tpl": "{field}",
+        "ttl": 30 * CONST_MINUTES,
+        "backend": "service",
+    }
+)
+
 EVENT_PULL_LOCKS = register_key_with_config(
     {
         "label": "[alert]事件拉取锁",
@@ -100,7 +100,20 @@ class ShieldCacheManager(CacheManager):
             }
         ]
         """
-        data = cls.cache.get(cls.CACHE_KEY_TEMPLATE.format(bk_biz_id))
+        return cls.load_shields(cls.get_shields_content(bk_biz_id))
+
+    @classmethod
+    def get_shields_content(cls, bk_biz_id) -> str:
+        """
+        按业务ID获取屏蔽配置缓存的原始内容，可用于判断屏蔽配置是否发生变化
+        """
+        return cls.cache.get(cls.CACHE_KEY_TEMPLATE.format(bk_biz_id)) or ""
+
+    @classmethod
+    def load_shields(cls, data: str):
+        """
+        解析屏蔽配置缓存的原始内容
+        """
         if data:
             data = extended_json.loads(data)
             for shield in data:
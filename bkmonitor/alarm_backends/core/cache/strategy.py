@@ -9,10 +9,13 @@ specific language governing permissions and limitations under the License.
 """
 
 import copy
+import hashlib
 import json
 import logging
+import pickle
+import threading
 import time
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from datetime import datetime, timedelta
 from itertools import chain, groupby
 from operator import itemgetter
@@ -56,6 +59,55 @@ from core.unit import load_unit
 logger = logging.getLogger("cache")
 
 
+class StrategyLocalCache:
+    """
+    进程内策略缓存(LRU)
+    缓存已完成版本转换的策略的序列化内容，以 redis 中的策略版本判断是否失效
+    每次读取时反序列化出新对象，避免调用方修改策略影响缓存内容
+    """
+
+    def __init__(self):
+        # strategy_id -> (version, 序列化后的策略)
+        self.data = OrderedDict()
+        self.size = 0
+        # 后台进程会在多个线程中读取策略，LRU 顺序调整及淘汰需要加锁
+        self.lock = threading.Lock()
+
+    def get(self, strategy_id: int, version: str) -> dict | None:
+        with self.lock:
+            entry = self.data.get(strategy_id)
+            if entry is None or entry[0] != version:
+                return None
+            self.data.move_to_end(strategy_id)
+        return pickle.loads(entry[1])
+
+    def set(self, strategy_id: int, version: str, strategy: dict, maxsize: int):
+        blob = pickle.dumps(strategy, protocol=pickle.HIGHEST_PROTOCOL) if maxsize > 0 else None
+        with self.lock:
+            self._pop(strategy_id)
+            if blob is None:
+                return
+            self.data[strategy_id] = (version, blob)
+            self.size += len(blob)
+            while len(self.data) > maxsize:
+                _, (_, expired_blob) = self.data.popitem(last=False)
+                self.size -= len(expired_blob)
+
+    def _pop(self, strategy_id: int):
+        entry = self.data.pop(strategy_id, None)
+        if entry is not None:
+            self.size -= len(entry[1])
+
+    def pop(self, strategy_id: int):
+        with self.lock:
+            self._pop(strategy_id)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.size = 0
+
+
 class StrategyCacheManager(CacheManager):
     """
     告警策略缓存
@@ -82,11 +134,15 @@ class StrategyCacheManager(CacheManager):
     STRATEGY_GROUP_CACHE_KEY = CacheManager.CACHE_KEY_PREFIX + ".strategy_group"
     # 最近增量更新时间
     LAST_UPDATED_CACHE_KEY = CacheManager.CACHE_KEY_PREFIX + ".last_updated"
+    # 策略版本(hash, field: 策略ID, value: 策略内容md5)，用于进程内策略缓存的失效判断
+    VERSIONS_CACHE_KEY = CacheManager.CACHE_KEY_PREFIX + ".strategy_versions"
     # 事件型时序检测周期(默认60s)
     fake_event_agg_interval = 60
     # 实例维度
     instance_dimensions = {"bk_target_ip", "bk_target_service_instance_id", "bk_host_id"}
     cache = Cache("cache-strategy")
+    # 进程内策略缓存
+    local_cache = StrategyLocalCache()
 
     @classmethod
     def transform_template_to_topo_nodes(cls, target, template_node_type, cache_manager):
@@ -589,6 +645,9 @@ class StrategyCacheManager(CacheManager):
         """
         if not strategy_ids:
             return []
+        if settings.STRATEGY_LOCAL_CACHE_SIZE > 0:
+            return [strategy for strategy in cls.get_strategies_with_local_cache(strategy_ids) if strategy]
+
         keys = [cls.CACHE_KEY_TEMPLATE.format(strategy_id=strategy_id) for strategy_id in strategy_ids]
         strategies = []
         for sub_keys in chunks(keys, 1000):
@@ -600,11 +659,63 @@ class StrategyCacheManager(CacheManager):
         """
         从缓存中获取策略详情
         """
+        if settings.STRATEGY_LOCAL_CACHE_SIZE > 0:
+            return cls.get_strategies_with_local_cache([strategy_id])[0]
+
         strategy = json.loads(cls.cache.get(cls.CACHE_KEY_TEMPLATE.format(strategy_id=strategy_id)) or "null")
         # 兼容旧版策略
         strategy = Strategy.convert_v1_to_v2(strategy)
         return strategy
 
+    @classmethod
+    def get_strategies_with_local_cache(cls, strategy_ids: list[int]) -> list[dict | None]:
+        """
+        通过进程内缓存获取策略详情，仅读取策略版本，版本变化或未缓存的策略才从redis中拉取
+        :return: 与 strategy_ids 一一对应的策略详情，不存在的策略为 None
+        """
+        strategy_ids = [int(strategy_id) for strategy_id in strategy_ids]
+        versions = []
+        for sub_ids in chunks(strategy_ids, 1000):
+            versions.extend(cls.cache.hmget(cls.VERSIONS_CACHE_KEY, sub_ids))
+
+        strategies = [None] * len(strategy_ids)
+        missing_indexes = []
+        for index, (strategy_id, version) in enumerate(zip(strategy_ids, versions)):
+            strategy = cls.local_cache.get(strategy_id, version) if version else None
+            if strategy is None:
+                missing_indexes.append(index)
+            else:
+                strategies[index] = strategy
+
+        if missing_indexes:
+            keys = [cls.CACHE_KEY_TEMPLATE.format(strategy_id=strategy_ids[index]) for index in missing_indexes]
+            results = []
+            for sub_keys in chunks(keys, 1000):
+                results.extend(cls.cache.mget(sub_keys))
+            for index, result in zip(missing_indexes, results):
+                if not result:
+                    cls.local_cache.pop(strategy_ids[index])
+                    continue
+                # 兼容旧版策略
+                strategies[index] = Strategy.convert_v1_to_v2(json.loads(result))
+                if versions[index]:
+                    # 先读版本再读内容，内容只会比版本新，不会出现旧内容对应新版本的情况
+                    cls.local_cache.set(
+                        strategy_ids[index], versions[index], strategies[index], settings.STRATEGY_LOCAL_CACHE_SIZE
+                    )
+
+        metrics.STRATEGY_LOCAL_CACHE_COUNT.labels(result="hit").inc(len(strategy_ids) - len(missing_indexes))
+        metrics.STRATEGY_LOCAL_CACHE_COUNT.labels(result="miss").inc(len(missing_indexes))
+        metrics.STRATEGY_LOCAL_CACHE_BYTES.set(cls.local_cache.size)
+        return strategies
+
+    @staticmethod
+    def get_strategy_version(strategy_data: str) -> str:
+        """
+        根据策略缓存内容生成版本号
+        """
+        return hashlib.md5(strategy_data.encode("utf-8")).hexdigest()
+
     @classmethod
     def get_all_bk_biz_ids(cls) -> list:
         """
@@ -739,6 +850,7 @@ class StrategyCacheManager(CacheManager):
                 logger.info(f"[smart_strategy_cache]: refresh_strategy_ids delete strategy: {strategy_id}")
                 # 从缓存中删除该策略的相关信息。
                 cls.cache.delete(cls.CACHE_KEY_TEMPLATE.format(strategy_id=strategy_id))
+                cls.cache.hdel(cls.VERSIONS_CACHE_KEY, strategy_id)
 
     @classmethod
     def refresh_bk_biz_ids(cls, strategies: list[dict], partial=None):
@@ -897,11 +1009,12 @@ class StrategyCacheManager(CacheManager):
 
         # 开启缓存pipeline以优化写入性能
         pipeline = cls.cache.pipeline()
+        versions = {}
         for strategy in strategies:
             # 将策略信息存储到缓存中
-            pipeline.set(
-                cls.CACHE_KEY_TEMPLATE.format(strategy_id=strategy["id"]), json.dumps(strategy), cls.CACHE_TIMEOUT
-            )
+            strategy_data = json.dumps(strategy)
+            pipeline.set(cls.CACHE_KEY_TEMPLATE.format(strategy_id=strategy["id"]), strategy_data, cls.CACHE_TIMEOUT)
+            versions[strategy["id"]] = cls.get_strategy_version(strategy_data)
             # 默认周期 50s
             for item in strategy["items"]:
                 if item.get("query_md5"):
@@ -941,6 +1054,13 @@ class StrategyCacheManager(CacheManager):
         # 设置缓存过期时间
         pipeline.expire(cls.STRATEGY_GROUP_CACHE_KEY, cls.CACHE_TIMEOUT)
 
+        # 策略版本需在策略内容之后写入，保证读取到新版本时策略内容也已更新
+        for sub_ids in chunks(list(versions), 1000):
+            pipeline.hset(
+                cls.VERSIONS_CACHE_KEY, mapping={strategy_id: versions[strategy_id] for strategy_id in sub_ids}
+            )
+        pipeline.expire(cls.VERSIONS_CACHE_KEY, cls.CACHE_TIMEOUT)
+
         # 执行pipeline中的所有操作
         pipeline.execute()
 
@@ -1116,6 +1236,7 @@ class StrategyCacheManager(CacheManager):
             target_biz_set, to_be_deleted_strategy_ids = cls.handle_history_strategies(histories, with_group_key=False)
             for strategy_id, _ in to_be_deleted_strategy_ids:
                 cls.cache.delete(cls.CACHE_KEY_TEMPLATE.format(strategy_id=strategy_id))
+                cls.cache.hdel(cls.VERSIONS_CACHE_KEY, strategy_id)
 
         duration = time.time() - start_time
         metrics.ALARM_CACHE_TASK_TIME.labels("0", "strategy", str(exc)).observe(duration)
@@ -91,10 +91,16 @@ def setup_sentinel_client(node, backend):
 
 
 class KeyRouterMixin(object):
+    # 非首个参数为key的命令，记录key所在的参数位置
+    COMMAND_KEY_INDEX = {"execute_command": 1, "eval": 2, "evalsha": 2}
+
     def strategy_id_from_command(self, *args, **kwargs):
         key = self.key_from_command(*args, **kwargs)
         return self.strategy_id_from_key(key)
 
+    def key_from_named_command(self, name, *args, **kwargs):
+        return self.key_from_command(*args[self.COMMAND_KEY_INDEX.get(name, 0) :], **kwargs)
+
     def strategy_id_from_key(self, key):
         return getattr(key, "strategy_id", 0) if key else 0
 
@@ -125,7 +131,7 @@ class RedisProxy(KeyRouterMixin):
     def __getattr__(self, name):
         def handle(*args, **kwargs):
             exception = None
-            strategy_id = self.strategy_id_from_command(*args, **kwargs)
+            strategy_id = self.strategy_id_from_key(self.key_from_named_command(name, *args, **kwargs))
             cache_node = get_node_by_strategy_id(strategy_id)
             client = self.get_client(cache_node)
             command = getattr(client, name)
@@ -172,7 +178,7 @@ class PipelineProxy(KeyRouterMixin):
 
     def __getattr__(self, name):
         def handle(*args, **kwargs):
-            key = self.key_from_command(*args, **kwargs)
+            key = self.key_from_named_command(name, *args, **kwargs)
             if key is None:
                 if name not in self.ALLOWED_METHOD:
                     return self.execute()
@@ -0,0 +1,288 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+"""
+access -> detect 数据队列编解码
+
+队列中的元素有两种格式：
+1. json: 每条 DataRecord.data 序列化为一个 json 字符串(旧格式)
+2. frame: 一批 DataRecord.data 打包为一个 msgpack 二进制帧，维度及字段名通过字典共享
+
+frame 结构: FRAME_MAGIC + 数据条数(4字节大端无符号整数) + msgpack 编码的
+{
+    "d": [[dimensions_md5, dimensions, dimension_fields], ...],  # 维度字典
+    "k": [[values_field1, values_field2, ...], ...],               # values 字段名字典
+    "r": [[dimension_index, time, value, values_key_index, [values...], access_time, extra], ...]
+}
+extra 为 record 中除标准字段外的其他字段，不存在时为 None
+帧头部记录数据条数，队列长度按元素计数，按数据条数限流时无需解码整个帧
+
+分批任务数据(ACCESS_BATCH_DATA_KEY)同样有两种格式：
+1. json: gzip 压缩后 base64 编码的 json(旧格式)
+2. binary: 前缀 BATCH_MAGIC + zlib 压缩的 msgpack
+"""
+
+import base64
+import gzip
+import json
+import math
+import struct
+import time
+import zlib
+from collections.abc import Iterable, Iterator
+
+import msgpack
+from redis.client import NEVER_DECODE
+
+FRAME_MAGIC = b"BKMF\x01"
+BATCH_MAGIC = b"BKMB\x01"
+# 帧中的数据条数
+FRAME_COUNT = struct.Struct(">I")
+FRAME_HEADER_SIZE = len(FRAME_MAGIC) + FRAME_COUNT.size
+
+# 以列存储的标准字段
+FRAME_FIELDS = {"record_id", "dimensions", "dimension_fields", "time", "value", "values", "access_time"}
+
+# 标记 dimension_fields 缺失
+MISSING = "__missing__"
+
+
+def encode_frame(records: list[dict]) -> bytes:
+    """
+    将一批 DataRecord.data 编码为二进制帧
+    """
+    dimension_table = []
+    dimension_index = {}
+    values_key_table = []
+    values_key_index = {}
+    rows = []
+
+    for record in records:
+        extra = {k: v for k, v in record.items() if k not in FRAME_FIELDS} or None
+
+        record_id = record.get("record_id", "")
+        dimensions_md5, _, timestamp = record_id.rpartition(".")
+        if not dimensions_md5 or timestamp != str(record.get("time")):
+            # record_id 不符合 "{md5}.{time}" 格式时原样保留
+            dimensions_md5 = ""
+            extra = dict(extra or {}, record_id=record_id)
+
+        # 维度字典，相同 md5 的维度内容理论上一致，不一致时追加新条目
+        dimensions = record.get("dimensions", {})
+        dimension_fields = record.get("dimension_fields", MISSING)
+        index = None
+        for candidate in dimension_index.get(dimensions_md5, []):
+            _, candidate_dimensions, candidate_fields = dimension_table[candidate]
+            if candidate_dimensions == dimensions and candidate_fields == dimension_fields:
+                index = candidate
+                break
+        if index is None:
+            index = len(dimension_table)
+            dimension_table.append([dimensions_md5, dimensions, dimension_fields])
+            dimension_index.setdefault(dimensions_md5, []).append(index)
+
+        values = record.get("values", {})
+        values_keys = tuple(values)
+        key_index = values_key_index.get(values_keys)
+        if key_index is None:
+            key_index = values_key_index[values_keys] = len(values_key_table)
+            values_key_table.append(list(values_keys))
+
+        rows.append(
+            [
+                index,
+                record.get("time"),
+                record.get("value"),
+                key_index,
+                list(values.values()),
+                record.get("access_time"),
+                extra,
+            ]
+        )
+
+    payload = {"d": dimension_table, "k": values_key_table, "r": rows}
+    return FRAME_MAGIC + FRAME_COUNT.pack(len(rows)) + msgpack.packb(payload, use_bin_type=True)
+
+
+def decode_frame(frame: bytes) -> Iterator[dict]:
+    """
+    将二进制帧解码为 DataRecord.data 格式的字典
+    """
+    payload = msgpack.unpackb(frame[FRAME_HEADER_SIZE:], raw=False, strict_map_key=False)
+    dimension_table = payload["d"]
+    values_key_table = payload["k"]
+
+    for dimension_index, timestamp, value, key_index, values, access_time, extra in payload["r"]:
+        dimensions_md5, dimensions, dimension_fields = dimension_table[dimension_index]
+        record = {
+            "record_id": f"{dimensions_md5}.{timestamp}",
+            "value": value,
+            "values": dict(zip(values_key_table[key_index], values)),
+            # 维度字典在同一帧内共享，拷贝一份避免后续修改相互影响
+            "dimensions": dict(dimensions),
+            "time": timestamp,
+        }
+        if dimension_fields != MISSING:
+            record["dimension_fields"] = list(dimension_fields)
+        if access_time is not None:
+            record["access_time"] = access_time
+        if extra:
+            record.update(extra)
+        yield record
+
+
+def is_frame(raw: bytes | str) -> bool:
+    return isinstance(raw, bytes) and raw.startswith(FRAME_MAGIC)
+
+
+def count_records(element: bytes | str) -> int:
+    """
+    获取队列元素包含的数据条数，json 格式的元素为一条
+    """
+    if is_frame(element):
+        return FRAME_COUNT.unpack_from(element, len(FRAME_MAGIC))[0]
+    return 1
+
+
+def encode_records(records: list[dict], binary: bool = False, frame_size: int = 1000) -> list[bytes | str]:
+    """
+    将一批 DataRecord.data 编码为队列元素
+    :param binary: 是否使用二进制帧格式
+    :param frame_size: 每个二进制帧包含的最大记录数
+    """
+    if not binary:
+        return [json.dumps(record) for record in records]
+    return [encode_frame(records[offset : offset + frame_size]) for offset in range(0, len(records), frame_size)]
+
+
+def decode_records(elements: Iterable[bytes | str]) -> Iterator[dict | Exception]:
+    """
+    解码队列元素，同时兼容旧的 json 格式
+    解码失败时返回 ValueError 以便调用方统计非期望格式的数据，不中断后续解码
+    """
+    for element in elements:
+        try:
+            if is_frame(element):
+                yield from decode_frame(element)
+            else:
+                yield json.loads(element)
+        except Exception as e:  # noqa
+            yield ValueError(f"{e}: {element[:200]!r}")
+
+
+def lrange_raw(client, name, start: int, end: int) -> list[bytes]:
+    """
+    以二进制方式读取队列，跳过客户端默认的 utf-8 解码
+    """
+    return client.execute_command("LRANGE", name, start, end, **{NEVER_DECODE: True})
+
+
+def lrange_by_records(client, name, limit: int, frame_size: int = 1000) -> tuple[list[bytes], int, bool]:
+    """
+    从队列右侧(最早写入的一端)读取元素，累计数据条数不超过 limit(至少读取一个元素)
+    返回 (按先进先出顺序排列的元素, 数据条数, 是否因达到 limit 而停止读取)，读取的元素需由调用方从队列中删除
+    每次读取的元素数按已读取元素的平均数据条数估算，首次按满帧估算，避免读取过多的帧
+    """
+    elements = []
+    record_count = 0
+    per_element = frame_size
+    while record_count < limit:
+        size = max(1, math.ceil((limit - record_count) / per_element))
+        end = -len(elements) - 1
+        batch = lrange_raw(client, name, end - size + 1, end)
+
+        for element in reversed(batch):
+            count = count_records(element)
+            if elements and record_count + count > limit:
+                return elements, record_count, True
+            elements.append(element)
+            record_count += count
+
+        if len(batch) < size:
+            return elements, record_count, False
+        per_element = max(1, record_count / len(elements))
+    return elements, record_count, True
+
+
+def is_queue_overloaded(client, name, limit: int, frame_size: int = 1000) -> tuple[bool, int]:
+    """
+    判断队列中的数据条数是否超过 limit，返回 (是否超过, 队列数据条数)
+    队列可能同时包含 json 元素(1条)和二进制帧(至多 frame_size 条)，先按元素数判断，无法确定时再读取帧头统计数据条数
+    超过 limit 时返回的数据条数为已统计到的条数
+    """
+    length = client.llen(name)
+    if length > limit:
+        return True, length
+    if length * frame_size <= limit:
+        return False, length
+    _, record_count, is_limited = lrange_by_records(client, name, limit + 1, frame_size=frame_size)
+    return is_limited or record_count > limit, record_count
+
+
+def rpop_raw(client, name, count: int) -> list[bytes]:
+    """
+    以二进制方式从队列右侧原子弹出至多 count 个元素(redis >= 6.2)，返回顺序即弹出顺序
+    """
+    return client.execute_command("RPOP", name, count, **{NEVER_DECODE: True}) or []
+
+
+def get_raw(client, name) -> bytes | None:
+    """
+    以二进制方式读取字符串，跳过客户端默认的 utf-8 解码
+    """
+    return client.execute_command("GET", name, **{NEVER_DECODE: True})
+
+
+def encode_batch_points(points: list[dict], binary: bool = False) -> bytes:
+    """
+    编码分批任务数据
+    :param binary: 是否使用二进制格式
+    """
+    if not binary:
+        return base64.b64encode(gzip.compress(json.dumps(points).encode("utf-8")))
+    return BATCH_MAGIC + zlib.compress(msgpack.packb(points, use_bin_type=True))
+
+
+def decode_batch_points(data: bytes | str | None) -> list[dict]:
+    """
+    解码分批任务数据，同时兼容旧的 json 格式
+    """
+    if not data:
+        return []
+    if isinstance(data, bytes) and data.startswith(BATCH_MAGIC):
+        return msgpack.unpackb(zlib.decompress(data[len(BATCH_MAGIC) :]), raw=False, strict_map_key=False)
+    return json.loads(gzip.decompress(base64.b64decode(data)).decode("utf-8"))
+
+
+def benchmark(records: list[dict], rounds: int = 10, frame_size: int = 1000) -> dict[str, dict[str, float]]:
+    """
+    对比 json 与二进制帧两种格式的编解码耗时及体积
+    """
+    result = {}
+    for name, binary in (("json", False), ("frame", True)):
+        encode_cost = decode_cost = 0
+        raw_elements = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            elements = encode_records(records, binary=binary, frame_size=frame_size)
+            encode_cost += time.perf_counter() - start
+
+            raw_elements = [element if binary else element.encode("utf-8") for element in elements]
+            start = time.perf_counter()
+            list(decode_records(raw_elements))
+            decode_cost += time.perf_counter() - start
+
+        result[name] = {
+            "elements": len(raw_elements),
+            "bytes": sum(len(element) for element in raw_elements),
+            "encode_seconds": encode_cost / rounds,
+            "decode_seconds": decode_cost / rounds,
+        }
+    return result
@@ -8,10 +8,29 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import hashlib
+import logging
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from redis.exceptions import ResponseError
+
 from alarm_backends.core.cache import key
+from bkmonitor.utils.common_utils import chunks
+from core.prometheus import metrics
+
+logger = logging.getLogger("access.data")
 
 
 class Duplicate:
+    """
+    数据去重(set 模式)
+    每个时间点一个 redis 集合，拉取时 smembers 整个集合到内存中进行比对
+    """
+
+    backend = "set"
+
     def __init__(self, strategy_group_key, strategy_id=None):
         self.strategy_group_key = strategy_group_key
         self.record_ids_cache = {}
@@ -20,25 +39,48 @@ class Duplicate:
 
         self.client = key.ACCESS_DUPLICATE_KEY.client
 
+        # 去重统计
+        self.hit_count = 0
+        self.miss_count = 0
+        self.transfer_bytes = 0
+
+    def get_dup_key(self, time):
+        dup_key = key.ACCESS_DUPLICATE_KEY.get_key(strategy_group_key=self.strategy_group_key, dt_event_time=time)
+        if self.strategy_id is not None:
+            # Q：strategy_id setter 的作用是？
+            # A:Redis 路由分片 - alarm_backends/core/storage/redis_cluster.py
+            dup_key.strategy_id = self.strategy_id
+        return dup_key
+
     def get_record_ids(self, time):
         # 保证每个时间点仅调用一次redis， 即使无数据也缓存下来。
-        dup_key = key.ACCESS_DUPLICATE_KEY.get_key(strategy_group_key=self.strategy_group_key, dt_event_time=time)
+        dup_key = self.get_dup_key(time)
         if dup_key not in self.record_ids_cache:
-            if self.strategy_id is not None:
-                # Q：strategy_id setter 的作用是？
-                # A:Redis 路由分片 - alarm_backends/core/storage/redis_cluster.py
-                dup_key.strategy_id = self.strategy_id
             self.record_ids_cache[dup_key] = self.client.smembers(dup_key)
+            self.transfer_bytes += sum(len(record_id) for record_id in self.record_ids_cache[dup_key])
 
         return self.record_ids_cache[dup_key]
 
+    def prefetch(self, records):
+        """
+        预取本次拉取的数据的去重状态，set 模式按需拉取整个集合，无需预取
+        """
+
+    def _is_duplicate(self, record):
+        record_ids = self.get_record_ids(record.time)
+        return str(record.record_id) in record_ids
+
     def is_duplicate(self, record):
         """
         判断数据是否重复
         采用redis的集合功能。以分钟+维度作为key，值为record_id的集合
         """
-        record_ids = self.get_record_ids(record.time)
-        return str(record.record_id) in record_ids
+        result = self._is_duplicate(record)
+        if result:
+            self.hit_count += 1
+        else:
+            self.miss_count += 1
+        return result
 
     def add_record(self, record):
         # 原方案，将需要新增的点和已经存在的点放一起。然后再批量刷进redis。
@@ -60,9 +102,243 @@ class Duplicate:
             if self.strategy_id is not None:
                 dup_key.strategy_id = self.strategy_id
             pipeline.sadd(dup_key, *record_ids)
+            self.transfer_bytes += sum(len(record_id) for record_id in record_ids)
 
         # duplicate point 对应过期时间也同步刷新
         for ttl_dup_key in self.record_ids_cache:
             ttl_dup_key.strategy_id = self.strategy_id
             pipeline.expire(ttl_dup_key, key.ACCESS_DUPLICATE_KEY.ttl)
         pipeline.execute()
+        self.report_metrics()
+
+    def report_metrics(self):
+        metrics.ACCESS_DUPLICATE_COUNT.labels(backend=self.backend, result="hit").inc(self.hit_count)
+        metrics.ACCESS_DUPLICATE_COUNT.labels(backend=self.backend, result="miss").inc(self.miss_count)
+        metrics.ACCESS_DUPLICATE_TRANSFER_BYTES.labels(backend=self.backend).inc(self.transfer_bytes)
+
+
+class BatchDuplicate(Duplicate):
+    """
+    数据去重(batch 模式)
+    与 set 模式共用 redis 集合，但仅通过 SMISMEMBER 检查本次拉取到的 record_id，避免整个集合传输
+    """
+
+    backend = "batch"
+    # 单条 SMISMEMBER 命令最多携带的 record_id 数量
+    batch_size = 5000
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (time, record_id) -> 是否已存在于 redis
+        self.existed = {}
+        self.added = set()
+
+    def prefetch(self, records):
+        pending = defaultdict(set)
+        for record in records:
+            if (record.time, str(record.record_id)) not in self.existed:
+                pending[record.time].add(str(record.record_id))
+        if not pending:
+            return
+
+        commands = []
+        pipeline = self.client.pipeline(transaction=False)
+        for time, record_ids in pending.items():
+            dup_key = self.get_dup_key(time)
+            self.record_ids_cache.setdefault(dup_key, set())
+            for chunk in chunks(list(record_ids), self.batch_size):
+                pipeline.smismember(dup_key, chunk)
+                commands.append((time, chunk))
+                self.transfer_bytes += sum(len(record_id) for record_id in chunk)
+
+        try:
+            results = pipeline.execute()
+        except ResponseError as e:
+            # redis 版本低于 6.2 时不支持 SMISMEMBER，回退为整个集合比对
+            logger.warning(f"strategy_group_key({self.strategy_group_key}) smismember not supported: {e}")
+            for time, record_ids in pending.items():
+                exists_ids = self.get_record_ids(time)
+                self.existed.update({(time, record_id): record_id in exists_ids for record_id in record_ids})
+            return
+
+        for (time, chunk), result in zip(commands, results):
+            self.transfer_bytes += len(result)
+            self.existed.update({(time, record_id): bool(exists) for record_id, exists in zip(chunk, result)})
+
+    def _is_duplicate(self, record):
+        record_key = (record.time, str(record.record_id))
+        if record_key in self.added:
+            return True
+        if record_key not in self.existed:
+            # 未预取的数据单独查询
+            self.prefetch([record])
+        return self.existed.get(record_key, False)
+
+    def add_record(self, record):
+        self.added.add((record.time, str(record.record_id)))
+        dup_key = self.get_dup_key(record.time)
+        self.record_ids_cache.setdefault(dup_key, set())
+        self.pending_to_add.setdefault(dup_key, set()).add(record.record_id)
+
+
+class BloomDuplicate(BatchDuplicate):
+    """
+    数据去重(bloom 模式)
+    每个时间点一个 redis 位图作为布隆过滤器，record_id 中的维度 md5 拆分为两个 64 位哈希，按双重哈希计算 k 个位置
+    存在误判(新数据被判定为重复)的可能，误判率由 ACCESS_DUPLICATE_BLOOM_ERROR_RATE 控制
+
+    位图大小按策略组单个时间点的数据量确定：容量按2的幂次分档，上限为 ACCESS_DUPLICATE_BLOOM_CAPACITY。
+    档位记录在 redis 中且只增不减，保证同一时间点在多次拉取中使用相同的位图；
+    档位提升的那次拉取同时检查旧档位的位图，并将命中的数据迁移到新位图中
+    """
+
+    backend = "bloom"
+    # 单条 BITFIELD 命令最多携带的操作数
+    batch_size = 10000
+    # 最小容量档位
+    min_capacity = 1024
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.client = key.ACCESS_DUPLICATE_BLOOM_KEY.client
+        self.capacity = 0
+        self.bit_size = self.hash_count = 0
+        # 档位提升前的位图参数 (bit_size, hash_count)
+        self.previous_layout = None
+
+    @staticmethod
+    def bloom_params(capacity, error_rate):
+        """
+        根据容量和误判率计算位图大小及哈希函数个数
+        """
+        capacity = max(int(capacity), 1)
+        bit_size = int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        hash_count = max(int(round(bit_size / capacity * math.log(2))), 1)
+        return bit_size, hash_count
+
+    def get_capacity_key(self):
+        capacity_key = key.ACCESS_DUPLICATE_BLOOM_CAPACITY_KEY.get_key(strategy_group_key=self.strategy_group_key)
+        if self.strategy_id is not None:
+            capacity_key.strategy_id = self.strategy_id
+        return capacity_key
+
+    def ensure_capacity(self, record_count: int):
+        """
+        按单个时间点的数据量确定位图容量档位，同一次拉取中只确定一次
+        """
+        error_rate = settings.ACCESS_DUPLICATE_BLOOM_ERROR_RATE
+        max_capacity = max(int(settings.ACCESS_DUPLICATE_BLOOM_CAPACITY), self.min_capacity)
+        stored_capacity = min(int(self.client.get(self.get_capacity_key()) or 0), max_capacity)
+
+        capacity = min(max(1 << (max(record_count, 1) - 1).bit_length(), self.min_capacity), max_capacity)
+        if capacity > stored_capacity:
+            self.client.set(self.get_capacity_key(), capacity, ex=key.ACCESS_DUPLICATE_BLOOM_CAPACITY_KEY.ttl)
+            if stored_capacity:
+                self.previous_layout = self.bloom_params(stored_capacity, error_rate)
+        else:
+            capacity = stored_capacity
+
+        self.capacity = capacity
+        self.bit_size, self.hash_count = self.bloom_params(capacity, error_rate)
+
+    def get_dup_key(self, time, layout=None):
+        if not self.capacity:
+            self.ensure_capacity(1)
+        bit_size, hash_count = layout or (self.bit_size, self.hash_count)
+
+        # 位图大小和哈希个数写入key中，避免容量档位或配置变更后与历史位图混用
+        dup_key = key.ACCESS_DUPLICATE_BLOOM_KEY.get_key(
+            strategy_group_key=self.strategy_group_key,
+            dt_event_time=time,
+            bit_size=bit_size,
+            hash_count=hash_count,
+        )
+        if self.strategy_id is not None:
+            dup_key.strategy_id = self.strategy_id
+        return dup_key
+
+    def positions(self, record_id, layout=None):
+        bit_size, hash_count = layout or (self.bit_size, self.hash_count)
+        dimensions_md5 = str(record_id).split(".")[0]
+        try:
+            digest = bytes.fromhex(dimensions_md5)
+        except ValueError:
+            digest = b""
+        if len(digest) != 16:
+            # record_id 不是 "{md5}.{time}" 格式时重新计算 md5，保证不同进程计算出的位置一致
+            digest = hashlib.md5(dimensions_md5.encode("utf-8")).digest()
+        h1, h2 = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:], "big")
+        return [(h1 + i * h2) % bit_size for i in range(hash_count)]
+
+    def prefetch(self, records):
+        pending = defaultdict(set)
+        for record in records:
+            if (record.time, str(record.record_id)) not in self.existed:
+                pending[record.time].add(str(record.record_id))
+        if not pending:
+            return
+
+        # 首次预取时按单个时间点的最大数据量确定位图容量
+        if not self.capacity:
+            self.ensure_capacity(max(len(record_ids) for record_ids in pending.values()))
+
+        layouts = [(self.bit_size, self.hash_count)]
+        if self.previous_layout:
+            layouts.append(self.previous_layout)
+
+        commands = []
+        pipeline = self.client.pipeline(transaction=False)
+        for time, record_ids in pending.items():
+            self.record_ids_cache.setdefault(self.get_dup_key(time), set())
+            for layout in layouts:
+                dup_key = self.get_dup_key(time, layout)
+                hash_count = layout[1]
+                for chunk in chunks(list(record_ids), max(self.batch_size // hash_count, 1)):
+                    args = []
+                    for record_id in chunk:
+                        for position in self.positions(record_id, layout):
+                            args.extend(["GET", "u1", position])
+                    pipeline.execute_command("BITFIELD", dup_key, *args)
+                    commands.append((time, chunk, layout))
+                    self.transfer_bytes += sum(len(str(arg)) for arg in args)
+
+        for (time, chunk, layout), result in zip(commands, pipeline.execute()):
+            self.transfer_bytes += len(result)
+            hash_count = layout[1]
+            for index, record_id in enumerate(chunk):
+                exists = all(result[index * hash_count : (index + 1) * hash_count])
+                if layout == layouts[0]:
+                    self.existed[(time, record_id)] = exists
+                elif exists and not self.existed[(time, record_id)]:
+                    # 仅存在于旧档位位图中的数据迁移到新位图
+                    self.existed[(time, record_id)] = True
+                    self.pending_to_add.setdefault(self.get_dup_key(time), set()).add(record_id)
+
+    def refresh_cache(self):
+        pipeline = self.client.pipeline(transaction=False)
+        for dup_key, record_ids in self.pending_to_add.items():
+            for chunk in chunks(list(record_ids), max(self.batch_size // self.hash_count, 1)):
+                args = []
+                for record_id in chunk:
+                    for position in self.positions(record_id):
+                        args.extend(["SET", "u1", position, 1])
+                pipeline.execute_command("BITFIELD", dup_key, *args)
+                self.transfer_bytes += sum(len(str(arg)) for arg in args)
+
+        for ttl_dup_key in self.record_ids_cache:
+            pipeline.expire(ttl_dup_key, key.ACCESS_DUPLICATE_BLOOM_KEY.ttl)
+        if self.capacity:
+            pipeline.expire(self.get_capacity_key(), key.ACCESS_DUPLICATE_BLOOM_CAPACITY_KEY.ttl)
+        pipeline.execute()
+        self.report_metrics()
+
+
+DUPLICATE_BACKENDS = {backend_cls.backend: backend_cls for backend_cls in [Duplicate, BatchDuplicate, BloomDuplicate]}
+
+
+def load_duplicate(strategy_group_key, strategy_id=None) -> Duplicate:
+    """
+    根据配置 ACCESS_DUPLICATE_BACKEND 获取去重对象
+    """
+    backend_cls = DUPLICATE_BACKENDS.get(settings.ACCESS_DUPLICATE_BACKEND, Duplicate)
+    return backend_cls(strategy_group_key, strategy_id=strategy_id)
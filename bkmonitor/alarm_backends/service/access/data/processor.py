@@ -8,15 +8,15 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
-import base64
-import gzip
 import json
 import logging
 import queue
+import resource
 import signal
 import threading
 import time
 from collections import defaultdict
+from collections.abc import Iterable, Iterator
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
@@ -40,7 +40,14 @@ from alarm_backends.core.control.strategy import Strategy
 from alarm_backends.core.storage.redis import Cache
 from alarm_backends.management.hashring import HashRing
 from alarm_backends.service.access import base
-from alarm_backends.service.access.data.duplicate import Duplicate
+from alarm_backends.service.access.data.codec import (
+    decode_batch_points,
+    encode_batch_points,
+    encode_records,
+    get_raw,
+    is_queue_overloaded,
+)
+from alarm_backends.service.access.data.duplicate import load_duplicate
 from alarm_backends.service.access.data.filters import (
     ExpireFilter,
     HostStatusFilter,
@@ -62,6 +69,21 @@ from core.prometheus import metrics
 IP = get_local_ip()
 logger = logging.getLogger("access.data")
 
+# 标记未预先查询数据
+NOT_PREFETCHED = object()
+
+
+def get_current_rss() -> int:
+    """
+    获取当前进程的常驻内存(字节)，无法获取时返回 0
+    ru_maxrss 是进程生命周期内的峰值，长期运行的 worker 中无法反映当前批次的内存占用
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, IndexError, ValueError):
+        return 0
+
 
 class BaseAccessDataProcess(base.BaseAccessProcess):
     def __init__(self, *args, sub_task_id: str = None, **kwargs):
@@ -140,9 +162,19 @@ class BaseAccessDataProcess(base.BaseAccessProcess):
         data_list_key = data_list_key or key.DATA_LIST_KEY
         client = output_client or data_list_key.client
         output_key = data_list_key.get_key(strategy_id=item.strategy.strategy_id, item_id=item.id)
-        queue_length = client.llen(output_key)
+
+        # 二进制帧仅用于检测队列，无数据检测队列仍使用json格式
+        binary = settings.ENABLED_ACCESS_DATA_BINARY_QUEUE and data_list_key is key.DATA_LIST_KEY
+        elements = encode_records(
+            [record.data for record in record_list], binary=binary, frame_size=settings.ACCESS_DATA_FRAME_SIZE
+        )
+
         # 超过最大检测长度10倍(50w)说明detect模块处理能力不足,数据将被丢弃。
-        if queue_length > settings.SQL_MAX_LIMIT * 10:
+        # 二进制帧包含多条数据，按帧头中的数据条数统计队列长度
+        is_overloaded, queue_length = is_queue_overloaded(
+            client, output_key, settings.SQL_MAX_LIMIT * 10, frame_size=settings.ACCESS_DATA_FRAME_SIZE
+        )
+        if is_overloaded:
             msg = (
                 f"Critical: strategy({item.strategy.strategy_id}), item({item.id})"
                 f"The number of ({output_key}) records to be detected has "
@@ -152,16 +184,19 @@ class BaseAccessDataProcess(base.BaseAccessProcess):
             raise Exception(msg)
 
         pipeline = client.pipeline(transaction=False)
+        push_bytes = sum(len(element) for element in elements)
         _offset = 0
-        while _offset < len(record_list):
-            chunk_records = record_list[_offset : _offset + 10000]
-            pipeline.lpush(output_key, *[json.dumps(record.data) for record in chunk_records])
+        while _offset < len(elements):
+            pipeline.lpush(output_key, *elements[_offset : _offset + 10000])
             _offset += 10000
         # 避免监控周期大于默认key过期时间，引起数据丢失
         agg_interval = min(query_config["agg_interval"] for query_config in item.query_configs)
         pipeline.expire(output_key, max([data_list_key.ttl, agg_interval * 5]))
         pipeline.execute()
         metrics.ACCESS_PROCESS_PUSH_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG, type="data").inc(len(record_list))
+        metrics.ACCESS_PROCESS_PUSH_DATA_BYTES.labels(
+            strategy_id=metrics.TOTAL_TAG, format="frame" if binary else "json"
+        ).inc(push_bytes)
 
         # 非批量任务，记录日志
         if not self.sub_task_id:
@@ -182,6 +217,92 @@ class BaseAccessDataProcess(base.BaseAccessProcess):
                 "count": len(record_list),
             }
 
+    def _push_no_data_liveness(self, item, record_list, output_client=None):
+        """
+        :summary: 推送无数据检测的维度存活索引
+        无数据检测只需要知道各数据时间上报了哪些维度，因此按数据时间记录降维后的维度md5集合，维度内容按md5只存储一份
+        :param item
+        :param record_list
+        :param output_client
+        """
+        no_data_dimensions = item.no_data_config.get("agg_dimension", [])
+        dimensions_by_md5 = {}
+        md5s_by_time = defaultdict(set)
+        invalid_count = 0
+        for record in record_list:
+            record_dimensions = record.data["dimensions"]
+            # 与无数据检测保持一致，缺少无数据维度的数据无效
+            if any(field not in record_dimensions for field in no_data_dimensions):
+                invalid_count += 1
+                continue
+            dimensions = {field: record_dimensions[field] for field in no_data_dimensions}
+            dimensions_md5 = count_md5(dimensions)
+            if dimensions_md5 not in dimensions_by_md5:
+                dimensions_by_md5[dimensions_md5] = json.dumps(dimensions)
+            md5s_by_time[record.data["time"]].add(dimensions_md5)
+
+        if invalid_count:
+            logger.warning(
+                "strategy(%s), item(%s) got %s invalid nodata records where no_data_dimensions is %s",
+                item.strategy.strategy_id,
+                item.id,
+                invalid_count,
+                no_data_dimensions,
+            )
+        if not md5s_by_time:
+            return
+
+        strategy_id = item.strategy.strategy_id
+        client = output_client or key.NO_DATA_LIVENESS_INDEX_KEY.client
+        # 避免监控周期大于默认key过期时间，引起数据丢失
+        agg_interval = min(query_config["agg_interval"] for query_config in item.query_configs)
+        ttl = max(key.NO_DATA_LIVENESS_KEY.ttl, agg_interval * 5)
+
+        # 维度字典按数据时间分桶，过期的桶整体淘汰，不再上报的维度不会一直保留
+        bucket_size = key.NO_DATA_DIMENSIONS_KEY.ttl
+        md5s_by_bucket = defaultdict(set)
+        for timestamp, dimensions_md5s in md5s_by_time.items():
+            md5s_by_bucket[timestamp - timestamp % bucket_size].update(dimensions_md5s)
+        dimensions_keys = {
+            bucket: key.NO_DATA_DIMENSIONS_KEY.get_key(strategy_id=strategy_id, item_id=item.id, bucket=bucket)
+            for bucket in md5s_by_bucket
+        }
+
+        # 仅写入维度字典中尚不存在的维度，持续上报的维度不再重复推送
+        pipeline = client.pipeline(transaction=False)
+        bucket_md5s = [(bucket, md5) for bucket, dimensions_md5s in md5s_by_bucket.items() for md5 in dimensions_md5s]
+        for bucket, md5 in bucket_md5s:
+            pipeline.hexists(dimensions_keys[bucket], md5)
+        new_dimensions = defaultdict(dict)
+        for (bucket, md5), exists in zip(bucket_md5s, pipeline.execute()):
+            if not exists:
+                new_dimensions[bucket][md5] = dimensions_by_md5[md5]
+
+        pipeline = client.pipeline(transaction=False)
+        # 先写入维度字典和存活集合，再写入时间索引，保证索引可见时数据已经就绪
+        for bucket, dimensions_key in dimensions_keys.items():
+            if new_dimensions[bucket]:
+                pipeline.hmset(dimensions_key, new_dimensions[bucket])
+            pipeline.expire(dimensions_key, max(bucket_size, ttl))
+        for timestamp, dimensions_md5s in md5s_by_time.items():
+            liveness_key = key.NO_DATA_LIVENESS_KEY.get_key(
+                strategy_id=strategy_id, item_id=item.id, timestamp=timestamp
+            )
+            pipeline.sadd(liveness_key, *dimensions_md5s)
+            pipeline.expire(liveness_key, ttl)
+        index_key = key.NO_DATA_LIVENESS_INDEX_KEY.get_key(strategy_id=strategy_id, item_id=item.id)
+        pipeline.zadd(index_key, {str(timestamp): timestamp for timestamp in md5s_by_time})
+        pipeline.expire(index_key, ttl)
+        pipeline.execute()
+
+        push_bytes = sum(
+            len(dimensions)
+            for bucket_dimensions in new_dimensions.values()
+            for dimensions in bucket_dimensions.values()
+        )
+        push_bytes += sum(len(md5) for dimensions_md5s in md5s_by_time.values() for md5 in dimensions_md5s)
+        metrics.ACCESS_PROCESS_PUSH_DATA_BYTES.labels(strategy_id=metrics.TOTAL_TAG, format="liveness").inc(push_bytes)
+
     def push(self, records: Optional[List] = None, output_client=None):
         """
         推送格式化后的数据到 detect 和 nodata 中(按单个策略，单个item项，写入不同的队列)
@@ -230,7 +351,10 @@ class BaseAccessDataProcess(base.BaseAccessProcess):
             )
             # 推送无数据处理
             if item.no_data_config["is_enabled"]:
-                self._push(item, records, output_client, key.NO_DATA_LIST_KEY)
+                if settings.NO_DATA_LIVENESS_INDEX_ENABLED:
+                    self._push_no_data_liveness(item, records, output_client)
+                else:
+                    self._push(item, records, output_client, key.NO_DATA_LIST_KEY)
 
         # 推送数据处理信号
         if records:
@@ -246,6 +370,8 @@ class AccessDataProcess(BaseAccessDataProcess):
         self.strategy_group_key = strategy_group_key
         self.from_timestamp = None
         self.until_timestamp = None
+        # 预先查询的数据
+        self.prefetched_points = NOT_PREFETCHED
 
         if sub_task_id:
             self.batch_timestamp = int(sub_task_id.split(".")[0])
@@ -296,13 +422,22 @@ class AccessDataProcess(BaseAccessDataProcess):
 
         return sorted(local_time_map.items(), key=lambda x: x[0])
 
-    def pull(self):
+    def prefetch(self):
         """
-        1. 根据策略配置获取到需要拉取的数据
-        2. 格式化数据，增加记录ID
+        预先查询数据，查询结果(或异常)暂存后在 pull 中使用
+        仅包含数据查询部分，可在其他线程中执行
+        """
+        try:
+            self.prefetched_points = self.query_points()
+        except Exception as e:
+            self.prefetched_points = e
+
+    def query_points(self) -> list[dict] | None:
+        """
+        根据策略配置查询数据，无需查询时返回 None
         """
         if not self.items:
-            return
+            return None
 
         now_timestamp = arrow.utcnow().timestamp
 
@@ -311,7 +446,7 @@ class AccessDataProcess(BaseAccessDataProcess):
 
         # 如果策略更新导致查询时间错位，则跳过本次查询
         if self.from_timestamp > self.until_timestamp:
-            return
+            return None
 
         # 数据查询
         local.strategy_id = ",".join([str(item.strategy.id) for item in self.items])
@@ -323,6 +458,21 @@ class AccessDataProcess(BaseAccessDataProcess):
             if getattr(local, "strategy_id", None):
                 delattr(local, "strategy_id")
             raise e
+        return points
+
+    def pull(self):
+        """
+        1. 根据策略配置获取到需要拉取的数据
+        2. 格式化数据，增加记录ID
+        """
+        if self.prefetched_points is NOT_PREFETCHED:
+            points = self.query_points()
+        else:
+            points, self.prefetched_points = self.prefetched_points, NOT_PREFETCHED
+            if isinstance(points, Exception):
+                raise points
+        if points is None:
+            return
 
         # 当点数大于阈值时，将数据拆分为多个批量任务
         point_total = len(points)
@@ -335,7 +485,7 @@ class AccessDataProcess(BaseAccessDataProcess):
                 strategy_name=self.items[0].strategy.name,
             ).inc(point_total)
             if settings.ACCESS_DATA_BATCH_PROCESS_THRESHOLD > 0:
-                points = self.send_batch_data(points, settings.ACCESS_DATA_BATCH_PROCESS_SIZE)
+                points = self.send_batch_data(self.consume_points(points), settings.ACCESS_DATA_BATCH_PROCESS_SIZE)
 
         # 过滤重复数据并实例化
         self.filter_duplicates(points)
@@ -447,65 +597,91 @@ class AccessDataProcess(BaseAccessDataProcess):
 
         self.until_timestamp = until_timestamp
 
-    def send_batch_data(self, points: List[Dict], batch_threshold: int = 50000) -> List[Dict]:
+    @staticmethod
+    def consume_points(points: list[dict]) -> Iterator[dict]:
         """
-        发送分批处理任务，并返回第一批数据
+        按顺序逐个取出数据点，取出后从列表中移除，使已发送批次的数据能够及时释放
         """
-        from alarm_backends.service.access.tasks import run_access_batch_data
+        points.reverse()
+        while points:
+            yield points.pop()
 
+    def send_batch_data(self, points: Iterable[dict], batch_threshold: int = 50000) -> list[dict]:
+        """
+        发送分批处理任务，并返回第一批数据
+        逐个消费数据点，数据点数达到阈值且时间点变化时切分批次，非首批数据即时写入redis并发起任务
+        """
+        batch_threshold = max(batch_threshold, 1)
         self.batch_timestamp = int(time.time())
 
-        client = key.ACCESS_BATCH_DATA_KEY.client
         first_batch_points = []
+        batch_points = []
         latest_record_timestamp = None
-        last_batch_index, batch_count = 0, 0
-        for index, record in enumerate(points):
+        batch_count = point_count = 0
+        for record in points:
             timestamp = record.get("_time_") or record["time"]
             # 当数据点数不足或数据同属一个时间点时，数据点记为同一批次
-            if (index - last_batch_index < batch_threshold or latest_record_timestamp == timestamp) and index < len(
-                points
-            ) - 1:
-                latest_record_timestamp = timestamp
-                continue
-
-            # 记录当前批次数
-            batch_count += 1
+            if len(batch_points) >= batch_threshold and latest_record_timestamp != timestamp:
+                batch_count += 1
+                if batch_count == 1:
+                    # 第一批数据原地处理
+                    first_batch_points = batch_points
+                else:
+                    self.send_batch(batch_points, batch_count)
+                batch_points = []
 
-            if index == len(points) - 1:
-                batch_points = points[last_batch_index:]
-            else:
-                batch_points = points[last_batch_index:index]
+            batch_points.append(record)
+            latest_record_timestamp = timestamp
+            point_count += 1
 
-            # 第一批数据原地处理
+        if batch_points:
+            batch_count += 1
             if batch_count == 1:
                 first_batch_points = batch_points
             else:
-                # 将分批数据写入redis
-                sub_task_id = f"{self.batch_timestamp}.{batch_count}"
-                data_key = key.ACCESS_BATCH_DATA_KEY.get_key(
-                    strategy_group_key=self.strategy_group_key, sub_task_id=sub_task_id
-                )
-                data_key.strategy_id = self.items[0].strategy.id
-                compress_batch_points = base64.b64encode(gzip.compress(json.dumps(batch_points).encode("utf-8")))
-                client.set(data_key, compress_batch_points, ex=key.ACCESS_BATCH_DATA_KEY.ttl)
-
-                # 发起异步任务
-                run_access_batch_data.delay(self.strategy_group_key, sub_task_id)
-
-            # 记录下一轮的起始位置
-            last_batch_index = index
+                self.send_batch(batch_points, batch_count)
 
         if batch_count > 1:
             self.sub_task_id = f"{self.batch_timestamp}.1"
             self.batch_count = batch_count
             logger.info(
                 "strategy_group_key({}), split {} access data into {} batch tasks".format(
-                    self.strategy_group_key, len(points), batch_count
+                    self.strategy_group_key, point_count, batch_count
                 )
             )
 
         return first_batch_points
 
+    def send_batch(self, batch_points: list[dict], batch_index: int):
+        """
+        将分批数据写入redis并发起异步任务
+        """
+        from alarm_backends.service.access.tasks import run_access_batch_data
+
+        sub_task_id = f"{self.batch_timestamp}.{batch_index}"
+        data_key = key.ACCESS_BATCH_DATA_KEY.get_key(
+            strategy_group_key=self.strategy_group_key, sub_task_id=sub_task_id
+        )
+        data_key.strategy_id = self.items[0].strategy.id
+        data = encode_batch_points(batch_points, binary=settings.ENABLED_ACCESS_BATCH_DATA_BINARY)
+        key.ACCESS_BATCH_DATA_KEY.client.set(data_key, data, ex=key.ACCESS_BATCH_DATA_KEY.ttl)
+
+        # 发起异步任务
+        run_access_batch_data.delay(self.strategy_group_key, sub_task_id)
+
+        # 记录进程当前内存
+        rss = get_current_rss()
+        if rss:
+            metrics.ACCESS_DATA_BATCH_RSS.observe(rss / 1024 / 1024)
+        logger.info(
+            "strategy_group_key(%s) send batch(%s) points(%s) bytes(%s) rss(%sMB)",
+            self.strategy_group_key,
+            sub_task_id,
+            len(batch_points),
+            len(data),
+            rss // 1024 // 1024,
+        )
+
     def filter_duplicates(self, points: List[Dict]):
         """
         过滤重复数据并实例化
@@ -513,7 +689,7 @@ class AccessDataProcess(BaseAccessDataProcess):
         first_item = self.items[0]
 
         records = []
-        dup_obj = Duplicate(self.strategy_group_key, strategy_id=first_item.strategy.id)
+        dup_obj = load_duplicate(self.strategy_group_key, strategy_id=first_item.strategy.id)
         duplicate_counts = none_point_counts = 0
 
         # 是否有优先级
@@ -523,10 +699,12 @@ class AccessDataProcess(BaseAccessDataProcess):
                 have_priority = True
                 break
 
-        max_data_time = 0
-        for record in reversed(points):
-            point = DataRecord(self.items, record)
+        points = [DataRecord(self.items, record) for record in reversed(points)]
+        # 批量预取本次数据的去重状态
+        dup_obj.prefetch([point for point in points if point.value is not None])
 
+        max_data_time = 0
+        for point in points:
             if point.value is not None:
                 # 去除重复数据
                 if dup_obj.is_duplicate(point):
@@ -824,11 +1002,7 @@ class AccessBatchDataProcess(AccessDataProcess):
             strategy_group_key=self.strategy_group_key, sub_task_id=self.sub_task_id
         )
         cache_key.strategy_id = self.items[0].strategy.id
-        data = client.get(cache_key)
-        if data:
-            points = json.loads(gzip.decompress(base64.b64decode(data)).decode("utf-8"))
-        else:
-            points = []
+        points = decode_batch_points(get_raw(client, cache_key))
         client.delete(cache_key)
         self.filter_duplicates(points)
 
@@ -0,0 +1,145 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from alarm_backends.core.cache import key
+from alarm_backends.core.lock.service_lock import service_lock
+from alarm_backends.service.access.data.processor import AccessDataProcess
+from alarm_backends.service.access.data.token import TokenBucket
+from core.errors.alarm_backends import LockError
+from core.prometheus import metrics
+
+logger = logging.getLogger("access.data")
+
+
+class AccessDataRunner:
+    """
+    多策略组数据拉取
+    1. 各策略组的数据查询按存储类型分配到独立线程池中并发执行，慢存储只占用自身的并发额度
+    2. 查询完成的策略组按完成顺序在当前线程中进行去重、过滤及推送(redis pipeline 非线程安全)
+    """
+
+    def __init__(self, strategy_group_keys: list[str], interval: int = 60):
+        self.strategy_group_keys = strategy_group_keys
+        self.interval = interval
+        self.executors: dict[str, ThreadPoolExecutor] = {}
+
+    @staticmethod
+    def get_storage(processor: AccessDataProcess) -> str:
+        """
+        获取策略组查询的存储类型
+        """
+        labels = sorted(processor.items[0].data_source_labels) if processor.items else []
+        return labels[0] if labels else "default"
+
+    def get_executor(self, storage: str) -> ThreadPoolExecutor:
+        if storage not in self.executors:
+            concurrency = settings.ACCESS_DATA_STORAGE_CONCURRENCY
+            max_workers = concurrency.get(storage) or concurrency.get("default") or 1
+            self.executors[storage] = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix=f"access_data_{storage}"
+            )
+        return self.executors[storage]
+
+    def acquire(self, strategy_group_key: str):
+        """
+        获取策略组的锁及令牌，获取失败时返回 None
+        """
+        stack = ExitStack()
+        try:
+            stack.enter_context(service_lock(key.SERVICE_LOCK_ACCESS, strategy_group_key=strategy_group_key))
+        except LockError as e:
+            logger.info(f"strategy_group_key({strategy_group_key}) skipped: {e}")
+            return None
+
+        token_bucket = TokenBucket(strategy_group_key, self.interval)
+        if not token_bucket.acquire():
+            stack.close()
+            return None
+        return stack, token_bucket
+
+    def prefetch(self, processor: AccessDataProcess, storage: str, submit_time: float):
+        """
+        在线程池中获取锁及令牌并查询数据
+        锁在任务开始执行时才获取，避免排队等待线程的策略组占用锁，排队过久时锁已过期
+        返回 (锁, 令牌桶, 查询耗时)，获取锁或令牌失败时返回 None
+        """
+        metrics.ACCESS_DATA_QUERY_QUEUE_TIME.labels(storage=storage).observe(time.time() - submit_time)
+        acquired = self.acquire(processor.strategy_group_key)
+        if acquired is None:
+            return None
+
+        stack, token_bucket = acquired
+        start = time.time()
+        try:
+            processor.prefetch()
+        except BaseException:
+            stack.close()
+            raise
+        finally:
+            duration = time.time() - start
+            metrics.ACCESS_DATA_QUERY_TIME.labels(storage=storage).observe(duration)
+            close_old_connections()
+        return stack, token_bucket, duration
+
+    def run(self):
+        futures = {}
+        try:
+            for strategy_group_key in self.strategy_group_keys:
+                try:
+                    processor = AccessDataProcess(strategy_group_key)
+                    storage = self.get_storage(processor)
+                    future = self.get_executor(storage).submit(self.prefetch, processor, storage, time.time())
+                except Exception as e:
+                    logger.exception(f"strategy_group_key({strategy_group_key}) submit access task error: {e}")
+                    continue
+                futures[future] = processor
+
+            # 按查询完成顺序依次处理
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.process(futures.pop(future), future)
+        finally:
+            # 异常退出时取消未开始的任务，并释放已查询完成但未处理的策略组的锁
+            for executor in self.executors.values():
+                executor.shutdown(wait=True, cancel_futures=True)
+            for future in futures:
+                if not future.cancelled() and future.exception() is None and future.result():
+                    future.result()[0].close()
+            metrics.report_all()
+
+    @staticmethod
+    def process(processor: AccessDataProcess, future):
+        try:
+            acquired = future.result()
+        except Exception as e:
+            logger.exception(f"{processor} prefetch error: {e}")
+            return
+
+        if acquired is None:
+            return
+
+        stack, token_bucket, pull_duration = acquired
+        with stack:
+            processor.process()
+            # 500ms内的请求不计令牌消耗
+            if pull_duration <= 0.5:
+                token_bucket.release(0)
+            else:
+                token_bucket.release(max([int(pull_duration), 1]))
@@ -24,11 +24,12 @@ from alarm_backends.service.access import ACCESS_TYPE_TO_CLASS, AccessType
 from alarm_backends.service.access.data.processor import AccessRealTimeDataProcess
 from alarm_backends.service.access.tasks import (
     run_access_data,
+    run_access_data_groups,
     run_access_event_handler,
     run_access_incident_handler,
 )
 from bkmonitor.utils.beater import MonitorBeater
-from bkmonitor.utils.common_utils import safe_int
+from bkmonitor.utils.common_utils import chunks, safe_int
 
 logger = logging.getLogger("access")
 REFRESH_STRATEGY_INFO = "refresh_agg_strategy_group_interval"
@@ -133,6 +134,16 @@ class AccessBeater(MonitorBeater):
         :param interval_key: 策略分组key(按周期)
         """
         strategy_group_keys = self.interval_map.get(interval_key) or []
+        group_size = settings.ACCESS_DATA_PARALLEL_GROUP_SIZE
+        if group_size > 1:
+            # 多个策略组合并为一个任务，在任务中并发拉取
+            strategy_group_keys = list(strategy_group_keys)
+            for _idx, sub_keys in enumerate(chunks(strategy_group_keys, group_size)):
+                run_access_data_groups.delay(sub_keys, interval=interval_key)
+                if _idx % (len(strategy_group_keys) // group_size // interval_key + 1) == 0:
+                    time.sleep(0.05)
+            strategy_group_keys = []
+
         for _idx, strategy_group_key in enumerate(strategy_group_keys):
             run_access_data.delay(strategy_group_key, interval=interval_key)
             if _idx % (len(strategy_group_keys) // interval_key + 1) == 0:
@@ -14,6 +14,7 @@ from alarm_backends.core.cache import key
 from alarm_backends.core.lock.service_lock import service_lock
 from alarm_backends.service.access import ACCESS_TYPE_TO_CLASS
 from alarm_backends.service.access.data import AccessBatchDataProcess, AccessDataProcess
+from alarm_backends.service.access.data.runner import AccessDataRunner
 from alarm_backends.service.access.data.token import TokenBucket
 from alarm_backends.service.access.event.processor import AccessCustomEventGlobalProcess
 from alarm_backends.service.access.event.processorv2 import AccessCustomEventGlobalProcessV2
@@ -40,6 +41,14 @@ def run_access_data(strategy_group_key, interval=60):
             task_tb.release(max([int(processor.pull_duration), 1]))
 
 
+@app.task(ignore_result=True, queue="celery_service")
+def run_access_data_groups(strategy_group_keys, interval=60):
+    """
+    并发拉取多个策略组的数据
+    """
+    AccessDataRunner(strategy_group_keys, interval).run()
+
+
 @app.task(queue="celery_service_batch", ignore_result=True)
 def run_access_batch_data(strategy_group_key: str, sub_task_id: str):
     processor = AccessBatchDataProcess(strategy_group_key=strategy_group_key, sub_task_id=sub_task_id)
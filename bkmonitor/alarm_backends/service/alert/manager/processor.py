@@ -11,8 +11,14 @@ specific language governing permissions and limitations under the License.
 import logging
 from typing import List
 
+from django.conf import settings
+
 from alarm_backends.core.alert import Alert, Event
 from alarm_backends.core.alert.alert import AlertKey
+from alarm_backends.core.alert.user_fields import (
+    fill_user_fields,
+    fill_user_fields_from_es,
+)
 from alarm_backends.core.cache import clear_mem_cache
 from alarm_backends.core.cache.key import ALERT_UPDATE_LOCK
 from alarm_backends.core.lock.service_lock import multi_service_lock
@@ -24,7 +30,6 @@ from alarm_backends.service.alert.manager.checker.recover import RecoverStatusCh
 from alarm_backends.service.alert.manager.checker.shield import ShieldStatusChecker
 from alarm_backends.service.alert.manager.checker.upgrade import UpgradeChecker
 from alarm_backends.service.alert.processor import BaseAlertProcessor
-from bkmonitor.documents import AlertDocument
 from bkmonitor.documents.base import BulkActionType
 from core.prometheus import metrics
 
@@ -50,35 +55,11 @@ class AlertManager(BaseAlertProcessor):
         alerts = Alert.mget(self.alert_keys)
 
         # 2. 补充用户修改字段，这些字段只有在ES是最准的，需要刷进去
-        fields = [
-            "id",
-            "assignee",
-            "is_handled",
-            "handle_stage",
-            "is_ack",
-            "is_ack_noticed",
-            "ack_operator",
-            "appointee",
-            "supervisor",
-            "extra_info",
-        ]
-        alert_docs = {
-            alert_doc.id: alert_doc
-            for alert_doc in AlertDocument.mget(
-                ids=[alert.id for alert in alerts],
-                fields=fields,
-            )
-        }
-        for alert in alerts:
-            if alert.id in alert_docs:
-                for field in fields:
-                    if field == "extra_info":
-                        # 以DB为主，同时合并check阶段新增内容
-                        extra_info = getattr(alert_docs[alert.id], field, None)
-                        alert.data[field] = alert.data.get(field) or {}
-                        alert.data[field].update(extra_info.to_dict() if extra_info else {})
-                    else:
-                        alert.data[field] = getattr(alert_docs[alert.id], field, None)
+        if settings.ALERT_USER_FIELDS_CACHE_ENABLED:
+            # 优先从缓存读取，缓存缺失或需要对账时再从ES拉取
+            fill_user_fields(alerts)
+        else:
+            fill_user_fields_from_es(alerts)
         return alerts
 
     def process(self):
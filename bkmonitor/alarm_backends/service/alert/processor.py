@@ -101,6 +101,17 @@ class BaseAlertProcessor:
             self.logger.info("[save alert document] action(%s): ignored(%d), saved(0), failed(0)", action, len(alerts))
             return alerts
 
+        if AlertDocument.is_bulk_buffer_enabled(action):
+            # 写入缓冲后由后台线程异步提交，提交结果通过缓冲的日志及指标上报
+            AlertDocument.bulk_create(alert_documents, action=action)
+            self.logger.info(
+                "[save alert document] action(%s): ignored(%d), queued(%d)",
+                action,
+                len(alerts) - len(alert_documents),
+                len(alert_documents),
+            )
+            return alerts
+
         start_time = time.time()
         errors = []
         try:
@@ -132,6 +143,11 @@ class BaseAlertProcessor:
         if not log_documents:
             return []
 
+        if AlertLog.is_bulk_buffer_enabled(BulkActionType.CREATE):
+            AlertLog.bulk_create(log_documents)
+            self.logger.info("[save alert log document] queued(%d)", len(log_documents))
+            return
+
         start_time = time.time()
         errors = []
         try:
@@ -0,0 +1,156 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+
+告警屏蔽匹配索引
+
+每条未命中屏蔽快照的告警都需要和业务下所有生效的屏蔽配置逐条匹配，屏蔽配置较多时，
+重复解析屏蔽配置及逐条匹配的开销很大。这里按业务将屏蔽配置编译为匹配索引并在进程内缓存：
+
+1. 屏蔽配置预先解析为 AlertShieldObj，缓存内容不变时不重复解析
+2. 按顶层精确匹配条件的维度分桶，策略屏蔽、告警屏蔽优先按策略ID分桶，匹配时只检查候选屏蔽配置
+3. 无法分桶的屏蔽配置(如维度屏蔽的组合条件、IP、拓扑节点等)每次都需要检查
+4. 动态分组等外部数据可能在屏蔽配置不变时发生变化，索引按最长刷新间隔重建
+"""
+
+import logging
+import time
+from collections import defaultdict
+
+import arrow
+from django.conf import settings
+
+from alarm_backends.core.cache.shield import ShieldCacheManager
+from alarm_backends.service.converge.shield.shield_obj import AlertShieldObj
+from bkmonitor.documents.alert import AlertDocument
+from bkmonitor.utils.range.conditions import EqualCondition
+from bkmonitor.utils.range.fields import DimensionField
+
+logger = logging.getLogger("fta_action.shield")
+
+
+class ShieldIndex:
+    """
+    单个业务的屏蔽配置匹配索引
+    """
+
+    # 优先用于分桶的维度
+    PREFERRED_BUCKET_FIELDS = ("strategy_id",)
+
+    def __init__(self, configs: list[dict], content: str = ""):
+        self.content = content
+        self.create_time = time.time()
+        self.configs = configs
+        self.shield_objs = [AlertShieldObj(config) for config in configs]
+        self.shield_obj_map = {str(shield_obj.id): shield_obj for shield_obj in self.shield_objs}
+
+        # 维度名 -> 维度值 -> 屏蔽配置下标
+        self.buckets: dict[str, dict[str, list[int]]] = defaultdict(lambda: defaultdict(list))
+        # 无法分桶，每次都需要检查的屏蔽配置下标
+        self.unindexed: list[int] = []
+        for index, shield_obj in enumerate(self.shield_objs):
+            bucket = self.get_bucket(shield_obj)
+            if bucket is None:
+                self.unindexed.append(index)
+                continue
+            field_name, values = bucket
+            for value in values:
+                self.buckets[field_name][value].append(index)
+
+    @classmethod
+    def get_bucket(cls, shield_obj: AlertShieldObj) -> tuple[str, set[str]] | None:
+        """
+        获取屏蔽配置的分桶维度及维度值
+        只有顶层的精确匹配条件才能用于分桶：告警维度值与条件值没有交集时，屏蔽配置必然不匹配
+        特殊维度(如IP、拓扑节点)的匹配逻辑不是简单的值相等，不参与分桶
+        """
+        conditions = [
+            condition
+            for condition in shield_obj.dimension_check.conditions
+            if type(condition) is EqualCondition and type(condition.cond_field) is DimensionField
+        ]
+        if not conditions:
+            return None
+
+        bucket_condition = conditions[0]
+        preferred_conditions = [
+            condition for condition in conditions if condition.cond_field.name in cls.PREFERRED_BUCKET_FIELDS
+        ]
+        if preferred_conditions:
+            bucket_condition = min(
+                preferred_conditions, key=lambda c: cls.PREFERRED_BUCKET_FIELDS.index(c.cond_field.name)
+            )
+        return bucket_condition.cond_field.name, set(bucket_condition.cond_field.to_str_list())
+
+    def get_candidates(self, dimension: dict) -> list[int]:
+        """
+        获取告警维度可能命中的屏蔽配置下标，保持屏蔽配置原有顺序
+        """
+        candidates = set(self.unindexed)
+        for field_name, bucket in self.buckets.items():
+            if field_name not in dimension:
+                continue
+            for value in DimensionField(field_name, dimension[field_name]).to_str_list():
+                candidates.update(bucket.get(value, []))
+        return sorted(candidates)
+
+    def match(self, alert: AlertDocument) -> list[AlertShieldObj]:
+        """
+        获取告警命中的屏蔽配置
+        """
+        if not self.shield_objs:
+            return []
+
+        # 告警维度只计算一次
+        dimension = AlertShieldObj.get_dimension(alert)
+        source_time = arrow.now()
+        shield_objs = []
+        candidates = self.get_candidates(dimension)
+        for index in candidates:
+            shield_obj = self.shield_objs[index]
+            if shield_obj.time_check.is_match(source_time) and shield_obj.dimension_check.is_match(dimension):
+                shield_objs.append(shield_obj)
+
+        logger.debug(
+            "[shield index] alert(%s) strategy(%s) candidates(%s/%s) matched(%s)",
+            alert.id,
+            alert.strategy_id,
+            len(candidates),
+            len(self.shield_objs),
+            len(shield_objs),
+        )
+        return shield_objs
+
+
+# 业务ID -> 屏蔽配置匹配索引
+_shield_indexes: dict[int, ShieldIndex] = {}
+
+
+def get_shield_index(bk_biz_id: int) -> ShieldIndex:
+    """
+    获取业务的屏蔽配置匹配索引，屏蔽配置缓存内容变化或超过最长刷新间隔时重建
+    """
+    content = ShieldCacheManager.get_shields_content(bk_biz_id)
+    shield_index = _shield_indexes.get(bk_biz_id)
+    if (
+        shield_index is not None
+        and shield_index.content == content
+        and time.time() - shield_index.create_time < settings.ALERT_SHIELD_INDEX_REFRESH_INTERVAL
+    ):
+        return shield_index
+
+    shield_index = ShieldIndex(ShieldCacheManager.load_shields(content), content)
+    _shield_indexes[bk_biz_id] = shield_index
+    logger.info(
+        "[shield index] rebuild shield index of bk_biz_id(%s): shields(%s) unindexed(%s) buckets(%s)",
+        bk_biz_id,
+        len(shield_index.shield_objs),
+        len(shield_index.unindexed),
+        {field_name: len(bucket) for field_name, bucket in shield_index.buckets.items()},
+    )
+    return shield_index
@@ -380,7 +380,8 @@ class ShieldObj(object):
 
 
 class AlertShieldObj(ShieldObj):
-    def get_dimension(self, alert: AlertDocument):
+    @staticmethod
+    def get_dimension(alert: AlertDocument):
         try:
             dimension = copy.deepcopy(alert.origin_alarm["data"]["dimensions"])
         except BaseException as error:
@@ -10,6 +10,7 @@ specific language governing permissions and limitations under the License.
 """
 import json
 import logging
+import time
 from datetime import datetime
 
 import arrow
@@ -22,11 +23,16 @@ from alarm_backends.core.cache.shield import ShieldCacheManager
 from alarm_backends.core.control.strategy import Strategy
 from alarm_backends.core.i18n import i18n
 from alarm_backends.service.alert.qos.influence import get_failure_scope_config
+from alarm_backends.service.converge.shield.shield_index import (
+    ShieldIndex,
+    get_shield_index,
+)
 from alarm_backends.service.converge.shield.shield_obj import AlertShieldObj
 from bkmonitor.documents.alert import AlertDocument
 from bkmonitor.models import ActionInstance, time_tools
 from bkmonitor.utils import extended_json
 from constants.shield import ShieldType
+from core.prometheus import metrics
 
 from .base import BaseShielder
 
@@ -51,6 +57,13 @@ class AlertShieldConfigShielder(BaseShielder):
         if config_ids:
             # 已经进行过屏蔽匹配了， 这里直接返回
             config_ids: [str] = json.loads(config_ids)
+            if self.shield_index is not None:
+                # 直接使用索引中已解析的屏蔽对象
+                return [
+                    self.shield_index.shield_obj_map[config_id]
+                    for config_id in config_ids
+                    if config_id in self.shield_index.shield_obj_map
+                ]
             return [AlertShieldObj(config) for config in self.configs if str(config["id"]) in config_ids]
         return None
 
@@ -66,8 +79,13 @@ class AlertShieldConfigShielder(BaseShielder):
 
     def __init__(self, alert: AlertDocument):
         self.alert = alert
+        self.shield_index: ShieldIndex | None = None
         try:
-            self.configs = ShieldCacheManager.get_shields_by_biz_id(self.alert.event.bk_biz_id)
+            if settings.ALERT_SHIELD_INDEX_REFRESH_INTERVAL > 0:
+                self.shield_index = get_shield_index(self.alert.event.bk_biz_id)
+                self.configs = self.shield_index.configs
+            else:
+                self.configs = ShieldCacheManager.get_shields_by_biz_id(self.alert.event.bk_biz_id)
             config_ids: [str] = ",".join([str(config["id"]) for config in self.configs])
             logger.debug(
                 "[load shield] alert(%s) strategy(%s) ids:(%s)",
@@ -76,6 +94,7 @@ class AlertShieldConfigShielder(BaseShielder):
                 config_ids,
             )
         except BaseException as error:
+            self.shield_index = None
             self.configs = []
             logger.exception(
                 "[load shield failed] alert(%s) strategy(%s) detail:(%s)", self.alert.id, self.alert.strategy_id, error
@@ -84,11 +103,18 @@ class AlertShieldConfigShielder(BaseShielder):
         shield_objs_cache = self.get_shield_objs_from_cache()
         from_cache = True
         if shield_objs_cache is None:
-            self.shield_objs = []
-            for config in self.configs:
-                shield_obj = AlertShieldObj(config)
-                if shield_obj.is_match(alert):
-                    self.shield_objs.append(shield_obj)
+            start_time = time.time()
+            if self.shield_index is not None:
+                self.shield_objs = self.shield_index.match(alert)
+            else:
+                self.shield_objs = []
+                for config in self.configs:
+                    shield_obj = AlertShieldObj(config)
+                    if shield_obj.is_match(alert):
+                        self.shield_objs.append(shield_obj)
+            metrics.ALERT_SHIELD_MATCH_TIME.labels(mode="index" if self.shield_index is not None else "linear").observe(
+                time.time() - start_time
+            )
             self.set_shield_objs_cache()
             from_cache = False
         else:
@@ -60,8 +60,37 @@ class AnomalyDataPoint(object):
     def __init__(self, data_point, detector):
         self.data_point = data_point
         self.detector = detector
-        self.anomaly_message = ""
+        self._anomaly_message = ""
+        self._message_renderer = None
         self.anomaly_time = arrow.utcnow().format("YYYY-MM-DD HH:mm:ss")
         self.strategy_snapshot_key = ""
         self.child_detector = []
         self.context = {}
+
+    @property
+    def anomaly_message(self):
+        # 延迟渲染的异常描述在首次读取时生成
+        if self._message_renderer is not None:
+            renderer, self._message_renderer = self._message_renderer, None
+            self._anomaly_message = renderer()
+        return self._anomaly_message
+
+    @anomaly_message.setter
+    def anomaly_message(self, value):
+        self._message_renderer = None
+        self._anomaly_message = value
+
+    def set_message_renderer(self, renderer):
+        """
+        设置异常描述的渲染函数，异常描述在首次读取时才渲染
+        """
+        self._message_renderer = renderer
+
+    def get_message_renderer(self):
+        """
+        获取异常描述的渲染函数，已渲染时返回已有的异常描述
+        """
+        if self._message_renderer is not None:
+            return self._message_renderer
+        message = self._anomaly_message
+        return lambda: message
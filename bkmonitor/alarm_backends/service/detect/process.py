@@ -9,17 +9,25 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-import json
 import logging
+import math
 import time
 
 from django.conf import settings
+from redis.exceptions import ResponseError
 
 from alarm_backends.core.cache import key
 from alarm_backends.core.control.strategy import Strategy
 from alarm_backends.core.i18n import i18n
 from alarm_backends.core.lock.service_lock import service_lock
 from alarm_backends.core.processor.base import BaseAbnormalPushProcessor
+from alarm_backends.service.access.data.codec import (
+    count_records,
+    decode_records,
+    lrange_by_records,
+    lrange_raw,
+    rpop_raw,
+)
 from alarm_backends.service.detect import DataPoint
 from core.prometheus import metrics
 
@@ -27,11 +35,18 @@ logger = logging.getLogger("detect")
 
 
 class DetectProcess(BaseAbnormalPushProcessor):
+    # redis 是否支持 RPOP count 参数，不支持时流式拉取回退为 LRANGE + LTRIM
+    rpop_count_supported = True
+
     def __init__(self, strategy_id: str):
         # note: 这里有个坑，进来的策略id是字符串
         self.strategy_id = strategy_id
         self.inputs = {}
         self.outputs = {}
+        # 流式检测模式下各监控项拉取的数据量(数据不保留在 inputs 中)
+        self.stream_counts = {}
+        # 流式检测的截止时间，超过后剩余数据交由下一次任务处理，避免超出策略锁的有效期
+        self.stream_deadline = float("inf")
         self.strategy = Strategy(strategy_id)
         i18n.set_biz(self.strategy.bk_biz_id)
         self.is_busy = False
@@ -60,47 +75,127 @@ class DetectProcess(BaseAbnormalPushProcessor):
         data_channel = key.DATA_LIST_KEY.get_key(strategy_id=self.strategy_id, item_id=item.id)
         client = key.DATA_LIST_KEY.client
 
-        total_points = client.llen(data_channel)
         assert settings.SQL_MAX_LIMIT > 0, "SQL_MAX_LIMIT should bigger than zero"
-        offset = min([total_points, settings.SQL_MAX_LIMIT])
-        if offset == 0:
+        # 以二进制方式读取，兼容json与二进制帧两种格式，二进制帧中包含多条数据，按数据条数限制单次拉取量
+        records, _, is_limited = lrange_by_records(
+            client, data_channel, settings.SQL_MAX_LIMIT, settings.ACCESS_DATA_FRAME_SIZE
+        )
+        if not records:
             logger.info("[detect] strategy({}) item({}) 暂无待检测数据".format(self.strategy_id, item.id))
             return
-        if offset == settings.SQL_MAX_LIMIT:
+
+        # 队列左进右出，已按先进先出顺序读取
+        client.ltrim(data_channel, 0, -len(records) - 1)
+        if is_limited:
             self.is_busy = True
             logger.error(
                 "[detect] strategy({}) item({}) 待检测数据量达到配置值"
                 "(SQL_MAX_LIMIT){}，部分数据可能存在处理延时".format(self.strategy_id, item.id, settings.SQL_MAX_LIMIT)
             )
 
-        records = client.lrange(data_channel, -offset, -1)
-
-        # 上报detect拉取数据量
-        metrics.DETECT_PROCESS_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG, type="pull").inc(len(records))
+        self.inputs[item.id] = self.decode_data_points(item, records)
+        logger.info(
+            "[detect] strategy({}) item({}) 拉取数据({})条".format(self.strategy_id, item.id, len(self.inputs[item.id]))
+        )
 
+    def decode_data_points(self, item, records) -> list[DataPoint]:
+        """
+        解码队列元素为数据点，并上报拉取数据量
+        """
+        data_points = []
         unexpected_record_count = 0
         last_unexpected_record = None
+        for record in decode_records(records):
+            if isinstance(record, ValueError):
+                unexpected_record_count += 1
+                last_unexpected_record = record
+                continue
+            # fill data point into inputs list
+            data_points.append(DataPoint(record, item))
+
+        # 上报detect拉取数据量
+        metrics.DETECT_PROCESS_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG, type="pull").inc(len(data_points))
+        if unexpected_record_count > 0:
+            logger.error(
+                f"[detect] strategy({self.strategy_id}) item({item.id}) "
+                f"发现非期望格式的待检测数据{unexpected_record_count}条, 其中之一: {last_unexpected_record}"
+            )
+        return data_points
+
+    def pop_records(self, client, data_channel, count: int) -> list[bytes]:
+        """
+        原子弹出队列中最早写入的至多 count 个元素，按先进先出顺序返回
+        """
+        if DetectProcess.rpop_count_supported:
+            try:
+                return rpop_raw(client, data_channel, count)
+            except ResponseError as e:
+                logger.warning("[detect] rpop with count not supported, use lrange + ltrim instead: %s", e)
+                DetectProcess.rpop_count_supported = False
+
+        records = lrange_raw(client, data_channel, -count, -1)
         if records:
-            client.ltrim(data_channel, 0, -offset - 1)
-            # 队列左进右出，lrange 取出时需要做一次倒序才能保证先进先出
-            for record in reversed(records):
-                try:
-                    data_point = DataPoint(json.loads(record), item)
-                    # fill data point into inputs list
-                    self.inputs[item.id].append(data_point)
-                except ValueError:
-                    unexpected_record_count += 1
-                    last_unexpected_record = record
-            if unexpected_record_count > 0:
-                logger.error(
-                    "[detect] strategy({}) item({}) 发现非期望格式的待检测数据{}条,"
-                    " 其中之一: {}".format(self.strategy_id, item.id, unexpected_record_count, last_unexpected_record)
-                )
+            client.ltrim(data_channel, 0, -len(records) - 1)
+        return records[::-1]
 
-            logger.info(
-                "[detect] strategy({}) item({}) 拉取数据({})条".format(self.strategy_id, item.id, len(self.inputs[item.id]))
+    def stream_detect(self, item):
+        """
+        流式检测：按 DETECT_STREAM_CHUNK_SIZE 条数据分块原子弹出待检测数据并逐块检测，
+        内存中仅保留当前块的数据点，单次最多消费 DETECT_STREAM_MAX_SIZE 条数据，
+        且不超过 DETECT_STREAM_TIME_LIMIT 秒
+        """
+        self.inputs[item.id] = []
+        self.outputs[item.id] = []
+        self.stream_counts[item.id] = 0
+
+        data_channel = key.DATA_LIST_KEY.get_key(strategy_id=self.strategy_id, item_id=item.id)
+        client = key.DATA_LIST_KEY.client
+        chunk_size = settings.DETECT_STREAM_CHUNK_SIZE
+        remaining = settings.DETECT_STREAM_MAX_SIZE or float("inf")
+
+        # 二进制帧中包含多条数据，每块弹出的元素数按已弹出元素的平均数据条数估算，首次按满帧估算
+        per_element = settings.ACCESS_DATA_FRAME_SIZE
+        element_count = record_count = chunk_count = 0
+        limited_by = None
+        while True:
+            if remaining <= 0:
+                limited_by = "DETECT_STREAM_MAX_SIZE"
+                break
+            if time.time() >= self.stream_deadline:
+                limited_by = "DETECT_STREAM_TIME_LIMIT"
+                break
+
+            count = max(1, math.floor(min(chunk_size, remaining) / per_element))
+            records = self.pop_records(client, data_channel, count)
+            if not records:
+                break
+            chunk_count += 1
+            element_count += len(records)
+            chunk_record_count = sum(count_records(record) for record in records)
+            record_count += chunk_record_count
+            remaining -= chunk_record_count
+            per_element = max(record_count / element_count, 1)
+
+            data_points = self.decode_data_points(item, records)
+            self.stream_counts[item.id] += len(data_points)
+            self.outputs[item.id].extend(item.detect(data_points))
+
+        # 达到单次消费上限，队列中仍有数据时交由下一次任务继续处理
+        if limited_by and client.llen(data_channel):
+            self.is_busy = True
+            logger.error(
+                f"[detect] strategy({self.strategy_id}) item({item.id}) 待检测数据达到配置值"
+                f"({limited_by}){getattr(settings, limited_by)}，部分数据可能存在处理延时"
             )
 
+        if not chunk_count:
+            logger.info(f"[detect] strategy({self.strategy_id}) item({item.id}) 暂无待检测数据")
+            return
+        logger.info(
+            f"[detect] strategy({self.strategy_id}) item({item.id}) "
+            f"分{chunk_count}块拉取数据({self.stream_counts[item.id]})条"
+        )
+
     def handle_data(self, item):
         # detect data
         data_points = self.inputs[item.id]
@@ -143,7 +238,7 @@ class DetectProcess(BaseAbnormalPushProcessor):
                 bk_biz_id=self.strategy.bk_biz_id,
                 strategy_name=self.strategy.name,
             ).inc(anomaly_count)
-        if any(self.inputs.values()):
+        if any(self.inputs.values()) or any(self.stream_counts.values()):
             logger.info("[detect] strategy({}) 异常检测完成: 异常记录数({})".format(self.strategy_id, anomaly_count))
             metrics.DETECT_PROCESS_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG, type="push").inc(anomaly_count)
 
@@ -164,10 +259,15 @@ class DetectProcess(BaseAbnormalPushProcessor):
         with service_lock(key.SERVICE_LOCK_DETECT, strategy_id=self.strategy_id):
             start_at = time.time()
             logger.info(f"[detect][latency] strategy({self.strategy_id}) processing start")
+            if settings.DETECT_STREAM_TIME_LIMIT > 0:
+                self.stream_deadline = start_at + settings.DETECT_STREAM_TIME_LIMIT
             self.strategy.gen_strategy_snapshot()
             for item in self.strategy.items:
-                self.pull_data(item)
-                self.handle_data(item)
+                if settings.DETECT_STREAM_CHUNK_SIZE > 0:
+                    self.stream_detect(item)
+                else:
+                    self.pull_data(item)
+                    self.handle_data(item)
                 try:
                     self.double_check(item)
                 except Exception:
@@ -17,6 +17,7 @@ import logging
 import time
 from collections import Counter
 
+import numpy as np
 from django.conf import settings
 from django.template import Context, Template
 from django.utils.translation import gettext as _
@@ -24,7 +25,8 @@ from django.utils.translation import gettext as _
 from alarm_backends.core.cache import key
 from alarm_backends.service.access.data.records import DataRecord
 from alarm_backends.service.detect import AnomalyDataPoint, DataPoint
-from alarm_backends.templatetags.unit import unit_auto_convert, unit_convert_min
+from alarm_backends.templatetags.unit import get_unit, unit_auto_convert, unit_convert_min
+from bkmonitor.utils.common_utils import chunks, count_md5
 from constants.aiops import SDKDetectStatus
 from core.errors.alarm_backends.detect import (
     HistoryDataNotExists,
@@ -32,10 +34,73 @@ from core.errors.alarm_backends.detect import (
     InvalidDataPoint,
 )
 from core.prometheus import metrics
-from core.unit import load_unit
 
 logger = logging.getLogger("detect")
 
+# 列式比较函数，与表达式中的比较运算符一一对应
+ARRAY_COMPARE_FUNCS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+
+def to_value_array(values):
+    """
+    将数值列表转换为 float64 数组，None 转换为 NaN
+    存在非数值类型时返回 None，由调用方回退到逐点检测
+    """
+    for value in values:
+        if value is not None and not isinstance(value, (int, float)):
+            return None
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+def unit_convert_min_array(values, unit, suffix=None):
+    """
+    unit_convert_min 的列式版本
+    逐级乘以换算系数(与 ScaledUnits.convert 的计算顺序一致)，再按 POINT_PRECISION 舍入
+    """
+    unit = get_unit(unit)
+    suffix_list = unit.suffix_list
+    if not len(suffix_list):
+        return values
+
+    if suffix is None:
+        suffix = suffix_list[unit.suffix_idx] if 0 < unit.suffix_idx < len(suffix_list) else ""
+    try:
+        suffix_id = suffix_list.index(suffix)
+    except ValueError:
+        suffix_id = -1
+
+    values = values.copy()
+    while suffix_id > 0:
+        values *= unit.suffix_factor.get(suffix_list[suffix_id], unit.factor)
+        suffix_id -= 1
+    return np.round(values, settings.POINT_PRECISION)
+
+
+def compare_array(left, method, right):
+    """
+    列式比较，返回候选异常掩码
+    numpy 与 python 的舍入实现存在末位误差，因此落在舍入误差范围内的临界点同样作为候选，
+    交由逐点表达式做最终判定，保证与逐点检测结果一致
+    """
+    hit = ARRAY_COMPARE_FUNCS[method](left, right)
+    boundary = np.isclose(left, right, rtol=1e-9, atol=10**-settings.POINT_PRECISION)
+    return hit | boundary
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_template(desc_tpl: str) -> Template:
+    """
+    编译异常描述模板，相同的模板只编译一次
+    """
+    return Template(desc_tpl)
+
 
 class DetectContext(dict):
     def __getattr__(self, item):
@@ -48,6 +113,8 @@ class Algorithms:
     """
 
     desc_tpl = ""
+    # 是否支持列式检测，支持的算法需实现 detect_mask
+    vectorized = False
 
     def __init__(self):
         self.expr = self.gen_expr()
@@ -108,13 +175,22 @@ class Algorithms:
         """
         if self._detect(data_point):
             anomaly_point = AnomalyDataPoint(data_point=data_point, detector=self)
-            try:
-                anomaly_point.anomaly_message = self._format_message(data_point)
-            except Exception as e:
-                logger.error(f"format anomaly message error: {e}")
-                anomaly_point.anomaly_message = ""
+            if settings.DETECT_LAZY_ANOMALY_MESSAGE:
+                anomaly_point.set_message_renderer(functools.partial(self.render_message, data_point))
+            else:
+                anomaly_point.anomaly_message = self.render_message(data_point)
             return [anomaly_point]
 
+    def render_message(self, data_point):
+        """
+        渲染异常描述，渲染失败时返回空字符串
+        """
+        try:
+            return self._format_message(data_point)
+        except Exception as e:
+            logger.error(f"format anomaly message error: {e}")
+            return ""
+
     def _format_message(self, data_point):
         """
         渲染异常描述
@@ -122,7 +198,28 @@ class Algorithms:
         if not self.desc_tpl:
             return ""
         context = Context(self.get_context(data_point))
-        return Template(self.desc_tpl).render(context)
+        return compile_template(str(self.desc_tpl)).render(context)
+
+    def detect_mask(self, data_points):
+        """
+        To be implemented
+        作用：列式检测，一次性计算整批数据点(同一监控项)的候选异常掩码
+        返回与 data_points 等长的布尔数组，False 表示确定不异常；返回 None 表示无法列式检测
+        """
+        return None
+
+    def get_detect_mask(self, data_points):
+        """
+        获取候选异常掩码，数据量未达到阈值或列式检测失败时返回 None，回退到逐点检测
+        """
+        if not self.vectorized or len(data_points) < settings.DETECT_VECTORIZED_MIN_POINTS:
+            return None
+
+        try:
+            return self.detect_mask(data_points)
+        except Exception as e:
+            logger.warning(f"[detect] vectorized detect error, fallback to per-point detect: {e}")
+            return None
 
     def detect_records(self, data_points, level):
         """
@@ -131,7 +228,11 @@ class Algorithms:
         if isinstance(data_points, DataPoint):
             data_points = [data_points]
         anomaly_points = []
-        for data_point in data_points:
+        # 列式检测排除确定正常的数据点，候选异常点仍走逐点检测生成异常描述
+        mask = self.get_detect_mask(data_points)
+        for index, data_point in enumerate(data_points):
+            if mask is not None and not mask[index]:
+                continue
             try:
                 check_result = self.detect(data_point)
             except Exception:
@@ -152,7 +253,7 @@ class Algorithms:
         :return: 前缀和后缀 -> tuple
         """
         prefix = data_point.item.name
-        unit = load_unit(data_point.unit)
+        unit = get_unit(data_point.unit)
         value, suffix = unit.fn.auto_convert(data_point.value, decimal=settings.POINT_PRECISION)
         suffix = _(", 当前值{value}{unit}").format(value=value, unit=suffix)
         return prefix, suffix
@@ -165,24 +266,29 @@ class Algorithms:
         :param auto_format: 自动拼接前后缀
         :return:
         """
-        anomaly_message_prefix, anomaly_message_suffix = self.anomaly_message_template_tuple(data_point)
-
         if len(detect_result) == 1:
             ap = detect_result[0]
-            if auto_format:
-                ap.anomaly_message = anomaly_message_prefix + ap.anomaly_message + anomaly_message_suffix
         else:
             # 总结基于多算法检测出的异常点，生成新的异常点
             ap = AnomalyDataPoint(data_point, self)
-            desc_list = []
             for child_ap in detect_result:
                 ap.child_detector.append(child_ap.detector)
-                desc_list.append(child_ap.anomaly_message)
+        renderers = [child_ap.get_message_renderer() for child_ap in detect_result]
 
-            if auto_format:
-                ap.anomaly_message = anomaly_message_prefix + _("且").join(desc_list) + anomaly_message_suffix
+        def render():
+            if len(renderers) == 1:
+                message = renderers[0]()
             else:
-                ap.anomaly_message = _("且").join(desc_list)
+                message = _("且").join(renderer() for renderer in renderers)
+            if auto_format:
+                anomaly_message_prefix, anomaly_message_suffix = self.anomaly_message_template_tuple(data_point)
+                message = anomaly_message_prefix + message + anomaly_message_suffix
+            return message
+
+        if settings.DETECT_LAZY_ANOMALY_MESSAGE:
+            ap.set_message_renderer(render)
+        else:
+            ap.anomaly_message = render()
 
         ap.anomaly_id = self._gen_anomaly_id(data_point, level)
 
@@ -275,6 +381,15 @@ class BasicAlgorithmsCollection(Algorithms):
 
         return anomaly
 
+    def value_array(self, data_points):
+        """
+        当前值的最小单位列式数据，对应表达式中的 unit_convert_min(value, unit)
+        """
+        values = to_value_array([data_point.value for data_point in data_points])
+        if values is None:
+            return None
+        return unit_convert_min_array(values, data_points[0].unit)
+
     def get_context(self, data_point):
         context = super().get_context(data_point)
         context.update(
@@ -283,21 +398,57 @@ class BasicAlgorithmsCollection(Algorithms):
         return context
 
 
+def get_history_query_md5(item):
+    """
+    计算监控项查询的md5，查询配置相同的监控项(包括不同策略)共享历史数据
+    查询配置id与策略相关，不参与计算
+    """
+    query_configs = [
+        {field: value for field, value in query_config.items() if field != "id"} for query_config in item.query_configs
+    ]
+    return count_md5(
+        {
+            "bk_biz_id": item.strategy.bk_biz_id,
+            "expression": item.expression,
+            "functions": item.functions,
+            "query_configs": query_configs,
+        },
+        list_sort=False,
+    )
+
+
 class HistoryPointFetcher:
+    # 单条 HMGET 命令最多携带的维度数量
+    history_fetch_batch_size = 5000
+
     def set_default(self, value: int):
         self._default = value
 
+    def get_history_key(self, item, history_timestamp):
+        """
+        历史数据缓存key，按查询配置的md5区分
+        """
+        if not getattr(self, "_history_query_md5", None):
+            self._history_query_md5 = {}
+        item_key = (item.strategy.id, item.id)
+        if item_key not in self._history_query_md5:
+            self._history_query_md5[item_key] = get_history_query_md5(item)
+        return key.HISTORY_DATA_KEY.get_key(query_md5=self._history_query_md5[item_key], timestamp=history_timestamp)
+
     def query_history_points(self, data_points):
         item = data_points[0].item
+        agg_interval = item.query_configs[0]["agg_interval"]
         # 按时间从小到大排序
         sorted_data_points = sorted(data_points, key=lambda x: x.timestamp)
         offsets = self.get_history_offsets(item)
+        history_offsets = set()
         for offset in offsets:
             # offsets 支持区间（相邻offset之间差值等于interval的整数倍）批量查询
             if isinstance(offset, tuple):
                 start, end = offset
             else:
                 start = end = offset
+            history_offsets.update(range(start, end + 1, agg_interval))
 
             if end == 0:
                 self._publish_history_points(item, data_points)
@@ -306,16 +457,10 @@ class HistoryPointFetcher:
             records = []
             from_timestamp, until_timestamp = (
                 sorted_data_points[0].timestamp - end,
-                sorted_data_points[-1].timestamp - start + item.query_configs[0]["agg_interval"],
+                sorted_data_points[-1].timestamp - start + agg_interval,
             )
 
-            accessed = None
-            for history_timestamp in range(from_timestamp, until_timestamp, item.query_configs[0]["agg_interval"]):
-                if accessed is None:
-                    accessed = True
-                accessed = accessed and self._check_history_points(item, history_timestamp)
-
-            if accessed:
+            if self._check_history_points(item, range(from_timestamp, until_timestamp, agg_interval)):
                 # 历史时刻的数据都已经查过
                 continue
 
@@ -325,18 +470,23 @@ class HistoryPointFetcher:
                 if point.value:
                     records.append(adapter_data_access_2_detect(point, item))
 
-            self._local_history_storage = {}
             self._publish_history_points(item, records)
 
-    def _check_history_points(self, item, history_timestamp):
+        self._local_history_storage = {}
+        self._prefetch_history_points(item, data_points, history_offsets)
+
+    def _check_history_points(self, item, history_timestamps):
         """
-        检查历史时刻的数据是否已经拉取过，如果存在，则更新过期时间。
+        批量检查历史时刻的数据是否都已经拉取过
         """
-        client = key.HISTORY_DATA_KEY.client
-        history_key = key.HISTORY_DATA_KEY.get_key(
-            strategy_id=item.strategy.id, item_id=item.id, timestamp=history_timestamp
-        )
-        return client.exists(history_key)
+        history_timestamps = list(history_timestamps)
+        if not history_timestamps:
+            return False
+
+        pipeline = key.HISTORY_DATA_KEY.client.pipeline(transaction=False)
+        for history_timestamp in history_timestamps:
+            pipeline.exists(self.get_history_key(item, history_timestamp))
+        return all(pipeline.execute())
 
     def _publish_history_points(self, item, history_points):
         """
@@ -345,9 +495,6 @@ class HistoryPointFetcher:
         if not history_points:
             return
         pipeline = key.HISTORY_DATA_KEY.client.pipeline(transaction=False)
-        history_key_maker = functools.partial(
-            key.HISTORY_DATA_KEY.get_key, strategy_id=item.strategy.id, item_id=item.id
-        )
         # bulk cache json data
         history_points_map = {}
         for point in history_points:
@@ -355,26 +502,49 @@ class HistoryPointFetcher:
             points_with_timestamp_map[point.record_id.split(".")[0]] = json.dumps(point.as_dict())
 
         for timestamp, _points_with_timestamp_map in history_points_map.items():
-            history_key = history_key_maker(timestamp=timestamp)
+            history_key = self.get_history_key(item, timestamp)
             pipeline.hmset(history_key, _points_with_timestamp_map)
             pipeline.expire(history_key, key.HISTORY_DATA_KEY.ttl)
         pipeline.execute()
 
+    def _prefetch_history_points(self, item, data_points, history_offsets):
+        """
+        批量获取待检测数据点在各历史时刻对应的数据，仅获取需要的维度
+        """
+        history_dimensions = {}
+        for point in data_points:
+            dimensions_md5 = point.record_id.split(".")[0]
+            for offset in history_offsets:
+                history_key = self.get_history_key(item, point.timestamp - offset)
+                history_dimensions.setdefault(history_key, set()).add(dimensions_md5)
+
+        commands = []
+        pipeline = key.HISTORY_DATA_KEY.client.pipeline(transaction=False)
+        for history_key, dimensions in history_dimensions.items():
+            for chunk in chunks(list(dimensions), self.history_fetch_batch_size):
+                pipeline.hmget(history_key, chunk)
+                commands.append((history_key, chunk))
+        if not commands:
+            return
+
+        for (history_key, chunk), values in zip(commands, pipeline.execute()):
+            self._local_history_storage.setdefault(history_key, {}).update(zip(chunk, values))
+
     def fetch_history_point(self, item, point, history_timestamp):
         """
         获取当前数据点对应的历史数据点
         """
-        client = key.HISTORY_DATA_KEY.client
-        history_key = key.HISTORY_DATA_KEY.get_key(
-            strategy_id=item.strategy.id, item_id=item.id, timestamp=history_timestamp
-        )
+        history_key = self.get_history_key(item, history_timestamp)
         if not getattr(self, "_local_history_storage", None):
             self._local_history_storage = {}
 
-        if history_key not in self._local_history_storage:
-            self._local_history_storage[history_key] = client.hgetall(history_key)
+        dimensions_md5 = point.record_id.split(".")[0]
+        history_data = self._local_history_storage.setdefault(history_key, {})
+        if dimensions_md5 not in history_data:
+            # 未预取的维度单独获取
+            history_data[dimensions_md5] = key.HISTORY_DATA_KEY.client.hget(history_key, dimensions_md5)
 
-        raw_data = self._local_history_storage[history_key].get(point.record_id.split(".")[0])
+        raw_data = history_data[dimensions_md5]
         if not raw_data:
             if getattr(self, "_default", None) is not None:
                 return DataPoint({"value": self._default, "time": history_timestamp}, item)
@@ -437,6 +607,43 @@ class RangeRatioAlgorithmsCollection(BasicAlgorithmsCollection, HistoryPointFetc
         env.update(self.validated_config)
         return env
 
+    def detect_mask(self, data_points):
+        """
+        列式计算下降/上升占比，对应 gen_expr 生成的表达式:
+        (value or history_value) and (value <=/>= history_value * (100 -/+ floor/ceil) * 0.01)
+        历史数据不存在的点与逐点检测一致视为不异常，获取历史数据出错的点交由逐点检测判定
+        """
+        raw_values = [data_point.value for data_point in data_points]
+        history_values = []
+        fallback = np.zeros(len(data_points), dtype=bool)
+        for index, data_point in enumerate(data_points):
+            try:
+                history_data_point = self.history_point_fetcher(data_point)
+            except Exception:
+                history_data_point = None
+                fallback[index] = True
+            history_values.append(getattr(history_data_point, "value", None))
+
+        values = to_value_array(raw_values)
+        raw_history_values = to_value_array(history_values)
+        if values is None or raw_history_values is None:
+            return None
+
+        unit = data_points[0].unit
+        current = unit_convert_min_array(values, unit)
+        history = unit_convert_min_array(raw_history_values, unit)
+        # 单位换算不改变零值，用原始值判断真值即可覆盖舍入后的结果
+        truthy = (np.nan_to_num(values) != 0) | (np.nan_to_num(raw_history_values) != 0)
+        # 历史数据不存在时逐点检测抛出 HistoryDataNotExists，视为不异常
+        truthy &= ~np.isnan(raw_history_values)
+
+        mask = np.zeros(len(data_points), dtype=bool)
+        if self.validated_config["floor"]:
+            mask |= compare_array(current, "<=", history * (100 - self.validated_config["floor"]) * 0.01)
+        if self.validated_config["ceil"]:
+            mask |= compare_array(current, ">=", history * (100 + self.validated_config["ceil"]) * 0.01)
+        return (mask & truthy) | fallback
+
     def history_point_fetcher(self, data_point, **kwargs):
         """
         同比环比类算法特有方法，获取历史数据。
@@ -24,6 +24,7 @@ from alarm_backends.service.detect.strategy.threshold import Threshold
 
 class OsRestart(SimpleRingRatio):
     expr_op = "and"
+    vectorized = False
     desc_tpl = _("当前服务器在{{data_point.value}}秒前发生系统重启事件")
     config_serializer = None
 
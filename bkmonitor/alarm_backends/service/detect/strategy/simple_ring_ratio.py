@@ -25,6 +25,7 @@ logger = logging.getLogger("detect")
 
 class SimpleRingRatio(RangeRatioAlgorithmsCollection):
     config_serializer = SimpleRingRatioSerializer
+    vectorized = True
 
     floor_desc_tpl = _("{% load unit %}较前一时刻({{history_data_point.value|auto_unit:unit}})下降超过{{floor}}%")
     ceil_desc_tpl = _("{% load unit %}较前一时刻({{history_data_point.value|auto_unit:unit}})上升超过{{ceil}}%")
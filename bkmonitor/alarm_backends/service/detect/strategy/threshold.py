@@ -16,10 +16,16 @@ specific language governing permissions and limitations under the License.
 import ast
 import logging
 
+import numpy as np
 from django.utils.safestring import mark_safe
 from six.moves import zip
 
-from alarm_backends.service.detect.strategy import BasicAlgorithmsCollection, ExprDetectAlgorithms
+from alarm_backends.service.detect.strategy import (
+    BasicAlgorithmsCollection,
+    ExprDetectAlgorithms,
+    compare_array,
+)
+from alarm_backends.templatetags.unit import unit_convert_min
 from bkmonitor.strategy.serializers import ThresholdSerializer, allowed_threshold_method
 from core.errors.alarm_backends.detect import InvalidThresholdConfig
 
@@ -37,6 +43,7 @@ class AlgorithmsAST(ast.NodeTransformer):
 class AndThreshold(BasicAlgorithmsCollection):
     config_serializer = ThresholdSerializer.AndSerializer
     expr_op = "and"
+    vectorized = True
 
     desc_tpl = "{{% load unit %}} {method_desc} {threshold}{{{{unit|unit_suffix:algorithm_unit}}}}"
 
@@ -61,6 +68,21 @@ class AndThreshold(BasicAlgorithmsCollection):
         for args in zip(expr_list, tpl_list):
             yield ExprDetectAlgorithms(*args)
 
+    def detect_mask(self, data_points):
+        """
+        列式检测：所有阈值条件同时满足
+        """
+        current = self.value_array(data_points)
+        if current is None:
+            return None
+
+        unit = data_points[0].unit
+        mask = np.ones(len(data_points), dtype=bool)
+        for t_config in self.validated_config:
+            threshold = unit_convert_min(t_config["threshold"], unit, self.unit)
+            mask &= compare_array(current, allowed_threshold_method[t_config["method"]], threshold)
+        return mask
+
 
 class Threshold(AndThreshold):
     config_serializer = ThresholdSerializer
@@ -69,3 +91,15 @@ class Threshold(AndThreshold):
     def gen_expr(self):
         for t_config in self.validated_config:
             yield AndThreshold(t_config, self.unit)
+
+    def detect_mask(self, data_points):
+        """
+        列式检测：任一组阈值条件满足
+        """
+        mask = np.zeros(len(data_points), dtype=bool)
+        for detector in self.detectors:
+            detector_mask = detector.detect_mask(data_points)
+            if detector_mask is None:
+                return None
+            mask |= detector_mask
+        return mask
@@ -12,6 +12,7 @@ specific language governing permissions and limitations under the License.
 
 import json
 import logging
+from collections import defaultdict
 
 import arrow
 
@@ -59,16 +60,25 @@ class CheckProcessor(BaseAbnormalPushProcessor):
             self.inputs[item.id].extend(inputs)
             return
         # pull data
-        data_channel = key.NO_DATA_LIST_KEY.get_key(strategy_id=self.strategy_id, item_id=item.id)
-        client = key.NO_DATA_LIST_KEY.client
-
-        total_points = client.llen(data_channel)
-        if total_points == 0:
+        # 数据队列和维度存活索引都需要拉取，避免开关切换时遗漏另一种方式中尚未检测的数据
+        self.pull_records(item, check_timestamp)
+        self.pull_liveness(item, check_timestamp)
+        if not self.inputs[item.id]:
             logger.info(
                 "[nodata] strategy({}) item({}) check_timestamp({}) 无待检测数据，可能触发无数据告警".format(
                     self.strategy_id, item.id, check_timestamp
                 )
             )
+
+    def pull_records(self, item, check_timestamp):
+        """
+        从无数据待检测队列拉取完整数据
+        """
+        data_channel = key.NO_DATA_LIST_KEY.get_key(strategy_id=self.strategy_id, item_id=item.id)
+        client = key.NO_DATA_LIST_KEY.client
+
+        total_points = client.llen(data_channel)
+        if total_points == 0:
             return
 
         records = client.lrange(data_channel, -total_points, -1)
@@ -147,6 +157,105 @@ class CheckProcessor(BaseAbnormalPushProcessor):
                 )
             )
 
+    def pull_liveness(self, item, check_timestamp):
+        """
+        从维度存活索引拉取各数据时间上报的维度，不再拉取完整数据
+        """
+        client = key.NO_DATA_LIVENESS_INDEX_KEY.client
+        index_key = key.NO_DATA_LIVENESS_INDEX_KEY.get_key(strategy_id=self.strategy_id, item_id=item.id)
+
+        md5s_by_time = self._pop_liveness(item, client.zrangebyscore(index_key, "-inf", check_timestamp))
+        future_timestamp = None
+        if not md5s_by_time and not self.inputs[item.id]:
+            # 如果当前监测点之前无数据，但是未来有数据，那么取未来一个周期的数据
+            future_timestamps = client.zrangebyscore(index_key, f"({check_timestamp}", "+inf", start=0, num=1)
+            md5s_by_time = self._pop_liveness(item, future_timestamps)
+            if md5s_by_time:
+                future_timestamp = future_timestamps[0]
+        if not md5s_by_time:
+            return
+
+        # 维度字典按数据时间分桶，从数据时间所在的桶中读取维度
+        bucket_size = key.NO_DATA_DIMENSIONS_KEY.ttl
+        md5s_by_bucket = defaultdict(set)
+        for timestamp, md5s in md5s_by_time.items():
+            md5s_by_bucket[timestamp - timestamp % bucket_size].update(md5s)
+        pipeline = client.pipeline(transaction=False)
+        bucket_md5s = []
+        for bucket, md5s in md5s_by_bucket.items():
+            md5s = list(md5s)
+            bucket_md5s.append((bucket, md5s))
+            pipeline.hmget(
+                key.NO_DATA_DIMENSIONS_KEY.get_key(strategy_id=self.strategy_id, item_id=item.id, bucket=bucket), md5s
+            )
+        dimensions_by_md5 = {}
+        for (bucket, md5s), dimensions_list in zip(bucket_md5s, pipeline.execute()):
+            for md5, dimensions in zip(md5s, dimensions_list):
+                if dimensions:
+                    dimensions_by_md5[(bucket, md5)] = dimensions
+
+        missing_count = 0
+        for timestamp, md5s in md5s_by_time.items():
+            bucket = timestamp - timestamp % bucket_size
+            for md5 in md5s:
+                if (bucket, md5) not in dimensions_by_md5:
+                    missing_count += 1
+                    continue
+                self.inputs[item.id].append(
+                    DataPoint(
+                        {
+                            "record_id": f"{md5}.{timestamp}",
+                            "value": None,
+                            # 无数据检测会对维度降维并加入无数据标记，每个数据点使用独立的维度
+                            "dimensions": json.loads(dimensions_by_md5[(bucket, md5)]),
+                            "time": timestamp,
+                        },
+                        item,
+                    )
+                )
+        metrics.NODATA_PROCESS_PULL_DATA_COUNT.labels(strategy_id=metrics.TOTAL_TAG).inc(len(self.inputs[item.id]))
+
+        if missing_count:
+            logger.error(
+                f"[nodata] strategy({self.strategy_id}) item({item.id}) check_timestamp({check_timestamp}) "
+                f"维度字典中缺少{missing_count}个维度"
+            )
+        logger.info(
+            f"[nodata] strategy({self.strategy_id}) item({item.id}) check_timestamp({check_timestamp}) "
+            f"future_timestamp({future_timestamp}) 拉取维度存活记录({len(self.inputs[item.id])})条"
+        )
+
+    def _pop_liveness(self, item, timestamps):
+        """
+        取出指定数据时间的维度存活集合
+        先删除时间索引再读取集合，只移除读取到的维度，读取后写入的维度会重新写入索引，等待下次检测
+        """
+        if not timestamps:
+            return {}
+        client = key.NO_DATA_LIVENESS_KEY.client
+        liveness_keys = [
+            key.NO_DATA_LIVENESS_KEY.get_key(strategy_id=self.strategy_id, item_id=item.id, timestamp=timestamp)
+            for timestamp in timestamps
+        ]
+        pipeline = client.pipeline(transaction=False)
+        pipeline.zrem(
+            key.NO_DATA_LIVENESS_INDEX_KEY.get_key(strategy_id=self.strategy_id, item_id=item.id), *timestamps
+        )
+        for liveness_key in liveness_keys:
+            pipeline.smembers(liveness_key)
+        results = pipeline.execute()[1:]
+
+        md5s_by_time = {}
+        pipeline = client.pipeline(transaction=False)
+        for timestamp, liveness_key, md5s in zip(timestamps, liveness_keys, results):
+            if not md5s:
+                continue
+            md5s_by_time[int(timestamp)] = md5s
+            pipeline.srem(liveness_key, *md5s)
+        if md5s_by_time:
+            pipeline.execute()
+        return md5s_by_time
+
     def handle_data(self, item, check_timestamp):
         # check no data
         data_points = self.inputs[item.id]
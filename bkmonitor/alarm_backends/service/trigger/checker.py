@@ -9,10 +9,12 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-
 import logging
+import time
 
+from django.conf import settings
 from django.utils.translation import gettext as _
+from redis.exceptions import ResponseError
 
 from alarm_backends.constants import NO_DATA_TAG_DIMENSION
 from alarm_backends.core.cache.key import CHECK_RESULT_CACHE_KEY
@@ -20,11 +22,127 @@ from alarm_backends.core.control.record_parser import RecordParser
 from alarm_backends.core.control.strategy import Strategy
 from alarm_backends.core.detect_result import ANOMALY_LABEL
 from bkmonitor.models import AnomalyRecord
+from bkmonitor.utils.common_utils import chunks
 
 logger = logging.getLogger("trigger")
 
+# 批量统计检测窗口内的检测结果
+# KEYS: 检测结果缓存key列表
+# ARGV: [异常标识, key1窗口起始时间, key1窗口结束时间, key2窗口起始时间, ...]
+# 返回: 每个key对应 [检测结果总数, 异常点时间戳...]
+CHECK_RESULT_SUMMARY_SCRIPT = """
+local label = ARGV[1]
+local label_len = string.len(label)
+local result = {}
+for i, key in ipairs(KEYS) do
+    local items = redis.call("ZRANGEBYSCORE", key, ARGV[i * 2], ARGV[i * 2 + 1], "WITHSCORES")
+    local summary = {#items / 2}
+    for j = 1, #items, 2 do
+        if string.sub(items[j], -label_len) == label then
+            table.insert(summary, items[j + 1])
+        end
+    end
+    result[i] = summary
+end
+return result
+"""
+
 
-class AnomalyChecker(object):
+class CheckResultFetcher:
+    """
+    检测结果批量获取
+    将一批异常点各级别的检测窗口合并为少量的 lua 脚本调用，服务端仅返回 (检测结果总数, 异常点时间戳)
+    未开启 ENABLED_TRIGGER_CHECK_RESULT_SCRIPT 或 redis 不支持 lua 脚本时，使用 pipeline 批量查询
+    """
+
+    # 单次脚本调用包含的检测窗口数量
+    BATCH_SIZE = 500
+    # 脚本执行失败(非不支持)后，使用 pipeline 的时长(秒)
+    SCRIPT_RETRY_INTERVAL = 60
+    # redis 不支持 lua 脚本时的错误信息(如代理不支持 EVAL、集群模式下 key 不在同一个 slot)
+    SCRIPT_UNSUPPORTED_ERRORS = ("unknown command", "unsupported command", "not support", "crossslot")
+
+    # redis 是否支持 lua 脚本，不支持时后续均使用 pipeline
+    lua_supported = True
+    # 脚本执行失败后，下次重新尝试脚本的时间
+    lua_retry_at = 0
+
+    def __init__(self):
+        self.client = CHECK_RESULT_CACHE_KEY.client
+        # (key, min, max) -> (检测结果总数, 异常点时间戳列表)
+        self.results = {}
+
+    def fetch(self, queries):
+        """
+        批量获取检测结果
+        :param queries: [(check_cache_key, min, max), ...]
+        """
+        queries = [query for query in dict.fromkeys(queries) if query not in self.results]
+        for chunk in chunks(queries, self.BATCH_SIZE):
+            if self.script_enabled():
+                try:
+                    self._fetch_by_script(chunk)
+                    continue
+                except ResponseError as e:
+                    self.on_script_error(e)
+            self._fetch_by_pipeline(chunk)
+
+    def script_enabled(self) -> bool:
+        return settings.ENABLED_TRIGGER_CHECK_RESULT_SCRIPT and self.lua_supported and time.time() >= self.lua_retry_at
+
+    @classmethod
+    def on_script_error(cls, error: ResponseError):
+        """
+        redis 不支持 lua 脚本时，后续均使用 pipeline；其他错误可能是暂时的，一段时间后重新尝试脚本
+        """
+        message = str(error).lower()
+        if any(unsupported in message for unsupported in cls.SCRIPT_UNSUPPORTED_ERRORS):
+            logger.warning("[trigger] check result script not supported, use pipeline instead: %s", error)
+            cls.lua_supported = False
+            return
+
+        logger.warning(
+            "[trigger] check result script error, use pipeline in the next %ss: %s", cls.SCRIPT_RETRY_INTERVAL, error
+        )
+        cls.lua_retry_at = time.time() + cls.SCRIPT_RETRY_INTERVAL
+
+    def _fetch_by_script(self, queries):
+        args = [ANOMALY_LABEL]
+        for _key, min_score, max_score in queries:
+            args.extend([min_score, max_score])
+        keys = [query[0] for query in queries]
+        summaries = self.client.eval(CHECK_RESULT_SUMMARY_SCRIPT, len(keys), *keys, *args)
+        for query, summary in zip(queries, summaries):
+            self.results[query] = (int(summary[0]), [int(float(score)) for score in summary[1:]])
+
+    def _fetch_by_pipeline(self, queries):
+        pipeline = self.client.pipeline(transaction=False)
+        for key, min_score, max_score in queries:
+            pipeline.zrangebyscore(name=key, min=min_score, max=max_score, withscores=True)
+        for query, check_results in zip(queries, pipeline.execute()):
+            self.results[query] = self.summarize(check_results)
+
+    @staticmethod
+    def summarize(check_results):
+        # 统计包含异常标记的key的数量
+        anomaly_timestamps = []
+        for label, score in check_results:
+            if label.endswith(ANOMALY_LABEL):
+                anomaly_timestamps.append(int(score))
+        return len(check_results), anomaly_timestamps
+
+    def get(self, key, min_score, max_score):
+        """
+        获取单个检测窗口的检测结果，未预取时单独查询
+        """
+        query = (key, min_score, max_score)
+        if query not in self.results:
+            check_results = self.client.zrangebyscore(name=key, min=min_score, max=max_score, withscores=True)
+            self.results[query] = self.summarize(check_results)
+        return self.results[query]
+
+
+class AnomalyChecker:
     """
     异常检测逻辑
     """
@@ -32,7 +150,7 @@ class AnomalyChecker(object):
     # 检测窗口单位(默认1min)
     DEFAULT_CHECK_WINDOW_UNIT = 60
 
-    def __init__(self, point, strategy, item_id):
+    def __init__(self, point, strategy, item_id, check_result_fetcher=None):
         self.item = Strategy.get_item_in_strategy(strategy, item_id)
         self.strategy = strategy
         self.strategy_id = strategy["id"]
@@ -54,6 +172,7 @@ class AnomalyChecker(object):
         # shortcut
         self.dimensions_md5 = self.record_parser.dimensions_md5
         self.source_time = self.record_parser.source_time
+        self.check_result_fetcher = check_result_fetcher or CheckResultFetcher()
 
     @staticmethod
     def is_no_data_point(point):
@@ -165,28 +284,25 @@ class AnomalyChecker(object):
                 anomaly_level = level
         return anomaly_level, anomaly_timestamps
 
-    def _check_anomaly_by_level(self, level):
+    def get_trigger_config(self, level):
         """
-        检测某个级别的异常点是否满足触发条件
-        :param str level: 告警级别
-        :return: 二元组：是否被触发，异常次数
+        获取某个级别的触发配置，不存在时返回 None
         """
         try:
-            trigger_config = self.trigger_configs[level]
+            return self.trigger_configs[level]
         except KeyError:
             trigger_configs = self.trigger_configs.values()
             if not trigger_configs:
-                # 如果该等级没有在策略中配置，则不检测
-                logger.error(
-                    "strategy({}), item({}) level({}) trigger config not exists".format(
-                        self.strategy_id, self.item_id, level
-                    )
-                )
-                return False, []
+                return None
 
             # 默认兜底，trigger 配置当前所有告警级别默认一致
-            trigger_config = list(trigger_configs)[0]
+            return list(trigger_configs)[0]
 
+    def get_check_query(self, level, trigger_config):
+        """
+        获取某个级别的检测窗口
+        :return: 三元组：检测结果缓存key，窗口起始时间，窗口结束时间
+        """
         check_cache_key = CHECK_RESULT_CACHE_KEY.get_key(
             strategy_id=self.strategy_id,
             item_id=self.item_id,
@@ -195,14 +311,39 @@ class AnomalyChecker(object):
         )
         # 在对应的打点队列中取出打点信息。时间范围为source_time前后的一个窗口偏移量
         check_window_offset = trigger_config["check_window_size"] * self.check_window_unit - 1
-        check_results = CHECK_RESULT_CACHE_KEY.client.zrangebyscore(
-            name=check_cache_key, min=self.source_time - check_window_offset, max=self.source_time, withscores=True
-        )
+        return check_cache_key, self.source_time - check_window_offset, self.source_time
+
+    def get_check_queries(self):
+        """
+        获取所有级别的检测窗口，用于批量预取检测结果
+        """
+        queries = []
+        for level in self.point["anomaly"]:
+            trigger_config = self.get_trigger_config(str(level))
+            if trigger_config:
+                queries.append(self.get_check_query(str(level), trigger_config))
+        return queries
+
+    def _check_anomaly_by_level(self, level):
+        """
+        检测某个级别的异常点是否满足触发条件
+        :param str level: 告警级别
+        :return: 二元组：是否被触发，异常次数
+        """
+        trigger_config = self.get_trigger_config(level)
+        if trigger_config is None:
+            # 如果该等级没有在策略中配置，则不检测
+            logger.error(
+                "strategy({}), item({}) level({}) trigger config not exists".format(
+                    self.strategy_id, self.item_id, level
+                )
+            )
+            return False, []
+
         # 统计包含异常标记的key的数量，并与trigger_count进行比较
-        anomaly_timestamps = []
-        for label, score in check_results:
-            if label.endswith(ANOMALY_LABEL):
-                anomaly_timestamps.append(int(score))
+        check_result_count, anomaly_timestamps = self.check_result_fetcher.get(
+            *self.get_check_query(level, trigger_config)
+        )
 
         anomaly_times = len(anomaly_timestamps)
         is_triggered = anomaly_times >= trigger_config["trigger_count"]
@@ -211,7 +352,7 @@ class AnomalyChecker(object):
             # 1. 所有检测记录均为异常点
             # 2. 异常点间时间差异符合无数据配置的周期
             start, end = anomaly_timestamps[0], anomaly_timestamps[-1]
-            always_nodata = anomaly_times == len(check_results)
+            always_nodata = anomaly_times == check_result_count
             is_triggered = always_nodata and (
                 (end - start) >= (trigger_config["trigger_count"] - 1) * self.check_window_unit
             )
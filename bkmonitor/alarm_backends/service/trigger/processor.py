@@ -13,10 +13,12 @@ import json
 import logging
 import time
 
+from django.conf import settings
+
 from alarm_backends.core.alert.adapter import MonitorEventAdapter
 from alarm_backends.core.cache.key import ANOMALY_LIST_KEY, ANOMALY_SIGNAL_KEY
 from alarm_backends.core.control.strategy import Strategy
-from alarm_backends.service.trigger.checker import AnomalyChecker
+from alarm_backends.service.trigger.checker import AnomalyChecker, CheckResultFetcher
 from core.errors.alarm_backends import StrategyNotFound
 from core.prometheus import metrics
 
@@ -145,6 +147,8 @@ class TriggerProcessor(object):
         in_alarm_time, message = self.strategy.in_alarm_time()
         if not in_alarm_time:
             logger.info("[trigger] strategy(%s) not in alarm time: %s, skipped", self.strategy_id, message)
+        elif settings.ENABLED_TRIGGER_BATCH_CHECK:
+            self.process_batch()
         else:
             for point in self.anomaly_points:
                 try:
@@ -157,10 +161,49 @@ class TriggerProcessor(object):
 
         self.push()
 
-    def process_point(self, point):
+    def process_batch(self):
+        """
+        批量处理：先汇总所有异常点各级别的检测窗口，一次性获取检测结果后再逐点判断
+        """
+        fetcher = CheckResultFetcher()
+        checkers = []
+        for point in self.anomaly_points:
+            try:
+                checkers.append(self.get_checker(point, fetcher))
+            except Exception as e:
+                error_message = (
+                    f"[process error] strategy({self.strategy_id}), item({self.item_id}) reason: {e} \n"
+                    f"origin data: {point}"
+                )
+                logger.exception(error_message)
+
+        try:
+            fetcher.fetch([query for checker in checkers for query in checker.get_check_queries()])
+        except Exception as e:
+            # 预取失败时，逐点查询
+            logger.exception(
+                f"[trigger] strategy({self.strategy_id}), item({self.item_id}) fetch check result error: {e}"
+            )
+
+        for checker in checkers:
+            try:
+                self.process_checker(checker)
+            except Exception as e:
+                error_message = (
+                    f"[process error] strategy({self.strategy_id}), item({self.item_id}) reason: {e} \n"
+                    f"origin data: {checker.point}"
+                )
+                logger.exception(error_message)
+
+    def get_checker(self, point, check_result_fetcher=None):
         point = json.loads(point)
         strategy = self.get_strategy_snapshot(point["strategy_snapshot_key"])
-        checker = AnomalyChecker(point, strategy, self.item_id)
+        return AnomalyChecker(point, strategy, self.item_id, check_result_fetcher=check_result_fetcher)
+
+    def process_point(self, point):
+        self.process_checker(self.get_checker(point))
+
+    def process_checker(self, checker):
         anomaly_records, event_record = checker.check()
 
         # 暂存结果，最后批量保存
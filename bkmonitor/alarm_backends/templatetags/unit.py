@@ -9,6 +9,8 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+from functools import lru_cache
+
 from django import template
 from django.conf import settings
 
@@ -17,23 +19,31 @@ from core.unit import load_unit
 register = template.Library()
 
 
+@lru_cache(maxsize=1024)
+def get_unit(unit):
+    """
+    获取单位对象，按单位缓存，避免逐点检测时重复查找
+    """
+    return load_unit(unit)
+
+
 @register.filter(name="auto_unit")
 def unit_auto_convert(value, unit):
     """
     自动单位转换
     """
-    value, suffix = load_unit(unit).auto_convert(value, decimal=settings.POINT_PRECISION)
+    value, suffix = get_unit(unit).auto_convert(value, decimal=settings.POINT_PRECISION)
     return f"{value}{suffix}"
 
 
 def unit_convert_min(value, unit, suffix=None):
-    unit = load_unit(unit)
+    unit = get_unit(unit)
     return unit.convert_to_max(value, suffix, decimal=settings.POINT_PRECISION)[0]
 
 
 @register.filter(name="unit_suffix")
 def unit_suffix(unit, suffix):
-    unit = load_unit(unit)
+    unit = get_unit(unit)
 
     if not suffix or suffix not in unit.suffix_list:
         suffix = ""
@@ -0,0 +1,93 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import copy
+import threading
+from unittest import mock
+
+import pytest
+from django.conf import settings
+
+from alarm_backends.core.cache.strategy import StrategyCacheManager, StrategyLocalCache
+
+pytestmark = pytest.mark.django_db
+
+STRATEGY = {"id": 1, "version": "v2", "bk_biz_id": 2, "name": "test", "items": []}
+
+
+class TestStrategyLocalCache:
+    def setup_method(self):
+        StrategyCacheManager.cache.flushall()
+        StrategyCacheManager.local_cache.clear()
+
+    def test_hit_after_refresh(self):
+        StrategyCacheManager.refresh_strategy([STRATEGY, dict(STRATEGY, id=2)])
+        assert StrategyCacheManager.get_strategy_by_id(1) == STRATEGY
+
+        with mock.patch.object(StrategyCacheManager.cache, "mget") as mget:
+            assert StrategyCacheManager.get_strategy_by_id(1) == STRATEGY
+            assert [s["id"] for s in StrategyCacheManager.get_strategy_by_ids([2, 1, 3])] == [2, 1]
+            assert mget.call_count == 1
+            assert mget.call_args[0][0] == [StrategyCacheManager.CACHE_KEY_TEMPLATE.format(strategy_id=2)]
+
+    def test_invalidate_by_version(self):
+        StrategyCacheManager.refresh_strategy([STRATEGY])
+        strategy = StrategyCacheManager.get_strategy_by_id(1)
+
+        # 调用方修改策略不影响缓存
+        strategy["name"] = "modified"
+        assert StrategyCacheManager.get_strategy_by_id(1)["name"] == "test"
+
+        StrategyCacheManager.refresh_strategy([dict(STRATEGY, name="new")])
+        assert StrategyCacheManager.get_strategy_by_id(1)["name"] == "new"
+
+        StrategyCacheManager.refresh_strategy_ids([], to_be_deleted_strategy_ids=[1])
+        assert StrategyCacheManager.get_strategy_by_id(1) is None
+
+    def test_disabled(self):
+        StrategyCacheManager.refresh_strategy([STRATEGY])
+        with mock.patch.object(settings, "STRATEGY_LOCAL_CACHE_SIZE", 0):
+            assert StrategyCacheManager.get_strategy_by_id(1) == STRATEGY
+            assert StrategyCacheManager.get_strategy_by_ids([1]) == [STRATEGY]
+        assert not StrategyCacheManager.local_cache.data
+
+    def test_lru(self):
+        cache = StrategyLocalCache()
+        for strategy_id in range(3):
+            cache.set(strategy_id, "v1", dict(STRATEGY, id=strategy_id), maxsize=2)
+        assert list(cache.data) == [1, 2]
+        assert cache.get(0, "v1") is None
+        assert cache.get(1, "v2") is None
+        assert cache.get(1, "v1") == dict(STRATEGY, id=1)
+        assert list(cache.data) == [2, 1]
+
+        size = cache.size
+        cache.pop(2)
+        assert 0 < cache.size < size
+        cache.set(1, "v2", copy.deepcopy(STRATEGY), maxsize=0)
+        assert cache.size == 0
+
+    def test_concurrent(self):
+        cache = StrategyLocalCache()
+
+        def worker(offset):
+            for strategy_id in range(offset, offset + 200):
+                cache.set(strategy_id % 50, "v1", dict(STRATEGY, id=strategy_id % 50), maxsize=20)
+                cache.get((strategy_id + 1) % 50, "v1")
+                cache.pop((strategy_id + 2) % 50)
+
+        threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(cache.data) <= 20
+        assert cache.size == sum(len(blob) for _, blob in cache.data.values())
@@ -1,4 +1,3 @@
-# -*- coding: utf-8 -*-
 """
 Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
 Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
@@ -9,7 +8,10 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import re
+from unittest import mock
 
+from bkmonitor.utils.range import compile_condition_instance, load_condition_instance
 from bkmonitor.utils.range.conditions import (
     AndCondition,
     EqualCondition,
@@ -27,7 +29,7 @@ from bkmonitor.utils.range.conditions import (
 from bkmonitor.utils.range.fields import DimensionField
 
 
-class TestCondition(object):
+class TestCondition:
     def test_equal(self):
         field = DimensionField("key", "value")
         condition = EqualCondition(field)
@@ -211,3 +213,75 @@ class TestCondition(object):
         and_condition.add(condition3)
         assert not and_condition.is_match({"key": "123"})
         assert and_condition.is_match({"key": "1234235678"})
+
+    def test_prepared(self):
+        field = DimensionField("key", [r"1234\d+5678", "[", r"123\d+5678"])
+        condition = RegularCondition(field)
+        with mock.patch("bkmonitor.utils.range.conditions.re.compile", wraps=re.compile) as compile_func:
+            assert condition.is_match({"key": "1234235678"})
+            # 无效正则之后的条件不再匹配
+            assert not condition.is_match({"key": "12345678"})
+        # 正则只在首次匹配时编译
+        assert compile_func.call_count == 2
+
+        condition = GreaterCondition(DimensionField("key", ["1", " 3 "]))
+        assert condition.is_match({"key": 4})
+        assert not condition.is_match({"key": [4, 2]})
+        assert condition.prepared == 3.0
+
+
+class TestConditionInstance:
+    CONDITIONS_CONFIG = [
+        [{"field": "strategy_id", "method": "eq", "value": [1, 2]}, {"field": "level", "method": "lte", "value": 2}],
+        [{"field": "alert_name", "method": "reg", "value": ["^CPU"]}],
+    ]
+    RECORDS = [
+        {"strategy_id": 1, "level": 1, "alert_name": "disk"},
+        {"strategy_id": 1, "level": 3, "alert_name": "disk"},
+        {"strategy_id": 3, "level": 1, "alert_name": "CPU usage"},
+        {"strategy_id": 3, "level": 1},
+        {"level": 3, "alert_name": "disk"},
+    ]
+
+    def test_is_match_many(self):
+        condition = load_condition_instance(self.CONDITIONS_CONFIG, False)
+        expected = [condition.is_match(record) for record in self.RECORDS]
+        assert expected == [True, False, True, False, False]
+        assert condition.is_match_many(self.RECORDS) == expected
+        assert condition.filter(self.RECORDS) == [self.RECORDS[0], self.RECORDS[2]]
+        assert load_condition_instance([]).is_match_many(self.RECORDS) == [True] * len(self.RECORDS)
+
+    def test_compile_condition_instance(self):
+        condition = compile_condition_instance(self.CONDITIONS_CONFIG, False)
+        assert compile_condition_instance(self.CONDITIONS_CONFIG, False) is condition
+        assert compile_condition_instance(self.CONDITIONS_CONFIG, True) is not condition
+        assert condition.is_match_many(self.RECORDS) == [True, False, True, False, False]
+
+    def test_match_parity(self):
+        # 分派规则
+        assign_config = [
+            [
+                {"field": "alert.strategy_id", "method": "eq", "value": [str(i) for i in range(50)]},
+                {"field": "alert.name", "method": "reg", "value": ["^CPU", "内存"]},
+            ],
+            [{"field": "device_name", "method": "include", "value": ["eth", "bond"]}],
+        ]
+        assign_records = [
+            {"alert.strategy_id": str(i % 80), "alert.name": "CPU使用率" if i % 2 else "磁盘", "device_name": "lo"}
+            for i in range(200)
+        ]
+        # 屏蔽配置
+        shield_config = [
+            [
+                {"field": "strategy_id", "method": "eq", "value": [1, 2, 3]},
+                {"field": "bk_target_ip", "method": "eq", "value": ["127.0.0.1"]},
+            ]
+        ]
+        shield_records = [{"strategy_id": i % 5, "bk_target_ip": f"127.0.0.{i % 3}"} for i in range(200)]
+
+        for config, records in ((assign_config, assign_records), (shield_config, shield_records)):
+            # 复用预处理后的条件对象，逐条或批量匹配的结果与每次重新加载条件对象一致
+            expected = [load_condition_instance(config).is_match(record) for record in records]
+            condition = compile_condition_instance(config)
+            assert [condition.is_match(record) for record in records] == expected
+            assert condition.is_match_many(records) == expected
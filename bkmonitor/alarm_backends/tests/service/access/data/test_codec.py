@@ -0,0 +1,122 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import copy
+import json
+
+import fakeredis
+
+from alarm_backends.service.access.data.codec import (
+    BATCH_MAGIC,
+    benchmark,
+    count_records,
+    decode_batch_points,
+    decode_records,
+    encode_batch_points,
+    encode_records,
+    is_frame,
+    is_queue_overloaded,
+    lrange_by_records,
+)
+from bkmonitor.utils.common_utils import count_md5
+
+from .config import STANDARD_DATA
+
+
+def make_records(series=200, timestamps=5):
+    records = []
+    for timestamp in range(1569246480, 1569246480 + timestamps * 60, 60):
+        for i in range(series):
+            dimensions = {"bk_target_ip": f"127.0.0.{i}", "bk_target_cloud_id": "0"}
+            records.append(
+                {
+                    "record_id": f"{count_md5(dimensions)}.{timestamp}",
+                    "value": i * 1.5,
+                    "values": {"time": timestamp, "load5": i * 1.5, "_result_": i * 1.5},
+                    "dimensions": dimensions,
+                    "dimension_fields": ["bk_target_ip", "bk_target_cloud_id"],
+                    "time": timestamp,
+                    "access_time": 1569246540.123,
+                }
+            )
+    return records
+
+
+class TestCodec:
+    def test_frame_round_trip(self):
+        records = make_records()
+        elements = encode_records(records, binary=True, frame_size=300)
+        assert len(elements) == 4
+        assert all(is_frame(element) for element in elements)
+        assert list(decode_records(elements)) == records
+
+    def test_frame_keeps_irregular_record(self):
+        record = copy.deepcopy(STANDARD_DATA)
+        record["record_id"] = "custom_record_id"
+        record["__debug__"] = True
+        assert list(decode_records(encode_records([record, STANDARD_DATA], binary=True))) == [record, STANDARD_DATA]
+
+    def test_decode_mixed_elements(self):
+        records = make_records(series=3, timestamps=1)
+        elements = [json.dumps(records[0]).encode("utf-8"), *encode_records(records[1:], binary=True), b"not json"]
+        decoded = list(decode_records(elements))
+        assert decoded[:3] == records
+        assert isinstance(decoded[3], ValueError)
+
+    def test_count_records(self):
+        records = make_records(series=10, timestamps=1)
+        assert [count_records(element) for element in encode_records(records, binary=True, frame_size=4)] == [4, 4, 2]
+        assert count_records(json.dumps(records[0]).encode("utf-8")) == 1
+
+    def test_lrange_by_records(self):
+        client = fakeredis.FakeRedis()
+        records = make_records(series=10, timestamps=1)
+        # 队列左进右出，先推送的帧在右侧
+        elements = [json.dumps(records[0]), *encode_records(records[1:], binary=True, frame_size=4)]
+        for element in elements:
+            client.lpush("queue", element)
+
+        # 按数据条数限制读取量，下一个帧超出限制时不再读取
+        result, record_count, is_limited = lrange_by_records(client, "queue", 6, frame_size=4)
+        assert result == [element if isinstance(element, bytes) else element.encode() for element in elements[:2]]
+        assert (record_count, is_limited) == (5, True)
+
+        # 至少读取一个元素
+        assert lrange_by_records(client, "queue", 2, frame_size=4)[1:] == (1, True)
+        assert lrange_by_records(client, "queue", 100, frame_size=4)[1:] == (10, False)
+        assert lrange_by_records(client, "empty", 100) == ([], 0, False)
+
+    def test_is_queue_overloaded(self):
+        client = fakeredis.FakeRedis()
+        records = make_records(series=10, timestamps=1)
+        # json 元素与二进制帧混合的队列，按帧头中的数据条数统计
+        client.lpush("queue", *[json.dumps(record) for record in records[:3]])
+        client.lpush("queue", *encode_records(records, binary=True, frame_size=4))
+        assert is_queue_overloaded(client, "queue", 13, frame_size=4) == (False, 13)
+        assert is_queue_overloaded(client, "queue", 12, frame_size=4)[0]
+        # 元素数超过限制或全部为满帧也不会超过限制时，不读取队列
+        assert is_queue_overloaded(client, "queue", 5, frame_size=4) == (True, 6)
+        assert is_queue_overloaded(client, "queue", 24, frame_size=4) == (False, 6)
+        assert is_queue_overloaded(client, "empty", 0) == (False, 0)
+
+    def test_benchmark(self):
+        result = benchmark(make_records(), rounds=1)
+        assert result["frame"]["elements"] < result["json"]["elements"]
+        assert result["frame"]["bytes"] < result["json"]["bytes"]
+
+    def test_batch_points_round_trip(self):
+        points = [{"bk_target_ip": "127.0.0.1", "_time_": 1569246480, "_result_": 1.38, "load5": None}] * 10
+        legacy = encode_batch_points(points)
+        binary = encode_batch_points(points, binary=True)
+        assert binary.startswith(BATCH_MAGIC)
+        assert decode_batch_points(legacy) == points
+        assert decode_batch_points(legacy.decode()) == points
+        assert decode_batch_points(binary) == points
+        assert decode_batch_points(None) == []
@@ -11,11 +11,19 @@ specific language governing permissions and limitations under the License.
 
 
 import copy
+import hashlib
+from unittest import mock
 
 import fakeredis
 import pytest
+from django.conf import settings
 
-from alarm_backends.service.access.data.duplicate import Duplicate
+from alarm_backends.service.access.data.duplicate import (
+    BatchDuplicate,
+    BloomDuplicate,
+    Duplicate,
+    load_duplicate,
+)
 
 from .config import STANDARD_DATA
 
@@ -65,3 +73,93 @@ class TestDuplicate(object):
         assert dup.is_duplicate(record_1) is True
         assert dup.is_duplicate(record_2) is True
         assert dup.is_duplicate(record) is False
+
+
+@pytest.mark.parametrize("duplicate_cls", [BatchDuplicate, BloomDuplicate])
+class TestDuplicateBackend:
+    def setup_method(self, method):
+        redis = fakeredis.FakeRedis(decode_responses=True)
+        redis.flushall()
+
+    def make_records(self, count, offset=0):
+        records = []
+        for i in range(offset, offset + count):
+            raw_data = copy.deepcopy(STANDARD_DATA)
+            raw_data["record_id"] = "{}.{}".format(hashlib.md5(str(i).encode()).hexdigest(), raw_data["time"])
+            records.append(MockRecord(raw_data))
+        return records
+
+    def test_duplicate(self, duplicate_cls):
+        dup = duplicate_cls("123456789")
+        record_1 = MockRecord(copy.deepcopy(STANDARD_DATA))
+        dup.prefetch([record_1])
+        assert dup.is_duplicate(record_1) is False
+
+        dup.add_record(record_1)
+        assert dup.is_duplicate(record_1) is True
+
+    def test_refresh_cache(self, duplicate_cls):
+        strategy_group_key = "123456789"
+        records = self.make_records(100)
+        dup = duplicate_cls(strategy_group_key)
+        dup.prefetch(records)
+        for record in records:
+            assert dup.is_duplicate(record) is False
+            dup.add_record(record)
+        dup.refresh_cache()
+
+        new_records = self.make_records(100, offset=100)
+        dup = duplicate_cls(strategy_group_key)
+        dup.prefetch(records + new_records)
+        assert all(dup.is_duplicate(record) for record in records)
+        assert not any(dup.is_duplicate(record) for record in new_records)
+        assert dup.hit_count == 100
+        assert dup.miss_count == 100
+
+    def test_load_duplicate(self, duplicate_cls):
+        with mock.patch.object(settings, "ACCESS_DUPLICATE_BACKEND", duplicate_cls.backend):
+            assert isinstance(load_duplicate("123456789", strategy_id=1), duplicate_cls)
+
+
+class TestBloomDuplicate:
+    def setup_method(self, method):
+        redis = fakeredis.FakeRedis(decode_responses=True)
+        redis.flushall()
+
+    def test_positions(self):
+        dup = BloomDuplicate("123456789")
+        dup.ensure_capacity(1)
+        md5 = hashlib.md5(b"custom_record_id").hexdigest()
+        # 非 md5 格式的 record_id 按其 md5 计算位置，不依赖进程内随机化的 hash()
+        assert dup.positions("custom_record_id.1569246480") == dup.positions(f"{md5}.1569246480")
+        h1, h2 = int(md5[:16], 16), int(md5[16:], 16)
+        assert dup.positions(md5) == [(h1 + i * h2) % dup.bit_size for i in range(dup.hash_count)]
+
+    def test_capacity(self):
+        records = TestDuplicateBackend().make_records(1500)
+        dup = BloomDuplicate("123456789")
+        dup.prefetch(records[:10])
+        small_bit_size = dup.bit_size
+        assert dup.capacity == BloomDuplicate.min_capacity
+        for record in records[:10]:
+            dup.add_record(record)
+        dup.refresh_cache()
+
+        # 容量档位只增不减，档位提升时旧位图中的数据迁移到新位图
+        dup = BloomDuplicate("123456789")
+        dup.prefetch(records)
+        assert dup.capacity == 2048
+        assert dup.bit_size > small_bit_size
+        assert [dup.is_duplicate(record) for record in records[:12]] == [True] * 10 + [False] * 2
+        dup.refresh_cache()
+
+        dup = BloomDuplicate("123456789")
+        dup.prefetch(records[:12])
+        assert dup.capacity == 2048
+        assert dup.previous_layout is None
+        assert [dup.is_duplicate(record) for record in records[:12]] == [True] * 10 + [False] * 2
+
+        with mock.patch.object(settings, "ACCESS_DUPLICATE_BLOOM_CAPACITY", 1000):
+            dup = BloomDuplicate("987654321")
+            dup.prefetch(records)
+            assert dup.capacity == BloomDuplicate.min_capacity
@@ -21,6 +21,14 @@ from django.conf import settings
 
 from alarm_backends.core.cache import key
 from alarm_backends.service.access.data import AccessBatchDataProcess, AccessDataProcess
+from alarm_backends.service.access.data.codec import (
+    decode_batch_points,
+    decode_records,
+    encode_records,
+    get_raw,
+    is_frame,
+    lrange_raw,
+)
 from bkmonitor.models import CacheNode
 from bkmonitor.utils.common_utils import count_md5
 
@@ -86,6 +94,49 @@ class TestAccessDataProcess(object):
         assert mock_records.call_count == 1
         assert mock_strategy_group.call_count == 1
 
+    @mock.patch(
+        "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_by_id", return_value=STRATEGY_CONFIG_V3
+    )
+    @mock.patch(
+        "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_group_detail", return_value={"1": [1]}
+    )
+    @mock.patch("alarm_backends.service.access.tasks.run_access_batch_data")
+    def test_pull_batch_binary(self, mock_batch, mock_strategy_group, mock_strategy):
+        strategy_group_key = "123456789"
+        points = []
+        for timestamp in range(1569246000, 1569246480, 60):
+            for i in range(3):
+                point = copy.deepcopy(RAW_DATA)
+                point.update({"bk_target_ip": f"127.0.0.{i}", "_time_": timestamp})
+                points.append(point)
+        expected_points = copy.deepcopy(points)
+
+        acc_data = AccessDataProcess(strategy_group_key)
+        with mock.patch("alarm_backends.core.control.item.Item.query_record", return_value=points), mock.patch.multiple(
+            settings,
+            ACCESS_DATA_BATCH_PROCESS_THRESHOLD=2,
+            ACCESS_DATA_BATCH_PROCESS_SIZE=4,
+            ENABLED_ACCESS_BATCH_DATA_BINARY=True,
+        ):
+            acc_data.pull()
+
+        # 按时间点切分批次，每批至少4个点：(6, 6, 6, 6)
+        assert acc_data.batch_count == 4
+        assert mock_batch.delay.call_count == 3
+        assert len(acc_data.record_list) == 6
+
+        c = key.ACCESS_BATCH_DATA_KEY.client
+        data_key = key.ACCESS_BATCH_DATA_KEY.get_key(
+            strategy_group_key=strategy_group_key, sub_task_id=f"{acc_data.batch_timestamp}.2"
+        )
+        data_key.strategy_id = 1
+        assert decode_batch_points(get_raw(c, data_key)) == expected_points[6:12]
+
+        p = AccessBatchDataProcess(strategy_group_key=strategy_group_key, sub_task_id=f"{acc_data.batch_timestamp}.2")
+        p.filters = []
+        p.process()
+        assert len(p.record_list) == 6
+
     @mock.patch(
         "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_by_id", return_value=STRATEGY_CONFIG_V3
     )
@@ -168,6 +219,61 @@ class TestAccessDataProcess(object):
             noise_dimension_data_hash
         }
 
+    @mock.patch(
+        "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_by_id", return_value=STRATEGY_CONFIG_V3
+    )
+    @mock.patch(
+        "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_group_detail", return_value={"1": [1]}
+    )
+    def test_push_binary_frame(self, mock_strategy, mock_strategy_group):
+        strategy_id = 1
+        item_id = 1
+        acc_data = AccessDataProcess("123456789")
+        record = MockRecord(STANDARD_DATA)
+        record.items = [acc_data.items[0]]
+        record.is_retains = {item_id: True}
+        acc_data.record_list = [record]
+        with mock.patch.object(settings, "ENABLED_ACCESS_DATA_BINARY_QUEUE", True):
+            acc_data.push()
+
+        client = key.DATA_LIST_KEY.client
+        output_key = key.DATA_LIST_KEY.get_key(strategy_id=strategy_id, item_id=item_id)
+        elements = lrange_raw(client, output_key, 0, -1)
+        assert len(elements) == 1
+        assert is_frame(elements[0])
+        assert list(decode_records(elements)) == [STANDARD_DATA]
+
+    @mock.patch(
+        "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_by_id", return_value=STRATEGY_CONFIG_V3
+    )
+    @mock.patch(
+        "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_group_detail", return_value={"1": [1]}
+    )
+    def test_push_overloaded(self, mock_strategy, mock_strategy_group):
+        item_id = 1
+        acc_data = AccessDataProcess("123456789")
+        record = MockRecord(STANDARD_DATA)
+        record.items = [acc_data.items[0]]
+        record.is_retains = {item_id: True}
+        acc_data.record_list = [record]
+
+        # 队列中同时存在 json 元素和二进制帧，按实际数据条数判断是否超过检测能力
+        client = key.DATA_LIST_KEY.client
+        output_key = key.DATA_LIST_KEY.get_key(strategy_id=1, item_id=item_id)
+        client.lpush(output_key, *[json.dumps(STANDARD_DATA)] * 5)
+        client.lpush(output_key, *encode_records([STANDARD_DATA] * 40, binary=True, frame_size=10))
+        with (
+            mock.patch.object(settings, "ENABLED_ACCESS_DATA_BINARY_QUEUE", True),
+            mock.patch.object(settings, "ACCESS_DATA_FRAME_SIZE", 10),
+            mock.patch.object(settings, "SQL_MAX_LIMIT", 5),
+        ):
+            acc_data.push()
+            assert client.llen(output_key) == 10
+
+            client.lpush(output_key, *encode_records([STANDARD_DATA] * 10, binary=True, frame_size=10))
+            with pytest.raises(Exception, match="exceeded"):
+                acc_data.push()
+
     strategy_dict = copy.deepcopy(STRATEGY_CONFIG_V3)
     strategy_dict["notice"]["options"].pop("noise_reduce_config", None)
 
@@ -0,0 +1,109 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import contextlib
+import threading
+import time
+from unittest import mock
+
+import pytest
+from django.conf import settings
+
+from alarm_backends.service.access.data.runner import AccessDataRunner
+
+pytestmark = pytest.mark.django_db
+
+# 策略组 -> (存储类型, 查询耗时)
+GROUPS = {
+    "slow_1": ("bk_data", 0.3),
+    "slow_2": ("bk_data", 0.3),
+    "fast_1": ("bk_monitor", 0.01),
+    "fast_2": ("bk_monitor", 0.01),
+}
+
+
+class FakeProcess:
+    processed = []
+    running = {}
+    max_running = {}
+    lock = threading.Lock()
+
+    def __init__(self, strategy_group_key):
+        self.strategy_group_key = strategy_group_key
+        self.storage, self.cost = GROUPS[strategy_group_key]
+        self.items = [mock.MagicMock(data_source_labels={self.storage})]
+
+    def prefetch(self):
+        with self.lock:
+            self.running[self.storage] = self.running.get(self.storage, 0) + 1
+            self.max_running[self.storage] = max(self.max_running.get(self.storage, 0), self.running[self.storage])
+        time.sleep(self.cost)
+        with self.lock:
+            self.running[self.storage] -= 1
+
+    def process(self):
+        self.processed.append((self.strategy_group_key, threading.current_thread()))
+
+
+@pytest.fixture
+def runner_env():
+    FakeProcess.processed = []
+    FakeProcess.running = {}
+    FakeProcess.max_running = {}
+    token_bucket = mock.MagicMock()
+    token_bucket.acquire.return_value = True
+    with (
+        mock.patch("alarm_backends.service.access.data.runner.AccessDataProcess", FakeProcess),
+        mock.patch("alarm_backends.service.access.data.runner.TokenBucket", return_value=token_bucket),
+        mock.patch(
+            "alarm_backends.service.access.data.runner.service_lock",
+            side_effect=lambda *a, **k: contextlib.nullcontext(),
+        ),
+        mock.patch.object(settings, "ACCESS_DATA_STORAGE_CONCURRENCY", {"default": 4, "bk_data": 1}),
+    ):
+        yield token_bucket
+
+
+class TestAccessDataRunner:
+    def test_run(self, runner_env):
+        AccessDataRunner(list(GROUPS)).run()
+
+        processed = [strategy_group_key for strategy_group_key, _ in FakeProcess.processed]
+        # 快存储的策略组不被慢存储阻塞，先完成处理
+        assert sorted(processed[:2]) == ["fast_1", "fast_2"]
+        assert sorted(processed[2:]) == ["slow_1", "slow_2"]
+        # 按存储类型限制并发
+        assert FakeProcess.max_running["bk_data"] == 1
+        # 去重及推送在当前线程中执行
+        assert {thread for _, thread in FakeProcess.processed} == {threading.current_thread()}
+        assert runner_env.release.call_count == 4
+
+    def test_token_forbidden(self, runner_env):
+        runner_env.acquire.return_value = False
+        AccessDataRunner(list(GROUPS)).run()
+        assert FakeProcess.processed == []
+
+    def test_lock_on_start(self, runner_env):
+        locked = []
+
+        @contextlib.contextmanager
+        def service_lock(*args, strategy_group_key, **kwargs):
+            locked.append((strategy_group_key, threading.current_thread(), dict(FakeProcess.running)))
+            yield
+
+        with mock.patch("alarm_backends.service.access.data.runner.service_lock", side_effect=service_lock):
+            AccessDataRunner(list(GROUPS)).run()
+
+        # 锁在线程池中任务开始执行时获取，排队等待前一个慢查询的策略组不提前占用锁
+        assert threading.current_thread() not in {thread for _, thread, _ in locked}
+        running = {strategy_group_key: running for strategy_group_key, _, running in locked}
+        assert running["slow_1"].get("bk_data", 0) == 0
+        assert running["slow_2"].get("bk_data", 0) == 0
+        assert len(FakeProcess.processed) == 4
@@ -0,0 +1,98 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import time
+from unittest import mock
+
+from django.conf import settings
+
+from alarm_backends.core.alert import Alert
+from alarm_backends.core.alert.user_fields import (
+    SYNC_TIME_FIELD,
+    UPDATE_TIME_FIELD,
+    fill_user_fields,
+    save_user_fields,
+)
+from alarm_backends.core.cache.key import ALERT_USER_FIELDS_KEY
+from bkmonitor.documents import AlertDocument
+
+ALERT_ID = "1617504052000001"
+
+
+def make_alert():
+    return Alert({"id": ALERT_ID, "strategy_id": 1, "status": "ABNORMAL", "extra_info": {"strategy": {"id": 1}}})
+
+
+def make_alert_doc(**kwargs):
+    data = {
+        "id": ALERT_ID,
+        "assignee": ["admin"],
+        "is_handled": False,
+        "handle_stage": [],
+        "is_ack": False,
+        "is_ack_noticed": False,
+        "ack_operator": "",
+        "appointee": ["admin"],
+        "supervisor": [],
+        "extra_info": {"is_recovering": False},
+    }
+    data.update(kwargs)
+    return AlertDocument(**data)
+
+
+def fetch(alert_docs):
+    alert = make_alert()
+    with mock.patch.object(AlertDocument, "mget", return_value=alert_docs) as mget:
+        fill_user_fields([alert])
+    return alert, mget.call_count
+
+
+class TestUserFields:
+    def setup_method(self):
+        ALERT_USER_FIELDS_KEY.client.delete(ALERT_USER_FIELDS_KEY.get_key(alert_id=ALERT_ID))
+
+    def test_fill_user_fields(self):
+        with mock.patch.object(settings, "ALERT_USER_FIELDS_RECONCILE_RATIO", 0):
+            # 缓存不存在时从ES读取并回写缓存
+            alert, es_count = fetch([make_alert_doc()])
+            assert es_count == 1
+            assert alert.data["assignee"] == ["admin"]
+            assert alert.data["extra_info"] == {"strategy": {"id": 1}, "is_recovering": False}
+
+            # 缓存完整后不再查询ES
+            alert, es_count = fetch([])
+            assert es_count == 0
+            assert alert.data["assignee"] == ["admin"]
+            assert alert.data["is_ack"] is False
+
+            # 修改后的字段直接从缓存读取
+            save_user_fields([AlertDocument(id=ALERT_ID, is_ack=True, ack_operator="user")])
+            alert, es_count = fetch([])
+            assert es_count == 0
+            assert (alert.data["is_ack"], alert.data["ack_operator"]) == (True, "user")
+
+            # extra_info 为增量写入，对账窗口内需要从ES读取，ES尚未刷新的字段以缓存为准
+            save_user_fields([AlertDocument(id=ALERT_ID, extra_info={"upgrade_notice": {"1": 1}})])
+            alert, es_count = fetch([make_alert_doc(extra_info={"upgrade_notice": {"1": 1}})])
+            assert es_count == 1
+            assert alert.data["is_ack"] is True
+            assert alert.data["extra_info"]["upgrade_notice"] == {"1": 1}
+
+    def test_reconcile(self):
+        fetch([make_alert_doc()])
+        # 模拟缓存漏写，超过对账窗口后以ES为准
+        key = ALERT_USER_FIELDS_KEY.get_key(alert_id=ALERT_ID)
+        ALERT_USER_FIELDS_KEY.client.hset(key, UPDATE_TIME_FIELD, int(time.time()) - 3600)
+        with mock.patch.object(settings, "ALERT_USER_FIELDS_RECONCILE_RATIO", 1):
+            alert, es_count = fetch([make_alert_doc(assignee=["user"])])
+        assert es_count == 1
+        assert alert.data["assignee"] == ["user"]
+        assert ALERT_USER_FIELDS_KEY.client.hget(key, "assignee") == '["user"]'
+        assert ALERT_USER_FIELDS_KEY.client.hexists(key, SYNC_TIME_FIELD)
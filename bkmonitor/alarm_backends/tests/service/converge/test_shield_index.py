@@ -0,0 +1,125 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import time
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.conf import settings
+
+from alarm_backends.service.converge.shield import shield_index
+from alarm_backends.service.converge.shield.shield_index import (
+    ShieldIndex,
+    get_shield_index,
+)
+from alarm_backends.service.converge.shield.shield_obj import AlertShieldObj
+from bkmonitor.documents import AlertDocument, EventDocument
+from bkmonitor.utils.extended_json import dumps
+
+STRATEGY_CONFIG = {"items": [{"query_configs": [{"metric_id": "bk_monitor.system.cpu_summary.usage"}]}]}
+
+
+def make_shield(shield_id, category, dimension_config, begin_offset=0):
+    now = datetime.now(tz=timezone.utc)
+    return {
+        "id": shield_id,
+        "is_enabled": True,
+        "is_deleted": False,
+        "bk_biz_id": 2,
+        "category": category,
+        "scope_type": "instance" if category != "dimension" else "dimension",
+        "content": "",
+        "begin_time": now + timedelta(hours=begin_offset),
+        "end_time": now + timedelta(hours=begin_offset + 1),
+        "failure_time": now + timedelta(hours=begin_offset + 1),
+        "dimension_config": dimension_config,
+        "cycle_config": {"type": 1, "week_list": [], "day_list": [], "begin_time": "", "end_time": ""},
+    }
+
+
+SHIELDS = [
+    make_shield(1, "strategy", {"strategy_id": [1]}),
+    make_shield(2, "strategy", {"strategy_id": [2, 3]}),
+    make_shield(3, "scope", {"service_instance_id": [10, 11]}),
+    make_shield(
+        4,
+        "dimension",
+        {"dimension_conditions": [{"key": "bk_target_ip", "value": ["127.0.0.1"], "method": "eq"}]},
+    ),
+    make_shield(5, "alert", {"strategy_id": 1, "_alert_id": "1"}),
+    # 未生效的屏蔽
+    make_shield(6, "strategy", {"strategy_id": [1]}, begin_offset=1),
+]
+
+
+def make_alert(strategy_id, ip, service_instance_id=None):
+    dimensions = [{"key": "bk_target_ip", "value": ip}]
+    if service_instance_id:
+        dimensions.append({"key": "bk_target_service_instance_id", "value": service_instance_id})
+    return AlertDocument(
+        id=f"{strategy_id}{ip}",
+        strategy_id=strategy_id,
+        severity=1,
+        event=EventDocument(bk_biz_id=2, ip=ip, bk_cloud_id=0),
+        dimensions=dimensions,
+        extra_info={"strategy": {}},
+    )
+
+
+def linear_match(configs, alert):
+    return [config["id"] for config in configs if AlertShieldObj(config).is_match(alert)]
+
+
+class TestShieldIndex:
+    def test_bucket(self):
+        index = ShieldIndex(SHIELDS)
+        assert {
+            field: {value: list(ids) for value, ids in bucket.items()} for field, bucket in index.buckets.items()
+        } == {
+            "strategy_id": {"1": [0, 4, 5], "2": [1], "3": [1]},
+            "service_instance_id": {"10": [2], "11": [2]},
+        }
+        assert index.unindexed == [3]
+        assert index.get_candidates({"strategy_id": 2, "bk_target_ip": "127.0.0.2"}) == [1, 3]
+
+    @mock.patch("alarm_backends.service.converge.shield.shield_obj.Strategy")
+    def test_match(self, strategy):
+        strategy.return_value.config = STRATEGY_CONFIG
+        index = ShieldIndex(SHIELDS)
+        alerts = [
+            make_alert(1, "127.0.0.1"),
+            make_alert(1, "127.0.0.2"),
+            make_alert(3, "127.0.0.2", service_instance_id=11),
+            make_alert(4, "127.0.0.2", service_instance_id=12),
+        ]
+        for alert in alerts:
+            assert [shield_obj.id for shield_obj in index.match(alert)] == linear_match(SHIELDS, alert)
+        assert [shield_obj.id for shield_obj in index.match(alerts[0])] == [1, 4, 5]
+
+    def test_get_shield_index(self):
+        content = dumps(SHIELDS)
+        shield_index._shield_indexes.clear()
+        with mock.patch.object(shield_index.ShieldCacheManager, "get_shields_content", return_value=content):
+            index = get_shield_index(2)
+            # 屏蔽配置未变化时复用索引
+            assert get_shield_index(2) is index
+            assert [config["id"] for config in index.configs] == [shield["id"] for shield in SHIELDS]
+
+            # 超过最长刷新间隔后重建
+            index.create_time = time.time() - settings.ALERT_SHIELD_INDEX_REFRESH_INTERVAL
+            assert get_shield_index(2) is not index
+
+            index = get_shield_index(2)
+
+        # 屏蔽配置变化时重建
+        with mock.patch.object(shield_index.ShieldCacheManager, "get_shields_content", return_value=dumps(SHIELDS[:1])):
+            new_index = get_shield_index(2)
+        assert new_index is not index
+        assert list(new_index.shield_obj_map) == ["1"]
@@ -17,7 +17,7 @@ from alarm_backends.service.detect import DataPoint
 from bkmonitor.data_source import BkMonitorTimeSeriesDataSource
 from bkmonitor.data_source.unify_query.query import UnifyQuery
 
-Strategy = namedtuple("Strategy", ["id", "scenario"])
+Strategy = namedtuple("Strategy", ["id", "scenario", "bk_biz_id"], defaults=[2])
 
 
 pytestmark = pytest.mark.django_db(databases="__all__")
@@ -35,6 +35,8 @@ class Item:
         self.query_configs = query_configs
         self.query = query
         self.name = name
+        self.expression = ""
+        self.functions = []
 
 
 item_config = {
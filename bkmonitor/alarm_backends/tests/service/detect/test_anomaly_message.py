@@ -0,0 +1,87 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from unittest import mock
+
+import pytest
+from django.conf import settings
+from django.template import Template
+
+from alarm_backends.service.detect.strategy import ExprDetectAlgorithms, compile_template
+from alarm_backends.service.detect.strategy.threshold import Threshold
+from alarm_backends.tests.service.detect.test_vectorized_detect import make_data_points
+
+pytestmark = pytest.mark.django_db(databases="__all__")
+
+THRESHOLD_CONFIG = [
+    [{"threshold": 6, "method": "gt"}, {"threshold": 99, "method": "lte"}],
+    [{"threshold": 1000, "method": "gte"}],
+]
+
+
+def detect_messages(data_points, lazy):
+    detector = Threshold(config=THRESHOLD_CONFIG, unit="%")
+    with mock.patch.object(settings, "DETECT_LAZY_ANOMALY_MESSAGE", lazy):
+        anomaly_points = detector.detect_records(data_points, 1)
+    return [(ap.anomaly_id, ap.anomaly_message) for ap in anomaly_points]
+
+
+class TestAnomalyMessage:
+    def test_lazy_message_parity(self):
+        data_points = make_data_points("%")
+        eager = detect_messages(data_points, lazy=False)
+        assert eager
+        assert detect_messages(data_points, lazy=True) == eager
+
+    def test_lazy_message_rendered_on_read(self):
+        data_points = make_data_points("%", count=30)
+        detector = Threshold(config=THRESHOLD_CONFIG, unit="%")
+        with mock.patch.object(settings, "DETECT_LAZY_ANOMALY_MESSAGE", True):
+            with mock.patch.object(ExprDetectAlgorithms, "render_message", autospec=True, return_value="") as render:
+                anomaly_points = detector.detect_records(data_points, 1)
+                assert anomaly_points
+                assert render.call_count == 0
+
+                anomaly_points[0].anomaly_message
+                render_count = render.call_count
+                assert render_count > 0
+                anomaly_points[0].anomaly_message
+                assert render.call_count == render_count
+
+    def test_lazy_message_skip_discarded(self):
+        # 1025 满足 >6 但不满足 <=99，同组 and 条件不成立，异常描述无需渲染
+        data_point = [point for point in make_data_points("%", count=30) if point.value == 1025][0]
+        detector = Threshold(config=[THRESHOLD_CONFIG[0]], unit="%")
+        for lazy, call_count in ((False, 1), (True, 0)):
+            with mock.patch.object(settings, "DETECT_LAZY_ANOMALY_MESSAGE", lazy):
+                with mock.patch.object(
+                    ExprDetectAlgorithms, "render_message", autospec=True, return_value=""
+                ) as render:
+                    assert detector.detect_records([data_point], 1) == []
+                    assert render.call_count == call_count
+
+    def test_template_compiled_once(self):
+        compile_template.cache_clear()
+        detect_messages(make_data_points("%"), lazy=False)
+        cache_info = compile_template.cache_info()
+        # 每个表达式算法一个模板
+        assert cache_info.misses == 3
+        assert cache_info.hits > 0
+
+    def test_compiled_template_parity(self):
+        """
+        缓存编译结果及延迟渲染的异常描述与逐点编译模板一致
+        """
+        data_points = make_data_points("%", count=200)
+        with mock.patch("alarm_backends.service.detect.strategy.compile_template", Template):
+            uncached_messages = detect_messages(data_points, lazy=False)
+        assert uncached_messages
+        assert detect_messages(data_points, lazy=False) == uncached_messages
+        assert detect_messages(data_points, lazy=True) == uncached_messages
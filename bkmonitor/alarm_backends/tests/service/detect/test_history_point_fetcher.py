@@ -0,0 +1,120 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import copy
+from unittest import mock
+
+import pytest
+
+from alarm_backends.core.cache import key
+from alarm_backends.core.storage.redis_cluster import get_node_by_strategy_id
+from alarm_backends.service.detect import DataPoint
+from alarm_backends.service.detect.strategy import get_history_query_md5
+from alarm_backends.service.detect.strategy.simple_ring_ratio import SimpleRingRatio
+from alarm_backends.tests.service.detect.mocked_data import (
+    Item,
+    Strategy,
+    item_config,
+    mock_unify_query,
+    mocked_data_source,
+)
+from bkmonitor.models import CacheNode
+
+pytestmark = pytest.mark.django_db(databases="__all__")
+
+DIMENSIONS_MD5 = "389518839de471c0baec4b6fb26c2538"
+
+HISTORY_RECORDS = [
+    {"mocked": "mocked", "mocked_metric": 99, "_time_": 1569246420, "minute1": 1569246420, "_result_": 99},
+    {"mocked": "mocked", "mocked_metric": 1, "_time_": 1569246360, "minute1": 1569246360, "_result_": 1},
+]
+
+
+def make_data_point(strategy_id, query_configs=None):
+    item = Item(
+        1,
+        Strategy(strategy_id, "os"),
+        "%",
+        [mocked_data_source],
+        ["system.cpu_summary"],
+        query_configs or copy.deepcopy(item_config["query_configs"]),
+        mock_unify_query,
+    )
+    item.query_record = mock.MagicMock(return_value=copy.deepcopy(HISTORY_RECORDS))
+    return DataPoint(
+        {
+            "record_id": f"{DIMENSIONS_MD5}.1569246480",
+            "value": 500,
+            "values": {"timestamp": 1569246480, "mocked_metric": 500},
+            "dimensions": {"mocked": "mocked"},
+            "time": 1569246480,
+        },
+        item,
+    )
+
+
+class TestHistoryPointFetcher:
+    def setup_method(self):
+        get_node_by_strategy_id(0)
+        CacheNode.refresh_from_settings()
+        key.HISTORY_DATA_KEY.client.flushall()
+
+    def test_query_md5(self):
+        query_configs = copy.deepcopy(item_config["query_configs"])
+        query_configs[0]["id"] = 100
+        # 查询配置id不同，查询内容相同
+        assert get_history_query_md5(make_data_point(1).item) == get_history_query_md5(
+            make_data_point(2, query_configs).item
+        )
+
+        query_configs[0]["agg_condition"] = [{"key": "mocked", "method": "eq", "value": ["mocked"]}]
+        assert get_history_query_md5(make_data_point(1).item) != get_history_query_md5(
+            make_data_point(2, query_configs).item
+        )
+
+    def test_share_history_between_strategies(self):
+        data_point = make_data_point(1)
+        detector = SimpleRingRatio(config={"floor": 50, "ceil": None})
+        detector.query_history_points([data_point])
+        assert data_point.item.query_record.call_count == 1
+
+        # 查询配置相同的其他策略直接复用已拉取的历史数据
+        other_data_point = make_data_point(2)
+        other_detector = SimpleRingRatio(config={"floor": 50, "ceil": None})
+        other_detector.query_history_points([other_data_point])
+        assert other_data_point.item.query_record.call_count == 0
+        assert other_detector.history_point_fetcher(other_data_point).value == 99
+
+        # 查询配置不同时重新拉取
+        query_configs = copy.deepcopy(item_config["query_configs"])
+        query_configs[0]["agg_condition"] = [{"key": "mocked", "method": "eq", "value": ["mocked"]}]
+        diff_data_point = make_data_point(3, query_configs)
+        SimpleRingRatio(config={"floor": 50, "ceil": None}).query_history_points([diff_data_point])
+        assert diff_data_point.item.query_record.call_count == 1
+
+    def test_prefetch_needed_dimensions(self):
+        data_point = make_data_point(1)
+        detector = SimpleRingRatio(config={"floor": 50, "ceil": None})
+        detector.query_history_points([data_point])
+
+        # 同一时刻的其他维度不会被拉取到本地
+        history_key = detector.get_history_key(data_point.item, 1569246420)
+        key.HISTORY_DATA_KEY.client.hset(history_key, "other_dimensions_md5", "{}")
+        detector.query_history_points([data_point])
+        assert set(detector._local_history_storage[history_key]) == {DIMENSIONS_MD5}
+
+        with mock.patch.object(key.HISTORY_DATA_KEY.client, "hget") as hget:
+            history_point = detector.fetch_history_point(data_point.item, data_point, 1569246420)
+            assert history_point.value == 99
+            assert hget.call_count == 0
+
+        # 未预取的时刻单独获取
+        assert detector.fetch_history_point(data_point.item, data_point, 1569246360).value == 1
+        assert detector.fetch_history_point(data_point.item, data_point, 1569246300) is None
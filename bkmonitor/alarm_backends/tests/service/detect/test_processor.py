@@ -254,6 +254,93 @@ class TestProcessorViews(TestCase):
                         assert score == records[1]["time"]
                         assert label == f"{records[1]['time']}|{records[1]['value']}"
 
+    def test_processor_stream_handle(self):
+        from alarm_backends.core.cache import key
+
+        strategy_id, item_id = 1, 2
+        records = [
+            {
+                "record_id": f"342a08e0f85f169a7e099c18db3708ed.{1569246480 + i * 60}",
+                "value": 99 if i % 2 else 50,
+                "values": {"timestamp": 1569246480 + i * 60, "load5": 99 if i % 2 else 50},
+                "dimensions": {"ip": "127.0.0.1"},
+                "time": 1569246480 + i * 60,
+            }
+            for i in range(5)
+        ]
+        redis_client = key.DATA_LIST_KEY.client
+        data_channel = key.DATA_LIST_KEY.get_key(strategy_id=strategy_id, item_id=item_id)
+        redis_client.delete(data_channel)
+        redis_client.lpush(data_channel, *map(json.dumps, records))
+
+        with mock.patch(
+            "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_by_id",
+            return_value=copy.deepcopy(strategy_config),
+        ):
+            with mock.patch.multiple("django.conf.settings", DETECT_STREAM_CHUNK_SIZE=2, DETECT_STREAM_MAX_SIZE=3):
+                processor = DetectProcess(str(strategy_id))
+                processor.process()
+
+        # 单次最多消费3条，剩余数据留给下一次任务
+        assert processor.is_busy
+        assert redis_client.llen(data_channel) == 2
+        assert processor.stream_counts[item_id] == 3
+        assert processor.inputs[item_id] == []
+        # 按先进先出顺序检测，仅第2条数据异常
+        assert [output["data"]["record_id"] for output in processor.outputs[item_id]] == [records[1]["record_id"]]
+
+        # 不支持 RPOP count 时回退为 LRANGE + LTRIM
+        with mock.patch.object(DetectProcess, "rpop_count_supported", False):
+            assert processor.pop_records(redis_client, data_channel, 5) == [
+                json.dumps(record).encode("utf-8") for record in records[3:]
+            ]
+        assert redis_client.llen(data_channel) == 0
+
+    def test_processor_stream_frames(self):
+        from alarm_backends.core.cache import key
+        from alarm_backends.service.access.data.codec import encode_records
+
+        strategy_id, item_id = 1, 2
+        records = [
+            {
+                "record_id": f"342a08e0f85f169a7e099c18db3708ed.{1569246480 + i * 60}",
+                "value": 50,
+                "values": {"timestamp": 1569246480 + i * 60, "load5": 50},
+                "dimensions": {"ip": "127.0.0.1"},
+                "time": 1569246480 + i * 60,
+            }
+            for i in range(5)
+        ]
+        redis_client = key.DATA_LIST_KEY.client
+        data_channel = key.DATA_LIST_KEY.get_key(strategy_id=strategy_id, item_id=item_id)
+        redis_client.delete(data_channel)
+        # 每帧2条数据，共3帧
+        redis_client.lpush(data_channel, *encode_records(records, binary=True, frame_size=2))
+
+        with mock.patch(
+            "alarm_backends.core.cache.strategy.StrategyCacheManager.get_strategy_by_id",
+            return_value=copy.deepcopy(strategy_config),
+        ):
+            processor = DetectProcess(str(strategy_id))
+
+        item = processor.strategy.items[0]
+        with mock.patch.multiple(
+            "django.conf.settings", DETECT_STREAM_CHUNK_SIZE=2, DETECT_STREAM_MAX_SIZE=3, ACCESS_DATA_FRAME_SIZE=2
+        ):
+            # 超过截止时间后不再消费
+            processor.stream_deadline = 0
+            processor.stream_detect(item)
+            assert processor.is_busy
+            assert redis_client.llen(data_channel) == 3
+
+            # 按数据条数限制单次消费量，而非队列元素数
+            processor.is_busy = False
+            processor.stream_deadline = float("inf")
+            processor.stream_detect(item)
+            assert processor.is_busy
+            assert processor.stream_counts[item_id] == 4
+            assert redis_client.llen(data_channel) == 1
+
     def test_check_result_pipeline(self):
         redis_pipeline = CheckResult(strategy_id=1, item_id=2, dimensions_md5="md5_str", level="1").pipeline()
         assert redis_pipeline is CheckResult(strategy_id=1, item_id=2, dimensions_md5="md5_str", level="1").CHECK_RESULT
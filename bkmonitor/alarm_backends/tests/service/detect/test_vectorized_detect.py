@@ -0,0 +1,140 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import random
+from unittest import mock
+
+import pytest
+from django.conf import settings
+
+from alarm_backends.service.detect import DataPoint
+from alarm_backends.service.detect.strategy.simple_ring_ratio import SimpleRingRatio
+from alarm_backends.service.detect.strategy.simple_year_round import SimpleYearRound
+from alarm_backends.service.detect.strategy.threshold import Threshold
+from alarm_backends.tests.service.detect.mocked_data import (
+    Item,
+    Strategy,
+    item_config,
+    mock_unify_query,
+    mocked_data_source,
+)
+
+pytestmark = pytest.mark.django_db(databases="__all__")
+
+VALUES = [None, 0, 0.0, -1, 1, 5, 5.0000004, 5.0000006, 6, 49.9999995, 50, 50.0000001, 99, 99.5, 100, 1024, 1025]
+
+
+def make_data_points(unit, count=300, seed=0):
+    item = Item(
+        1,
+        Strategy(1, "os"),
+        unit,
+        [mocked_data_source],
+        ["system.cpu_summary"],
+        item_config["query_configs"],
+        mock_unify_query,
+    )
+    rand = random.Random(seed)
+    data_points = []
+    for i in range(count):
+        value = VALUES[i] if i < len(VALUES) else round(rand.uniform(-10, 2000), rand.randint(0, 8))
+        data_points.append(
+            DataPoint(
+                {
+                    "record_id": f"{i:032x}.1569246480",
+                    "value": value,
+                    "values": {"timestamp": 1569246480, "load5": value},
+                    "dimensions": {"ip": f"127.0.0.{i}"},
+                    "time": 1569246480,
+                },
+                item,
+            )
+        )
+    return data_points
+
+
+def detect_both_paths(detector, data_points):
+    """
+    分别使用逐点检测与列式检测，返回两者的异常点
+    """
+    with mock.patch.object(settings, "DETECT_VECTORIZED_MIN_POINTS", len(data_points) + 1):
+        assert detector.get_detect_mask(data_points) is None
+        per_point = detector.detect_records(data_points, 1)
+
+    with mock.patch.object(settings, "DETECT_VECTORIZED_MIN_POINTS", 1):
+        assert detector.get_detect_mask(data_points) is not None
+        vectorized = detector.detect_records(data_points, 1)
+
+    return per_point, vectorized
+
+
+def assert_same_anomalies(per_point, vectorized):
+    assert [ap.anomaly_id for ap in per_point] == [ap.anomaly_id for ap in vectorized]
+    assert [ap.anomaly_message for ap in per_point] == [ap.anomaly_message for ap in vectorized]
+
+
+class TestVectorizedDetect:
+    @pytest.mark.parametrize("method", ["gt", "gte", "lt", "lte", "eq", "neq"])
+    @pytest.mark.parametrize("threshold", [0, 5.000001, 50, 1])
+    def test_threshold_parity(self, method, threshold):
+        detector = Threshold(config=[[{"threshold": threshold, "method": method}]])
+        per_point, vectorized = detect_both_paths(detector, make_data_points("%"))
+        assert_same_anomalies(per_point, vectorized)
+
+    def test_threshold_multi_parity(self):
+        algorithms_config = [
+            [{"threshold": 6, "method": "gt"}, {"threshold": 99, "method": "lte"}, {"threshold": 50, "method": "neq"}],
+            [{"threshold": 6, "method": "eq"}],
+        ]
+        detector = Threshold(config=algorithms_config)
+        per_point, vectorized = detect_both_paths(detector, make_data_points("%"))
+        assert per_point
+        assert_same_anomalies(per_point, vectorized)
+
+    def test_threshold_unit_parity(self):
+        detector = Threshold(config=[[{"threshold": 1, "method": "gte"}]], unit="Ki")
+        per_point, vectorized = detect_both_paths(detector, make_data_points("bytes"))
+        assert per_point
+        assert_same_anomalies(per_point, vectorized)
+
+    @pytest.mark.parametrize("detector_cls", [SimpleRingRatio, SimpleYearRound])
+    @pytest.mark.parametrize(
+        "config", [{"floor": 50, "ceil": None}, {"floor": None, "ceil": 100}, {"floor": 1, "ceil": 1}]
+    )
+    def test_range_ratio_parity(self, detector_cls, config):
+        data_points = make_data_points("%")
+        rand = random.Random(1)
+        history = {}
+        for i, data_point in enumerate(data_points):
+            # 部分点缺少历史数据
+            if i % 7 == 0:
+                continue
+            value = 0 if i % 11 == 0 else round(rand.uniform(-10, 2000), rand.randint(0, 8))
+            history[data_point.record_id] = DataPoint(
+                {"record_id": data_point.record_id, "value": value, "time": data_point.time - 60}, data_point.item
+            )
+
+        detector = detector_cls(config=config)
+        with mock.patch.object(
+            detector_cls,
+            "history_point_fetcher",
+            side_effect=lambda data_point, **kwargs: history.get(data_point.record_id),
+        ):
+            per_point, vectorized = detect_both_paths(detector, data_points)
+        assert per_point
+        assert_same_anomalies(per_point, vectorized)
+
+    def test_fallback_with_invalid_value(self):
+        data_points = make_data_points("%", count=10)
+        data_points[0].value = "abc"
+        detector = Threshold(config=[[{"threshold": 1, "method": "gte"}]])
+        with mock.patch.object(settings, "DETECT_VECTORIZED_MIN_POINTS", 1):
+            assert detector.get_detect_mask(data_points) is None
+            assert len(detector.detect_records(data_points, 1)) > 0
@@ -0,0 +1,118 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import json
+from types import SimpleNamespace
+from unittest import mock
+
+from alarm_backends.core.cache import key
+from alarm_backends.service.access.data.processor import BaseAccessDataProcess
+from alarm_backends.service.nodata.processor import CheckProcessor
+
+STRATEGY_ID = 1
+ITEM_ID = 2
+
+
+def make_item():
+    item = mock.MagicMock()
+    item.id = ITEM_ID
+    item.strategy.strategy_id = STRATEGY_ID
+    item.no_data_config = {"is_enabled": True, "agg_dimension": ["bk_target_ip"]}
+    item.query_configs = [{"agg_interval": 60}]
+    return item
+
+
+def make_record(ip, timestamp):
+    return SimpleNamespace(
+        data={
+            "record_id": f"{ip}.{timestamp}",
+            "value": 1,
+            "dimensions": {"bk_target_ip": ip, "device_name": "eth0"},
+            "time": timestamp,
+        }
+    )
+
+
+def make_processor():
+    processor = CheckProcessor.__new__(CheckProcessor)
+    processor.strategy_id = STRATEGY_ID
+    processor.inputs = {}
+    return processor
+
+
+def pulled(processor, item, check_timestamp):
+    processor.pull_data(item, check_timestamp)
+    return sorted((point.dimensions["bk_target_ip"], point.timestamp) for point in processor.inputs[item.id])
+
+
+class TestNoDataLiveness:
+    def setup_method(self):
+        key.NO_DATA_LIVENESS_INDEX_KEY.client.flushall()
+
+    def test_pull_liveness(self):
+        item = make_item()
+        records = [make_record("127.0.0.1", 60), make_record("127.0.0.1", 60), make_record("127.0.0.2", 120)]
+        BaseAccessDataProcess._push_no_data_liveness(None, item, records)
+        BaseAccessDataProcess._push_no_data_liveness(None, item, [make_record("127.0.0.3", 180)])
+
+        # 维度按无数据维度降维后只存储一份
+        dimensions = key.NO_DATA_DIMENSIONS_KEY.client.hgetall(
+            key.NO_DATA_DIMENSIONS_KEY.get_key(strategy_id=STRATEGY_ID, item_id=ITEM_ID, bucket=0)
+        )
+        assert sorted(json.loads(value)["bk_target_ip"] for value in dimensions.values()) == [
+            "127.0.0.1",
+            "127.0.0.2",
+            "127.0.0.3",
+        ]
+
+        processor = make_processor()
+        assert pulled(processor, item, 120) == [("127.0.0.1", 60), ("127.0.0.2", 120)]
+        # 已检测的数据不会重复拉取，当前检测点之前无数据时取未来最早一个周期的数据
+        assert pulled(processor, item, 120) == [("127.0.0.3", 180)]
+        assert pulled(processor, item, 240) == []
+
+    def test_push_new_dimensions(self):
+        item = make_item()
+        bucket_size = key.NO_DATA_DIMENSIONS_KEY.ttl
+        BaseAccessDataProcess._push_no_data_liveness(None, item, [make_record("127.0.0.1", 60)])
+        dimensions_key = key.NO_DATA_DIMENSIONS_KEY.get_key(strategy_id=STRATEGY_ID, item_id=ITEM_ID, bucket=0)
+        client = key.NO_DATA_DIMENSIONS_KEY.client
+        (dimensions_md5,) = client.hkeys(dimensions_key)
+
+        # 同一个桶内已存在的维度不再重复写入
+        client.hset(dimensions_key, dimensions_md5, json.dumps({"bk_target_ip": "cached"}))
+        BaseAccessDataProcess._push_no_data_liveness(None, item, [make_record("127.0.0.1", 120)])
+        assert json.loads(client.hget(dimensions_key, dimensions_md5)) == {"bk_target_ip": "cached"}
+
+        # 不同时间桶的维度写入各自的桶，按数据时间所在的桶读取
+        BaseAccessDataProcess._push_no_data_liveness(None, item, [make_record("127.0.0.1", bucket_size + 60)])
+        next_dimensions_key = key.NO_DATA_DIMENSIONS_KEY.get_key(
+            strategy_id=STRATEGY_ID, item_id=ITEM_ID, bucket=bucket_size
+        )
+        assert client.hkeys(next_dimensions_key) == [dimensions_md5]
+
+        processor = make_processor()
+        assert pulled(processor, item, bucket_size + 60) == [
+            ("127.0.0.1", bucket_size + 60),
+            ("cached", 60),
+            ("cached", 120),
+        ]
+
+    def test_pull_records_and_liveness(self):
+        item = make_item()
+        # 开关切换时，队列中尚未检测的完整数据仍然会被拉取
+        key.NO_DATA_LIST_KEY.client.rpush(
+            key.NO_DATA_LIST_KEY.get_key(strategy_id=STRATEGY_ID, item_id=ITEM_ID),
+            json.dumps(make_record("127.0.0.1", 60).data),
+        )
+        BaseAccessDataProcess._push_no_data_liveness(None, item, [make_record("127.0.0.2", 60)])
+
+        processor = make_processor()
+        assert pulled(processor, item, 60) == [("127.0.0.1", 60), ("127.0.0.2", 60)]
@@ -9,15 +9,18 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 import copy
+from unittest import mock
 
 import arrow
 import pytest
+from django.conf import settings
 from django.test import TestCase
+from redis.exceptions import ResponseError
 
 from alarm_backends.constants import NO_DATA_TAG_DIMENSION
 from alarm_backends.core.cache.key import CHECK_RESULT_CACHE_KEY
 from alarm_backends.core.storage.redis_cluster import get_node_by_strategy_id
-from alarm_backends.service.trigger.checker import AnomalyChecker
+from alarm_backends.service.trigger.checker import AnomalyChecker, CheckResultFetcher
 from bkmonitor.models import CacheNode
 from bkmonitor.utils import time_tools
 from core.errors.alarm_backends import StrategyItemNotFound
@@ -473,3 +476,73 @@ class TestChecker(TestCase):
         anomaly_records, event_record = checker.check()
         self.assertEqual(len(anomaly_records), 3)
         self.assertEqual(event_record["trigger"]["level"], "2")
+
+    def test_check_anomaly_batch(self):
+        self.insert_check_result(2)
+        fetcher = CheckResultFetcher()
+        checkers = [AnomalyChecker(POINT, STRATEGY, 1, check_result_fetcher=fetcher) for _ in range(3)]
+        fetcher.fetch([query for checker in checkers for query in checker.get_check_queries()])
+        self.assertEqual(len(fetcher.results), 3)
+
+        with mock.patch.object(fetcher.client, "zrangebyscore") as zrangebyscore:
+            for checker in checkers:
+                anomaly_level, anomaly_timestamps = checker.check_anomaly()
+                self.assertEqual(anomaly_level, 2)
+                self.assertListEqual(anomaly_timestamps, [1569246240, 1569246420])
+            zrangebyscore.assert_not_called()
+
+    def test_check_anomaly_batch_parity(self):
+        self.insert_check_result(5)
+        points = []
+        for timestamp in (1569246360, 1569246420, 1569246480):
+            point = copy.deepcopy(POINT)
+            point["data"]["time"] = timestamp
+            points.append(point)
+
+        # 批量获取检测结果与逐点查询的结果一致
+        expected = [AnomalyChecker(point, STRATEGY, 1).check_anomaly() for point in points]
+        fetcher = CheckResultFetcher()
+        checkers = [AnomalyChecker(point, STRATEGY, 1, check_result_fetcher=fetcher) for point in points]
+        fetcher.fetch([query for checker in checkers for query in checker.get_check_queries()])
+        self.assertListEqual([checker.check_anomaly() for checker in checkers], expected)
+
+    def test_check_anomaly_batch_pipeline(self):
+        self.insert_check_result(5)
+        strategy = copy.deepcopy(STRATEGY)
+        strategy["no_data_config"] = {"continuous": 5}
+        point = copy.deepcopy(POINT)
+        point["data"]["dimensions"][NO_DATA_TAG_DIMENSION] = True
+
+        fetcher = CheckResultFetcher()
+        checker = AnomalyChecker(point, strategy, 1, check_result_fetcher=fetcher)
+        with mock.patch.object(CheckResultFetcher, "lua_supported", False):
+            fetcher.fetch(checker.get_check_queries())
+        anomaly_level, anomaly_timestamps = checker.check_anomaly()
+        self.assertEqual(anomaly_level, 1)
+        self.assertListEqual(anomaly_timestamps, [1569246240, 1569246300, 1569246360, 1569246420, 1569246480])
+
+    def test_check_result_script_error(self):
+        self.insert_check_result(2)
+        fetcher = CheckResultFetcher()
+        checker = AnomalyChecker(POINT, STRATEGY, 1, check_result_fetcher=fetcher)
+        with (
+            mock.patch.object(CheckResultFetcher, "lua_supported", True),
+            mock.patch.object(CheckResultFetcher, "lua_retry_at", 0),
+            mock.patch.object(fetcher, "_fetch_by_script", side_effect=ResponseError("BUSY script")) as script,
+        ):
+            # 暂时性错误回退为 pipeline，一段时间内不再尝试脚本
+            fetcher.fetch(checker.get_check_queries())
+            self.assertEqual(checker.check_anomaly()[0], 2)
+            self.assertTrue(CheckResultFetcher.lua_supported)
+            self.assertFalse(fetcher.script_enabled())
+
+            # 不支持 lua 脚本时后续均使用 pipeline
+            CheckResultFetcher.lua_retry_at = 0
+            script.side_effect = ResponseError("ERR unknown command 'EVAL'")
+            fetcher.results.clear()
+            fetcher.fetch(checker.get_check_queries())
+            self.assertFalse(CheckResultFetcher.lua_supported)
+            self.assertEqual(script.call_count, 2)
+
+        with mock.patch.object(settings, "ENABLED_TRIGGER_CHECK_RESULT_SCRIPT", False):
+            self.assertFalse(fetcher.script_enabled())
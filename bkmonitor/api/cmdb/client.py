@@ -311,6 +311,11 @@ class FindHostBizRelation(CMDBBaseResource):
 
     method = "POST"
 
+    # 并发的按主机ID查询合并为一次请求
+    COALESCE_REQUESTS = True
+    BATCH_FIELD = "bk_host_id"
+    BATCH_RESULT_FIELD = "bk_host_id"
+
 
 class SearchCloudArea(CMDBBaseResource):
     """
@@ -160,6 +160,7 @@ class GetDataIdResource(MetaDataAPIGWResource):
 
     action = "/app/metadata/get_data_id/"
     method = "GET"
+    COALESCE_REQUESTS = True
 
     class RequestSerializer(serializers.Serializer):
         bk_data_id = serializers.IntegerField(required=False)
@@ -18,9 +18,10 @@ to the current version of the project delivered to anyone in the future.
 import datetime
 import logging
 import operator
+import time
 
-import networkx
-from networkx import dag_longest_path_length
+import billiard
+from django.conf import settings
 from opentelemetry.semconv.resource import ResourceAttributes
 from opentelemetry.semconv.trace import SpanAttributes
 from opentelemetry.trace import StatusCode
@@ -30,6 +31,7 @@ from apm.models import ApmApplication
 from apm_web.handlers.span_infer import InferenceHandler
 from bkm_space.api import SpaceApi
 from bkmonitor.utils import group_by
+from bkmonitor.utils.common_utils import chunks
 from bkmonitor.utils.thread_backend import ThreadPool
 from constants.apm import (
     OtlpKey,
@@ -37,9 +39,66 @@ from constants.apm import (
     SpanKind,
     SpanStandardField,
 )
+from core.prometheus import metrics
 
 logger = logging.getLogger("apm")
 
+# 根 span 指向的虚拟节点
+ROOT_SINK_NODE = "--"
+
+
+def longest_path_length(parents: dict) -> int:
+    """
+    计算有向无环图的最长路径长度(边数)，与 networkx.dag_longest_path_length 结果一致
+    :param parents: 节点 -> 父节点集合
+    """
+    depths = {}
+    for start in parents:
+        if start in depths:
+            continue
+
+        # 迭代实现深度优先遍历，避免调用链过深时递归溢出
+        stack = [start]
+        visiting = set()
+        while stack:
+            node = stack[-1]
+            visiting.add(node)
+            pending = None
+            for parent in parents.get(node, ()):
+                if parent in depths:
+                    continue
+                if parent in visiting:
+                    raise ValueError(f"span graph contains a cycle at node({parent})")
+                pending = parent
+                break
+
+            if pending is not None:
+                stack.append(pending)
+                continue
+
+            depths[node] = max((depths[parent] + 1 for parent in parents.get(node, ())), default=0)
+            visiting.discard(node)
+            stack.pop()
+
+    return max(depths.values(), default=0)
+
+
+def aggregate_trace_chunk(chunk: list) -> tuple[list, float]:
+    """
+    多进程模式下的 Trace 聚合子任务，在子进程中执行
+    :param chunk: [(trace_id, [紧凑 span 元组, ...]), ...]
+    :return: (Trace 信息列表, 消耗的 CPU 时间)
+    """
+    cpu_start = time.process_time()
+    results = []
+    for trace_id, compact_spans in chunk:
+        try:
+            spans = [PrecalculateProcessor.expand_span(span) for span in compact_spans]
+            results.append(PrecalculateProcessor.build_trace_info(trace_id, spans))
+        except Exception as e:  # noqa
+            logger.exception(f"[PrecalculateProcessor] aggregate trace({trace_id}) failed: {e}")
+    return results, time.process_time() - cpu_start
+
 
 class PrecalculateProcessor:
     """
@@ -47,6 +106,19 @@ class PrecalculateProcessor:
     [旧] 目前应用已经迁移至 BMW 预计算处
     """
 
+    # 预计算用到的 span 字段，多进程模式下仅将这些字段以元组形式传输给子进程
+    SPAN_FIELDS = (
+        OtlpKey.SPAN_ID,
+        OtlpKey.PARENT_SPAN_ID,
+        OtlpKey.START_TIME,
+        OtlpKey.END_TIME,
+        OtlpKey.KIND,
+        OtlpKey.SPAN_NAME,
+        OtlpKey.STATUS,
+        OtlpKey.RESOURCE,
+        OtlpKey.ATTRIBUTES,
+    )
+
     def __init__(self, storage, bk_biz_id, app_name):
         self.bk_biz_id = bk_biz_id
         self.app_name = app_name
@@ -60,10 +132,29 @@ class PrecalculateProcessor:
         trace_mapping = group_by(all_span, operator.itemgetter(OtlpKey.TRACE_ID))
 
         logger.info(f"[PrecalculateProcessor] group by total {len(trace_mapping)} trace")
-        pool = ThreadPool()
-        params = [(k, v) for k, v in trace_mapping.items()]
-
-        results = pool.map_ignore_exception(self.get_trace_info, params)
+        start_time = time.time()
+        if settings.APM_PRECALCULATE_PROCESS_NUM > 0:
+            mode = "process"
+            results, cpu_seconds = self.aggregate_in_processes(trace_mapping, settings.APM_PRECALCULATE_PROCESS_NUM)
+        else:
+            mode = "thread"
+            cpu_start = time.process_time()
+            pool = ThreadPool()
+            params = [(k, v) for k, v in trace_mapping.items()]
+            results = pool.map_ignore_exception(self.get_trace_info, params)
+            cpu_seconds = time.process_time() - cpu_start
+
+        # 按消耗的 CPU 时间统计单核吞吐，用于评估预计算所需的进程数
+        trace_count = len(trace_mapping)
+        logger.info(
+            f"[PrecalculateProcessor] aggregate {trace_count} trace in {mode} mode, "
+            f"cost: {time.time() - start_time:.3f}s, cpu: {cpu_seconds:.3f}s"
+        )
+        labels = {"bk_biz_id": self.bk_biz_id, "app_name": self.app_name, "mode": mode}
+        metrics.APM_PRECALCULATE_TRACE_COUNT.labels(**labels).inc(trace_count)
+        if cpu_seconds > 0:
+            metrics.APM_PRECALCULATE_TRACES_PER_CORE_SECOND.labels(**labels).set(trace_count / cpu_seconds)
+        metrics.report_all()
 
         data = []
         for result in results:
@@ -76,19 +167,68 @@ class PrecalculateProcessor:
         # 存储数据
         self.storage.save(data)
 
-    def get_status_code(self, span):
+    def aggregate_in_processes(self, trace_mapping: dict, processes: int) -> tuple[list, float]:
+        """
+        多进程聚合 Trace：span 压缩为元组后按批分发到子进程
+        :return: (Trace 信息列表, 子进程消耗的 CPU 时间)
+        """
+        params = [(trace_id, [self.compact_span(span) for span in spans]) for trace_id, spans in trace_mapping.items()]
+        pool = billiard.Pool(processes=processes)
+        try:
+            chunk_results = pool.map(
+                aggregate_trace_chunk, chunks(params, max(settings.APM_PRECALCULATE_CHUNK_SIZE, 1))
+            )
+        finally:
+            pool.close()
+            pool.join()
+
+        results = []
+        cpu_seconds = 0
+        for trace_infos, chunk_cpu_seconds in chunk_results:
+            results.extend(self.fill_app_info(trace_info) for trace_info in trace_infos)
+            cpu_seconds += chunk_cpu_seconds
+        return results, cpu_seconds
+
+    @classmethod
+    def compact_span(cls, span: dict) -> tuple:
+        return tuple(span.get(field) for field in cls.SPAN_FIELDS)
+
+    @classmethod
+    def expand_span(cls, compact_span: tuple) -> dict:
+        return dict(zip(cls.SPAN_FIELDS, compact_span))
+
+    @classmethod
+    def get_status_code(cls, span):
         for i in [SpanAttributes.HTTP_STATUS_CODE, SpanAttributes.RPC_GRPC_STATUS_CODE]:
             if i in span[OtlpKey.ATTRIBUTES]:
                 return span[OtlpKey.ATTRIBUTES][i]
 
         return None
 
+    def fill_app_info(self, trace_info: dict) -> dict:
+        """补充 Trace 所属的业务及应用信息"""
+        return {
+            PreCalculateSpecificField.BK_TENANT_ID.value: self.bk_biz_id,
+            PreCalculateSpecificField.BIZ_ID.value: self.bk_biz_id,
+            PreCalculateSpecificField.BIZ_NAME.value: self.bk_biz_name,
+            PreCalculateSpecificField.APP_ID.value: self.application.id,
+            PreCalculateSpecificField.APP_NAME.value: self.app_name,
+            **trace_info,
+        }
+
     def get_trace_info(self, trace_id, spans):
+        return self.fill_app_info(self.build_trace_info(trace_id, spans))
+
+    @classmethod
+    def build_trace_info(cls, trace_id, spans):
+        """
+        计算 Trace 的统计信息，不依赖业务及应用信息，可在子进程中执行
+        """
         from apm_web.constants import CategoryEnum
 
         sorted_spans = sorted(spans, key=lambda s: s[OtlpKey.START_TIME])
-        nodes = set()
-        edges = set()
+        # span -> 父 span 集合，根 span 指向虚拟节点
+        parents = {}
         services = set()
         start_times = []
         end_times = []
@@ -108,7 +248,7 @@ class PrecalculateProcessor:
             KindCategory.INTERNAL: 0,
             KindCategory.UNSPECIFIED: 0,
         }
-        collections = self.init_collections()
+        collections = cls.init_collections()
 
         span_id_mapping = {}
 
@@ -116,12 +256,9 @@ class PrecalculateProcessor:
             span_id_mapping[i[OtlpKey.SPAN_ID]] = i
 
             if i[OtlpKey.PARENT_SPAN_ID]:
-                nodes.add(i[OtlpKey.PARENT_SPAN_ID])
-                nodes.add(i[OtlpKey.SPAN_ID])
-                edges.add((i[OtlpKey.PARENT_SPAN_ID], i[OtlpKey.SPAN_ID]))
+                parents.setdefault(i[OtlpKey.SPAN_ID], set()).add(i[OtlpKey.PARENT_SPAN_ID])
             else:
-                nodes.add(i[OtlpKey.SPAN_ID])
-                edges.add((i[OtlpKey.SPAN_ID], "--"))
+                parents.setdefault(ROOT_SINK_NODE, set()).add(i[OtlpKey.SPAN_ID])
 
             service_name = i[OtlpKey.RESOURCE].get(ResourceAttributes.SERVICE_NAME)
             if service_name:
@@ -136,14 +273,11 @@ class PrecalculateProcessor:
 
             category_statistics[InferenceHandler.infer(i)] += 1
             kind_statistics[KindCategory.get_category(i[OtlpKey.KIND])] += 1
-            self.collect(collections, i)
+            cls.collect(collections, i)
 
         # 层级数
-        graph = networkx.DiGraph()
-        graph.add_nodes_from(nodes)
-        graph.add_edges_from(edges)
-        hierarchy_count = dag_longest_path_length(graph)
-        degree_mapping = self.list_span_degree(graph, span_id_mapping)
+        hierarchy_count = longest_path_length(parents)
+        degree_mapping = cls.list_span_degree(parents, span_id_mapping)
 
         # 入口服务&入口接口&入口状态码&入口调用类型
         root_service_span = next(
@@ -160,7 +294,7 @@ class PrecalculateProcessor:
             root_service_span_id = root_service_span[OtlpKey.SPAN_ID]
             root_service = root_service_span[OtlpKey.RESOURCE][ResourceAttributes.SERVICE_NAME]
             root_service_span_name = root_service_span[OtlpKey.SPAN_NAME]
-            root_service_status_code = self.get_status_code(root_service_span)
+            root_service_status_code = cls.get_status_code(root_service_span)
             root_service_category = InferenceHandler.infer(root_service_span)
             root_service_kind = root_service_span[OtlpKey.KIND]
         else:
@@ -203,11 +337,6 @@ class PrecalculateProcessor:
         error = bool(error_count)
 
         return {
-            PreCalculateSpecificField.BK_TENANT_ID.value: self.bk_biz_id,
-            PreCalculateSpecificField.BIZ_ID.value: self.bk_biz_id,
-            PreCalculateSpecificField.BIZ_NAME.value: self.bk_biz_name,
-            PreCalculateSpecificField.APP_ID.value: self.application.id,
-            PreCalculateSpecificField.APP_NAME.value: self.app_name,
             PreCalculateSpecificField.TRACE_ID.value: trace_id,
             PreCalculateSpecificField.HIERARCHY_COUNT.value: hierarchy_count,
             PreCalculateSpecificField.SERVICE_COUNT.value: service_count,
@@ -235,7 +364,8 @@ class PrecalculateProcessor:
             PreCalculateSpecificField.COLLECTIONS.value: collections,
         }
 
-    def init_collections(self):
+    @classmethod
+    def init_collections(cls):
         res = {}
         for f in SpanStandardField.COMMON_STANDARD_FIELDS:
             if f.source == f.key:
@@ -248,7 +378,8 @@ class PrecalculateProcessor:
 
         return res
 
-    def collect(self, collections, span):
+    @classmethod
+    def collect(cls, collections, span):
         for f in SpanStandardField.COMMON_STANDARD_FIELDS:
             v = span[f.source]
             if isinstance(v, dict):
@@ -259,12 +390,12 @@ class PrecalculateProcessor:
                     collections[f.source].append(span[f.key])
 
     @classmethod
-    def list_span_degree(cls, graph, node_data):
+    def list_span_degree(cls, parents, node_data):
         """获取span层级等信息"""
 
         res = {}
         for node in node_data.values():
-            degree = graph.in_degree(node[OtlpKey.SPAN_ID])
+            degree = len(parents.get(node[OtlpKey.SPAN_ID], ()))
             res[node[OtlpKey.SPAN_ID]] = {
                 "degree": degree,
                 "node": node,
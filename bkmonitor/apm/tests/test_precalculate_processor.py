@@ -0,0 +1,105 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from unittest import mock
+
+import pytest
+from django.conf import settings
+
+from apm.core.discover.precalculation.processor import (
+    PrecalculateProcessor,
+    longest_path_length,
+)
+from constants.apm import OtlpKey, PreCalculateSpecificField, SpanKind
+
+
+def make_span(trace_id, span_id, parent_span_id, start_time, kind=SpanKind.SPAN_KIND_SERVER, status_code=0):
+    return {
+        OtlpKey.TRACE_ID: trace_id,
+        OtlpKey.SPAN_ID: span_id,
+        OtlpKey.PARENT_SPAN_ID: parent_span_id,
+        OtlpKey.START_TIME: start_time,
+        OtlpKey.END_TIME: start_time + 100,
+        OtlpKey.ELAPSED_TIME: 100,
+        OtlpKey.KIND: kind,
+        OtlpKey.SPAN_NAME: f"span-{span_id}",
+        OtlpKey.STATUS: {"code": status_code, "message": ""},
+        OtlpKey.RESOURCE: {"service.name": f"service-{span_id}"},
+        OtlpKey.ATTRIBUTES: {"http.method": "GET", "http.status_code": 200},
+        OtlpKey.EVENTS: [{"name": "event", "attributes": {}}],
+        OtlpKey.LINKS: [],
+    }
+
+
+def make_trace(trace_id, start_time=1000):
+    return [
+        make_span(trace_id, "a", "", start_time),
+        make_span(trace_id, "b", "a", start_time + 10, kind=SpanKind.SPAN_KIND_CLIENT),
+        make_span(trace_id, "c", "b", start_time + 20, status_code=2),
+        make_span(trace_id, "d", "a", start_time + 30, kind=SpanKind.SPAN_KIND_INTERNAL),
+    ]
+
+
+def without_time(trace_info):
+    trace_info = dict(trace_info)
+    trace_info.pop(PreCalculateSpecificField.TIME.value)
+    return trace_info
+
+
+class TestPrecalculateProcessor:
+    def test_longest_path_length(self):
+        # 单个根 span 指向虚拟节点，层级数为 1
+        assert longest_path_length({"--": {"a"}}) == 1
+        assert longest_path_length({"--": {"a"}, "b": {"a"}, "c": {"b"}}) == 2
+        # 父 span 缺失时，仍按父子关系计算
+        assert longest_path_length({"b": {"x"}}) == 1
+        assert longest_path_length({f"s{i}": {f"s{i - 1}"} for i in range(1, 100000)}) == 99999
+
+        with pytest.raises(ValueError):
+            longest_path_length({"a": {"b"}, "b": {"a"}})
+
+    def test_build_trace_info(self):
+        trace_info = PrecalculateProcessor.build_trace_info("trace", make_trace("trace"))
+        assert trace_info[PreCalculateSpecificField.HIERARCHY_COUNT.value] == 2
+        assert trace_info[PreCalculateSpecificField.SPAN_COUNT.value] == 4
+        assert trace_info[PreCalculateSpecificField.ROOT_SPAN_ID.value] == "a"
+        assert trace_info[PreCalculateSpecificField.ROOT_SERVICE_SPAN_ID.value] == "a"
+        assert trace_info[PreCalculateSpecificField.ERROR_COUNT.value] == 1
+        assert trace_info[PreCalculateSpecificField.TRACE_DURATION.value] == 130
+
+    def test_compact_span(self):
+        spans = make_trace("trace")
+        compact_spans = [PrecalculateProcessor.compact_span(span) for span in spans]
+        assert all(isinstance(span, tuple) for span in compact_spans)
+        assert without_time(
+            PrecalculateProcessor.build_trace_info(
+                "trace", [PrecalculateProcessor.expand_span(span) for span in compact_spans]
+            )
+        ) == without_time(PrecalculateProcessor.build_trace_info("trace", spans))
+
+    def test_handle_in_processes(self):
+        processor = PrecalculateProcessor.__new__(PrecalculateProcessor)
+        processor.bk_biz_id = 2
+        processor.app_name = "test_app"
+        processor.bk_biz_name = "test_biz"
+        processor.application = mock.MagicMock(id=1)
+        processor.storage = mock.MagicMock(save_index_name="test_index")
+        all_span = [span for i in range(50) for span in make_trace(f"trace-{i}", start_time=1000 + i)]
+
+        saved = {}
+        for process_num in (0, 2):
+            with mock.patch.object(settings, "APM_PRECALCULATE_PROCESS_NUM", process_num):
+                with mock.patch.object(settings, "APM_PRECALCULATE_CHUNK_SIZE", 8):
+                    processor.handle(all_span)
+            data = processor.storage.save.call_args[0][0]
+            saved[process_num] = {item["_id"]: without_time(item["_source"]) for item in data}
+
+        assert len(saved[0]) == 50
+        assert saved[2] == saved[0]
@@ -18,7 +18,7 @@ from django.utils.translation import gettext as _
 
 from bkmonitor.documents import AlertDocument, AlertLog
 from bkmonitor.utils.common_utils import count_md5
-from bkmonitor.utils.range import load_condition_instance
+from bkmonitor.utils.range import compile_condition_instance
 from constants.action import ActionPluginType, AssignMode, UserGroupType
 from constants.alert import EVENT_SEVERITY_DICT
 from core.drf_resource import api
@@ -100,7 +100,7 @@ class AssignRuleMatch:
             and_cond.append(condition)
         if and_cond:
             or_cond.append(and_cond)
-        self.dimension_check = load_condition_instance(or_cond, False)
+        self.dimension_check = compile_condition_instance(or_cond, False)
 
     def assign_group(self):
         return {"group_id": self.assign_rule["assign_group_id"]}
@@ -692,7 +692,7 @@ class DataSource(metaclass=ABCMeta):
             return records
 
         condition_filter = load_agg_condition_instance(self._advance_where)
-        return [record for record in records if condition_filter.is_match(record)]
+        return condition_filter.filter(records)
 
     def _update_params_by_advance_method(self):
         """
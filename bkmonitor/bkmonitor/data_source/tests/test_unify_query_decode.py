@@ -0,0 +1,128 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from bkmonitor.data_source.unify_query.query import UnifyQuery, convert_time_column
+
+PARAMS = {"query_list": [{"reference_name": "a"}]}
+
+DATA = {
+    "series": [
+        {
+            "group_keys": ["bk_target_ip_table1", "bk_target_cloud_id"],
+            "group_values": ["127.0.0.1", "0"],
+            "columns": ["_time", "_value"],
+            "types": ["float", "float"],
+            "values": [[1700000000000, 1], [1700000060000, 2], [1700000120000, 3]],
+        },
+        {
+            "group_keys": None,
+            "group_values": [],
+            "columns": ["time", "a"],
+            "types": ["time", "float"],
+            "values": [[1700000000.5, 10], [1700000060, 20]],
+        },
+        {
+            "group_keys": ["bk_target_ip"],
+            "group_values": ["127.0.0.2"],
+            "columns": ["_time", "_value"],
+            "types": ["float", "float"],
+            "values": [],
+        },
+    ]
+}
+
+
+def legacy_process_unify_query_data(params, data, end_time=None):
+    """
+    逐点解析的原始实现，用于对比
+    """
+    records = []
+    for row in data.get("series") or []:
+        dimensions = {}
+        for index, group_key in enumerate(row["group_keys"] or []):
+            if group_key.endswith("_table1"):
+                group_key = group_key[: -len("_table1")]
+            dimensions[group_key] = row["group_values"][index]
+
+        for value in row["values"]:
+            record = {**dimensions}
+            for column, column_type, v in zip(row["columns"], row["types"], value):
+                if column_type == "time":
+                    v = int(v) * 1000
+                if column == "_time":
+                    column = "_time_"
+                elif column in ["_result", "_value"]:
+                    column = "_result_"
+                record[column] = v
+
+            if "_result_" not in record:
+                record["_result_"] = record[params["query_list"][0]["reference_name"]]
+
+            if not params.get("instant") and end_time and record.get("_time_") == end_time:
+                continue
+            records.append(record)
+    return records
+
+
+class TestUnifyQueryDecode:
+    def test_records(self):
+        records = UnifyQuery.process_unify_query_data(PARAMS, DATA)
+        assert records == legacy_process_unify_query_data(PARAMS, DATA)
+        assert records[0] == {
+            "bk_target_ip": "127.0.0.1",
+            "bk_target_cloud_id": "0",
+            "_time_": 1700000000000,
+            "_result_": 1,
+        }
+        assert records[3] == {"time": 1700000000000, "a": 10, "_result_": 10}
+
+    def test_end_time(self):
+        records = UnifyQuery.process_unify_query_data(PARAMS, DATA, end_time=1700000120000)
+        assert len(records) == 4
+        assert records == legacy_process_unify_query_data(PARAMS, DATA, end_time=1700000120000)
+
+        # instant 查询不过滤结束时间
+        params = {**PARAMS, "instant": True}
+        assert len(UnifyQuery.process_unify_query_data(params, DATA, end_time=1700000120000)) == 5
+
+    def test_iterator_and_columns(self):
+        assert list(UnifyQuery.iter_unify_query_data(PARAMS, DATA)) == UnifyQuery.process_unify_query_data(PARAMS, DATA)
+
+        series = UnifyQuery.process_unify_query_columns(PARAMS, DATA, end_time=1700000120000)
+        assert len(series) == 2
+        assert series[0] == {
+            "dimensions": {"bk_target_ip": "127.0.0.1", "bk_target_cloud_id": "0"},
+            "columns": {"_time_": [1700000000000, 1700000060000], "_result_": [1, 2]},
+        }
+        assert series[1]["columns"]["_result_"] == [10, 20]
+
+    def test_convert_time_column(self):
+        assert convert_time_column((1700000000, 1700000060.9), {}) == [1700000000000, 1700000060000]
+
+    def test_decode_parity(self):
+        """
+        按列解析与逐点解析结果一致
+        """
+        data = {
+            "series": [
+                {
+                    "group_keys": ["bk_target_ip_table1"],
+                    "group_values": [f"127.0.0.{i}"],
+                    "columns": ["_time", "_value"],
+                    "types": ["float", "float"],
+                    "values": [[1700000000000 + j * 60000, j] for j in range(100)],
+                }
+                for i in range(20)
+            ]
+        }
+
+        records = UnifyQuery.process_unify_query_data(PARAMS, data)
+        assert len(records) == 2000
+        assert records == legacy_process_unify_query_data(PARAMS, data)
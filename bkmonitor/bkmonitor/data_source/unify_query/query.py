@@ -12,10 +12,13 @@ import json
 import logging
 import re
 import time
+from collections.abc import Iterator, Sequence
+from functools import lru_cache
 from itertools import chain
 from typing import Any
 
 import arrow
+import numpy as np
 from django.conf import settings
 from django.utils import timezone
 from django.utils.functional import cached_property
@@ -44,6 +47,38 @@ from core.prometheus import metrics
 tracer = trace.get_tracer(__name__)
 logger = logging.getLogger(__name__)
 
+UNIFY_QUERY_COLUMN_ALIASES = {"_time": "_time_", "_result": "_result_", "_value": "_result_"}
+
+
+@lru_cache(maxsize=4096)
+def normalize_group_key(group_key: str) -> str:
+    """
+    去掉维度字段的 _table{n} 后缀
+    """
+    return re.sub(r"_table\d+$", "", group_key)
+
+
+def convert_time_column(values: Sequence, cache: dict) -> list[int]:
+    """
+    批量将时间列转换为毫秒时间戳
+    """
+    try:
+        timestamps = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        timestamps = None
+
+    if timestamps is not None and timestamps.ndim == 1 and not np.isnan(timestamps).any():
+        return (np.floor(timestamps).astype(np.int64) * 1000).tolist()
+
+    # 时间字符串逐个解析，相同时间点只解析一次
+    result = []
+    for value in values:
+        timestamp = cache.get(value)
+        if timestamp is None:
+            timestamp = cache[value] = arrow.get(value).timestamp * 1000
+        result.append(timestamp)
+    return result
+
 
 class UnifyQuery:
     """
@@ -141,50 +176,83 @@ class UnifyQuery:
                 data_source.filter_dict[f"{settings.SYSTEM_NET_GROUP_FIELD_NAME}__neq"] = value
 
     @classmethod
-    def process_unify_query_data(cls, params: dict, data: dict, end_time: int = None) -> list[dict[str, Any]]:
+    def decode_unify_query_series(
+        cls, params: dict, data: dict, end_time: int = None
+    ) -> Iterator[tuple[dict[str, Any], list[str], list[list]]]:
         """
-        处理统一查询模块返回值
+        按列解析统一查询模块返回的时间序列
+        :return: (维度, 字段名列表, 字段值列表(按列))
         """
-        re_dimension = re.compile(r"_table\d+$")
-
-        records = []
-
-        rows = data.get("series") or []
-        for row in rows:
-            dimensions = {}
-            if not row["group_keys"]:
-                row["group_keys"] = []
-            for index, group_key in enumerate(row["group_keys"]):
-                end_string = re_dimension.findall(group_key)
-                if end_string:
-                    end_string = end_string[0]
-                    group_key = group_key[: -len(end_string)]
+        filter_end_time = not params.get("instant") and end_time
+        # 时间列转换结果，不同序列间的时间点大量重复
+        time_cache = {}
+
+        for row in data.get("series") or []:
+            values = row["values"]
+            if not values:
+                continue
+
+            group_keys = row["group_keys"] or []
+            dimensions = {
+                normalize_group_key(group_key): group_value
+                for group_key, group_value in zip(group_keys, row["group_values"])
+            }
 
-                dimensions[group_key] = row["group_values"][index]
+            names = []
+            columns = []
+            for column, column_type, column_values in zip(row["columns"], row["types"], zip(*values)):
+                if column_type == "time":
+                    column_values = convert_time_column(column_values, time_cache)
+                names.append(UNIFY_QUERY_COLUMN_ALIASES.get(column, column))
+                columns.append(column_values)
+
+            # 单指标情况下避免缺少_result_字段
+            if "_result_" not in names and "_result_" not in dimensions:
+                reference_name = params["query_list"][0]["reference_name"]
+                if reference_name in names:
+                    result_column = columns[len(names) - 1 - names[::-1].index(reference_name)]
+                else:
+                    result_column = [dimensions[reference_name]] * len(values)
+                names.append("_result_")
+                columns.append(result_column)
+
+            # 如果是最后一条数据，且时间戳等于结束时间，不返回
+            if filter_end_time and "_time_" in names:
+                time_column = columns[len(names) - 1 - names[::-1].index("_time_")]
+                if end_time in time_column:
+                    keep = [index for index, timestamp in enumerate(time_column) if timestamp != end_time]
+                    columns = [[column[index] for index in keep] for column in columns]
+
+            yield dimensions, names, columns
 
-            for value in row["values"]:
+    @classmethod
+    def iter_unify_query_data(cls, params: dict, data: dict, end_time: int = None) -> Iterator[dict[str, Any]]:
+        """
+        逐条生成统一查询模块返回的数据记录
+        """
+        for dimensions, names, columns in cls.decode_unify_query_series(params, data, end_time):
+            for value in zip(*columns):
                 record = {**dimensions}
-                for column, column_type, v in zip(row["columns"], row["types"], value):
-                    if column_type == "time":
-                        v = arrow.get(v).timestamp * 1000
-
-                    if column == "_time":
-                        column = "_time_"
-                    elif column in ["_result", "_value"]:
-                        column = "_result_"
+                record.update(zip(names, value))
+                yield record
 
-                    record[column] = v
-
-                # 单指标情况下避免缺少_result_字段
-                if "_result_" not in record:
-                    record["_result_"] = record[params["query_list"][0]["reference_name"]]
-
-                # 如果是最后一条数据，且时间戳等于结束时间，不返回
-                if not params.get("instant") and end_time and record.get("_time_") == end_time:
-                    continue
+    @classmethod
+    def process_unify_query_columns(cls, params: dict, data: dict, end_time: int = None) -> list[dict[str, Any]]:
+        """
+        处理统一查询模块返回值，按序列返回列式结构
+        :return: [{"dimensions": {...}, "columns": {"_time_": [...], "_result_": [...]}}]
+        """
+        return [
+            {"dimensions": dimensions, "columns": dict(zip(names, map(list, columns)))}
+            for dimensions, names, columns in cls.decode_unify_query_series(params, data, end_time)
+        ]
 
-                records.append(record)
-        return records
+    @classmethod
+    def process_unify_query_data(cls, params: dict, data: dict, end_time: int = None) -> list[dict[str, Any]]:
+        """
+        处理统一查询模块返回值
+        """
+        return list(cls.iter_unify_query_data(params, data, end_time))
 
     def process_data_by_datasource(self, records: list[dict[str, Any]]) -> list[dict[str, Any]]:
         first_ds: DataSource = self.data_sources[0]
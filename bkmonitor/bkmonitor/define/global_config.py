@@ -405,6 +405,63 @@ ADVANCED_OPTIONS = OrderedDict(
             slz.IntegerField(label="access数据批量处理触发阈值(0为不触发)", default=0),
         ),
         ("ACCESS_DATA_BATCH_PROCESS_SIZE", slz.IntegerField(label="access数据批量处理单次处理量", default=50000)),
+        (
+            "ENABLED_ACCESS_DATA_BINARY_QUEUE",
+            slz.BooleanField(label="access推送检测队列是否使用二进制帧格式", default=False),
+        ),
+        ("ACCESS_DATA_FRAME_SIZE", slz.IntegerField(label="access检测队列二进制帧数据点数", default=1000)),
+        ("ACCESS_DUPLICATE_BACKEND", slz.CharField(label="access数据去重方式(set/batch/bloom)", default="set")),
+        (
+            "ACCESS_DUPLICATE_BLOOM_CAPACITY",
+            slz.IntegerField(label="access布隆去重单时间点最大预估数据量", default=100000),
+        ),
+        ("ACCESS_DUPLICATE_BLOOM_ERROR_RATE", slz.FloatField(label="access布隆去重误判率", default=0.001)),
+        ("ENABLED_TRIGGER_BATCH_CHECK", slz.BooleanField(label="trigger是否批量获取检测结果", default=True)),
+        (
+            "ENABLED_TRIGGER_CHECK_RESULT_SCRIPT",
+            slz.BooleanField(label="trigger是否使用lua脚本汇总检测结果", default=True),
+        ),
+        ("STRATEGY_LOCAL_CACHE_SIZE", slz.IntegerField(label="进程内策略缓存最大策略数", default=5000)),
+        ("ACCESS_DATA_PARALLEL_GROUP_SIZE", slz.IntegerField(label="access单任务并发拉取策略组数量", default=0)),
+        (
+            "ACCESS_DATA_STORAGE_CONCURRENCY",
+            slz.DictField(
+                label="access各存储类型最大并发查询数", default={"default": 8, "bk_data": 2, "bk_log_search": 2}
+            ),
+        ),
+        (
+            "ENABLED_ACCESS_BATCH_DATA_BINARY",
+            slz.BooleanField(label="access分批任务数据是否使用二进制格式", default=False),
+        ),
+        ("DETECT_STREAM_CHUNK_SIZE", slz.IntegerField(label="detect流式检测每块弹出的数据条数", default=0)),
+        ("DETECT_STREAM_MAX_SIZE", slz.IntegerField(label="detect流式检测单次最多消费的数据条数", default=2000000)),
+        ("DETECT_STREAM_TIME_LIMIT", slz.IntegerField(label="detect流式检测单次最长消费时间(秒)", default=40)),
+        ("DETECT_LAZY_ANOMALY_MESSAGE", slz.BooleanField(label="detect是否延迟渲染异常描述", default=False)),
+        ("ES_BULK_BUFFER_ENABLED", slz.BooleanField(label="ES文档是否启用批量写入缓冲", default=False)),
+        ("ES_BULK_BUFFER_MAX_SIZE", slz.IntegerField(label="ES批量写入缓冲最大文档数", default=500)),
+        ("ES_BULK_BUFFER_MAX_BYTES", slz.IntegerField(label="ES批量写入缓冲最大字节数", default=5 * 1024 * 1024)),
+        ("ES_BULK_BUFFER_FLUSH_INTERVAL", slz.IntegerField(label="ES批量写入缓冲最长等待秒数", default=1)),
+        ("ES_BULK_BUFFER_MAX_RETRIES", slz.IntegerField(label="ES批量写入缓冲提交失败最大重试次数", default=3)),
+        ("GRAPH_QUERY_CACHE_ENABLED", slz.BooleanField(label="图表查询是否启用查询结果缓存", default=False)),
+        ("GRAPH_QUERY_CACHE_BUCKET_POINTS", slz.IntegerField(label="图表查询结果缓存时间桶点数", default=60)),
+        ("GRAPH_QUERY_CACHE_TIMEOUT", slz.IntegerField(label="图表查询结果缓存过期时间(秒)", default=60 * 60)),
+        ("GRAPH_QUERY_CACHE_DELAY", slz.IntegerField(label="图表查询结果缓存数据延迟时间(秒)", default=5 * 60)),
+        ("GRAPH_QUERY_CACHE_MAX_POINTS", slz.IntegerField(label="图表查询结果缓存时间桶最大点数", default=50000)),
+        ("APM_PRECALCULATE_PROCESS_NUM", slz.IntegerField(label="APM预计算聚合Trace的进程数", default=0)),
+        ("APM_PRECALCULATE_CHUNK_SIZE", slz.IntegerField(label="APM预计算子任务Trace数", default=200)),
+        ("ALERT_USER_FIELDS_CACHE_ENABLED", slz.BooleanField(label="告警管理是否启用用户修改字段缓存", default=False)),
+        ("ALERT_USER_FIELDS_RECONCILE_WINDOW", slz.IntegerField(label="告警用户修改字段缓存对账窗口(秒)", default=120)),
+        ("ALERT_USER_FIELDS_RECONCILE_RATIO", slz.FloatField(label="告警用户修改字段缓存抽样对账比例", default=0.01)),
+        ("NO_DATA_LIVENESS_INDEX_ENABLED", slz.BooleanField(label="无数据检测是否启用维度存活索引", default=False)),
+        ("ALERT_SHIELD_INDEX_REFRESH_INTERVAL", slz.IntegerField(label="告警屏蔽匹配索引最长刷新间隔(秒)", default=60)),
+        ("USING_CACHE_SINGLE_FLIGHT_ENABLED", slz.BooleanField(label="using_cache是否启用单飞刷新", default=False)),
+        ("USING_CACHE_SINGLE_FLIGHT_WAIT", slz.IntegerField(label="using_cache单飞刷新最长等待时间(秒)", default=5)),
+        ("USING_CACHE_STALE_TIMEOUT", slz.IntegerField(label="using_cache过期旧数据可用时长(秒)", default=0)),
+        ("API_TRANSPORT_POOL_CONNECTIONS", slz.IntegerField(label="API共享连接池缓存的host数量", default=10)),
+        ("API_TRANSPORT_POOL_MAXSIZE", slz.IntegerField(label="API共享连接池单个host最大连接数", default=50)),
+        ("API_REQUEST_COALESCING_ENABLED", slz.BooleanField(label="API是否合并并发的相同请求", default=False)),
+        ("API_REQUEST_BATCH_WINDOW", slz.FloatField(label="API列表参数请求合并等待窗口(秒)", default=0.01)),
+        ("DETECT_VECTORIZED_MIN_POINTS", slz.IntegerField(label="detect列式检测最小数据点数", default=1000)),
         ("BASE64_ENCODE_TRIGGER_CHARS", slz.ListField(label="需要base64编码的特殊字符", default=[])),
         ("AIDEV_KNOWLEDGE_BASE_IDS", slz.ListField(label="aidev的知识库ID", default=[])),
         ("AIDEV_AGENT_AI_GENERATING_KEYWORD", slz.CharField(label="AIAgent内容生成关键字", default="生成中")),
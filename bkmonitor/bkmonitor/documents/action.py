@@ -16,7 +16,7 @@ from django_elasticsearch_dsl.registries import registry
 from elasticsearch.helpers import BulkIndexError
 from elasticsearch_dsl import InnerDoc, Search, field
 
-from bkmonitor.documents.base import BaseDocument, Date
+from bkmonitor.documents.base import BaseDocument, BulkActionType, Date
 from constants.action import ActionDisplayStatus, ActionPluginType
 
 logger = logging.getLogger("action")
@@ -26,6 +26,7 @@ logger = logging.getLogger("action")
 class ActionInstanceDocument(BaseDocument):
     REINDEX_ENABLED = True
     REINDEX_QUERY = Search().filter("term", status=ActionDisplayStatus.RUNNING).to_dict()
+    BULK_BUFFER_ACTIONS = {BulkActionType.INDEX, BulkActionType.UPDATE, BulkActionType.UPSERT}
 
     class OpType:
         # 执行动作
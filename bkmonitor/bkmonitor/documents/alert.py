@@ -8,16 +8,18 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import logging
 import time
 from typing import List
 
+from django.conf import settings
 from django.utils.functional import cached_property
 from django.utils.translation import gettext as _
 from django_elasticsearch_dsl.registries import registry
 from elasticsearch_dsl import InnerDoc, Search, field
 
 from bkmonitor.documents import EventDocument
-from bkmonitor.documents.base import BaseDocument, Date
+from bkmonitor.documents.base import BaseDocument, BulkActionType, Date
 from bkmonitor.models import NO_DATA_TAG_DIMENSION
 from constants.alert import (
     EVENT_SEVERITY,
@@ -28,11 +30,14 @@ from constants.alert import (
 from constants.data_source import DataSourceLabel, DataTypeLabel
 from core.errors.alert import AlertNotFoundError
 
+logger = logging.getLogger("bkmonitor.documents")
+
 
 @registry.register_document
 class AlertDocument(BaseDocument):
     REINDEX_ENABLED = True
     REINDEX_QUERY = Search().filter("term", status=EventStatus.ABNORMAL).to_dict()
+    BULK_BUFFER_ACTIONS = {BulkActionType.INDEX, BulkActionType.UPDATE, BulkActionType.UPSERT}
 
     id = field.Keyword(required=True)
     seq_id = field.Long()
@@ -182,6 +187,19 @@ class AlertDocument(BaseDocument):
 
         return [cls(**hit.to_dict()) for hit in search.params(size=5000).scan()]
 
+    @classmethod
+    def bulk_create(cls, documents, parallel=False, action=BulkActionType.CREATE, **kwargs):
+        result = super().bulk_create(documents, parallel=parallel, action=action, **kwargs)
+        if action == BulkActionType.UPDATE and settings.ALERT_USER_FIELDS_CACHE_ENABLED:
+            # 用户修改字段同步写入缓存，告警管理周期检测时优先从缓存读取
+            try:
+                from alarm_backends.core.alert.user_fields import save_user_fields
+
+                save_user_fields(documents)
+            except Exception as e:  # noqa
+                logger.exception("save alert user fields cache error: %s", e)
+        return result
+
     @classmethod
     def get_by_dedupe_md5(cls, dedupe_md5, start_time=None) -> "AlertDocument":
         search_object = cls.search(all_indices=True)
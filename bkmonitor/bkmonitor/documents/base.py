@@ -16,6 +16,7 @@ from django_elasticsearch_dsl import Document
 from elasticsearch_dsl import Date as BaseDate
 from elasticsearch_dsl import MetaField
 
+from bkmonitor.documents.buffer import bulk_write_buffer
 from bkmonitor.utils.elasticsearch.ilm import ILM
 
 
@@ -32,6 +33,8 @@ class BaseDocument(Document):
     DATE_FORMAT = "epoch_second"
     ES_REQUEST_TIMEOUT = 30  # ES 请求超时，默认30s
     ES_BULK_MAX_RETRIES = 3  # ES 批量写入最大重试次数
+    # 开启批量写入缓冲时，允许异步合并写入的操作类型
+    BULK_BUFFER_ACTIONS = set()
 
     # 索引轮转时，是否需要将部分数据转移至新索引（避免数据重复）
     REINDEX_ENABLED = False
@@ -186,6 +189,9 @@ class BaseDocument(Document):
 
     @classmethod
     def bulk_create(cls, documents, parallel=False, action=BulkActionType.CREATE, **kwargs):
+        if cls.is_bulk_buffer_enabled(action) and not parallel and not kwargs:
+            return bulk_write_buffer.add(cls, documents, action)
+
         actions = []
         for doc in documents:
             actions.append(doc.prepare_action(action))
@@ -194,6 +200,13 @@ class BaseDocument(Document):
             return cls().parallel_bulk(**params)
         return cls().bulk(max_retries=cls.ES_BULK_MAX_RETRIES, **params)
 
+    @classmethod
+    def is_bulk_buffer_enabled(cls, action) -> bool:
+        """
+        是否使用批量写入缓冲，仅后台进程开启，避免页面操作后读取不到最新数据
+        """
+        return settings.ES_BULK_BUFFER_ENABLED and settings.ROLE == "worker" and action in cls.BULK_BUFFER_ACTIONS
+
     @classmethod
     def get_lifecycle_manager(cls):
         return ILM(
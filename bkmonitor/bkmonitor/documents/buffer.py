@@ -0,0 +1,243 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from celery.signals import worker_process_shutdown
+from django.conf import settings
+from elasticsearch.helpers import BulkIndexError
+
+from bkmonitor.utils.common_utils import chunks
+from core.prometheus import metrics
+
+logger = logging.getLogger("bkmonitor.documents")
+
+
+def merge_doc(target: dict, source: dict):
+    """
+    按 ES 局部更新的语义合并文档：对象字段递归合并，其余字段后者覆盖前者
+    """
+    for field, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(field), dict):
+            merge_doc(target[field], value)
+        else:
+            target[field] = value
+
+
+def estimate_size(data: dict) -> int:
+    return len(json.dumps(data, default=str))
+
+
+class BulkWriteBuffer:
+    """
+    ES 文档批量写入缓冲(进程级)
+
+    1. 写入请求先进入缓冲，按文档数、字节数或等待时间任一阈值触发提交
+    2. 同一文档(索引 + _id)连续的同类写入在缓冲内合并：index 后者覆盖前者，update/upsert 按字段合并
+    3. 提交由后台线程完成；缓冲积压超过上限时，由写入方同步提交，形成背压
+    4. 进程退出时将缓冲中的文档全部提交
+    """
+
+    # 积压文档数超过 提交阈值 * 该倍数 时，写入方同步提交
+    BACKPRESSURE_FACTOR = 4
+    # 提交失败重试的最长等待时间(秒)
+    MAX_RETRY_BACKOFF = 5
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        初始化缓冲状态，fork 出的子进程不继承父进程的缓冲、锁和后台线程
+        """
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.flusher = None
+        # entry_id -> [文档类, 写入类型, bulk action, 字节数]
+        self.pending = {}
+        # (文档类, 索引, _id) -> (写入类型, entry_id)，记录每个文档最后一次写入
+        self.latest = {}
+        self.entry_id = 0
+        self.pending_bytes = 0
+        self.first_add_time = None
+
+    @property
+    def max_size(self) -> int:
+        return max(settings.ES_BULK_BUFFER_MAX_SIZE, 1)
+
+    def add(self, document_cls, documents, action: str):
+        actions = [doc.prepare_action(action) for doc in documents]
+        if not actions:
+            return
+
+        with self.lock:
+            for data in actions:
+                self._add(document_cls, action, data)
+            pending_size = len(self.pending)
+            pending_bytes = self.pending_bytes
+            self._ensure_flusher()
+
+        if pending_size >= self.max_size or pending_bytes >= settings.ES_BULK_BUFFER_MAX_BYTES:
+            if pending_size >= self.max_size * self.BACKPRESSURE_FACTOR:
+                # 后台线程提交跟不上写入速度，由写入方同步提交
+                self.flush()
+            else:
+                self.wakeup.set()
+
+    def _add(self, document_cls, action: str, data: dict):
+        if self.first_add_time is None:
+            self.first_add_time = time.time()
+
+        doc_key = None
+        if data.get("_id") is not None:
+            doc_key = (document_cls, data["_index"], data["_id"])
+            latest_action, entry_id = self.latest.get(doc_key, (None, None))
+            # 仅当该文档最后一次写入为同类写入时合并，不同类型的写入之间保持原有顺序
+            # create 以先写入者为准，冲突由 ES 返回，因此不做合并
+            if latest_action == action and action != "create" and entry_id in self.pending:
+                entry = self.pending[entry_id]
+                if "doc" in data:
+                    merge_doc(entry[2]["doc"], data["doc"])
+                else:
+                    entry[2] = data
+                size = estimate_size(entry[2])
+                self.pending_bytes += size - entry[3]
+                entry[3] = size
+                return
+
+        self.entry_id += 1
+        size = estimate_size(data)
+        self.pending[self.entry_id] = [document_cls, action, data, size]
+        self.pending_bytes += size
+        if doc_key:
+            self.latest[doc_key] = (action, self.entry_id)
+
+    def _ensure_flusher(self):
+        if self.flusher and self.flusher.is_alive():
+            return
+        self.flusher = threading.Thread(target=self._run_flusher, name="es-bulk-buffer-flusher", daemon=True)
+        self.flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            interval = max(settings.ES_BULK_BUFFER_FLUSH_INTERVAL, 0.1)
+            self.wakeup.wait(interval)
+            self.wakeup.clear()
+            first_add_time = self.first_add_time
+            if first_add_time is None:
+                continue
+            if (
+                time.time() - first_add_time < interval
+                and len(self.pending) < self.max_size
+                and self.pending_bytes < settings.ES_BULK_BUFFER_MAX_BYTES
+            ):
+                continue
+            try:
+                self.flush()
+            except Exception as e:  # noqa
+                logger.exception("[bulk buffer] flush error: %s", e)
+            # 后台线程中的提交不经过任务的指标上报流程，提交后单独上报
+            metrics.report_all()
+
+    def flush(self):
+        """
+        提交缓冲中的全部文档
+        """
+        with self.flush_lock:
+            with self.lock:
+                pending = self.pending
+                self.pending = {}
+                self.latest = {}
+                self.pending_bytes = 0
+                self.first_add_time = None
+
+            if not pending:
+                return
+
+            # 同一文档类的写入保持原有顺序提交
+            actions_by_cls = defaultdict(list)
+            for document_cls, _action, data, _size in pending.values():
+                actions_by_cls[document_cls].append(data)
+
+            for document_cls, actions in actions_by_cls.items():
+                for chunk in chunks(actions, self.max_size):
+                    self.send(document_cls, chunk)
+
+    def send(self, document_cls, actions: list[dict]):
+        document = document_cls.__name__
+        metrics.ES_BULK_BUFFER_BATCH_SIZE.labels(document=document).observe(len(actions))
+
+        max_retries = max(settings.ES_BULK_BUFFER_MAX_RETRIES, 0)
+        for retry in range(max_retries + 1):
+            start_time = time.time()
+            try:
+                document_cls().bulk(
+                    actions=actions,
+                    max_retries=document_cls.ES_BULK_MAX_RETRIES,
+                    request_timeout=document_cls.ES_REQUEST_TIMEOUT,
+                )
+            except BulkIndexError as e:
+                # 文档级别的写入错误(如冲突、字段类型错误)，重试无意义
+                metrics.ES_BULK_BUFFER_FLUSH_LATENCY.labels(document=document, status="failed").observe(
+                    time.time() - start_time
+                )
+                metrics.ES_BULK_BUFFER_ACTION_COUNT.labels(document=document, result="success").inc(
+                    len(actions) - len(e.errors)
+                )
+                metrics.ES_BULK_BUFFER_ACTION_COUNT.labels(document=document, result="failed").inc(len(e.errors))
+                metrics.ES_BULK_BUFFER_SEND_FAILED_COUNT.labels(document=document, reason="document_error").inc()
+                logger.error("[bulk buffer] save %s error: %s", document, e.errors)
+                return
+            except Exception as e:  # noqa
+                metrics.ES_BULK_BUFFER_FLUSH_LATENCY.labels(document=document, status="failed").observe(
+                    time.time() - start_time
+                )
+                if retry >= max_retries:
+                    metrics.ES_BULK_BUFFER_ACTION_COUNT.labels(document=document, result="dropped").inc(len(actions))
+                    metrics.ES_BULK_BUFFER_SEND_FAILED_COUNT.labels(document=document, reason="dropped").inc()
+                    logger.exception(
+                        "[bulk buffer] save %s(%d) failed after %d retries: %s", document, len(actions), retry, e
+                    )
+                    return
+                metrics.ES_BULK_BUFFER_SEND_FAILED_COUNT.labels(document=document, reason="retry").inc()
+                logger.warning("[bulk buffer] save %s(%d) failed, retry(%d): %s", document, len(actions), retry + 1, e)
+                time.sleep(min(0.5 * 2**retry, self.MAX_RETRY_BACKOFF))
+            else:
+                metrics.ES_BULK_BUFFER_FLUSH_LATENCY.labels(document=document, status="success").observe(
+                    time.time() - start_time
+                )
+                metrics.ES_BULK_BUFFER_ACTION_COUNT.labels(document=document, result="success").inc(len(actions))
+                return
+
+
+bulk_write_buffer = BulkWriteBuffer()
+
+
+def flush_bulk_write_buffer():
+    try:
+        bulk_write_buffer.flush()
+    except Exception as e:  # noqa
+        logger.exception("[bulk buffer] flush on shutdown error: %s", e)
+
+
+@worker_process_shutdown.connect
+def flush_on_worker_shutdown(signal=None, sender=None, **kwargs):
+    flush_bulk_write_buffer()
+
+
+atexit.register(flush_bulk_write_buffer)
+os.register_at_fork(after_in_child=bulk_write_buffer.reset)
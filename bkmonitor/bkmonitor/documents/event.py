@@ -12,7 +12,7 @@ specific language governing permissions and limitations under the License.
 from django_elasticsearch_dsl.registries import registry
 from elasticsearch_dsl import field
 
-from bkmonitor.documents.base import BaseDocument, Date
+from bkmonitor.documents.base import BaseDocument, BulkActionType, Date
 from core.errors.alert import EventNotFoundError
 
 
@@ -22,6 +22,9 @@ class EventDocument(BaseDocument):
     # time 字段在时间偏移量范围内，使用 time 字段作为索引时间
     INDEX_TIME_OFFSET = 24 * 60 * 60
 
+    # 事件新建依赖写入冲突结果进行去重，仍然同步写入
+    BULK_BUFFER_ACTIONS = {BulkActionType.INDEX, BulkActionType.UPDATE, BulkActionType.UPSERT}
+
     # 事件标识
     id = field.Keyword(required=True)
     event_id = field.Keyword(required=True)
@@ -12,11 +12,13 @@ specific language governing permissions and limitations under the License.
 from django_elasticsearch_dsl.registries import registry
 from elasticsearch_dsl import Q, field
 
-from bkmonitor.documents.base import BaseDocument, Date
+from bkmonitor.documents.base import BaseDocument, BulkActionType, Date
 
 
 @registry.register_document
 class AlertLog(BaseDocument):
+    BULK_BUFFER_ACTIONS = {BulkActionType.CREATE}
+
     class Index:
         name = "bkfta_log_alert"
         settings = {"number_of_shards": 3, "number_of_replicas": 1, "refresh_interval": "1s"}
@@ -0,0 +1,158 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from unittest import mock
+
+import pytest
+from django.conf import settings
+from elasticsearch.exceptions import ConnectionError
+from elasticsearch.helpers import BulkIndexError
+
+from bkmonitor.documents import AlertDocument, EventDocument
+from bkmonitor.documents.base import BulkActionType
+from bkmonitor.documents.buffer import BulkWriteBuffer
+
+
+class FakeDocument:
+    ES_BULK_MAX_RETRIES = 3
+    ES_REQUEST_TIMEOUT = 30
+    bulk = mock.MagicMock()
+
+    def __init__(self, id=None, **kwargs):
+        self.id = id
+        self.data = kwargs
+
+    def prepare_action(self, action):
+        data = {"_op_type": action, "_index": "fake_index", "_id": self.id}
+        if action in (BulkActionType.UPDATE, BulkActionType.UPSERT):
+            data["_op_type"] = BulkActionType.UPDATE
+            data["doc"] = dict(self.data)
+        else:
+            data["_source"] = dict(self.data)
+        return data
+
+
+@pytest.fixture
+def buffer():
+    FakeDocument.bulk.reset_mock(side_effect=True)
+    with mock.patch.multiple(
+        settings,
+        ES_BULK_BUFFER_MAX_SIZE=100,
+        ES_BULK_BUFFER_MAX_BYTES=1024 * 1024,
+        ES_BULK_BUFFER_FLUSH_INTERVAL=60,
+        ES_BULK_BUFFER_MAX_RETRIES=2,
+    ):
+        with mock.patch.object(BulkWriteBuffer, "_ensure_flusher"):
+            yield BulkWriteBuffer()
+
+
+def sent_actions():
+    return [action for call in FakeDocument.bulk.call_args_list for action in call.kwargs["actions"]]
+
+
+class TestBulkWriteBuffer:
+    def test_coalesce(self, buffer):
+        buffer.add(FakeDocument, [FakeDocument(id=1, status="ABNORMAL", extra_info={"a": 1})], BulkActionType.UPSERT)
+        buffer.add(FakeDocument, [FakeDocument(id=2, status="ABNORMAL")], BulkActionType.UPSERT)
+        buffer.add(FakeDocument, [FakeDocument(id=1, severity=2, extra_info={"b": 2})], BulkActionType.UPSERT)
+        buffer.add(FakeDocument, [FakeDocument(id=3, status="ABNORMAL")], BulkActionType.INDEX)
+        buffer.add(FakeDocument, [FakeDocument(id=3, status="CLOSED")], BulkActionType.INDEX)
+        assert FakeDocument.bulk.call_count == 0
+
+        buffer.flush()
+        assert FakeDocument.bulk.call_count == 1
+        actions = sent_actions()
+        assert len(actions) == 3
+        assert actions[0]["doc"] == {"status": "ABNORMAL", "severity": 2, "extra_info": {"a": 1, "b": 2}}
+        assert actions[2]["_source"] == {"status": "CLOSED"}
+
+        # 缓冲已清空
+        buffer.flush()
+        assert FakeDocument.bulk.call_count == 1
+
+    def test_keep_order_between_actions(self, buffer):
+        buffer.add(FakeDocument, [FakeDocument(id=1, status="ABNORMAL")], BulkActionType.INDEX)
+        buffer.add(FakeDocument, [FakeDocument(id=1, severity=2)], BulkActionType.UPDATE)
+        buffer.add(FakeDocument, [FakeDocument(id=1, status="CLOSED")], BulkActionType.INDEX)
+        buffer.add(FakeDocument, [FakeDocument(id=4), FakeDocument(id=4)], BulkActionType.CREATE)
+        buffer.flush()
+
+        # 不同类型的写入不合并，create 不合并
+        assert [(action["_op_type"], action["_id"]) for action in sent_actions()] == [
+            ("index", 1),
+            ("update", 1),
+            ("index", 1),
+            ("create", 4),
+            ("create", 4),
+        ]
+
+    def test_flush_threshold(self, buffer):
+        with mock.patch.object(settings, "ES_BULK_BUFFER_MAX_SIZE", 2):
+            buffer.add(FakeDocument, [FakeDocument(id=1)], BulkActionType.INDEX)
+            assert not buffer.wakeup.is_set()
+            buffer.add(FakeDocument, [FakeDocument(id=2)], BulkActionType.INDEX)
+            assert buffer.wakeup.is_set()
+            assert FakeDocument.bulk.call_count == 0
+
+            # 积压超过上限，写入方同步提交
+            buffer.add(FakeDocument, [FakeDocument(id=i) for i in range(3, 9)], BulkActionType.INDEX)
+            assert FakeDocument.bulk.call_count == 4
+            assert len(buffer.pending) == 0
+
+    def test_retry(self, buffer):
+        FakeDocument.bulk.side_effect = [ConnectionError("N/A", "timeout", None), (1, [])]
+        buffer.add(FakeDocument, [FakeDocument(id=1)], BulkActionType.INDEX)
+        with mock.patch("bkmonitor.documents.buffer.time.sleep") as sleep:
+            buffer.flush()
+        assert FakeDocument.bulk.call_count == 2
+        assert sleep.call_count == 1
+
+        # 文档级别错误不重试
+        FakeDocument.bulk.reset_mock()
+        FakeDocument.bulk.side_effect = BulkIndexError("1 document(s) failed to index.", [{"index": {"_id": 1}}])
+        buffer.add(FakeDocument, [FakeDocument(id=1)], BulkActionType.INDEX)
+        buffer.flush()
+        assert FakeDocument.bulk.call_count == 1
+
+        # 超过重试次数后丢弃
+        FakeDocument.bulk.reset_mock()
+        FakeDocument.bulk.side_effect = ConnectionError("N/A", "timeout", None)
+        buffer.add(FakeDocument, [FakeDocument(id=1)], BulkActionType.INDEX)
+        with mock.patch("bkmonitor.documents.buffer.time.sleep"):
+            buffer.flush()
+        assert FakeDocument.bulk.call_count == 3
+        assert len(buffer.pending) == 0
+
+    def test_send_failed_metric(self, buffer):
+        FakeDocument.bulk.side_effect = ConnectionError("N/A", "timeout", None)
+        buffer.add(FakeDocument, [FakeDocument(id=1)], BulkActionType.INDEX)
+        with mock.patch("bkmonitor.documents.buffer.time.sleep"):
+            with mock.patch("bkmonitor.documents.buffer.metrics") as metrics:
+                buffer.flush()
+
+        reasons = [call.kwargs["reason"] for call in metrics.ES_BULK_BUFFER_SEND_FAILED_COUNT.labels.call_args_list]
+        assert reasons == ["retry", "retry", "dropped"]
+
+    def test_bulk_create_route(self):
+        with mock.patch("bkmonitor.documents.base.bulk_write_buffer") as bulk_write_buffer:
+            with mock.patch.object(AlertDocument, "bulk") as bulk:
+                with mock.patch.multiple(settings, ES_BULK_BUFFER_ENABLED=True, ROLE="worker"):
+                    AlertDocument.bulk_create([], action=BulkActionType.UPSERT)
+                    assert bulk_write_buffer.add.call_count == 1
+
+                    # 事件新建依赖写入结果，仍然同步写入
+                    with mock.patch.object(EventDocument, "bulk") as event_bulk:
+                        EventDocument.bulk_create([])
+                        assert event_bulk.call_count == 1
+
+                with mock.patch.multiple(settings, ES_BULK_BUFFER_ENABLED=True, ROLE="web"):
+                    AlertDocument.bulk_create([], action=BulkActionType.UPSERT)
+                assert bulk_write_buffer.add.call_count == 1
+                assert bulk.call_count == 1
@@ -12,6 +12,7 @@ import functools
 import json
 import logging
 import time
+import uuid
 import zlib
 from time import monotonic
 from typing import Any
@@ -25,6 +26,8 @@ from django.utils.encoding import force_bytes
 from bkmonitor.utils.common_utils import count_md5
 from bkmonitor.utils.local import local
 from bkmonitor.utils.request import get_request
+from bkmonitor.utils.thread_backend import InheritParentThread
+from core.prometheus import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +42,10 @@ class UsingCache:
     min_length = 15
     preset = 6
     key_prefix = "web_cache"
+    # 单飞刷新锁的超时时间，防止持锁进程异常退出后锁无法释放
+    lock_timeout = 60
+    # 等待其他调用方刷新缓存时的轮询间隔
+    lock_wait_interval = 0.1
 
     def __init__(
         self,
@@ -99,10 +106,24 @@ class UsingCache:
             return f"{self.key_prefix}:{self.using_cache_type.key}:{self.func_key_generator(task_definition)}:{count_md5(args)},{count_md5(kwargs)}[{self._get_username()}]{lang}"
         return None
 
+    @property
+    def stale_timeout(self):
+        """
+        缓存过期后仍可返回旧数据的时长，为0时不启用
+        """
+        if not self.using_cache_type:
+            return 0
+        if self.using_cache_type.stale_timeout is not None:
+            return self.using_cache_type.stale_timeout
+        return settings.USING_CACHE_STALE_TIMEOUT
+
+    def _count(self, status):
+        metrics.USING_CACHE_REQUEST_COUNT.labels(cache_type=self.using_cache_type.key, status=status).inc()
+
     def get_value(self, cache_key, default=None):
         """
         新增一级内存缓存（local）。在同一个请求(线程)中，优先使用内存缓存。
-        一级缓存： local（web服务单次请求中生效）
+        一级缓存： local（web服务单次请求中生效），保存反序列化后的对象，同一请求内多次命中返回同一对象，调用方不应修改
         二级缓存： cache（60s生效）
         机制：
         local (miss), cache(miss): cache <- result
@@ -111,7 +132,7 @@ class UsingCache:
         if self.local_cache_enable:
             value = getattr(local, cache_key, None)
             if value:
-                return json.loads(value)
+                return value
 
         value = mem_cache.get(cache_key, default=None) or cache.get(cache_key, default=None)
         if value is None:
@@ -126,7 +147,7 @@ class UsingCache:
             except Exception:
                 value = default
         if value and self.local_cache_enable:
-            setattr(local, cache_key, json.dumps(value))
+            setattr(local, cache_key, value)
         return value
 
     def set_value(self, key, value, timeout=60):
@@ -163,14 +184,121 @@ class UsingCache:
             cache_key = None
         else:
             cache_key = self._cache_key(task_definition, args, kwargs)
-        if cache_key:
-            return_value = self.get_value(cache_key, default=None)
+        if not cache_key:
+            return self._cacheless(task_definition, args, kwargs)
 
-            if return_value is None:
-                return_value = self._refresh(task_definition, args, kwargs)
-        else:
-            return_value = self._cacheless(task_definition, args, kwargs)
-        return return_value
+        if self.stale_timeout:
+            return self._cached_with_stale(task_definition, args, kwargs, cache_key)
+
+        return_value = self.get_value(cache_key, default=None)
+        if return_value is not None:
+            self._count("hit")
+            return return_value
+
+        self._count("miss")
+        return self._single_flight_refresh(
+            task_definition, args, kwargs, cache_key, lambda: self.get_value(cache_key, default=None)
+        )
+
+    def _cached_with_stale(self, task_definition, args, kwargs, cache_key):
+        """
+        【过期旧数据模式】
+        缓存分为软过期和硬过期：软过期(缓存类型超时)后的一段时间内直接返回旧数据，并由一个调用方在后台刷新缓存
+        """
+        stale_cache_key = self._stale_cache_key(cache_key)
+
+        def get_entry():
+            entry = self.get_value(stale_cache_key, default=None)
+            if isinstance(entry, dict) and "expire_at" in entry:
+                return entry
+            return None
+
+        entry = get_entry()
+        if entry is None:
+            self._count("miss")
+            return self._single_flight_refresh(
+                task_definition, args, kwargs, cache_key, lambda: (get_entry() or {}).get("value")
+            )
+
+        if entry["expire_at"] > time.time():
+            self._count("hit")
+            return entry["value"]
+
+        self._count("stale")
+        lock_key = self._lock_key(cache_key)
+        token = self._acquire_lock(lock_key)
+        if token:
+            InheritParentThread(
+                target=self._background_refresh, args=(task_definition, args, kwargs, lock_key, token), daemon=True
+            ).start()
+        return entry["value"]
+
+    def _background_refresh(self, task_definition, args, kwargs, lock_key, token):
+        try:
+            self._refresh(task_definition, args, kwargs)
+        except Exception as e:
+            logger.exception(f"[Cache]后台刷新缓存[key:{lock_key}]失败：{e}")
+        finally:
+            self._release_lock(lock_key, token)
+
+    def _single_flight_refresh(self, task_definition, args, kwargs, cache_key, get_cached_value):
+        """
+        【单飞刷新模式】
+        缓存缺失时只由获取到锁的调用方执行函数，其他调用方等待其回写缓存，等待超时后再自行执行
+        """
+        if not settings.USING_CACHE_SINGLE_FLIGHT_ENABLED:
+            return self._refresh(task_definition, args, kwargs)
+
+        lock_key = self._lock_key(cache_key)
+        token = self._acquire_lock(lock_key)
+        if token:
+            try:
+                return self._refresh(task_definition, args, kwargs)
+            finally:
+                self._release_lock(lock_key, token)
+
+        deadline = monotonic() + settings.USING_CACHE_SINGLE_FLIGHT_WAIT
+        while monotonic() < deadline:
+            time.sleep(self.lock_wait_interval)
+            value = get_cached_value()
+            if value is not None:
+                self._count("wait")
+                return value
+            try:
+                if not cache.get(lock_key):
+                    # 持锁方已结束但未写入缓存(如结果不需要缓存)，不再继续等待
+                    break
+            except Exception:
+                break
+        return self._refresh(task_definition, args, kwargs)
+
+    def _stale_cache_key(self, cache_key):
+        return f"{cache_key}:stale"
+
+    def _lock_key(self, cache_key):
+        return f"{cache_key}:lock"
+
+    def _acquire_lock(self, lock_key):
+        """
+        获取刷新锁，获取失败时返回空字符串
+        缓存出错时视为获取成功(fail-open)，由当前调用方直接刷新，不做并发控制
+        """
+        token = uuid.uuid4().hex
+        try:
+            if cache.add(lock_key, token, self.lock_timeout):
+                return token
+        except Exception as e:
+            logger.exception(f"[Cache]获取缓存刷新锁[key:{lock_key}]时报错，跳过并发控制直接刷新：{e}")
+            metrics.USING_CACHE_LOCK_ERROR_COUNT.labels(cache_type=self.using_cache_type.key).inc()
+            return token
+        return ""
+
+    def _release_lock(self, lock_key, token):
+        try:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+        except Exception as e:
+            logger.exception(f"[Cache]释放缓存刷新锁[key:{lock_key}]时报错：{e}")
 
     def _refresh(self, task_definition, args, kwargs):
         """
@@ -180,12 +308,20 @@ class UsingCache:
         cache_key = self._cache_key(task_definition, args, kwargs)
 
         return_value = self._cacheless(task_definition, args, kwargs)
+        if self.using_cache_type:
+            self._count("recompute")
 
         # 设置了缓存空数据
         # 或者不缓存空数据且数据为空时
         # 需要进行缓存
         if self.is_cache_func(return_value):
-            self.set_value(cache_key, return_value, self.using_cache_type.timeout)
+            timeout = self.using_cache_type.timeout
+            stale_timeout = self.stale_timeout
+            if stale_timeout:
+                entry = {"expire_at": time.time() + timeout, "value": return_value}
+                self.set_value(self._stale_cache_key(cache_key), entry, timeout + stale_timeout)
+            else:
+                self.set_value(cache_key, return_value, timeout)
 
         return return_value
 
@@ -230,20 +366,22 @@ class CacheTypeItem:
     缓存类型定义
     """
 
-    def __init__(self, key, timeout, user_related=None, label=""):
+    def __init__(self, key, timeout, user_related=None, label="", stale_timeout=None):
         """
         :param key: 缓存名称
         :param timeout: 缓存超时，单位：s
         :param user_related: 是否用户相关
         :param label: 详细说明
+        :param stale_timeout: 缓存超时后仍可返回旧数据并在后台刷新的时长，单位：s，为None时使用全局配置
         """
         self.key = key
         self.timeout = timeout
         self.label = label
         self.user_related = user_related
+        self.stale_timeout = stale_timeout
 
     def __call__(self, timeout):
-        return CacheTypeItem(self.key, timeout, self.user_related, self.label)
+        return CacheTypeItem(self.key, timeout, self.user_related, self.label, self.stale_timeout)
 
 
 class CacheType:
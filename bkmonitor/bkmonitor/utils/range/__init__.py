@@ -1,4 +1,3 @@
-# -*- coding: utf-8 -*-
 """
 Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
 Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
@@ -8,12 +7,16 @@ Unless required by applicable law or agreed to in writing, software distributed
 an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
 specific language governing permissions and limitations under the License.
 """
+import json
+from functools import lru_cache
+
 from constants.common import DutyType
 
 from . import conditions, fields, period
 
 __all__ = [
     "load_condition_instance",
+    "compile_condition_instance",
     "TIME_MATCH_CLASS_MAP",
     "load_field_instance",
     "load_agg_condition_instance",
@@ -122,3 +125,23 @@ def load_condition_instance(conditions_config, default_value_if_not_exists=True)
 
         or_cond_obj.add(and_cond_obj)
     return or_cond_obj
+
+
+@lru_cache(maxsize=1024)
+def _compile_condition_instance(conditions_config_json, default_value_if_not_exists):
+    return load_condition_instance(json.loads(conditions_config_json), default_value_if_not_exists)
+
+
+def compile_condition_instance(conditions_config, default_value_if_not_exists=True):
+    """
+    Load Condition instance and cache it by config content
+    相同配置复用同一个条件对象，条件值(集合、数值、正则)只在首次匹配时预处理一次
+    返回的条件对象会被共享，调用方不能再修改其中的条件
+    :param conditions_config: 同 load_condition_instance
+    :return: condition object
+    """
+    try:
+        conditions_config_json = json.dumps(conditions_config, sort_keys=True)
+    except (TypeError, ValueError):
+        return load_condition_instance(conditions_config, default_value_if_not_exists)
+    return _compile_condition_instance(conditions_config_json, default_value_if_not_exists)
@@ -1,4 +1,3 @@
-# -*- coding: utf-8 -*-
 """
 Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
 Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
@@ -14,17 +13,47 @@ import re
 import sre_constants
 
 
-class Condition(object):
+class Condition:
     def is_match(self, data):
         raise NotImplementedError("You should implement this.")
 
+    def is_match_many(self, records):
+        """
+        批量匹配，返回每条数据的匹配结果
+        """
+        is_match = self.is_match
+        return [is_match(data) for data in records]
+
+    def filter(self, records):
+        """
+        过滤出匹配的数据
+        """
+        return [data for data, matched in zip(records, self.is_match_many(records)) if matched]
+
 
 class SimpleCondition(Condition):
     """eq / gt / lt / reg ..."""
 
+    # 匹配时数据值的转换类型
+    value_type = str
+
     def __init__(self, cond_field, default_value_if_not_exists=False):
         self.cond_field = cond_field
         self.default_value_if_not_exists = default_value_if_not_exists
+        # 预处理后的条件值，首次匹配时生成，避免每次匹配重复转换条件值
+        self._prepared = None
+
+    @property
+    def prepared(self):
+        if self._prepared is None:
+            self._prepared = self.prepare()
+        return self._prepared
+
+    def prepare(self):
+        """
+        预处理条件值
+        """
+        return tuple(self.cond_field.to_str_list())
 
     def is_match(self, data):
         existed, data_field = self.get_field(data)
@@ -34,6 +63,11 @@ class SimpleCondition(Condition):
         return self._is_match(data_field)
 
     def _is_match(self, data_field):
+        if self.value_type is float:
+            return self._match(data_field.to_float_list())
+        return self._match(data_field.to_str_list())
+
+    def _match(self, data_value):
         raise NotImplementedError("You should inherit me and implement this.")
 
     def get_field(self, data):
@@ -58,6 +92,28 @@ class CompositeCondition(Condition):
     def remove(self, condition):
         self.conditions.remove(condition)
 
+    def _is_match_many(self, records, short_circuit_result):
+        """
+        按条件逐个批量匹配，已确定结果的数据不再参与后续条件的匹配
+        """
+        if not self.conditions:
+            return [True] * len(records)
+
+        results = [not short_circuit_result] * len(records)
+        pending = list(range(len(records)))
+        for cond in self.conditions:
+            if not pending:
+                break
+            matched_list = cond.is_match_many([records[index] for index in pending])
+            next_pending = []
+            for index, matched in zip(pending, matched_list):
+                if matched == short_circuit_result:
+                    results[index] = short_circuit_result
+                else:
+                    next_pending.append(index)
+            pending = next_pending
+        return results
+
 
 class OrCondition(CompositeCondition):
     def is_match(self, data):
@@ -69,6 +125,9 @@ class OrCondition(CompositeCondition):
                 return True
         return False
 
+    def is_match_many(self, records):
+        return self._is_match_many(records, True)
+
 
 class AndCondition(CompositeCondition):
     def is_match(self, data):
@@ -80,86 +139,104 @@ class AndCondition(CompositeCondition):
                 return False
         return True
 
+    def is_match_many(self, records):
+        return self._is_match_many(records, False)
+
 
 class EqualCondition(SimpleCondition):
-    def _is_match(self, data_field):
-        data_value = data_field.to_str_list()
-        cond_value = self.cond_field.to_str_list()
-        return bool(set(data_value) & set(cond_value))
+    def prepare(self):
+        return frozenset(self.cond_field.to_str_list())
+
+    def _match(self, data_value):
+        return not self.prepared.isdisjoint(data_value)
 
 
 class NotEqualCondition(EqualCondition):
-    def _is_match(self, data_field):
-        return not super(NotEqualCondition, self)._is_match(data_field)
+    def _match(self, data_value):
+        return not super()._match(data_value)
 
 
 class IncludeCondition(SimpleCondition):
-    def _is_match(self, data_field):
-        data_value = data_field.to_str_list()
+    def _match(self, data_value):
         if not data_value:
             return False
         data_value = data_value[0]
-        cond_value = self.cond_field.to_str_list()
-        for v in cond_value:
+        for v in self.prepared:
             if v in data_value:
                 return True
         return False
 
 
 class ExcludeCondition(IncludeCondition):
-    def _is_match(self, data_field):
-        return not super(ExcludeCondition, self)._is_match(data_field)
+    def _match(self, data_value):
+        return not super()._match(data_value)
 
 
 class GreaterCondition(SimpleCondition):
-    def _is_match(self, data_field):
-        data_value = min(data_field.to_float_list())
-        cond_value = max(self.cond_field.to_float_list())
-        return data_value > cond_value
+    value_type = float
+
+    def prepare(self):
+        return max(self.cond_field.to_float_list())
+
+    def _match(self, data_value):
+        return min(data_value) > self.prepared
 
 
 class LesserOrEqualCondition(GreaterCondition):
-    def _is_match(self, data_field):
-        return not super(LesserOrEqualCondition, self)._is_match(data_field)
+    def _match(self, data_value):
+        return not super()._match(data_value)
 
 
 class LesserCondition(SimpleCondition):
-    def _is_match(self, data_field):
-        data_value = max(data_field.to_float_list())
-        cond_value = min(self.cond_field.to_float_list())
-        return data_value < cond_value
+    value_type = float
+
+    def prepare(self):
+        return min(self.cond_field.to_float_list())
+
+    def _match(self, data_value):
+        return max(data_value) < self.prepared
 
 
 class GreaterOrEqualCondition(LesserCondition):
-    def _is_match(self, data_field):
-        return not super(GreaterOrEqualCondition, self)._is_match(data_field)
+    def _match(self, data_value):
+        return not super()._match(data_value)
 
 
 class RegularCondition(SimpleCondition):
-    def _is_match(self, data_field):
-        data_value = data_field.to_str_list()
+    def prepare(self):
+        """
+        预编译正则，无效的正则记为 None，匹配到时视为不匹配
+        """
+        patterns = []
+        for v in self.cond_field.to_str_list():
+            try:
+                patterns.append(re.compile(str(v)))
+            except sre_constants.error:
+                patterns.append(None)
+                break
+        return tuple(patterns)
+
+    def _match(self, data_value):
         if not data_value:
             return False
         data_value = data_value[0]
-        cond_value = self.cond_field.to_str_list()
-        for v in cond_value:
-            try:
-                reg = re.compile(r"%s" % v)
-            except sre_constants.error:
+        for reg in self.prepared:
+            if reg is None:
                 return False
 
-            if reg.findall(data_value):
+            if reg.search(data_value):
                 return True
         return False
 
 
 class NotRegularCondition(RegularCondition):
-    def _is_match(self, data_field):
-        return not super(NotRegularCondition, self)._is_match(data_field)
+    def _match(self, data_value):
+        return not super()._match(data_value)
 
 
 class IsSuperSetCondition(SimpleCondition):
-    def _is_match(self, data_field):
-        data_value = data_field.to_str_list()
-        cond_value = self.cond_field.to_str_list()
-        return set(data_value).issuperset(set(cond_value))
+    def prepare(self):
+        return frozenset(self.cond_field.to_str_list())
+
+    def _match(self, data_value):
+        return self.prepared.issubset(data_value)
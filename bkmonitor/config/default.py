@@ -1530,6 +1530,99 @@ ENABLED_ACCESS_DATA_BATCH_PROCESS = False
 ACCESS_DATA_BATCH_PROCESS_SIZE = 50000
 ACCESS_DATA_BATCH_PROCESS_THRESHOLD = 0
 
+# access推送检测队列时是否使用二进制帧格式(detect同时兼容json与二进制帧)
+ENABLED_ACCESS_DATA_BINARY_QUEUE = False
+# 二进制帧单帧包含的最大数据点数
+ACCESS_DATA_FRAME_SIZE = 1000
+
+# access数据去重方式: set(整集合比对), batch(SMISMEMBER仅检查本次数据), bloom(布隆过滤器)
+ACCESS_DUPLICATE_BACKEND = "set"
+# bloom模式下单个时间点的最大预估数据量及误判率，位图按策略组实际数据量分档，不超过该容量
+ACCESS_DUPLICATE_BLOOM_CAPACITY = 100000
+ACCESS_DUPLICATE_BLOOM_ERROR_RATE = 0.001
+
+# trigger是否批量获取检测结果(一次lua脚本/pipeline调用获取所有异常点的检测窗口)
+ENABLED_TRIGGER_BATCH_CHECK = True
+# trigger批量获取检测结果时是否使用lua脚本在服务端汇总，关闭或redis不支持时使用pipeline
+ENABLED_TRIGGER_CHECK_RESULT_SCRIPT = True
+
+# 进程内策略缓存的最大策略数(0为不启用)，通过redis中的策略版本判断是否失效
+STRATEGY_LOCAL_CACHE_SIZE = 5000
+
+# access单个任务并发拉取的策略组数量(小于等于1时每个策略组一个任务)
+ACCESS_DATA_PARALLEL_GROUP_SIZE = 0
+# access并发拉取时各存储类型(数据源标签)的最大并发查询数
+ACCESS_DATA_STORAGE_CONCURRENCY = {"default": 8, "bk_data": 2, "bk_log_search": 2}
+
+# access分批任务数据是否使用二进制格式(zlib压缩的msgpack，分批任务同时兼容旧格式)
+ENABLED_ACCESS_BATCH_DATA_BINARY = False
+
+# detect流式检测每块原子弹出的数据条数(0为不启用，使用LRANGE一次性拉取)
+DETECT_STREAM_CHUNK_SIZE = 0
+# detect流式检测单次任务最多消费的数据条数(0为不限制)，超出后由下一次任务继续处理
+DETECT_STREAM_MAX_SIZE = 2000000
+# detect流式检测单次任务的最长消费时间(秒，0为不限制)，需小于detect策略锁的有效期(60s)
+DETECT_STREAM_TIME_LIMIT = 40
+
+# detect是否延迟渲染异常描述(仅在生成异常记录时渲染，组合算法中被丢弃的异常点不再渲染)
+DETECT_LAZY_ANOMALY_MESSAGE = False
+
+# ES文档(告警/事件/流水/处理记录)是否启用进程内批量写入缓冲，开启后文档异步合并写入
+ES_BULK_BUFFER_ENABLED = False
+# ES批量写入缓冲的提交阈值：文档数、字节数、最长等待秒数
+ES_BULK_BUFFER_MAX_SIZE = 500
+ES_BULK_BUFFER_MAX_BYTES = 5 * 1024 * 1024
+ES_BULK_BUFFER_FLUSH_INTERVAL = 1
+# ES批量写入缓冲提交失败(连接异常等)时的最大重试次数
+ES_BULK_BUFFER_MAX_RETRIES = 3
+
+# 图表查询是否启用查询结果缓存，已完成的历史时间桶缓存查询结果，刷新时仅查询尾部时间窗口
+GRAPH_QUERY_CACHE_ENABLED = False
+# 图表查询结果缓存的时间桶大小(查询周期的倍数)
+GRAPH_QUERY_CACHE_BUCKET_POINTS = 60
+# 图表查询结果缓存过期时间(秒)
+GRAPH_QUERY_CACHE_TIMEOUT = 60 * 60
+# 最近多长时间(秒)内的数据可能延迟上报，不进行缓存
+GRAPH_QUERY_CACHE_DELAY = 5 * 60
+# 单个时间桶超过该数据点数时不进行缓存
+GRAPH_QUERY_CACHE_MAX_POINTS = 50000
+
+# APM预计算聚合Trace的进程数(0为不启用多进程，使用线程池)
+APM_PRECALCULATE_PROCESS_NUM = 0
+# APM预计算多进程模式下，每个子任务包含的Trace数
+APM_PRECALCULATE_CHUNK_SIZE = 200
+
+# 告警管理是否启用用户修改字段(分派、确认、处理阶段等)缓存，开启后周期检测优先从缓存读取，不再每次查询ES
+ALERT_USER_FIELDS_CACHE_ENABLED = False
+# 用户修改字段缓存的对账窗口(秒)，窗口内ES可能尚未刷新，以缓存为准
+ALERT_USER_FIELDS_RECONCILE_WINDOW = 120
+# 用户修改字段缓存的抽样对账比例，被抽中的告警同时查询ES并校正缓存
+ALERT_USER_FIELDS_RECONCILE_RATIO = 0.01
+
+# access是否以维度存活索引推送无数据检测数据(仅记录各数据时间上报的维度)，替代推送完整数据的无数据待检测队列
+NO_DATA_LIVENESS_INDEX_ENABLED = False
+
+# 告警屏蔽匹配索引的最长刷新间隔(秒)，屏蔽配置变化时立即重建；动态分组等外部数据按该间隔刷新(0为不启用索引，逐条匹配)
+ALERT_SHIELD_INDEX_REFRESH_INTERVAL = 60
+
+# using_cache 缓存缺失时是否只由一个调用方执行函数(基于缓存锁)，其他调用方等待其回写缓存
+USING_CACHE_SINGLE_FLIGHT_ENABLED = False
+# using_cache 等待其他调用方回写缓存的最长时间(秒)，超时后自行执行函数
+USING_CACHE_SINGLE_FLIGHT_WAIT = 5
+# using_cache 缓存超时后仍可返回旧数据并在后台刷新的时长(秒)，缓存类型未单独配置时生效(0为不启用)
+USING_CACHE_STALE_TIMEOUT = 0
+
+# APIResource 共享连接池：每个Session缓存的host连接池数量及单个host连接池的最大连接数，Session创建时读取
+API_TRANSPORT_POOL_CONNECTIONS = 10
+API_TRANSPORT_POOL_MAXSIZE = 50
+# APIResource 是否合并进程内并发的相同请求及列表参数请求(仅对声明了 COALESCE_REQUESTS 的接口生效)
+API_REQUEST_COALESCING_ENABLED = False
+# 列表参数请求合并的等待窗口(秒)，首个请求等待该时长收集其他调用方的列表参数
+API_REQUEST_BATCH_WINDOW = 0.01
+
+# detect列式检测的最小数据点数，达到该数量时先整批计算候选异常点，再逐点生成异常信息(0为不限制)
+DETECT_VECTORIZED_MIN_POINTS = 1000
+
 # metadata请求es超时配置, 单位为秒，默认10秒
 # 格式: {default: 10, 集群域名: 20}
 METADATA_REQUEST_ES_TIMEOUT = {}
@@ -12,7 +12,6 @@ import abc
 import json
 import logging
 
-import requests
 from blueapps.account.conf import ConfFixture
 from blueapps.account.utils import load_backend
 from django.conf import settings
@@ -28,6 +27,8 @@ from bkmonitor.utils.request import get_request, get_request_tenant_id
 from bkmonitor.utils.user import make_userinfo
 from constants.common import DEFAULT_TENANT_ID
 from core.drf_resource.contrib.cache import CacheResource
+from core.drf_resource.contrib.coalesce import RequestBatcher, RequestCoalescer
+from core.drf_resource.contrib.transport import get_session, track_request
 from core.errors.api import BKAPIError
 from core.errors.iam import APIPermissionDeniedError
 from core.prometheus import metrics
@@ -42,6 +43,9 @@ __doc__ = """
 BK_USERNAME_FIELD = "bk_username"
 APIPermissionDeniedCodeList = ["9900403", "35999999"]
 
+request_coalescer = RequestCoalescer()
+request_batcher = RequestBatcher()
+
 
 def get_bk_login_ticket(request):
     """
@@ -81,6 +85,15 @@ class APIResource(CacheResource, metaclass=abc.ABCMeta):
 
     ignore_error_msg_list = []
 
+    # 是否合并进程内并发的相同请求(需同时开启 API_REQUEST_COALESCING_ENABLED)，仅适用于只读接口
+    COALESCE_REQUESTS = False
+    # 列表参数字段，配置后除该字段外参数相同的并发请求会合并列表参数，只发起一次请求
+    BATCH_FIELD = ""
+    # 返回列表中每项数据对应列表参数取值的字段，用于拆分合并请求的结果
+    BATCH_RESULT_FIELD = ""
+    # 单次请求的列表参数上限
+    BATCH_MAX_SIZE = 500
+
     @property
     @abc.abstractmethod
     def base_url(self):
@@ -138,7 +151,6 @@ class APIResource(CacheResource, metaclass=abc.ABCMeta):
             "method仅支持GET或POST或PUT或DELETE或PATCH"
         )
         self.method = self.method.upper()
-        self.session = requests.session()
         self.bk_tenant_id: str | None = None
 
     def request(self, request_data=None, **kwargs):
@@ -206,10 +218,75 @@ class APIResource(CacheResource, metaclass=abc.ABCMeta):
         headers["X-Bk-Tenant-Id"] = self._get_tenant_id()
         return headers
 
+    def get_coalesce_key(self, validated_request_data) -> tuple | None:
+        """
+        获取请求合并的标识，请求参数及调用身份均相同的请求才能合并，无法合并时返回None
+        """
+        try:
+            data = json.dumps(validated_request_data, sort_keys=True)
+        except (TypeError, ValueError):
+            # 文件等无法序列化的参数不合并
+            return None
+
+        request = get_request(peaceful=True)
+        return (
+            f"{self.__class__.__module__}.{self.__class__.__name__}",
+            self.method,
+            self.action,
+            data,
+            getattr(self, "bk_username", ""),
+            getattr(getattr(request, "user", None), "username", ""),
+            self.bk_tenant_id or get_request_tenant_id(peaceful=True) or "",
+            translation.get_language() or "",
+        )
+
+    def split_batch_result(self, result, values):
+        """
+        从合并请求的结果中拆分出列表参数对应的结果，子类可进行重写
+        """
+        if not isinstance(result, list):
+            return result
+        values = {str(value) for value in values}
+        return [item for item in result if str(item.get(self.BATCH_RESULT_FIELD)) in values]
+
     def perform_request(self, validated_request_data):
         """
-        发起http请求
+        发起http请求，开启请求合并时，进程内并发的相同请求只发起一次
         """
+        if (
+            not self.COALESCE_REQUESTS
+            or not settings.API_REQUEST_COALESCING_ENABLED
+            or getattr(self, "IS_STREAM", False)
+        ):
+            return self._perform_request(validated_request_data)
+
+        batch_values = validated_request_data.get(self.BATCH_FIELD) if self.BATCH_FIELD else None
+        if isinstance(batch_values, (list, tuple)) and self.BATCH_RESULT_FIELD:
+            params = {k: v for k, v in validated_request_data.items() if k != self.BATCH_FIELD}
+            key = self.get_coalesce_key(params)
+            if key is not None:
+                result, merged = request_batcher.do(
+                    key,
+                    list(batch_values),
+                    func=lambda values: self._perform_request({**params, self.BATCH_FIELD: values}),
+                    split=self.split_batch_result,
+                    window=settings.API_REQUEST_BATCH_WINDOW,
+                    max_size=self.BATCH_MAX_SIZE,
+                )
+                if merged:
+                    self.report_api_coalesced_metric("batched")
+                return result
+
+        key = self.get_coalesce_key(validated_request_data)
+        if key is None:
+            return self._perform_request(validated_request_data)
+
+        result, merged = request_coalescer.do(key, lambda: self._perform_request(validated_request_data))
+        if merged:
+            self.report_api_coalesced_metric("merged")
+        return result
+
+    def _perform_request(self, validated_request_data):
         validated_request_data = dict(validated_request_data)
 
         # 获取租户ID
@@ -254,14 +331,16 @@ class APIResource(CacheResource, metaclass=abc.ABCMeta):
                 if "method" in kwargs:
                     del kwargs["method"]
 
-                result = self.session.get(
-                    url=request_url,
-                    params=validated_request_data,
-                    headers=headers,
-                    verify=False,
-                    timeout=validated_request_data.get("timeout") or self.TIMEOUT,
-                    stream=is_stream,
-                )
+                self.report_api_upstream_metric()
+                with track_request(request_url):
+                    result = get_session(request_url).get(
+                        url=request_url,
+                        params=validated_request_data,
+                        headers=headers,
+                        verify=False,
+                        timeout=validated_request_data.get("timeout") or self.TIMEOUT,
+                        stream=is_stream,
+                    )
             else:
                 non_file_data, file_data = self.split_request_data(validated_request_data)
 
@@ -274,7 +353,9 @@ class APIResource(CacheResource, metaclass=abc.ABCMeta):
                     kwargs["data"] = non_file_data
 
                 kwargs = self.before_request(kwargs)
-                result = self.session.request(**kwargs)
+                self.report_api_upstream_metric()
+                with track_request(kwargs["url"]):
+                    result = get_session(kwargs["url"]).request(**kwargs)
         except ReadTimeout as error:
             # 上报API调用失败统计指标
             self.report_api_failure_metric(error_code=getattr(error, "code", 0), exception_type=type(error).__name__)
@@ -365,6 +446,21 @@ class APIResource(CacheResource, metaclass=abc.ABCMeta):
         except Exception as err:  # pylint: disable=broad-except
             logger.exception(f"APIResource: Failed to report api_failed_requests metrics,error:{err}")
 
+    def report_api_upstream_metric(self):
+        """
+        上报实际发起的上游请求次数
+        """
+        metrics.API_UPSTREAM_REQUESTS_TOTAL.labels(action=self.action, module=self.module_name).inc()
+
+    def report_api_coalesced_metric(self, coalesce_type):
+        """
+        上报被合并而未发起的请求次数
+        @param coalesce_type: merged(相同请求共享结果) / batched(列表参数合并)
+        """
+        metrics.API_COALESCED_REQUESTS_TOTAL.labels(
+            action=self.action, module=self.module_name, type=coalesce_type
+        ).inc()
+
     def report_api_request_count_metric(self, code):
         """
         上报API调用指标，统计返回状态码，现阶段具体实现下沉在各个API Module的render_response_data方法中
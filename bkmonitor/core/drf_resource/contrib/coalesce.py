@@ -0,0 +1,167 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+
+APIResource 请求合并
+
+后台模块常在多个线程中逐个调用同一个接口，这里在进程内合并并发的请求：
+1. RequestCoalescer: 相同的请求进行中时，其他调用方等待并共享其结果，不再重复请求
+2. RequestBatcher: 除列表参数外相同的请求，在很短的窗口内合并列表参数，只发起一次请求
+结果被多个调用方共享时，各调用方拿到的是相互独立的副本
+"""
+
+import copy
+import threading
+from collections.abc import Callable, Hashable
+from typing import Any
+
+
+class _Call:
+    """
+    一次被合并的请求
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        # 共享该请求结果的其他调用方数量
+        self.waiters = 0
+
+    def run(self, func: Callable[[], Any]) -> Any:
+        try:
+            self.result = func()
+        except BaseException as e:
+            self.error = e
+            raise
+        finally:
+            self.event.set()
+        return self.result
+
+    def wait(self) -> Any:
+        self.event.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class RequestCoalescer:
+    """
+    相同请求的单飞执行
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> tuple[Any, bool]:
+        """
+        执行请求，返回 (结果, 是否共享了其他调用方的请求)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not is_leader:
+            return copy.deepcopy(call.wait()), True
+
+        try:
+            result = call.run(func)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+        # 移出后不会再有新的等待方，此时的等待方数量是确定的
+        if call.waiters:
+            result = copy.deepcopy(result)
+        return result, False
+
+
+class _Batch(_Call):
+    """
+    一批被合并的请求
+    """
+
+    def __init__(self):
+        super().__init__()
+        # 合并后的列表参数，保持调用方传入的顺序
+        self.values: list = []
+        self._value_set: set = set()
+        # 批次已满或已超出等待窗口，不再接收新的调用方
+        self.closed = threading.Event()
+
+    def add(self, values: list):
+        for value in values:
+            if value not in self._value_set:
+                self._value_set.add(value)
+                self.values.append(value)
+
+
+class RequestBatcher:
+    """
+    列表参数请求的微批合并
+    第一个调用方等待一个很短的窗口，期间相同批次的调用方将列表参数并入该批次，由第一个调用方发起请求
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._batches: dict[Hashable, _Batch] = {}
+
+    def _close(self, key: Hashable, batch: _Batch):
+        if self._batches.get(key) is batch:
+            del self._batches[key]
+        batch.closed.set()
+
+    def do(
+        self,
+        key: Hashable,
+        values: list,
+        func: Callable[[list], Any],
+        split: Callable[[Any, list], Any],
+        window: float,
+        max_size: int,
+    ) -> tuple[Any, bool]:
+        """
+        执行请求，返回 (结果, 是否并入了其他调用方发起的请求)
+        :param func: 以合并后的列表参数发起请求
+        :param split: 从合并请求的结果中拆分出调用方自身列表参数对应的结果
+        :param window: 等待其他调用方并入的时长(秒)
+        :param max_size: 单次请求的列表参数上限
+        """
+        with self._lock:
+            batch = self._batches.get(key)
+            if batch is not None and len(batch.values) + len(values) > max_size:
+                # 并入后超过单次请求上限，当前批次立即发起请求
+                self._close(key, batch)
+                batch = None
+
+            is_leader = batch is None
+            if is_leader:
+                batch = self._batches[key] = _Batch()
+            else:
+                batch.waiters += 1
+
+            batch.add(values)
+            if len(batch.values) >= max_size:
+                self._close(key, batch)
+
+        if not is_leader:
+            return copy.deepcopy(split(batch.wait(), values)), True
+
+        batch.closed.wait(window)
+        with self._lock:
+            self._close(key, batch)
+
+        result = batch.run(lambda: func(list(batch.values)))
+        if not batch.waiters:
+            return result, False
+        return copy.deepcopy(split(result, values)), False
@@ -0,0 +1,93 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+
+APIResource 共享的 http 连接池
+
+每个 APIResource 实例各自持有 requests.Session 时，长连接只能在实例内部复用。
+这里按 scheme + host 在进程内共享 Session，并挂载可配置大小的连接池，所有 APIResource 子类复用同一组长连接。
+连接池大小在 Session 创建时读取，调整后对新进程生效。
+"""
+
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from core.prometheus import metrics
+
+# scheme://host -> 共享的 Session
+_sessions: dict[str, requests.Session] = {}
+# scheme://host -> 正在进行的请求数
+_in_flight: dict[str, int] = defaultdict(int)
+_lock = threading.Lock()
+
+
+def get_host(url: str) -> str:
+    """
+    获取url对应的连接池标识
+    """
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def create_session() -> requests.Session:
+    session = requests.Session()
+    # 共享的 Session 会被不同用户的请求使用，不保存响应中的 cookie，避免串用
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = HTTPAdapter(
+        pool_connections=settings.API_TRANSPORT_POOL_CONNECTIONS,
+        pool_maxsize=settings.API_TRANSPORT_POOL_MAXSIZE,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session(url: str) -> requests.Session:
+    """
+    获取url所在host共享的 Session
+    """
+    host = get_host(url)
+    session = _sessions.get(host)
+    if session is not None:
+        return session
+
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = _sessions[host] = create_session()
+    return session
+
+
+@contextmanager
+def track_request(url: str):
+    """
+    记录host正在进行的请求数，超过连接池大小时上报连接池饱和
+    连接池不阻塞等待，超出部分的连接在请求结束后直接关闭，无法复用
+    """
+    host = get_host(url)
+    with _lock:
+        _in_flight[host] += 1
+        in_flight = _in_flight[host]
+        metrics.API_TRANSPORT_IN_FLIGHT.labels(host=host).set(in_flight)
+
+    if in_flight > settings.API_TRANSPORT_POOL_MAXSIZE:
+        metrics.API_TRANSPORT_POOL_SATURATED_TOTAL.labels(host=host).inc()
+
+    try:
+        yield
+    finally:
+        with _lock:
+            _in_flight[host] -= 1
+            metrics.API_TRANSPORT_IN_FLIGHT.labels(host=host).set(_in_flight[host])
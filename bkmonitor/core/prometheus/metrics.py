@@ -144,6 +144,12 @@ DATASOURCE_QUERY_COUNT = Counter(
     labelnames=("data_source_label", "data_type_label", "role", "result_table", "api", "status", "exception"),
 )
 
+GRAPH_QUERY_CACHE_COUNT = Counter(
+    name="bkmonitor_graph_query_cache_count",
+    documentation="图表查询结果缓存命中次数",
+    labelnames=("result",),
+)
+
 # access
 ACCESS_DATA_PROCESS_TIME = Histogram(
     name="bkmonitor_access_data_process_time",
@@ -163,6 +169,24 @@ ACCESS_DATA_PROCESS_PULL_DATA_COUNT = Counter(
     labelnames=("strategy_group_key",),
 )
 
+ACCESS_DATA_BATCH_RSS = Histogram(
+    name="bkmonitor_access_data_batch_rss",
+    documentation="access(data) 模块分批发送数据时进程常驻内存(MB)",
+    buckets=(128, 256, 512, 1024, 2048, 4096, 8192, INF),
+)
+
+ACCESS_DATA_QUERY_QUEUE_TIME = Histogram(
+    name="bkmonitor_access_data_query_queue_time",
+    documentation="access(data) 模块并发拉取时查询排队耗时",
+    labelnames=("storage",),
+)
+
+ACCESS_DATA_QUERY_TIME = Histogram(
+    name="bkmonitor_access_data_query_time",
+    documentation="access(data) 模块并发拉取时查询耗时",
+    labelnames=("storage",),
+)
+
 ACCESS_EVENT_PROCESS_TIME = Histogram(
     name="bkmonitor_access_event_process_time",
     documentation="access(event) 模块处理耗时",
@@ -187,6 +211,24 @@ ACCESS_PROCESS_PUSH_DATA_COUNT = Counter(
     labelnames=("strategy_id", "type"),
 )
 
+ACCESS_PROCESS_PUSH_DATA_BYTES = Counter(
+    name="bkmonitor_access_process_push_data_bytes",
+    documentation="access 模块数据推送字节数",
+    labelnames=("strategy_id", "format"),
+)
+
+ACCESS_DUPLICATE_COUNT = Counter(
+    name="bkmonitor_access_duplicate_count",
+    documentation="access 模块数据去重检查次数",
+    labelnames=("backend", "result"),
+)
+
+ACCESS_DUPLICATE_TRANSFER_BYTES = Counter(
+    name="bkmonitor_access_duplicate_transfer_bytes",
+    documentation="access 模块数据去重与 redis 交互字节数",
+    labelnames=("backend",),
+)
+
 ACCESS_TOKEN_FORBIDDEN_COUNT = Counter(
     name="bkmonitor_access_token_forbidden_count",
     documentation="access 流控限制次数",
@@ -380,6 +422,86 @@ ALERT_MANAGE_PUSH_DATA_COUNT = Counter(
     labelnames=("strategy_id", "signal"),
 )
 
+ALERT_USER_FIELDS_READ_COUNT = Counter(
+    name="bkmonitor_alert_user_fields_read_count",
+    documentation="alert(manager) 模块用户修改字段读取次数",
+    labelnames=("source",),
+)
+
+ALERT_USER_FIELDS_STALE_COUNT = Counter(
+    name="bkmonitor_alert_user_fields_stale_count",
+    documentation="alert(manager) 模块用户修改字段缓存与ES不一致次数",
+    labelnames=("field",),
+)
+
+ALERT_SHIELD_MATCH_TIME = Histogram(
+    name="bkmonitor_alert_shield_match_time",
+    documentation="告警屏蔽配置匹配耗时",
+    labelnames=("mode",),
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, INF),
+)
+
+USING_CACHE_REQUEST_COUNT = Counter(
+    name="bkmonitor_using_cache_request_count",
+    documentation="using_cache 缓存请求次数",
+    labelnames=("cache_type", "status"),
+)
+
+USING_CACHE_LOCK_ERROR_COUNT = Counter(
+    name="bkmonitor_using_cache_lock_error_count",
+    documentation="using_cache 获取刷新锁报错次数(报错时跳过并发控制直接刷新)",
+    labelnames=("cache_type",),
+)
+
+API_UPSTREAM_REQUESTS_TOTAL = Counter(
+    name="bkmonitor_api_upstream_requests_total",
+    documentation="三方API实际发起的请求次数",
+    labelnames=("action", "module"),
+)
+
+API_COALESCED_REQUESTS_TOTAL = Counter(
+    name="bkmonitor_api_coalesced_requests_total",
+    documentation="三方API被合并而未发起的请求次数",
+    labelnames=("action", "module", "type"),
+)
+
+API_TRANSPORT_IN_FLIGHT = Gauge(
+    name="bkmonitor_api_transport_in_flight",
+    documentation="三方API共享连接池正在进行的请求数",
+    labelnames=("host",),
+)
+
+API_TRANSPORT_POOL_SATURATED_TOTAL = Counter(
+    name="bkmonitor_api_transport_pool_saturated_total",
+    documentation="三方API共享连接池饱和(并发请求数超过连接池大小)次数",
+    labelnames=("host",),
+)
+
+ES_BULK_BUFFER_BATCH_SIZE = Histogram(
+    name="bkmonitor_es_bulk_buffer_batch_size",
+    documentation="ES 批量写入缓冲单次提交的文档数",
+    labelnames=("document",),
+    buckets=(1, 10, 50, 100, 200, 500, 1000, 2000, 5000, INF),
+)
+
+ES_BULK_BUFFER_FLUSH_LATENCY = Histogram(
+    name="bkmonitor_es_bulk_buffer_flush_latency",
+    documentation="ES 批量写入缓冲单次提交耗时",
+    labelnames=("document", "status"),
+)
+
+ES_BULK_BUFFER_ACTION_COUNT = Counter(
+    name="bkmonitor_es_bulk_buffer_action_count",
+    documentation="ES 批量写入缓冲处理的文档数",
+    labelnames=("document", "result"),
+)
+
+ES_BULK_BUFFER_SEND_FAILED_COUNT = Counter(
+    name="bkmonitor_es_bulk_buffer_send_failed_count",
+    documentation="ES 批量写入缓冲提交失败次数",
+    labelnames=("document", "reason"),
+)
+
 ALERT_QOS_COUNT = Counter(
     name="bkmonitor_alert_qos_count",
     documentation="composite 模块动作推送条数",
@@ -511,6 +633,17 @@ ALARM_CACHE_TASK_TIME = Histogram(
     buckets=(1, 3, 5, 10, 30, 60, 300, INF),
 )
 
+STRATEGY_LOCAL_CACHE_COUNT = Counter(
+    name="bkmonitor_strategy_local_cache_count",
+    documentation="进程内策略缓存读取次数",
+    labelnames=("result",),
+)
+
+STRATEGY_LOCAL_CACHE_BYTES = Gauge(
+    name="bkmonitor_strategy_local_cache_bytes",
+    documentation="进程内策略缓存占用字节数",
+)
+
 # mail report
 MAIL_REPORT_SEND_LATENCY = Histogram(
     name="bkmonitor_mail_report_send_latency",
@@ -1202,6 +1335,35 @@ METADATA_DATA_LINK_ACCESS_TOTAL = Counter(
     labelnames=("version", "biz_id", "strategy", "status"),
 )
 
+METADATA_SPACE_ROUTER_PUSH_SPACE_TOTAL = Counter(
+    name="bkmonitor_metadata_space_router_push_space_total",
+    documentation="空间路由批量推送的空间数",
+    labelnames=("status",),
+)
+
+METADATA_SPACE_ROUTER_PUSH_DB_ROWS_TOTAL = Counter(
+    name="bkmonitor_metadata_space_router_push_db_rows_total",
+    documentation="空间路由批量推送读取的数据库行数",
+)
+
+METADATA_SPACE_ROUTER_PUSH_COST_SECONDS = Histogram(
+    name="bkmonitor_metadata_space_router_push_cost_seconds",
+    documentation="空间路由批量推送耗时",
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800, INF),
+)
+
+APM_PRECALCULATE_TRACE_COUNT = Counter(
+    name="bkmonitor_apm_precalculate_trace_count",
+    documentation="APM预计算处理的Trace数",
+    labelnames=("bk_biz_id", "app_name", "mode"),
+)
+
+APM_PRECALCULATE_TRACES_PER_CORE_SECOND = Gauge(
+    name="bkmonitor_apm_precalculate_traces_per_core_second",
+    documentation="APM预计算单核每秒处理的Trace数",
+    labelnames=("bk_biz_id", "app_name", "mode"),
+)
+
 API_REQUESTS_TOTAL = Counter(
     name="bkmonitor_api_requests_total",
     documentation="三方APi调用统计",
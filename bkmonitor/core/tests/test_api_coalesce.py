@@ -0,0 +1,169 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import threading
+from unittest import mock
+
+import pytest
+from django.conf import settings
+
+from core.drf_resource.contrib import api as api_module
+from core.drf_resource.contrib import transport
+from core.drf_resource.contrib.api import APIResource
+from core.drf_resource.contrib.coalesce import RequestBatcher, RequestCoalescer
+
+
+def run_concurrently(func, args_list):
+    results = [None] * len(args_list)
+
+    def target(index, args):
+        results[index] = func(*args)
+
+    threads = [threading.Thread(target=target, args=(index, args)) for index, args in enumerate(args_list)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestRequestCoalescer:
+    def test_merge(self):
+        coalescer = RequestCoalescer()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def func():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return {"value": 1}
+
+        leader = threading.Thread(target=coalescer.do, args=("key", func))
+        leader.start()
+        started.wait()
+
+        follower_results = []
+        follower = threading.Thread(target=lambda: follower_results.append(coalescer.do("key", func)))
+        follower.start()
+        # 等待跟随方加入后再完成请求
+        while not coalescer._calls["key"].waiters:
+            pass
+        release.set()
+        leader.join()
+        follower.join()
+
+        assert len(calls) == 1
+        result, merged = follower_results[0]
+        assert result == {"value": 1} and merged
+        # 请求结束后不再合并
+        assert coalescer.do("key", lambda: 2) == (2, False)
+
+    def test_error(self):
+        coalescer = RequestCoalescer()
+        with pytest.raises(ValueError):
+            coalescer.do("key", mock.MagicMock(side_effect=ValueError))
+        assert not coalescer._calls
+
+
+class TestRequestBatcher:
+    @staticmethod
+    def split(result, values):
+        return [item for item in result if item["id"] in values]
+
+    def test_batch(self):
+        batcher = RequestBatcher()
+        func = mock.MagicMock(side_effect=lambda values: [{"id": value} for value in values])
+        results = run_concurrently(
+            lambda values: batcher.do("key", values, func, self.split, window=0.5, max_size=10),
+            [([1, 2],), ([2, 3],), ([4],)],
+        )
+
+        func.assert_called_once()
+        assert sorted(func.call_args[0][0]) == [1, 2, 3, 4]
+        assert sorted([item["id"] for item in result] for result, _ in results) == [[1, 2], [2, 3], [4]]
+        assert sorted(merged for _, merged in results) == [False, True, True]
+
+    def test_max_size(self):
+        batcher = RequestBatcher()
+        func = mock.MagicMock(side_effect=lambda values: [{"id": value} for value in values])
+        results = run_concurrently(
+            lambda values: batcher.do("key", values, func, self.split, window=0.5, max_size=2),
+            [([1, 2],), ([3, 4],)],
+        )
+
+        # 超过单次请求上限时分批请求
+        assert sorted(sorted(call[0][0]) for call in func.call_args_list) == [[1, 2], [3, 4]]
+        assert sorted([item["id"] for item in result] for result, _ in results) == [[1, 2], [3, 4]]
+
+
+class HostRelationResource(APIResource):
+    base_url = "http://cmdb.example.com/api/"
+    module_name = "cmdb"
+    action = "find_host_biz_relations/"
+    method = "POST"
+    INSERT_BK_USERNAME_TO_REQUEST_DATA = False
+
+    COALESCE_REQUESTS = True
+    BATCH_FIELD = "bk_host_id"
+    BATCH_RESULT_FIELD = "bk_host_id"
+
+    def get_headers(self):
+        return {}
+
+
+@pytest.fixture
+def session():
+    session = mock.MagicMock()
+
+    def request(**kwargs):
+        response = mock.MagicMock()
+        response.json.return_value = {
+            "result": True,
+            "code": 0,
+            "data": [{"bk_host_id": host_id, "bk_biz_id": 2} for host_id in kwargs["json"]["bk_host_id"]],
+        }
+        return response
+
+    session.request.side_effect = request
+    with (
+        mock.patch.object(api_module, "get_session", return_value=session),
+        mock.patch.object(settings, "API_REQUEST_COALESCING_ENABLED", True),
+        mock.patch.object(settings, "API_REQUEST_BATCH_WINDOW", 0.5),
+    ):
+        yield session
+
+
+class TestAPIResourceCoalesce:
+    def test_batch(self, session):
+        resource = HostRelationResource()
+        results = run_concurrently(resource.perform_request, [({"bk_host_id": [1, 2]},), ({"bk_host_id": [3]},)])
+
+        session.request.assert_called_once()
+        assert session.request.call_args[1]["json"]["bk_host_id"] in ([1, 2, 3], [3, 1, 2])
+        assert results == [
+            [{"bk_host_id": 1, "bk_biz_id": 2}, {"bk_host_id": 2, "bk_biz_id": 2}],
+            [{"bk_host_id": 3, "bk_biz_id": 2}],
+        ]
+
+    def test_disabled(self, session):
+        resource = HostRelationResource()
+        with mock.patch.object(settings, "API_REQUEST_COALESCING_ENABLED", False):
+            run_concurrently(resource.perform_request, [({"bk_host_id": [1]},), ({"bk_host_id": [2]},)])
+        assert session.request.call_count == 2
+
+
+def test_get_session():
+    transport._sessions.clear()
+    session = transport.get_session("http://cmdb.example.com/api/a/")
+    assert transport.get_session("http://cmdb.example.com/api/b/") is session
+    assert transport.get_session("https://cmdb.example.com/api/a/") is not session
+    assert session.get_adapter("http://cmdb.example.com/")._pool_maxsize == settings.API_TRANSPORT_POOL_MAXSIZE
@@ -9,15 +9,22 @@ specific language governing permissions and limitations under the License.
 """
 
 import datetime
+import hashlib
 import itertools
 import json
 import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
 
 from django.conf import settings
+from django.db import connections, router
 from django.db.models import Q
 from django.utils.timezone import now as tz_now
 
 from constants.common import DEFAULT_TENANT_ID
+from core.prometheus import metrics
 from metadata import models
 from metadata.models.constants import DEFAULT_MEASUREMENT
 from metadata.models.space import utils
@@ -65,17 +72,129 @@ class SpaceTableIDRedis:
     多租户环境下,不允许跨租户推送路由,即每次操作的目标数据,必须是同一租户下的,不能跨租户
     """
 
-    def push_space_table_ids(self, space_type: str, space_id: str, is_publish: bool | None = False):
+    # 批量推送上下文，线程内有效
+    _batch = threading.local()
+
+    @contextmanager
+    def batch_query(self):
         """
-        推送空间及对应的结果表和过滤条件
-        多租户环境下,需要统一在table_id后拼接租户ID
+        批量推送上下文
+        上下文内与具体空间无关的数据只查询一次，在多个空间之间复用；支持嵌套，以最外层为准
         """
-        logger.info("start to push space table_id data, space_type: %s, space_id: %s", space_type, space_id)
-        # NOTE: 为防止 space_id 传递非字符串，转换一次
-        space_id = str(space_id)
+        if self._in_batch():
+            yield
+            return
 
-        space = models.Space.objects.get(space_type_id=space_type, space_id=space_id)
-        bk_tenant_id = space.bk_tenant_id
+        self._batch.cache = {}
+        try:
+            yield
+        finally:
+            self._batch.cache = None
+
+    def _in_batch(self) -> bool:
+        return getattr(self._batch, "cache", None) is not None
+
+    def _batch_cached(self, key: tuple, func):
+        """批量推送上下文内缓存查询结果，上下文外直接查询"""
+        if not self._in_batch():
+            return func()
+
+        cache = self._batch.cache
+        if key not in cache:
+            cache[key] = func()
+        return cache[key]
+
+    @contextmanager
+    def _record_db_reads(self, stats: dict):
+        """统计当前线程的查询次数及读取的行数"""
+
+        def wrapper(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            stats["queries"] += 1
+            stats["rows"] += max(context["cursor"].rowcount, 0)
+            return result
+
+        with connections[router.db_for_read(models.Space)].execute_wrapper(wrapper):
+            yield
+
+    @staticmethod
+    def get_space_redis_key(space_type: str, space_id: str, bk_tenant_id: str) -> str:
+        """组装空间路由的 redis field"""
+        if settings.ENABLE_MULTI_TENANT_MODE:
+            return f"{space_type}__{space_id}|{bk_tenant_id}"
+        return f"{space_type}__{space_id}"
+
+    @staticmethod
+    def _get_values_md5(values: dict) -> str:
+        """计算路由内容的摘要，与结果表的顺序无关"""
+        return hashlib.md5(json.dumps(values, sort_keys=True).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def _get_stored_values_md5(cls, stored_value: str | bytes | None) -> str | None:
+        """计算 redis 中已有路由内容的摘要，路由不存在或无法解析时返回 None"""
+        if not stored_value:
+            return None
+        try:
+            return cls._get_values_md5(json.loads(stored_value))
+        except ValueError:
+            return None
+
+    def _get_space(self, space_type: str, space_id: str) -> models.Space | None:
+        """获取空间，批量推送上下文内复用已加载的空间"""
+
+        def get_space():
+            try:
+                return models.Space.objects.get(space_type_id=space_type, space_id=space_id)
+            except models.Space.DoesNotExist:
+                return None
+
+        return self._batch_cached(("space", space_type, space_id), get_space)
+
+    def _get_biz_id_by_space(self, space_type: str, space_id: str) -> int | None:
+        """通过空间类型和空间ID获取业务ID，与 SpaceManager.get_biz_id_by_space 一致"""
+        space = self._get_space(space_type, space_id)
+        if space is None:
+            return None
+        if space_type == SpaceTypes.BKCC.value:
+            return int(space.space_id)
+        # 非bkcc空间类型，返回负值
+        return -space.id
+
+    def _load_spaces(self, spaces: list[models.Space | dict]) -> list[models.Space]:
+        """
+        将空间参数统一为 Space 实例，字典参数按空间类型批量查询
+        批量推送上下文内，加载的空间会预置到缓存中，避免后续逐个查询
+        """
+        space_ids_by_type = defaultdict(set)
+        for space in spaces:
+            if not isinstance(space, models.Space):
+                space_ids_by_type[space["space_type_id"]].add(str(space["space_id"]))
+
+        space_objs = {}
+        for space_type, space_ids in space_ids_by_type.items():
+            for space in filter_query_set_by_in_page(
+                query_set=models.Space.objects.filter(space_type_id=space_type),
+                field_op="space_id__in",
+                filter_data=list(space_ids),
+            ):
+                space_objs[(space.space_type_id, space.space_id)] = space
+
+        result = []
+        for space in spaces:
+            if not isinstance(space, models.Space):
+                space_key = (space["space_type_id"], str(space["space_id"]))
+                if space_key not in space_objs:
+                    logger.error("space_type: %s, space_id: %s not found", *space_key)
+                    continue
+                space = space_objs[space_key]
+            result.append(space)
+            if self._in_batch():
+                self._batch.cache[("space", space.space_type_id, space.space_id)] = space
+        return result
+
+    def _compose_space_values(self, space: models.Space) -> dict[str, dict]:
+        """组装空间的路由数据"""
+        space_type = space.space_type_id
 
         # 过滤空间关联的数据源信息
         if space_type == SpaceTypes.BKCC.value:
@@ -86,19 +205,26 @@ class SpaceTableIDRedis:
         elif space_type == SpaceTypes.BKSAAS.value:
             redis_values = self._compose_bksaas_space_table_ids(space)
         else:
-            logger.error("not found space_type: %s, space_id: %s", space_type, space_id)
+            logger.error("not found space_type: %s, space_id: %s", space_type, space.space_id)
             raise ValueError("not found space type")
 
         # 二段式校验&补充
-        values_to_redis = {}
-        for key, value in redis_values.items():
-            values_to_redis[reformat_table_id(key)] = value
+        return {reformat_table_id(key): value for key, value in redis_values.items()}
+
+    def push_space_table_ids(self, space_type: str, space_id: str, is_publish: bool | None = False):
+        """
+        推送空间及对应的结果表和过滤条件
+        多租户环境下,需要统一在table_id后拼接租户ID
+        """
+        logger.info("start to push space table_id data, space_type: %s, space_id: %s", space_type, space_id)
+        # NOTE: 为防止 space_id 传递非字符串，转换一次
+        space_id = str(space_id)
+
+        space = models.Space.objects.get(space_type_id=space_type, space_id=space_id)
+        values_to_redis = self._compose_space_values(space)
 
         # 组装redis key
-        if settings.ENABLE_MULTI_TENANT_MODE:
-            space_redis_key = f"{space_type}__{space_id}|{bk_tenant_id}"
-        else:
-            space_redis_key = f"{space_type}__{space_id}"
+        space_redis_key = self.get_space_redis_key(space_type, space_id, space.bk_tenant_id)
 
         # 推送数据
         if values_to_redis:
@@ -115,23 +241,86 @@ class SpaceTableIDRedis:
             RedisTools.publish(SPACE_TO_RESULT_TABLE_CHANNEL, [space_redis_key])
         logger.info("push space table_id data successfully, space_type: %s, space_id: %s", space_type, space_id)
 
-    def push_multi_space_table_ids(self, spaces: list[models.Space], is_publish: bool | None = False) -> None:
+    def push_multi_space_table_ids(
+        self,
+        spaces: list[models.Space | dict],
+        is_publish: bool | None = False,
+        force: bool | None = False,
+    ) -> list[str]:
         """
         批量推送空间数据
+        1. 与具体空间无关的数据只查询一次，在空间之间复用
+        2. 与 redis 中实际的路由内容比对摘要，仅写入和通知路由有变化的空间，路由被外部修改或删除时同样会重新写入
+        3. 分批并发调用时，由调用方在全部批次完成后统一上报指标
+
+        :param spaces: 空间列表，元素为 Space 实例，或包含 space_type_id、space_id 的字典
+        :param is_publish: 是否通知使用方
+        :param force: 是否忽略摘要比对，写入全部空间
+        :return: 路由有变化的空间 redis key
         """
+        start_time = time.time()
+        stats = {"queries": 0, "rows": 0}
+        failed_count = 0
+
+        space_values = {}
+        with self.batch_query(), self._record_db_reads(stats):
+            for space in self._load_spaces(spaces):
+                try:
+                    values = self._compose_space_values(space)
+                except Exception as e:  # pylint: disable=broad-except
+                    failed_count += 1
+                    logger.exception(
+                        "push_multi_space_table_ids: compose space_type->[%s], space_id->[%s] error: %s",
+                        space.space_type_id,
+                        space.space_id,
+                        e,
+                    )
+                    continue
+                # 路由为空时不推送，与单个空间推送保持一致
+                if values:
+                    space_redis_key = self.get_space_redis_key(space.space_type_id, space.space_id, space.bk_tenant_id)
+                    space_values[space_redis_key] = values
+
+        # 与 redis 中已有的路由比对，过滤掉未变化的空间
+        changed_keys = list(space_values)
+        if changed_keys and not force:
+            stored_values = RedisTools.hmget(SPACE_TO_RESULT_TABLE_KEY, changed_keys)
+            changed_keys = [
+                key
+                for key, stored_value in zip(changed_keys, stored_values)
+                if self._get_stored_values_md5(stored_value) != self._get_values_md5(space_values[key])
+            ]
+
         # 推送数据
-        for space in spaces:
-            self.push_space_table_ids(space.space_type_id, space.space_id, is_publish=False)
+        if changed_keys:
+            RedisTools.hmset_to_redis(
+                SPACE_TO_RESULT_TABLE_KEY, {key: json.dumps(space_values[key]) for key in changed_keys}
+            )
 
-        # 通知使用方
-        if is_publish:
-            push_redis_keys = []
-            for space in spaces:
-                if settings.ENABLE_MULTI_TENANT_MODE:
-                    push_redis_keys.append(f"{space.space_type_id}__{space.space_id}|{space.bk_tenant_id}")
-                else:
-                    push_redis_keys.append(f"{space.space_type_id}__{space.space_id}")
-            RedisTools.publish(SPACE_TO_RESULT_TABLE_CHANNEL, push_redis_keys)
+            # 通知使用方
+            if is_publish:
+                RedisTools.publish(SPACE_TO_RESULT_TABLE_CHANNEL, changed_keys)
+
+        cost = time.time() - start_time
+        logger.info(
+            "push_multi_space_table_ids: spaces->[%s], changed->[%s], failed->[%s], queries->[%s], rows->[%s], "
+            "cost->[%.3fs]",
+            len(spaces),
+            len(changed_keys),
+            failed_count,
+            stats["queries"],
+            stats["rows"],
+            cost,
+        )
+        metrics.METADATA_SPACE_ROUTER_PUSH_SPACE_TOTAL.labels(status="changed").inc(len(changed_keys))
+        metrics.METADATA_SPACE_ROUTER_PUSH_SPACE_TOTAL.labels(status="unchanged").inc(
+            len(space_values) - len(changed_keys)
+        )
+        metrics.METADATA_SPACE_ROUTER_PUSH_SPACE_TOTAL.labels(status="failed").inc(failed_count)
+        metrics.METADATA_SPACE_ROUTER_PUSH_DB_ROWS_TOTAL.inc(stats["rows"])
+        metrics.METADATA_SPACE_ROUTER_PUSH_COST_SECONDS.observe(cost)
+
+        return changed_keys
 
     def push_data_label_table_ids(
         self,
@@ -905,15 +1094,20 @@ class SpaceTableIDRedis:
         if not obj:
             logger.error("space: %s__%s, resource_type: %s not found", space_type, space_id, resource_type)
             return {}
+
         # 获取空间关联的业务，注意这里业务 ID 为字符串类型
-        # 追加空间访问指定插件的 filter
-        rts = models.ResultTable.objects.filter(
-            Q(table_id__startswith=BKCI_SYSTEM_TABLE_ID_PREFIX) | Q(table_id__in=settings.BKCI_SPACE_ACCESS_PLUGIN_LIST)
-        )
+        # 追加空间访问指定插件的 filter，与具体空间无关
+        def get_table_ids():
+            rts = models.ResultTable.objects.filter(
+                Q(table_id__startswith=BKCI_SYSTEM_TABLE_ID_PREFIX)
+                | Q(table_id__in=settings.BKCI_SPACE_ACCESS_PLUGIN_LIST)
+            )
+
+            if settings.ENABLE_MULTI_TENANT_MODE:  # 若开启多租户模式,则这里应该会变成新版1001数据
+                rts = rts.filter(bk_tenant_id=bk_tenant_id)
+            return list(rts.values_list("table_id", flat=True))
 
-        if settings.ENABLE_MULTI_TENANT_MODE:  # 若开启多租户模式,则这里应该会变成新版1001数据
-            rts = rts.filter(bk_tenant_id=bk_tenant_id)
-        tids = rts.values_list("table_id", flat=True)
+        tids = self._batch_cached(("bcs_space_biz_table_ids", bk_tenant_id), get_table_ids)
 
         return {tid: {"filters": [{"bk_biz_id": str(obj.resource_id)}]} for tid in tids}
 
@@ -970,19 +1164,24 @@ class SpaceTableIDRedis:
     def _compose_bkci_level_table_ids(self, space_type: str, space_id: str, bk_tenant_id=DEFAULT_TENANT_ID) -> dict:
         """组装 bkci 全局下的结果表"""
         logger.info("start to push bkci level table_id, space_type: %s, space_id: %s", space_type, space_id)
-        # 过滤空间级的数据源
-        data_ids = get_platform_data_ids(space_type=space_type, bk_tenant_id=bk_tenant_id)
-        # 一个空间下 data_id 不会太多
-        table_is_list = list(
-            models.DataSourceResultTable.objects.filter(bk_data_id__in=data_ids.keys()).values_list(
-                "table_id", flat=True
+
+        def get_table_ids():
+            # 过滤空间级的数据源
+            data_ids = get_platform_data_ids(space_type=space_type, bk_tenant_id=bk_tenant_id)
+            # 一个空间下 data_id 不会太多
+            table_is_list = list(
+                models.DataSourceResultTable.objects.filter(bk_data_id__in=data_ids.keys()).values_list(
+                    "table_id", flat=True
+                )
             )
-        )
+            if not table_is_list:
+                return set()
+            # 过滤仅写入influxdb和vm的数据
+            return self._refine_table_ids(table_is_list, bk_tenant_id=bk_tenant_id)
+
+        # 空间级的结果表仅与空间类型相关
+        table_ids = self._batch_cached(("bkci_level_table_ids", space_type, bk_tenant_id), get_table_ids)
         _values = {}
-        if not table_is_list:
-            return _values
-        # 过滤仅写入influxdb和vm的数据
-        table_ids = self._refine_table_ids(table_is_list, bk_tenant_id=bk_tenant_id)
         # 组装数据
         for tid in table_ids:
             if tid in settings.SPECIAL_RT_ROUTE_ALIAS_RESULT_TABLE_LIST:
@@ -1029,13 +1228,18 @@ class SpaceTableIDRedis:
         logger.info(
             "start to push bkci space cross space_type table_id, space_type: %s, space_id: %s", space_type, space_id
         )
-        tids = models.ResultTable.objects.filter(table_id__startswith=BKCI_1001_TABLE_ID_PREFIX).values_list(
-            "table_id", flat=True
-        )
-        # bkci 访问 p4 主机数据对应的结果表
-        p4_tids = models.ResultTable.objects.filter(table_id__startswith=P4_1001_TABLE_ID_PREFIX).values_list(
-            "table_id", flat=True
-        )
+
+        def get_table_ids():
+            tids = models.ResultTable.objects.filter(table_id__startswith=BKCI_1001_TABLE_ID_PREFIX).values_list(
+                "table_id", flat=True
+            )
+            # bkci 访问 p4 主机数据对应的结果表
+            p4_tids = models.ResultTable.objects.filter(table_id__startswith=P4_1001_TABLE_ID_PREFIX).values_list(
+                "table_id", flat=True
+            )
+            return list(tids), list(p4_tids)
+
+        tids, p4_tids = self._batch_cached(("bkci_cross_table_ids",), get_table_ids)
         # 组装结果表对应的 filter
         tid_filters = {tid: {"filters": [{"projectId": space_id}]} for tid in tids}
         tid_filters.update({tid: {"filters": [{"devops_id": space_id}]} for tid in p4_tids})
@@ -1045,11 +1249,10 @@ class SpaceTableIDRedis:
         """组装非业务类型的全空间类型的结果表数据"""
         logger.info("start to push all space type table_id, space_type: %s, space_id: %s", space_type, space_id)
         # 转换空间对应的bk_biz_id
-        try:
-            _id = models.Space.objects.get(space_type_id=space_type, space_id=space_id).id
-        except models.Space.DoesNotExist:
+        space = self._get_space(space_type, space_id)
+        if space is None:
             return {}
-        return {tid: {"filters": [{"bk_biz_id": str(-_id)}]} for tid in ALL_SPACE_TYPE_TABLE_ID_LIST}
+        return {tid: {"filters": [{"bk_biz_id": str(-space.id)}]} for tid in ALL_SPACE_TYPE_TABLE_ID_LIST}
 
     def _compose_apm_all_type_table_ids(self, space_type: str, space_id: str) -> dict:
         """
@@ -1058,15 +1261,21 @@ class SpaceTableIDRedis:
         """
         # TODO： 该方法为临时支持，长期需要改造抽象为公共逻辑
         logger.info("start to push apm all space type table_id, space_type: %s, space_id: %s", space_type, space_id)
-        try:
-            space = models.Space.objects.get(space_type_id=space_type, space_id=space_id)
-        except models.Space.DoesNotExist:
+        space = self._get_space(space_type, space_id)
+        if space is None:
             return {}
 
-        result_tables = models.ResultTable.objects.filter(
-            table_id__contains="apm_global.precalculate_storage", bk_tenant_id=space.bk_tenant_id
+        result_tables = self._batch_cached(
+            ("apm_all_type_table_ids", space.bk_tenant_id),
+            lambda: list(
+                models.ResultTable.objects.filter(
+                    table_id__contains="apm_global.precalculate_storage", bk_tenant_id=space.bk_tenant_id
+                ).values_list("table_id", "bk_biz_id_alias")
+            ),
         )
-        return {rt.table_id: {"filters": [{rt.bk_biz_id_alias: str(-space.id)}]} for rt in result_tables}
+        return {
+            table_id: {"filters": [{bk_biz_id_alias: str(-space.id)}]} for table_id, bk_biz_id_alias in result_tables
+        }
 
     def _compose_bksaas_space_cluster_table_ids(
         self,
@@ -1300,31 +1509,63 @@ class SpaceTableIDRedis:
             space_id,
             bk_tenant_id,
         )
-        objs = RecordRule.objects.filter(space_type=space_type, space_id=space_id, bk_tenant_id=bk_tenant_id)
-        return {obj.table_id: {"filters": []} for obj in objs}
+        if not self._in_batch():
+            objs = RecordRule.objects.filter(space_type=space_type, space_id=space_id, bk_tenant_id=bk_tenant_id)
+            return {obj.table_id: {"filters": []} for obj in objs}
+
+        def get_space_table_ids():
+            space_table_ids = defaultdict(list)
+            for _space_type, _space_id, table_id in RecordRule.objects.filter(bk_tenant_id=bk_tenant_id).values_list(
+                "space_type", "space_id", "table_id"
+            ):
+                space_table_ids[(_space_type, _space_id)].append(table_id)
+            return space_table_ids
+
+        space_table_ids = self._batch_cached(("record_rule_table_ids", bk_tenant_id), get_space_table_ids)
+        return {tid: {"filters": []} for tid in space_table_ids.get((space_type, space_id), [])}
 
     def _compose_es_table_ids(self, space_type: str, space_id: str, bk_tenant_id=DEFAULT_TENANT_ID):
         """组装es的结果表"""
-        biz_id = models.Space.objects.get_biz_id_by_space(space_type, space_id)
-        tids = models.ResultTable.objects.filter(
-            bk_biz_id=biz_id,
-            default_storage=models.ClusterInfo.TYPE_ES,
-            is_deleted=False,
-            is_enable=True,
-            bk_tenant_id=bk_tenant_id,
-        ).values_list("table_id", flat=True)
+        biz_id = self._get_biz_id_by_space(space_type, space_id)
+        if self._in_batch():
+            tids = self._get_biz_table_ids(models.ClusterInfo.TYPE_ES, bk_tenant_id).get(biz_id, [])
+        else:
+            tids = models.ResultTable.objects.filter(
+                bk_biz_id=biz_id,
+                default_storage=models.ClusterInfo.TYPE_ES,
+                is_deleted=False,
+                is_enable=True,
+                bk_tenant_id=bk_tenant_id,
+            ).values_list("table_id", flat=True)
         return {tid: {"filters": []} for tid in tids}
 
     def _compose_doris_table_ids(self, space_type: str, space_id: str):
         """
         组装Doris链路结果表
         """
-        biz_id = models.Space.objects.get_biz_id_by_space(space_type, space_id)
-        tids = models.ResultTable.objects.filter(
-            bk_biz_id=biz_id, default_storage=models.ClusterInfo.TYPE_DORIS, is_deleted=False, is_enable=True
-        ).values_list("table_id", flat=True)
+        biz_id = self._get_biz_id_by_space(space_type, space_id)
+        if self._in_batch():
+            tids = self._get_biz_table_ids(models.ClusterInfo.TYPE_DORIS).get(biz_id, [])
+        else:
+            tids = models.ResultTable.objects.filter(
+                bk_biz_id=biz_id, default_storage=models.ClusterInfo.TYPE_DORIS, is_deleted=False, is_enable=True
+            ).values_list("table_id", flat=True)
         return {tid: {"filters": []} for tid in tids}
 
+    def _get_biz_table_ids(self, default_storage: str, bk_tenant_id: str | None = None) -> dict[int, list[str]]:
+        """批量推送上下文内，按业务分组加载指定存储类型的结果表"""
+
+        def get_biz_table_ids():
+            rts = models.ResultTable.objects.filter(default_storage=default_storage, is_deleted=False, is_enable=True)
+            if bk_tenant_id is not None:
+                rts = rts.filter(bk_tenant_id=bk_tenant_id)
+            biz_table_ids = defaultdict(list)
+            for bk_biz_id, table_id in rts.values_list("bk_biz_id", "table_id"):
+                biz_table_ids[bk_biz_id].append(table_id)
+            return biz_table_ids
+
+        return self._batch_cached(("biz_table_ids", default_storage, bk_tenant_id), get_biz_table_ids)
+
     def _compose_related_bkci_es_table_ids(self, space_type: str, space_id: str, bk_tenant_id=DEFAULT_TENANT_ID):
         """
         组装关联的BKCI类型的ES结果表
@@ -1466,6 +1707,9 @@ class SpaceTableIDRedis:
 
     def _refine_table_ids(self, table_id_list: list | None = None, bk_tenant_id: str | None = DEFAULT_TENANT_ID) -> set:
         """提取写入到influxdb或vm的结果表数据"""
+        if self._in_batch():
+            return self._refine_table_ids_in_batch(table_id_list, bk_tenant_id)
+
         # 过滤写入 influxdb 的结果表
         influxdb_table_ids = models.InfluxDBStorage.objects.values_list("table_id", flat=True)
 
@@ -1501,6 +1745,31 @@ class SpaceTableIDRedis:
 
         return table_ids
 
+    def _refine_table_ids_in_batch(self, table_id_list: list | None, bk_tenant_id: str | None) -> set:
+        """批量推送上下文内，一次加载全部存储的结果表，在内存中过滤，过滤规则与 _refine_table_ids 一致"""
+
+        def get_storage_table_ids():
+            influxdb_table_ids = set(models.InfluxDBStorage.objects.values_list("table_id", flat=True))
+            tenant_table_ids = defaultdict(set)
+            for table_id, _bk_tenant_id in itertools.chain(
+                models.AccessVMRecord.objects.values_list("result_table_id", "bk_tenant_id"),
+                models.ESStorage.objects.values_list("table_id", "bk_tenant_id"),
+            ):
+                tenant_table_ids[_bk_tenant_id].add(table_id)
+            return influxdb_table_ids, tenant_table_ids, influxdb_table_ids.union(*tenant_table_ids.values())
+
+        influxdb_table_ids, tenant_table_ids, all_table_ids = self._batch_cached(
+            ("storage_table_ids",), get_storage_table_ids
+        )
+        if not table_id_list:
+            return set(all_table_ids)
+
+        # 多租户模式下，vm 和 es 的结果表需要匹配租户
+        if settings.ENABLE_MULTI_TENANT_MODE:
+            tenant_tids = tenant_table_ids.get(bk_tenant_id, set())
+            return {tid for tid in table_id_list if tid in influxdb_table_ids or tid in tenant_tids}
+        return {tid for tid in table_id_list if tid in all_table_ids}
+
     def _filter_ts_info(self, table_ids: set) -> dict:
         """根据结果表获取对应的时序数据"""
         if not table_ids:
@@ -630,6 +630,37 @@ def refresh_bkci_space_name():
     logger.info("refresh only bkci space successfully")
 
 
+def bulk_push_space_table_ids(spaces: list[Space | dict], is_publish: bool | None = True):
+    """
+    分批并发推送空间路由，仅推送并通知路由有变化的空间
+    全部批次完成后统一通知使用方并上报指标
+    """
+    changed_keys = []
+    bulk_handle(
+        lambda space_list: changed_keys.extend(SpaceTableIDRedis().push_multi_space_table_ids(space_list)),
+        spaces,
+    )
+    metrics.report_all()
+    if not (is_publish and changed_keys):
+        return
+
+    # 通知到使用方
+    changed_keys = set(changed_keys)
+    push_redis_keys = []
+    for space in spaces:
+        if isinstance(space, Space):
+            space_type, space_id, bk_tenant_id = space.space_type_id, space.space_id, space.bk_tenant_id
+        else:
+            space_type, space_id, bk_tenant_id = space["space_type_id"], space["space_id"], space["bk_tenant_id"]
+        if SpaceTableIDRedis.get_space_redis_key(space_type, space_id, bk_tenant_id) not in changed_keys:
+            continue
+        if settings.ENABLE_MULTI_TENANT_MODE:
+            push_redis_keys.append(f"{bk_tenant_id}|{space_type}__{space_id}")
+        else:
+            push_redis_keys.append(f"{space_type}__{space_id}")
+    RedisTools.publish(SPACE_TO_RESULT_TABLE_CHANNEL, push_redis_keys)
+
+
 def push_and_publish_space_router(
     space_type: str | None = None,
     space_id: str | None = None,
@@ -638,7 +669,6 @@ def push_and_publish_space_router(
     bk_tenant_id: str | None = DEFAULT_TENANT_ID,
 ):
     """推送数据和通知"""
-    from metadata.models.space.constants import SPACE_TO_RESULT_TABLE_CHANNEL
     from metadata.models.space.ds_rt import get_space_table_id_data_id
     from metadata.models.space.space_table_id_redis import SpaceTableIDRedis
 
@@ -661,21 +691,8 @@ def push_and_publish_space_router(
         for space in spaces
     ]
 
-    # 批量处理 -- SPACE_TO_RESULT_TABLE 路由
-    bulk_handle(
-        lambda batch_spaces: SpaceTableIDRedis().push_multi_space_table_ids(batch_spaces, is_publish=False),
-        list(spaces),
-    )
-
-    # 通知到使用方
-    if is_publish:
-        space_uid_list = []
-        for space in spaces:
-            if settings.ENABLE_MULTI_TENANT_MODE:
-                space_uid_list.append(f"{space['bk_tenant_id']}|{space['space_type_id']}__{space['space_id']}")
-            else:
-                space_uid_list.append(f"{space['space_type_id']}__{space['space_id']}")
-        RedisTools.publish(SPACE_TO_RESULT_TABLE_CHANNEL, space_uid_list)
+    # 批量处理 -- SPACE_TO_RESULT_TABLE 路由，仅推送并通知路由有变化的空间
+    bulk_push_space_table_ids(list(spaces), is_publish=is_publish)
 
     # 仅存在空间 id 时，可以直接按照结果表进行处理
     # 非多租户环境: 所有table_id的路由一并推送
@@ -889,16 +906,7 @@ def refresh_bksaas_space_resouce():
 
     # 批量进行推送数据
     # NOTE: 此时集群或者公共插件相关的信息已经存在了，不需要再进行指标或 data_label 的映射
-    space_client = SpaceTableIDRedis()
-    bulk_handle(lambda space_list: space_client.push_multi_space_table_ids(space_list), spaces)
-
-    # 通知到使用方
-    push_redis_keys = []
-    for space in spaces:
-        if settings.ENABLE_MULTI_TENANT_MODE:
-            push_redis_keys.append(f"{space.bk_tenant_id}|{space.space_type_id}__{space.space_id}")
-        else:
-            push_redis_keys.append(f"{space.space_type_id}__{space.space_id}")
-    RedisTools.publish(SPACE_TO_RESULT_TABLE_CHANNEL, push_redis_keys)
+    # 仅推送并通知路由有变化的空间
+    bulk_push_space_table_ids(spaces)
 
     logger.info("refresh bksaas space resource successfully")
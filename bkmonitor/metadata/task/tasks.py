@@ -39,10 +39,9 @@ from metadata.service.sync_metadata import (
     sync_kafka_metadata,
     sync_vm_metadata,
 )
-from metadata.task.utils import bulk_handle
 from metadata.tools.constants import TASK_FINISHED_SUCCESS, TASK_STARTED
 from metadata.utils import consul_tools
-from metadata.utils.redis_tools import RedisTools, bkbase_redis_client
+from metadata.utils.redis_tools import bkbase_redis_client
 
 logger = logging.getLogger("metadata")
 
@@ -433,12 +432,10 @@ def push_and_publish_space_router(
         space_id,
         json.dumps(table_id_list),
     )
-    from metadata.models.space.constants import (
-        SPACE_TO_RESULT_TABLE_CHANNEL,
-        SpaceTypes,
-    )
+    from metadata.models.space.constants import SpaceTypes
     from metadata.models.space.ds_rt import get_space_table_id_data_id
     from metadata.models.space.space_table_id_redis import SpaceTableIDRedis
+    from metadata.task.sync_space import bulk_push_space_table_ids
 
     # 获取空间下的结果表，如果不存在，则获取空间下的所有
     if not table_id_list:
@@ -452,17 +449,8 @@ def push_and_publish_space_router(
     else:
         # NOTE: 现阶段仅针对 bkcc 类型做处理
         spaces = list(models.Space.objects.filter(space_type_id=SpaceTypes.BKCC.value))
-        # 使用线程处理
-        bulk_handle(lambda space_list: space_client.push_multi_space_table_ids(space_list, is_publish=False), spaces)
-
-        # 通知到使用方
-        push_redis_keys = []
-        for space in spaces:
-            if settings.ENABLE_MULTI_TENANT_MODE:
-                push_redis_keys.append(f"{space.bk_tenant_id}|{space.space_type_id}__{space.space_id}")
-            else:
-                push_redis_keys.append(f"{space.space_type_id}__{space.space_id}")
-        RedisTools.publish(SPACE_TO_RESULT_TABLE_CHANNEL, push_redis_keys)
+        # 使用线程处理，仅推送并通知路由有变化的空间
+        bulk_push_space_table_ids(spaces)
 
     # 更新数据
     space_client.push_data_label_table_ids(table_id_list=table_id_list, is_publish=True)
@@ -349,3 +349,84 @@ def test_compose_bkci_level_table_ids(create_or_delete_records):
     data = client._compose_bkci_level_table_ids(space_type="bkci", space_id="bkmonitor", bk_tenant_id="system")
     expected = {"bkmonitor_event_60010": {"filters": [{"dimensions.project_id": "bkmonitor"}]}}
     assert data == expected
+
+
+@pytest.mark.django_db(databases="__all__")
+def test_push_multi_space_to_rt_router(create_or_delete_records):
+    """
+    测试SPACE_TO_RESULT_TABLE路由批量推送，与单个空间推送结果一致，且仅推送路由有变化的空间
+    """
+    settings.ENABLE_MULTI_TENANT_MODE = True
+    client = SpaceTableIDRedis()
+    spaces = [("bkcc", "1"), ("bkci", "bkmonitor"), ("bksaas", "monitor_saas")]
+
+    expected = {}
+    with patch("metadata.utils.redis_tools.RedisTools.hmset_to_redis") as mock_hmset_to_redis:
+        for space_type, space_id in spaces:
+            client.push_space_table_ids(space_type=space_type, space_id=space_id)
+            args, kwargs = mock_hmset_to_redis.call_args
+            expected.update({key: json.loads(value) for key, value in args[1].items()})
+
+    # redis 中已有的路由
+    stored_routes = {}
+    with patch("metadata.utils.redis_tools.RedisTools.hmset_to_redis") as mock_hmset_to_redis:
+        with patch("metadata.utils.redis_tools.RedisTools.publish") as mock_publish:
+            with patch(
+                "metadata.utils.redis_tools.RedisTools.hmget",
+                side_effect=lambda key, fields: [stored_routes.get(field) for field in fields],
+            ):
+                changed_keys = client.push_multi_space_table_ids(
+                    [{"space_type_id": space_type, "space_id": space_id} for space_type, space_id in spaces],
+                    is_publish=True,
+                )
+                assert set(changed_keys) == set(expected)
+                (route_args, _) = mock_hmset_to_redis.call_args
+                assert route_args[0] == "bkmonitorv3:spaces:space_to_result_table"
+                assert {key: json.loads(value) for key, value in route_args[1].items()} == expected
+                mock_publish.assert_called_once_with("bkmonitorv3:spaces:space_to_result_table:channel", changed_keys)
+                stored_routes.update(route_args[1])
+
+                # 路由未变化时，不写入也不通知
+                mock_hmset_to_redis.reset_mock()
+                mock_publish.reset_mock()
+                assert client.push_multi_space_table_ids(list(models.Space.objects.all()), is_publish=True) == []
+                mock_hmset_to_redis.assert_not_called()
+                mock_publish.assert_not_called()
+
+                # redis 中的路由被删除时重新写入
+                stored_routes.pop("bkcc__1|system")
+                assert client.push_multi_space_table_ids(list(models.Space.objects.all())) == ["bkcc__1|system"]
+                stored_routes.update(mock_hmset_to_redis.call_args[0][1])
+
+                # 仅推送路由有变化的空间
+                mock_publish.reset_mock()
+                models.RecordRule.objects.create(
+                    space_type="bkci", space_id="bkmonitor", table_id="bkm_bkmonitor_record_rule.__default__"
+                )
+                changed_keys = client.push_multi_space_table_ids(list(models.Space.objects.all()), is_publish=True)
+                assert changed_keys == ["bkci__bkmonitor|system"]
+                mock_publish.assert_called_once_with("bkmonitorv3:spaces:space_to_result_table:channel", changed_keys)
+
+                # 强制推送时忽略比对
+                assert len(client.push_multi_space_table_ids(list(models.Space.objects.all()), force=True)) == 3
+
+
+@pytest.mark.django_db(databases="__all__")
+def test_bulk_push_space_table_ids(create_or_delete_records):
+    """
+    测试分批推送空间路由，仅通知路由有变化的空间，多租户下通知内容为 租户|空间
+    """
+    from metadata.task.sync_space import bulk_push_space_table_ids
+
+    settings.ENABLE_MULTI_TENANT_MODE = True
+    spaces = list(models.Space.objects.values("space_type_id", "space_id", "bk_tenant_id"))
+    with patch(
+        "metadata.models.space.space_table_id_redis.SpaceTableIDRedis.push_multi_space_table_ids",
+        return_value=["bkcc__1|system"],
+    ):
+        with patch("metadata.task.sync_space.metrics.report_all") as mock_report_all:
+            with patch("metadata.utils.redis_tools.RedisTools.publish") as mock_publish:
+                bulk_push_space_table_ids(spaces)
+
+    mock_report_all.assert_called_once()
+    mock_publish.assert_called_once_with("bkmonitorv3:spaces:space_to_result_table:channel", ["system|bkcc__1"])
@@ -10,6 +10,7 @@ specific language governing permissions and limitations under the License.
 import logging
 import re
 from dataclasses import dataclass, field
+from functools import lru_cache
 from typing import Dict, List
 
 from django.conf import settings
@@ -25,6 +26,19 @@ DOT_INVALID_CHARS = ["[", "]", ":", ";", "{", "}", '"', "<", ">"]
 GO_STRUCT_TYPE_REGEX = re.compile(r'\[go\.shape\..*\]')
 
 
+@lru_cache(maxsize=65536)
+def sanitize_function_field(value: str) -> str:
+    """清洗函数帧字段：泛型定义替换为 (...)，并去掉特殊字符"""
+    # Step1: 替换泛型
+    value = GO_STRUCT_TYPE_REGEX.sub("(...)", value)
+
+    # Step2: 检查特殊字符
+    for c in DOT_INVALID_CHARS:
+        if c in value:
+            value = value.replace(c, "")
+    return value
+
+
 @dataclass
 class FunctionNode:
     """Function based flame node"""
@@ -89,26 +103,8 @@ class FunctionNode:
         2️⃣ 如果名称中有泛型的定义 替换具体类型变为 (...) [针对 GO SDK 上报]
         """
 
-        check_fields = ["systemName", "fileName", "name"]
-        for f in check_fields:
-            f_value = line["function"][f]
-
-            # Step1: 替换泛型
-            matches_indices = [(m.start(), m.end()) for m in GO_STRUCT_TYPE_REGEX.finditer(f_value)]
-            modified = []
-            prev_end = 0
-            for start, end in matches_indices:
-                modified.append(f_value[prev_end:start] + "(...)")
-                prev_end = end
-
-            modified.append(f_value[prev_end:])
-            tmp_value = "".join(modified)
-
-            # Step2: 检查特殊字符
-            for c in DOT_INVALID_CHARS:
-                if c in tmp_value:
-                    tmp_value = tmp_value.replace(c, "")
-            line["function"][f] = tmp_value
+        for f in ["systemName", "fileName", "name"]:
+            line["function"][f] = sanitize_function_field(line["function"][f])
 
         return line
 
@@ -132,18 +128,20 @@ class ValueCalculator:
             "LAST": cls.SumCount,  # agg_method的值是LAST时，只有一个样本，所以使用SumCount，保证这个样本保持自身的value
         }
 
+    @classmethod
+    def get_calculator(cls, sample_type, agg_method=None):
+        """根据聚合方法和采样类型获取计算策略，当agg_method没传值时，默认通过profiling数据类型的计算节点"""
+        default_calculator = cls.agg_mapping().get(
+            settings.APM_PROFILING_AGG_METHOD_MAPPING.get(sample_type["type"].upper()), cls.SumCount
+        )
+        if agg_method:
+            return cls.agg_mapping().get(agg_method) or default_calculator
+        return default_calculator
+
     @classmethod
     def calculate_nodes(cls, tree, sample_type, samples_len, agg_method=None):
         """递归计算所有节点值"""
-        # 根据聚合方法和采样类型获取计算策略，当agg_method没传值时，默认通过profiling数据类型的计算节点
-        if agg_method:
-            c = cls.agg_mapping().get(agg_method) or cls.agg_mapping().get(
-                settings.APM_PROFILING_AGG_METHOD_MAPPING.get(sample_type["type"].upper()), cls.SumCount
-            )
-        else:
-            c = cls.agg_mapping().get(
-                settings.APM_PROFILING_AGG_METHOD_MAPPING.get(sample_type["type"].upper()), cls.SumCount
-            )
+        c = cls.get_calculator(sample_type, agg_method)
 
         def calculate_node(tree_node):
             """递归计算节点值"""
@@ -172,9 +170,15 @@ class ValueCalculator:
         @classmethod
         def calculate(cls, values, samples_len):
             # 添加边界条件检查
-            if not values or samples_len <= 0:
+            if not values:
+                return 0
+            return cls.calculate_total(sum(values), samples_len)
+
+        @classmethod
+        def calculate_total(cls, total, samples_len):
+            if samples_len <= 0:
                 return 0
-            return format_percent(sum(values) / samples_len, precision=4, sig_fig_cnt=4)
+            return format_percent(total / samples_len, precision=4, sig_fig_cnt=4)
 
     class SumCount:
         """默认计算策略（累加）"""
@@ -185,6 +189,10 @@ class ValueCalculator:
                 return 0
             return sum(values)
 
+        @classmethod
+        def calculate_total(cls, total, samples_len=None):
+            return total
+
 
 def is_func(name: str) -> bool:
     """name包含斜杠或点说明是路径，返回True，不包含说明name是函数名，返回False"""
@@ -0,0 +1,344 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import json
+from collections.abc import Iterable
+
+from apm_web.profile.diagrams.base import ROOT_DISPLAY_NAME, sanitize_function_field
+from bkmonitor.utils.common_utils import format_percent
+
+# 调用树根节点下标
+ROOT_INDEX = 0
+# 调用图根节点的帧 ID
+MAP_ROOT_FRAME = -1
+
+
+class FrameTable:
+    """
+    函数帧驻留表
+    相同的函数帧只清洗一次，并分配一个自增的整数 ID，帧 ID 按首次出现的顺序分配
+    """
+
+    def __init__(self):
+        self.ids: list[str] = []
+        self.names: list[str] = []
+        self.system_names: list[str] = []
+        self.filenames: list[str] = []
+        # 节点 ID -> 帧 ID
+        self._id_index: dict[str, int] = {}
+        # 原始 (systemName, fileName, name) -> 帧 ID
+        self._raw_index: dict[tuple, int] = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def intern(self, function: dict) -> int:
+        raw_key = (function["systemName"], function["fileName"], function["name"])
+        frame_id = self._raw_index.get(raw_key)
+        if frame_id is not None:
+            return frame_id
+
+        system_name, filename, name = (sanitize_function_field(value) for value in raw_key)
+        # 与 FunctionNode.generate_id 保持一致，清洗后相同的帧合并为同一个节点
+        node_id = system_name + filename + name
+        frame_id = self._id_index.get(node_id)
+        if frame_id is None:
+            frame_id = len(self.ids)
+            self.ids.append(node_id)
+            self.names.append(name)
+            self.system_names.append(system_name)
+            self.filenames.append(filename)
+            self._id_index[node_id] = frame_id
+
+        self._raw_index[raw_key] = frame_id
+        return frame_id
+
+
+class FrameTree:
+    """
+    基于数组的 Profile 聚合结构
+
+    1. 调用树以平行数组存储：parents / frame_ids / totals，下标 0 为根节点
+    2. 调用图以帧 ID 为节点，每个 sample 中同一帧只累加一次
+    3. 节点值直接累加为总和，不再保留每个 sample 的值列表
+    4. 通过 root / map_root / function_node_map 提供与 FunctionTree 一致的只读视图，各类图表可直接使用
+    """
+
+    def __init__(self):
+        self.frames = FrameTable()
+
+        # 调用树
+        self.parents: list[int] = [-1]
+        self.frame_ids: list[int] = [-1]
+        self.totals: list[int] = [0]
+        self.children: list[list[int]] = [[]]
+        self._child_index: dict[tuple[int, int], int] = {}
+
+        # 调用图，下标为帧 ID
+        self.frame_totals: list[int] = []
+        self.graph_children: list[dict[int, None]] = []
+        self.map_root_children: dict[int, None] = {}
+
+        # 计算后的节点值
+        self.values: list = []
+        self.frame_values: list = []
+        self.root_value = 0
+        self.map_root_value = 0
+
+        self._function_node_map = None
+
+    def __len__(self):
+        return len(self.parents)
+
+    def add_samples(self, samples: Iterable[tuple[str, int]]):
+        """
+        累加 (stacktrace, value) 样本
+        相同堆栈只解析一次，其值先合并再累加到路径上的各个节点
+        """
+        stack_totals = {}
+        for stacktrace, value in samples:
+            stack_totals[stacktrace] = stack_totals.get(stacktrace, 0) + value
+
+        for stacktrace, total in stack_totals.items():
+            path, frames = self._add_stack(json.loads(stacktrace))
+            for index in path:
+                self.totals[index] += total
+            for frame_id in frames:
+                self.frame_totals[frame_id] += total
+
+    def _add_stack(self, stacktraces: list) -> tuple[list[int], dict[int, None]]:
+        """将一个堆栈加入调用树和调用图，返回经过的树节点下标和出现过的帧"""
+        path = []
+        frames = {}
+        parent = ROOT_INDEX
+        map_parent = MAP_ROOT_FRAME
+
+        for stacktrace in reversed(stacktraces):
+            if not stacktrace["lines"]:
+                # 将 parent 设置为根节点防止生成错误的调用关系
+                parent = ROOT_INDEX
+                map_parent = MAP_ROOT_FRAME
+                continue
+
+            for line in reversed(stacktrace["lines"]):
+                if not line:
+                    parent = ROOT_INDEX
+                    map_parent = MAP_ROOT_FRAME
+                    continue
+
+                frame_id = self.frames.intern(line["function"])
+
+                # 1. 构造树
+                index = self._child_index.get((parent, frame_id))
+                if index is None:
+                    index = len(self.parents)
+                    self.parents.append(parent)
+                    self.frame_ids.append(frame_id)
+                    self.totals.append(0)
+                    self.children.append([])
+                    self.children[parent].append(index)
+                    self._child_index[(parent, frame_id)] = index
+                path.append(index)
+                parent = index
+
+                # 2. 构造图
+                if frame_id == len(self.frame_totals):
+                    self.frame_totals.append(0)
+                    self.graph_children.append({})
+                if map_parent == MAP_ROOT_FRAME:
+                    self.map_root_children[frame_id] = None
+                else:
+                    self.graph_children[map_parent][frame_id] = None
+                map_parent = frame_id
+                frames[frame_id] = None
+
+        return path, frames
+
+    def calculate(self, calculator, samples_len: int):
+        """根据计算策略(ValueCalculator.AvgCount / SumCount)计算所有节点值"""
+        self.values = [0] + [calculator.calculate_total(total, samples_len) for total in self.totals[1:]]
+        self.root_value = format_percent(
+            sum(self.values[index] for index in self.children[ROOT_INDEX]), precision=4, sig_fig_cnt=4
+        )
+        self.values[ROOT_INDEX] = self.root_value
+
+        self.frame_values = [calculator.calculate_total(total, samples_len) for total in self.frame_totals]
+        self.map_root_value = format_percent(
+            sum(self.frame_values[frame_id] for frame_id in self.map_root_children), precision=4, sig_fig_cnt=4
+        )
+
+    def self_time(self, index: int):
+        sub = self.values[index] - sum(self.values[child] for child in self.children[index])
+        return sub if sub > 0 else 0
+
+    def frame_self_time(self, frame_id: int):
+        sub = self.frame_values[frame_id] - sum(self.frame_values[child] for child in self.graph_children[frame_id])
+        return sub if sub > 0 else 0
+
+    @property
+    def root(self) -> "TreeNodeView":
+        return TreeNodeView(self, ROOT_INDEX)
+
+    @property
+    def map_root(self) -> "GraphRootView":
+        return GraphRootView(self)
+
+    @property
+    def function_node_map(self) -> dict[str, "GraphNodeView"]:
+        if self._function_node_map is None or len(self._function_node_map) != len(self.frame_totals):
+            self._function_node_map = {
+                self.frames.ids[frame_id]: GraphNodeView(self, frame_id) for frame_id in range(len(self.frame_totals))
+            }
+        return self._function_node_map
+
+
+class NodeView:
+    """FrameTree 节点的只读视图，接口与 FunctionNode 保持一致"""
+
+    __slots__ = ("tree",)
+
+    id: str
+    name: str
+    system_name: str
+    filename: str
+
+    def __eq__(self, other):
+        return self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "value": self.value,
+            "self": self.self_time,
+            "name": self.name,
+            "system_name": self.system_name,
+            "filename": self.filename,
+        }
+
+
+class FrameNodeView(NodeView):
+    """对应一个函数帧的节点视图"""
+
+    __slots__ = ("frame_id",)
+
+    @property
+    def id(self) -> str:
+        return self.tree.frames.ids[self.frame_id]
+
+    @property
+    def name(self) -> str:
+        return self.tree.frames.names[self.frame_id]
+
+    @property
+    def system_name(self) -> str:
+        return self.tree.frames.system_names[self.frame_id]
+
+    @property
+    def filename(self) -> str:
+        return self.tree.frames.filenames[self.frame_id]
+
+
+class TreeNodeView(FrameNodeView):
+    """调用树节点视图"""
+
+    __slots__ = ("index",)
+
+    def __init__(self, tree: FrameTree, index: int):
+        self.tree = tree
+        self.index = index
+        self.frame_id = tree.frame_ids[index]
+
+    @property
+    def id(self) -> str:
+        return ROOT_DISPLAY_NAME if self.index == ROOT_INDEX else super().id
+
+    @property
+    def name(self) -> str:
+        return ROOT_DISPLAY_NAME if self.index == ROOT_INDEX else super().name
+
+    @property
+    def system_name(self) -> str:
+        return "" if self.index == ROOT_INDEX else super().system_name
+
+    @property
+    def filename(self) -> str:
+        return "" if self.index == ROOT_INDEX else super().filename
+
+    @property
+    def value(self):
+        return self.tree.values[self.index]
+
+    @property
+    def self_time(self):
+        return self.tree.self_time(self.index)
+
+    @property
+    def children(self) -> dict[str, "TreeNodeView"]:
+        frame_ids = self.tree.frames.ids
+        return {
+            frame_ids[self.tree.frame_ids[child]]: TreeNodeView(self.tree, child)
+            for child in self.tree.children[self.index]
+        }
+
+
+class GraphNodeView(FrameNodeView):
+    """调用图节点视图"""
+
+    __slots__ = ()
+
+    def __init__(self, tree: FrameTree, frame_id: int):
+        self.tree = tree
+        self.frame_id = frame_id
+
+    @property
+    def value(self):
+        return self.tree.frame_values[self.frame_id]
+
+    @property
+    def self_time(self):
+        return self.tree.frame_self_time(self.frame_id)
+
+    @property
+    def children(self) -> dict[str, "GraphNodeView"]:
+        node_map = self.tree.function_node_map
+        frame_ids = self.tree.frames.ids
+        return {frame_ids[child]: node_map[frame_ids[child]] for child in self.tree.graph_children[self.frame_id]}
+
+
+class GraphRootView(NodeView):
+    """调用图根节点视图"""
+
+    __slots__ = ()
+
+    id = ROOT_DISPLAY_NAME
+    name = ROOT_DISPLAY_NAME
+    system_name = ""
+    filename = ""
+
+    def __init__(self, tree: FrameTree):
+        self.tree = tree
+
+    @property
+    def value(self):
+        return self.tree.map_root_value
+
+    @property
+    def self_time(self):
+        sub = self.value - sum(self.tree.frame_values[child] for child in self.tree.map_root_children)
+        return sub if sub > 0 else 0
+
+    @property
+    def children(self) -> dict[str, GraphNodeView]:
+        node_map = self.tree.function_node_map
+        frame_ids = self.tree.frames.ids
+        return {frame_ids[child]: node_map[frame_ids[child]] for child in self.tree.map_root_children}
@@ -8,25 +8,21 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
-import json
 from dataclasses import dataclass
 from typing import Any
 
-from apm_web.profile.diagrams.base import (
-    ROOT_DISPLAY_NAME,
-    FunctionNode,
-    FunctionTree,
-    ValueCalculator,
-)
+from apm_web.profile.diagrams.base import FunctionTree, ValueCalculator
+from apm_web.profile.diagrams.frame_tree import FrameTree
 
 
 @dataclass
 class TreeConverter:
     """
-    将 doris 查询出来的原始数据直接转为 FunctionTree 而不经过 ProfileConverter
+    将 doris 查询出来的原始数据直接转为 FrameTree 而不经过 ProfileConverter
+    FrameTree 提供与 FunctionTree 一致的只读接口，子类(如 EbpfConverter)仍可直接构建 FunctionTree
     """
 
-    tree: FunctionTree = None
+    tree: FunctionTree | FrameTree = None
     sample_type: dict = None
 
     def empty(self) -> bool:
@@ -39,7 +35,7 @@ class TreeConverter:
     def _align_agg_interval(cls, t, interval):
         return int(t / interval) * interval
 
-    def convert(self, raw: Any, agg_method: str | None = None, agg_interval: int = 60) -> FunctionTree:
+    def convert(self, raw: Any, agg_method: str | None = None, agg_interval: int = 60) -> FrameTree:
         samples_info = raw["list"]
         if not samples_info:
             return self.tree
@@ -47,23 +43,8 @@ class TreeConverter:
         first_item_sample_type = samples_info[0]["sample_type"].split("/")
         self.sample_type = {"type": first_item_sample_type[0], "unit": first_item_sample_type[1]}
 
-        # 构建 FunctionTree
-        tree = FunctionTree(
-            root=FunctionNode(
-                id=ROOT_DISPLAY_NAME,
-                name=ROOT_DISPLAY_NAME,
-                system_name="",
-                filename="",
-                values=[],
-            ),
-            map_root=FunctionNode(
-                id=ROOT_DISPLAY_NAME,
-                name=ROOT_DISPLAY_NAME,
-                system_name="",
-                filename="",
-                values=[],
-            ),
-        )
+        # 构建 FrameTree
+        tree = FrameTree()
         self.build_tree(tree, samples_info, agg_method, agg_interval)
 
         # 计算出一共有多少个时间点的数据，相同时间点的数据只算一次
@@ -71,13 +52,13 @@ class TreeConverter:
             {self._align_agg_interval(int(s["dtEventTimeStamp"]), agg_interval * 1000) for s in samples_info}
         )
         # 不同数据类型的节点 value 计算方式有所不同
-        ValueCalculator.calculate_nodes(tree, self.get_sample_type(), snapshot_len, agg_method)
+        tree.calculate(ValueCalculator.get_calculator(self.get_sample_type(), agg_method), snapshot_len)
 
         self.tree = tree
         return self.tree
 
     @classmethod
-    def build_tree(cls, tree: FunctionTree, samples, agg_method=None, agg_interval=60):
+    def build_tree(cls, tree: FrameTree, samples, agg_method=None, agg_interval=60):
         if agg_method == "LAST":
             # 只保留最后一个时间戳的所有 sample 数据
             interval = agg_interval * 1000
@@ -86,62 +67,4 @@ class TreeConverter:
                 s for s in samples if cls._align_agg_interval(int(s["dtEventTimeStamp"]), interval) == last_snapshot
             ]
 
-        for sample in samples:
-            value = int(sample["value"])
-            parent = tree.root
-            map_parent = tree.map_root
-            stacktraces = json.loads(sample["stacktrace"])
-
-            visited_node = set()
-            for stacktrace in reversed(stacktraces):
-                if not stacktrace["lines"]:
-                    # 将 parent 设置为空防止生成错误的调用关系
-                    parent = tree.root
-                    map_parent = tree.map_root
-                    continue
-
-                for line in reversed(stacktrace["lines"]):
-                    if not line:
-                        parent = tree.root
-                        map_parent = tree.map_root
-                        continue
-
-                    pure_line = FunctionNode.replace_invalid_char(line)
-                    node_id = FunctionNode.generate_id(pure_line)
-
-                    # 1. 构造树
-                    if node_id in parent.children:
-                        node = parent.children.get(node_id)
-                        node.add_value(value)
-                        parent = node
-                    else:
-                        node = FunctionNode(
-                            id=node_id,
-                            name=pure_line["function"]["name"],
-                            system_name=pure_line["function"]["systemName"],
-                            filename=pure_line["function"]["fileName"],
-                            values=[value],
-                        )
-                        parent.add_child(node)
-                        parent = node
-
-                    # 2. 构造图
-                    if node_id not in tree.function_node_map:
-                        map_node = FunctionNode(
-                            id=node_id,
-                            name=pure_line["function"]["name"],
-                            system_name=pure_line["function"]["systemName"],
-                            filename=pure_line["function"]["fileName"],
-                            values=[value],
-                        )
-                        tree.function_node_map[node_id] = map_node
-                        map_parent.add_child(map_node)
-                        map_parent = map_node
-                    else:
-                        map_node = tree.function_node_map[node_id]
-                        if node_id not in visited_node:
-                            map_node.add_value(value)
-                        map_parent.add_child(map_node)
-                        map_parent = map_node
-
-                    visited_node.add(node_id)
+        tree.add_samples((sample["stacktrace"], int(sample["value"])) for sample in samples)
@@ -0,0 +1,118 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2022 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import json
+
+from apm_web.profile.diagrams.base import FunctionNode
+from apm_web.profile.diagrams.callgraph import build_edge_relation
+from apm_web.profile.diagrams.diff import ProfileDiffer
+from apm_web.profile.diagrams.flamegraph import FlamegraphDiagrammer
+from apm_web.profile.diagrams.table import TableDiagrammer
+from apm_web.profile.diagrams.tree_converter import TreeConverter
+
+
+def make_line(name, system_name="sys", filename="main.go"):
+    return {"function": {"name": name, "systemName": system_name, "fileName": filename}}
+
+
+def make_sample(names, value, timestamp=1700000000000, sample_type="cpu/nanoseconds"):
+    # 堆栈从叶子到根排列
+    stacktrace = [{"lines": [make_line(name) for name in reversed(names)]}]
+    return {
+        "stacktrace": json.dumps(stacktrace),
+        "value": str(value),
+        "dtEventTimeStamp": str(timestamp),
+        "sample_type": sample_type,
+    }
+
+
+def convert(samples, agg_method=None):
+    c = TreeConverter()
+    c.convert({"list": samples}, agg_method)
+    return c
+
+
+class TestTreeConverter:
+    def test_build_tree(self):
+        c = convert(
+            [
+                make_sample(["main", "a", "b"], 10),
+                make_sample(["main", "a"], 5),
+                make_sample(["main", "b", "b"], 3),
+                make_sample(["main", "a", "b"], 2),
+            ]
+        )
+        root = c.tree.root
+        assert root.value == 20
+        main = root.children["sysmain.gomain"]
+        assert main.value == 20
+        assert list(main.children) == ["sysmain.goa", "sysmain.gob"]
+        a = main.children["sysmain.goa"]
+        assert (a.value, a.self_time) == (17, 5)
+        assert a.children["sysmain.gob"].value == 12
+
+        # 调用图中同一个 sample 内重复出现的函数只累加一次
+        node_map = c.tree.function_node_map
+        assert node_map["sysmain.gob"].value == 15
+        assert node_map["sysmain.gob"].self_time == 0
+        assert set(node_map["sysmain.gob"].children) == {"sysmain.gob"}
+        assert c.tree.map_root.value == 20
+
+        assert FlamegraphDiagrammer().draw(c)["flame_data"]["children"][0]["children"][0] == {
+            "id": "sysmain.goa",
+            "name": "a",
+            "value": 17,
+            "self": 5,
+            "children": [{"id": "sysmain.gob", "name": "b", "value": 12, "self": 12, "children": []}],
+        }
+        table_items = {item["id"]: item for item in TableDiagrammer().draw(c)["table_data"]["items"]}
+        assert table_items["sysmain.goa"] == {"id": "sysmain.goa", "name": "a", "self": 2, "total": 17}
+        assert {
+            (e["source_id"], e["target_id"]) for e in build_edge_relation(list(c.tree.map_root.children.values()))
+        } == {
+            ("sysmain.gomain", "sysmain.goa"),
+            ("sysmain.gomain", "sysmain.gob"),
+            ("sysmain.goa", "sysmain.gob"),
+            ("sysmain.gob", "sysmain.gob"),
+        }
+
+    def test_invalid_char(self):
+        c = convert([make_sample(["main", "Do[go.shape.int]", "a:b"], 1), make_sample(["main", "Do[]", "ab"], 1)])
+        node = c.tree.root.children["sysmain.gomain"].children["sysmain.goDo(...)"]
+        assert node.name == "Do(...)"
+        assert node.value == 1
+        # 清洗后相同的帧合并为同一个节点
+        assert c.tree.function_node_map["sysmain.goab"].value == 2
+        assert FunctionNode.replace_invalid_char(make_line("Do[go.shape.int]<a>"))["function"]["name"] == "Do(...)a"
+
+    def test_agg_method(self):
+        samples = [
+            make_sample(["main", "a"], 10, timestamp=1700000000000),
+            make_sample(["main", "a"], 20, timestamp=1700000060000),
+        ]
+        assert convert(samples, "SUM").tree.root.value == 30
+        assert convert(samples, "AVG").tree.root.value == 15
+        assert convert(samples, "LAST").tree.root.value == 20
+
+    def test_diff(self):
+        base = convert([make_sample(["main", "a"], 10), make_sample(["main", "b"], 5)])
+        comp = convert([make_sample(["main", "a"], 10), make_sample(["main", "c"], 5)])
+        diff_root = ProfileDiffer.from_raw(base, comp).diff_tree().root
+        marks = {child.default.id: child.mark.value for child in diff_root.children[0].children}
+        assert marks == {"sysmain.goa": "unchanged", "sysmain.gob": "added", "sysmain.goc": "removed"}
+        assert {
+            node_id: node.mark.value
+            for node_id, node in ProfileDiffer.from_raw(base, comp).diff_table().diff_node_map.items()
+        } == {
+            "sysmain.gomain": "unchanged",
+            "sysmain.goa": "unchanged",
+            "sysmain.gob": "added",
+            "sysmain.goc": "removed",
+        }
@@ -8,21 +8,26 @@ an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express o
 specific language governing permissions and limitations under the License.
 """
 
+import json
 import logging
 import re
+import time
+import zlib
 from collections import defaultdict
 from dataclasses import asdict
 from functools import reduce
 from itertools import chain
 from typing import Any
-from collections.abc import Callable
+from collections.abc import Callable, Iterable, Iterator
 from re import Pattern
 
 import arrow
 from django.conf import settings
+from django.core.cache import caches
 from django.db.models import Q
 from django.forms import model_to_dict
 from django.utils import timezone
+from django.utils.functional import cached_property
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
@@ -40,6 +45,7 @@ from bkmonitor.data_source.unify_query.query import UnifyQuery
 from bkmonitor.models import BCSCluster, MetricListCache
 from bkmonitor.share.api_auth_resource import ApiAuthResource
 from bkmonitor.strategy.new_strategy import get_metric_id
+from bkmonitor.utils.common_utils import count_md5
 from bkmonitor.utils.range import load_agg_condition_instance
 from bkmonitor.utils.request import get_request_tenant_id
 from bkmonitor.utils.time_tools import (
@@ -56,6 +62,7 @@ from constants.data_source import (
 from constants.strategy import SYSTEM_EVENT_RT_TABLE_ID, UPTIMECHECK_ERROR_CODE_MAP
 from core.drf_resource import Resource, api, resource
 from core.errors.api import BKAPIError
+from core.prometheus import metrics
 from core.prometheus.base import OPERATION_REGISTRY
 from core.prometheus.metrics import safe_push_to_gateway
 from monitor_web.grafana.utils import get_cookies_filter, remove_all_conditions
@@ -64,6 +71,8 @@ from monitor_web.strategies.constant import CORE_FILE_SIGNAL_LIST
 
 logger = logging.getLogger(__name__)
 
+query_result_cache = caches["default"]
+
 
 class TimeCompareProcessor:
     """
@@ -480,6 +489,156 @@ class QueryTypeProcessor:
         return new_data
 
 
+class QueryResultCache:
+    """
+    图表查询结果缓存
+    按查询周期将时间范围切分为固定大小的时间桶，已完成的历史时间桶缓存查询结果，
+    刷新时仅查询缓存缺失的时间桶及未完成的尾部时间窗口，再将结果合并
+    """
+
+    key_prefix = "graph_query_result"
+
+    def __init__(self, params: dict, query_method: Callable[..., list[dict]], **query_kwargs):
+        self.params = params
+        self.query_method = query_method
+        self.query_kwargs = query_kwargs
+
+        interval = max([int(query_config["interval"]) for query_config in params["query_configs"]] or [60])
+        self.interval = max(interval, 1)
+        self.bucket_size = self.interval * settings.GRAPH_QUERY_CACHE_BUCKET_POINTS
+
+    @classmethod
+    def is_enabled(cls, params: dict) -> bool:
+        """
+        判断查询是否可使用缓存
+        """
+        if not settings.GRAPH_QUERY_CACHE_ENABLED or settings.GRAPH_QUERY_CACHE_BUCKET_POINTS <= 0:
+            return False
+
+        # topk维度组合与查询时间相关，instant查询及非对齐查询只关注尾部数据
+        return not (
+            params.get("bypass_cache")
+            or params.get("series_num") is not None
+            or params["type"] == "instant"
+            or not params.get("time_alignment", True)
+            or params.get("query_method", "query_data") != "query_data"
+        )
+
+    @cached_property
+    def query_md5(self) -> str:
+        """
+        归一化后的查询配置标识
+        """
+        return count_md5(
+            {
+                "bk_tenant_id": get_request_tenant_id(),
+                "bk_biz_id": self.params["bk_biz_id"],
+                "query_configs": self.params["query_configs"],
+                "expression": self.params["expression"],
+                "functions": self.params["functions"],
+                "limit": self.params["limit"],
+                "slimit": self.params["slimit"],
+                "down_sample_range": self.params["down_sample_range"],
+                "bucket_size": self.bucket_size,
+            }
+        )
+
+    def get_cache_key(self, bucket_start: int) -> str:
+        return f"{self.key_prefix}:{self.query_md5}:{bucket_start}"
+
+    def query(self, start_time: int, end_time: int) -> list[dict]:
+        return self.query_method(start_time=start_time * 1000, end_time=end_time * 1000, **self.query_kwargs)
+
+    @staticmethod
+    def dumps(points: list[dict]) -> bytes:
+        return zlib.compress(json.dumps(points).encode("utf-8"))
+
+    @staticmethod
+    def loads(value: bytes) -> list[dict]:
+        return json.loads(zlib.decompress(value))
+
+    def query_data(self) -> list[dict]:
+        start_time, end_time = self.params["start_time"], self.params["end_time"]
+        bucket_size = self.bucket_size
+
+        # 只有在延迟时间之前结束的时间桶才视为已完成，其数据不再变化
+        complete_time = min(end_time, int(time.time()) - settings.GRAPH_QUERY_CACHE_DELAY)
+        first_bucket = time_interval_align(start_time, bucket_size)
+        complete_bucket = time_interval_align(complete_time, bucket_size)
+        buckets = list(range(first_bucket, complete_bucket, bucket_size))
+        if not buckets:
+            metrics.GRAPH_QUERY_CACHE_COUNT.labels(result="bypass").inc()
+            return self.query(start_time, end_time)
+
+        cache_keys = {bucket: self.get_cache_key(bucket) for bucket in buckets}
+        try:
+            cached_values = query_result_cache.get_many(list(cache_keys.values()))
+        except Exception as e:
+            logger.exception("get graph query result cache error: %s", e)
+            cached_values = {}
+
+        bucket_points = {}
+        for bucket, cache_key in cache_keys.items():
+            if cache_key not in cached_values:
+                continue
+            try:
+                bucket_points[bucket] = self.loads(cached_values[cache_key])
+            except Exception:
+                continue
+
+        # 按实际使用的缓存时间桶数判断命中情况
+        cached_bucket_count = len(bucket_points)
+        if cached_bucket_count == len(buckets):
+            metrics.GRAPH_QUERY_CACHE_COUNT.labels(result="hit").inc()
+        elif cached_bucket_count:
+            metrics.GRAPH_QUERY_CACHE_COUNT.labels(result="partial_hit").inc()
+        else:
+            metrics.GRAPH_QUERY_CACHE_COUNT.labels(result="miss").inc()
+
+        # 连续缺失的时间桶合并查询，结果按时间桶拆分后写入缓存
+        missing_ranges = []
+        for bucket in buckets:
+            if bucket in bucket_points:
+                continue
+            if missing_ranges and missing_ranges[-1][1] == bucket:
+                missing_ranges[-1][1] = bucket + bucket_size
+            else:
+                missing_ranges.append([bucket, bucket + bucket_size])
+
+        new_values = {}
+        for range_start, range_end in missing_ranges:
+            points = self.query(range_start, range_end)
+            range_points = {bucket: [] for bucket in range(range_start, range_end, bucket_size)}
+            for point in points:
+                point_bucket = range_start + (point["_time_"] // 1000 - range_start) // bucket_size * bucket_size
+                range_points.setdefault(point_bucket, []).append(point)
+
+            for bucket, points in range_points.items():
+                bucket_points[bucket] = points
+                if len(points) <= settings.GRAPH_QUERY_CACHE_MAX_POINTS:
+                    new_values[self.get_cache_key(bucket)] = self.dumps(points)
+
+        if new_values:
+            try:
+                query_result_cache.set_many(new_values, settings.GRAPH_QUERY_CACHE_TIMEOUT)
+            except Exception as e:
+                logger.exception("set graph query result cache error: %s", e)
+
+        # 首个时间桶可能早于查询开始时间，按查询周期对齐后过滤
+        start_timestamp = time_interval_align(start_time, self.interval) * 1000
+        end_timestamp = time_interval_align(end_time, self.interval) * 1000
+        records = []
+        for bucket in buckets:
+            records.extend(
+                point for point in bucket_points[bucket] if start_timestamp <= point["_time_"] < end_timestamp
+            )
+
+        # 尾部未完成的时间窗口实时查询
+        if complete_bucket < end_time:
+            records.extend(self.query(max(complete_bucket, start_time), end_time))
+        return records
+
+
 class UnifyQueryRawResource(ApiAuthResource):
     """
     统一查询接口 (原始数据)
@@ -487,6 +646,9 @@ class UnifyQueryRawResource(ApiAuthResource):
 
     re_down_sample = re.compile(r"^\d+[mshdw]$")
 
+    # 是否使用查询结果缓存
+    enable_query_cache = False
+
     class RequestSerializer(serializers.Serializer):
         class QueryConfigSerializer(serializers.Serializer):
             class MetricSerializer(serializers.Serializer):
@@ -567,6 +729,7 @@ class UnifyQueryRawResource(ApiAuthResource):
         query_method = serializers.CharField(label="查询方法", required=False, default="query_data")
         unit = serializers.CharField(label="单位", default="", allow_blank=True)
         with_metric = serializers.BooleanField(label="是否返回metric信息", default=True)
+        bypass_cache = serializers.BooleanField(label="是否跳过查询结果缓存", default=False)
 
         @classmethod
         def to_str(cls, value):
@@ -872,19 +1035,23 @@ class UnifyQueryRawResource(ApiAuthResource):
         }
         query_method: Callable[[Any], list[dict]] = query_method_map.get(params.get("query_method"), query.query_data)
 
-        points = query_method(
-            start_time=params["start_time"] * 1000,
-            end_time=params["end_time"] * 1000,
+        query_kwargs = dict(
             limit=params["limit"],
             slimit=params["slimit"],
             down_sample_range=params["down_sample_range"],
             time_alignment=time_alignment,
         )
+        if self.enable_query_cache and QueryResultCache.is_enabled(params):
+            points = QueryResultCache(params, query_method, **query_kwargs).query_data()
+        else:
+            points = query_method(
+                start_time=params["start_time"] * 1000, end_time=params["end_time"] * 1000, **query_kwargs
+            )
 
         # 如果存在数据后过滤条件，则进行过滤
         if params.get("post_query_filter_dict"):
             condition_filter = load_agg_condition_instance(params["post_query_filter_dict"])
-            points = [point for point in points if condition_filter.is_match(point)]
+            points = condition_filter.filter(points)
 
         # 数据预处理
         points = TimeCompareProcessor.process_origin_data(params, points)
@@ -900,6 +1067,8 @@ class GraphUnifyQueryResource(UnifyQueryRawResource):
     统一查询接口 (适配图表展示)
     """
 
+    enable_query_cache = True
+
     def get_unit(self, metrics: list[dict], params: dict) -> str:
         """
         获取单位信息
@@ -918,6 +1087,40 @@ class GraphUnifyQueryResource(UnifyQueryRawResource):
 
         return metrics[0].get("unit", "")
 
+    @staticmethod
+    def get_dimension_extractor(params: dict) -> Callable[[dict], tuple]:
+        """
+        生成维度提取函数，返回按维度名排序的 (维度名, 维度值) 元组
+        """
+        data_source_label = ""
+        for query_config in params["query_configs"]:
+            data_source_label = query_config.get("data_source_label")
+
+        # prometheus 查询除结果和时间外的所有字段均为维度，同一序列的字段相同，排序结果可复用
+        if data_source_label == DataSourceLabel.PROMETHEUS:
+            excluded_fields = {"_result_", "_time_"}
+            sorted_fields_cache = {}
+
+            def extract_dimensions(record: dict) -> tuple:
+                fields = tuple(record)
+                sorted_fields = sorted_fields_cache.get(fields)
+                if sorted_fields is None:
+                    sorted_fields = sorted_fields_cache[fields] = sorted(
+                        field for field in fields if field not in excluded_fields
+                    )
+                return tuple((field, record[field]) for field in sorted_fields)
+
+            return extract_dimensions
+
+        dimension_fields = sorted(
+            set(chain(["__time_compare"], *(query_config["group_by"] for query_config in params["query_configs"])))
+        )
+
+        def extract_dimensions(record: dict) -> tuple:
+            return tuple((field, record[field]) for field in dimension_fields if field in record)
+
+        return extract_dimensions
+
     def data_format(self, params, data):
         """
         转换为Grafana TimeSeries的格式
@@ -932,18 +1135,20 @@ class GraphUnifyQueryResource(UnifyQueryRawResource):
         :return:
         :rtype: list
         """
+        return list(self.iter_data_format(params, data))
 
-        dimension_fields = set(chain(*(query_config["group_by"] for query_config in params["query_configs"])))
-
-        formatted_data = defaultdict(dict)
-
+    def iter_data_format(self, params: dict, data: Iterable[dict]) -> Iterator[dict]:
+        """
+        逐个生成Grafana TimeSeries格式的序列
+        维度提取及指标展示配置每次请求只计算一次，数据记录只遍历一次，data 可以是惰性生成的记录
+        """
         # 表达式翻译
         expression: str = params["expression"]
         stack: str = params.get("stack")
-        data_source_label = ""
         is_bar = False
+        # 需要展示的指标: (字段, 展示名称)
+        display_metrics: list[tuple[str, str]] = []
         for query_config in params["query_configs"]:
-            data_source_label = query_config.get("data_source_label")
             for metric in query_config["metrics"]:
                 if metric.get("alias"):
                     expression = expression.replace(metric["alias"], f"{metric['method']}({metric['field']})")
@@ -958,51 +1163,50 @@ class GraphUnifyQueryResource(UnifyQueryRawResource):
                     (DataSourceLabel.BK_FTA, DataTypeLabel.EVENT),
                 )
 
-        for record in data:
-            dimensions = tuple(
-                sorted(
-                    (key, value)
-                    for key, value in record.items()
-                    if key in dimension_fields
-                    or key == "__time_compare"
-                    or (data_source_label == DataSourceLabel.PROMETHEUS and key not in ["_result_", "_time_"])
-                )
-            )
+                # 只展示需要展示的指标
+                if not metric.get("display"):
+                    continue
+                if metric.get("alias"):
+                    display_metrics.append((metric["alias"], f"{metric['field']}({metric['alias']})"))
+                else:
+                    display_metrics.append((metric["field"], metric["field"]))
 
-            if record.get("_result_") is not None:
-                if isinstance(record["_result_"], int | float):
-                    record["_result_"] = round(record["_result_"], settings.POINT_PRECISION)
+        extract_dimensions = self.get_dimension_extractor(params)
+        precision = settings.POINT_PRECISION
+        number_types = (int, float)
+        result_metric = ("_result_", expression)
 
-                # 查询结果取值
-                formatted_data[dimensions].setdefault(("_result_", expression), []).append(
-                    [record.get("_result_"), record["_time_"]]
-                )
+        formatted_data: dict[tuple, dict[tuple[str, str], list]] = defaultdict(dict)
+        for record in data:
+            metric_to_data_point = None
+
+            # 查询结果取值
+            value = record.get("_result_")
+            if value is not None:
+                if isinstance(value, number_types):
+                    value = round(value, precision)
+                metric_to_data_point = formatted_data[extract_dimensions(record)]
+                datapoints = metric_to_data_point.get(result_metric)
+                if datapoints is None:
+                    datapoints = metric_to_data_point[result_metric] = []
+                datapoints.append([value, record["_time_"]])
 
             # 其他指标取值
-            for query_config in params["query_configs"]:
-                for metric in query_config["metrics"]:
-                    # 只展示需要展示的指标
-                    if not metric.get("display"):
-                        continue
-
-                    if metric.get("alias"):
-                        alias = metric["alias"]
-                        display_dimension = f"{metric['field']}({alias})"
-                    else:
-                        alias = metric["field"]
-                        display_dimension = alias
-
-                    alias = metric.get("alias") or metric["field"]
-                    if record.get(alias) is not None:
-                        value = record[alias]
-                        if isinstance(value, int | float):
-                            value = round(value, settings.POINT_PRECISION)
-                        formatted_data[dimensions].setdefault((alias, display_dimension), []).append(
-                            [value, record["_time_"]]
-                        )
+            for metric_tuple in display_metrics:
+                value = record.get(metric_tuple[0])
+                if value is None:
+                    continue
+                if isinstance(value, number_types):
+                    value = round(value, precision)
+                if metric_to_data_point is None:
+                    metric_to_data_point = formatted_data[extract_dimensions(record)]
+                datapoints = metric_to_data_point.get(metric_tuple)
+                if datapoints is None:
+                    datapoints = metric_to_data_point[metric_tuple] = []
+                datapoints.append([value, record["_time_"]])
 
         # 构造图表数据结构
-        result = []
+        series_type = "bar" if is_bar else "line"
         for dimensions, metric_to_data_point in formatted_data.items():
             dimension_string = ", ".join(f"{dimension[0]}={dimension[1]}" for dimension in dimensions)
             for metric_tuple, value in metric_to_data_point.items():
@@ -1013,18 +1217,16 @@ class GraphUnifyQueryResource(UnifyQueryRawResource):
                     target = "value"
 
                 item = {
-                    "dimensions": {dimension[0]: dimension[1] for dimension in dimensions},
+                    "dimensions": dict(dimensions),
                     "target": target,
                     "metric_field": metric_tuple[0],
                     "datapoints": value,
                     "alias": metric_tuple[0],
-                    "type": "bar" if is_bar else "line",
+                    "type": series_type,
                 }
                 if stack:
                     item["stack"] = stack
-                result.append(item)
-
-        return result
+                yield item
 
     def translate_dimensions(self, params: dict, data: list):
         """
@@ -0,0 +1,149 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+import copy
+from collections import defaultdict
+from itertools import chain
+
+import pytest
+from django.conf import settings
+
+from constants.data_source import DataSourceLabel, DataTypeLabel
+from monitor_web.grafana.resources.unify_query import GraphUnifyQueryResource
+
+
+def make_params(data_source_label=DataSourceLabel.BK_MONITOR_COLLECTOR, display=True):
+    return {
+        "expression": "a + b",
+        "query_configs": [
+            {
+                "data_source_label": data_source_label,
+                "data_type_label": DataTypeLabel.TIME_SERIES,
+                "group_by": ["namespace", "pod_name"],
+                "metrics": [{"field": "container_cpu_usage", "method": "sum", "alias": "a", "display": display}],
+            },
+            {
+                "data_source_label": data_source_label,
+                "data_type_label": DataTypeLabel.TIME_SERIES,
+                "group_by": ["pod_name"],
+                "metrics": [{"field": "container_memory_usage", "method": "sum", "alias": "b", "display": False}],
+            },
+        ],
+    }
+
+
+def make_records(series_count, point_count):
+    records = []
+    for series in range(series_count):
+        for point in range(point_count):
+            records.append(
+                {
+                    "namespace": f"namespace-{series % 10}",
+                    "pod_name": f"pod-{series}",
+                    "a": series * 0.123456 + point,
+                    "b": series,
+                    "_result_": series * 1.0000001 + point if point % 100 else None,
+                    "_time_": 1700000000000 + point * 60000,
+                }
+            )
+    return records
+
+
+def legacy_data_format(params, data):
+    """
+    逐条记录排序维度、遍历指标配置的原始实现，用于对比
+    """
+    dimension_fields = set(chain(*(query_config["group_by"] for query_config in params["query_configs"])))
+    formatted_data = defaultdict(dict)
+    expression = params["expression"]
+    data_source_label = ""
+    for query_config in params["query_configs"]:
+        data_source_label = query_config.get("data_source_label")
+        for metric in query_config["metrics"]:
+            if metric.get("alias"):
+                expression = expression.replace(metric["alias"], f"{metric['method']}({metric['field']})")
+
+    for record in data:
+        dimensions = tuple(
+            sorted(
+                (key, value)
+                for key, value in record.items()
+                if key in dimension_fields
+                or key == "__time_compare"
+                or (data_source_label == DataSourceLabel.PROMETHEUS and key not in ["_result_", "_time_"])
+            )
+        )
+        if record.get("_result_") is not None:
+            if isinstance(record["_result_"], int | float):
+                record["_result_"] = round(record["_result_"], settings.POINT_PRECISION)
+            formatted_data[dimensions].setdefault(("_result_", expression), []).append(
+                [record.get("_result_"), record["_time_"]]
+            )
+        for query_config in params["query_configs"]:
+            for metric in query_config["metrics"]:
+                if not metric.get("display"):
+                    continue
+                if metric.get("alias"):
+                    alias = metric["alias"]
+                    display_dimension = f"{metric['field']}({alias})"
+                else:
+                    alias = metric["field"]
+                    display_dimension = alias
+                alias = metric.get("alias") or metric["field"]
+                if record.get(alias) is not None:
+                    value = record[alias]
+                    if isinstance(value, int | float):
+                        value = round(value, settings.POINT_PRECISION)
+                    formatted_data[dimensions].setdefault((alias, display_dimension), []).append(
+                        [value, record["_time_"]]
+                    )
+
+    result = []
+    for dimensions, metric_to_data_point in formatted_data.items():
+        dimension_string = ", ".join(f"{dimension[0]}={dimension[1]}" for dimension in dimensions)
+        for metric_tuple, value in metric_to_data_point.items():
+            target = metric_tuple[1]
+            if dimension_string:
+                target += f"{{{dimension_string}}}"
+            if not target:
+                target = "value"
+            result.append(
+                {
+                    "dimensions": {dimension[0]: dimension[1] for dimension in dimensions},
+                    "target": target,
+                    "metric_field": metric_tuple[0],
+                    "datapoints": value,
+                    "alias": metric_tuple[0],
+                    "type": "line",
+                }
+            )
+    return result
+
+
+class TestGraphDataFormat:
+    @pytest.mark.parametrize(
+        "params",
+        [
+            make_params(),
+            make_params(display=False),
+            make_params(data_source_label=DataSourceLabel.PROMETHEUS),
+        ],
+    )
+    def test_parity(self, params):
+        records = make_records(20, 200)
+        records[3]["__time_compare"] = "1d"
+        expected = legacy_data_format(params, copy.deepcopy(records))
+        assert GraphUnifyQueryResource().data_format(params, records) == expected
+
+    def test_iter_data_format(self):
+        params = make_params()
+        records = make_records(5, 10)
+        series = GraphUnifyQueryResource().iter_data_format(params, iter(records))
+        assert list(series) == legacy_data_format(params, copy.deepcopy(records))
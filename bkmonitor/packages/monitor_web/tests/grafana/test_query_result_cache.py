@@ -0,0 +1,134 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from unittest import mock
+
+import pytest
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+
+from bkmonitor.utils.time_tools import time_interval_align
+from monitor_web.grafana.resources.unify_query import QueryResultCache
+
+INTERVAL = 60
+BUCKET_POINTS = 10
+NOW = 1700006000
+
+
+def make_params(start_time, end_time, **kwargs):
+    params = {
+        "bk_biz_id": 2,
+        "query_configs": [{"interval": INTERVAL, "table": "system.cpu_summary", "filter_dict": {}}],
+        "expression": "a",
+        "functions": [],
+        "limit": 1000,
+        "slimit": 1000,
+        "down_sample_range": "",
+        "type": "range",
+        "time_alignment": True,
+        "start_time": start_time,
+        "end_time": end_time,
+    }
+    params.update(kwargs)
+    return params
+
+
+def fake_query(start_time, end_time, **kwargs):
+    """
+    每个周期一个数据点，结束时间不包含在内
+    """
+    start_time = time_interval_align(start_time // 1000, INTERVAL) * 1000
+    end_time = time_interval_align(end_time // 1000, INTERVAL) * 1000
+    return [{"_time_": t, "_result_": t // 1000 % 97} for t in range(start_time, end_time, INTERVAL * 1000)]
+
+
+@pytest.fixture
+def result_cache():
+    cache = LocMemCache("graph_query_result", {})
+    # 同名的 LocMemCache 共享存储，避免用例之间相互影响
+    cache.clear()
+    with mock.patch("monitor_web.grafana.resources.unify_query.query_result_cache", cache):
+        with mock.patch("monitor_web.grafana.resources.unify_query.get_request_tenant_id", return_value="system"):
+            with mock.patch("monitor_web.grafana.resources.unify_query.time.time", return_value=NOW):
+                with mock.patch.multiple(
+                    settings,
+                    GRAPH_QUERY_CACHE_ENABLED=True,
+                    GRAPH_QUERY_CACHE_BUCKET_POINTS=BUCKET_POINTS,
+                    GRAPH_QUERY_CACHE_DELAY=300,
+                    GRAPH_QUERY_CACHE_MAX_POINTS=1000,
+                    GRAPH_QUERY_CACHE_TIMEOUT=3600,
+                ):
+                    yield cache
+
+
+def query_with_cache(params):
+    query_method = mock.MagicMock(side_effect=fake_query)
+    records = QueryResultCache(params, query_method).query_data()
+    return records, query_method
+
+
+class TestQueryResultCache:
+    def test_cache(self, result_cache):
+        params = make_params(NOW - 3600, NOW)
+        records, query_method = query_with_cache(params)
+        assert records == fake_query(params["start_time"] * 1000, params["end_time"] * 1000)
+        # 历史时间桶合并查询一次，尾部窗口查询一次
+        assert query_method.call_count == 2
+
+        # 刷新时历史时间桶命中缓存，只查询尾部窗口
+        params = make_params(NOW - 3600 + 30, NOW + 30)
+        records, query_method = query_with_cache(params)
+        assert records == fake_query(params["start_time"] * 1000, params["end_time"] * 1000)
+        assert query_method.call_count == 1
+
+    def test_partial_hit(self, result_cache):
+        query_with_cache(make_params(NOW - 3600, NOW))
+
+        # 更早的时间桶缺失，单独查询
+        params = make_params(NOW - 7200, NOW)
+        records, query_method = query_with_cache(params)
+        assert records == fake_query(params["start_time"] * 1000, params["end_time"] * 1000)
+        assert query_method.call_count == 2
+        assert query_method.call_args_list[0].kwargs["end_time"] <= (NOW - 3600) * 1000
+
+    def test_metrics(self, result_cache):
+        def cache_result(params):
+            with mock.patch("monitor_web.grafana.resources.unify_query.metrics") as metrics:
+                query_with_cache(params)
+            return [call.kwargs["result"] for call in metrics.GRAPH_QUERY_CACHE_COUNT.labels.call_args_list]
+
+        assert cache_result(make_params(NOW - 3600, NOW)) == ["miss"]
+        assert cache_result(make_params(NOW - 3600, NOW)) == ["hit"]
+        # 按实际使用的缓存时间桶判断，部分时间桶来自缓存即为部分命中
+        assert cache_result(make_params(NOW - 7200, NOW)) == ["partial_hit"]
+        assert cache_result(make_params(NOW - 7200, NOW)) == ["hit"]
+
+    def test_query_config_change(self, result_cache):
+        query_with_cache(make_params(NOW - 3600, NOW))
+
+        params = make_params(NOW - 3600, NOW)
+        params["query_configs"][0]["filter_dict"] = {"bk_target_ip": "127.0.0.1"}
+        _, query_method = query_with_cache(params)
+        assert query_method.call_count == 2
+
+    def test_is_enabled(self, result_cache):
+        assert QueryResultCache.is_enabled(make_params(NOW - 3600, NOW))
+        assert not QueryResultCache.is_enabled(make_params(NOW - 3600, NOW, bypass_cache=True))
+        assert not QueryResultCache.is_enabled(make_params(NOW - 3600, NOW, type="instant"))
+        assert not QueryResultCache.is_enabled(make_params(NOW - 3600, NOW, series_num=10))
+        with mock.patch.object(settings, "GRAPH_QUERY_CACHE_ENABLED", False):
+            assert not QueryResultCache.is_enabled(make_params(NOW - 3600, NOW))
+
+    def test_recent_range(self, result_cache):
+        # 查询范围内没有已完成的时间桶，直接查询
+        params = make_params(NOW - 300, NOW)
+        records, query_method = query_with_cache(params)
+        assert query_method.call_count == 1
+        assert records == fake_query(params["start_time"] * 1000, params["end_time"] * 1000)
@@ -0,0 +1,130 @@
+"""
+Tencent is pleased to support the open source community by making 蓝鲸智云 - 监控平台 (BlueKing - Monitor) available.
+Copyright (C) 2017-2021 THL A29 Limited, a Tencent company. All rights reserved.
+Licensed under the MIT License (the "License"); you may not use this file except in compliance with the License.
+You may obtain a copy of the License at http://opensource.org/licenses/MIT
+Unless required by applicable law or agreed to in writing, software distributed under the License is distributed on
+an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the License for the
+specific language governing permissions and limitations under the License.
+"""
+
+from unittest import mock
+
+import pytest
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+
+from bkmonitor.utils import cache as cache_module
+from bkmonitor.utils.cache import CacheTypeItem, UsingCache
+from bkmonitor.utils.local import local
+
+CACHE_TYPE = CacheTypeItem(key="test", timeout=60, user_related=False)
+
+
+class SyncThread:
+    """
+    同步执行后台刷新，便于断言
+    """
+
+    def __init__(self, target, args, daemon=None):
+        self.target = target
+        self.args = args
+
+    def start(self):
+        self.target(*self.args)
+
+
+@pytest.fixture
+def backend():
+    backend = LocMemCache("using_cache_test", {})
+    backend.clear()
+    with (
+        mock.patch.multiple(cache_module, cache=backend, mem_cache=backend),
+        mock.patch.multiple(
+            settings,
+            ENVIRONMENT="test",
+            USING_CACHE_SINGLE_FLIGHT_ENABLED=True,
+            USING_CACHE_SINGLE_FLIGHT_WAIT=1,
+            USING_CACHE_STALE_TIMEOUT=0,
+        ),
+    ):
+        yield backend
+
+
+def make_cached_func(cache_type=CACHE_TYPE):
+    func = mock.MagicMock(return_value={"value": 1})
+    func.__module__ = __name__
+    func.__name__ = "func"
+    using_cache = UsingCache(cache_type)
+    using_cache.local_cache_enable = False
+    return using_cache, using_cache(func), func
+
+
+class TestUsingCache:
+    def test_single_flight_wait(self, backend):
+        using_cache, cached_func, func = make_cached_func()
+        cache_key = using_cache._cache_key(func, (), {})
+        # 其他调用方持有刷新锁，等待其回写缓存
+        backend.add(using_cache._lock_key(cache_key), "other")
+
+        def sleep(seconds):
+            using_cache.set_value(cache_key, {"value": 2})
+
+        with mock.patch.object(cache_module.time, "sleep", side_effect=sleep):
+            assert cached_func() == {"value": 2}
+        func.assert_not_called()
+
+    def test_single_flight_holder_finished(self, backend):
+        using_cache, cached_func, func = make_cached_func()
+        lock_key = using_cache._lock_key(using_cache._cache_key(func, (), {}))
+        backend.add(lock_key, "other")
+
+        # 持锁方结束但未写入缓存时，不再等待，自行执行
+        with mock.patch.object(cache_module.time, "sleep", side_effect=lambda seconds: backend.delete(lock_key)):
+            assert cached_func() == {"value": 1}
+        assert func.call_count == 1
+        assert cached_func() == {"value": 1}
+        assert func.call_count == 1
+        assert backend.get(lock_key) is None
+
+    def test_stale_while_revalidate(self, backend):
+        using_cache, cached_func, func = make_cached_func(CacheTypeItem(key="test", timeout=60, stale_timeout=600))
+        assert cached_func() == {"value": 1}
+        assert cached_func() == {"value": 1}
+        assert func.call_count == 1
+
+        # 软过期后返回旧数据，并在后台刷新
+        stale_cache_key = using_cache._stale_cache_key(using_cache._cache_key(func, (), {}))
+        entry = using_cache.get_value(stale_cache_key)
+        using_cache.set_value(stale_cache_key, {"expire_at": 0, "value": entry["value"]}, 660)
+        func.return_value = {"value": 2}
+        with mock.patch.object(cache_module, "InheritParentThread", SyncThread):
+            assert cached_func() == {"value": 1}
+        assert func.call_count == 2
+        assert cached_func() == {"value": 2}
+
+    def test_local_cache(self, backend):
+        using_cache, cached_func, func = make_cached_func()
+        using_cache.local_cache_enable = True
+        cache_key = using_cache._cache_key(func, (), {})
+        try:
+            cached_func()
+            value = using_cache.get_value(cache_key)
+            # 一级缓存保存反序列化后的对象
+            assert getattr(local, cache_key) is value
+            backend.clear()
+            assert using_cache.get_value(cache_key) is value
+        finally:
+            delattr(local, cache_key)
+
+    def test_lock_error(self, backend):
+        using_cache, cached_func, func = make_cached_func()
+        # 缓存出错时跳过并发控制，直接刷新并上报
+        with (
+            mock.patch.object(backend, "add", side_effect=ConnectionError),
+            mock.patch.object(cache_module.metrics, "USING_CACHE_LOCK_ERROR_COUNT") as lock_error_count,
+        ):
+            assert cached_func() == {"value": 1}
+        func.assert_called_once()
+        lock_error_count.labels.assert_called_once_with(cache_type="test")
+        lock_error_count.labels.return_value.inc.assert_called_once()